@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.request import urlopen, Request
+from loguru import logger
+
+"""
+Benchmark of release asset downloads over a slow, flaky connection.
+
+A local server serves a random file with RTT seconds of latency before each response, at most
+RATE MB/s per connection (like a long-distance TCP connection) and a DROP_CHANCE chance per MB
+sent of dropping the connection. The baseline is the previous DependencyManager._download_file
+(urlopen, 8 KB reads, starting over after a drop), compared with the current download, resumed
+with Range requests, in one stream and in several byte ranges at once.
+
+Usage: python benchmarks/bench_download.py [--size-mb 48] [--rate 8] [--rtt 0.1] [--drop-chance 0.03] [--segments 4]
+"""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+SEND_CHUNK = 64 * 1024
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Serves server.content with Range support, throttled, with latency and random drops."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.rtt)
+        content, start, end = server.content, 0, len(server.content) - 1
+        range_header = self.headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            first, _, last = range_header[len("bytes="):].partition("-")
+            start, end = int(first), int(last) if last else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", '"bench"')
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        offset = start
+        sent_since_roll = 0
+        while offset <= end:
+            chunk = content[offset:min(offset + SEND_CHUNK, end + 1)]
+            try:
+                self.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                return  # The first range stops reading its open-ended request at its end
+            offset += len(chunk)
+            sent_since_roll += len(chunk)
+            if sent_since_roll >= 1024 * 1024:
+                sent_since_roll = 0
+                with server.random_lock:
+                    dropped = server.random.random() < server.drop_chance
+                if dropped:
+                    server.drops += 1
+                    self.close_connection = True
+                    return
+            time.sleep(len(chunk) / server.rate)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def download_before(url: str, output_path: Path, attempts: int = 50) -> int:
+    """
+    The previous DependencyManager._download_file, retried from scratch like a rerun would.
+
+    A drop ends its read loop without an error, leaving a truncated zip that _validate_zip_file
+    rejects, so a short file counts as a failed attempt here.
+    """
+    for attempt in range(attempts):
+        try:
+            req = Request(url, headers={'User-Agent': 'DarkAndDarker-Exporter'})
+            with urlopen(req) as response:
+                file_size = int(response.headers.get('Content-Length', 0))
+                with open(output_path, 'wb') as f:
+                    while True:
+                        chunk = response.read(8192)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+            if output_path.stat().st_size == file_size:
+                return attempt + 1
+        except Exception:
+            pass
+        output_path.unlink(missing_ok=True)
+    raise RuntimeError("Gave up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark downloads over a slow, flaky connection")
+    parser.add_argument("--size-mb", type=int, default=48, help="Size of the served file in MB")
+    parser.add_argument("--rate", type=float, default=8, help="MB/s per connection")
+    parser.add_argument("--rtt", type=float, default=0.1, help="Seconds of latency before each response")
+    parser.add_argument("--drop-chance", type=float, default=0.03, help="Chance per MB sent that the connection drops")
+    parser.add_argument("--segments", type=int, default=4, help="Byte ranges for the segmented download")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the drops")
+    args = parser.parse_args()
+
+    import http_client
+    logger.remove()
+    http_client.RETRY_DELAY = 0.1
+    http_client.DOWNLOAD_RETRIES = 50
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    server.content = os.urandom(args.size_mb * 1024 * 1024)
+    server.rate = args.rate * 1024 * 1024
+    server.rtt = args.rtt
+    server.drop_chance = args.drop_chance
+    server.random_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/asset.zip"
+    work_dir = Path(tempfile.mkdtemp())
+    size = len(server.content)
+
+    def run(label, download):
+        server.random = random.Random(args.seed)
+        server.drops = 0
+        path = work_dir / f"{label.split()[0]}.zip"
+        start_time = time.perf_counter()
+        detail = download(path)
+        seconds = time.perf_counter() - start_time
+        assert path.read_bytes() == server.content
+        path.unlink()
+        print(f"{label:<32} {seconds:7.2f} s  {size / seconds / 1024 ** 2:6.2f} MB/s  {server.drops:3} drops  {detail}")
+
+    try:
+        print(f"{args.size_mb} MB at {args.rate} MB/s per connection, {args.rtt * 1000:.0f} ms latency, {args.drop_chance:.0%} drop chance per MB")
+        run("before (restart on drop)", lambda path: f"{download_before(url, path)} attempts")
+        run("after (resume, 1 stream)", lambda path: f"{http_client.HttpClient(work_dir / 'cache.json').download(url, path)[0]} bytes")
+        run(f"after (resume, {args.segments} ranges)", lambda path: f"{http_client.HttpClient(work_dir / 'cache.json').download(url, path, segments=args.segments)[0]} bytes")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.request import urlopen, Request
+from loguru import logger
+
+"""
+Benchmark of download throughput and memory over a fast local connection.
+
+A local server serves SIZE MB payloads as fast as it can, from a repeated 1 MB random block so it
+doesn't hold them in memory. Each download runs in its own process, which reports its wall time
+and peak RSS. The baselines are the previous DependencyManager._download_single_file (the whole
+response read into memory with response.read()) and _download_file (urlopen, a new 8 KB bytes
+object per read), compared with HttpClient.download, which reads into one reused buffer of
+CHUNK_SIZE and hashes SHA-256 as it writes. Since hashing costs time of its own, the 8 KB loop is
+also run hashing each chunk.
+
+Usage: python benchmarks/bench_download_throughput.py [--sizes 10 100 1000 2048] [--chunk-sizes 65536 1048576] [--dir TEMP_DIR]
+"""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+BLOCK = os.urandom(1024 * 1024)
+
+
+class PayloadHandler(BaseHTTPRequestHandler):
+    """Serves /<size in bytes> with Range support, from the repeated block."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        size = int(self.path.strip("/").split(".")[0])
+        start, end = 0, size - 1
+        range_header = self.headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            first, _, last = range_header[len("bytes="):].partition("-")
+            start, end = int(first), int(last) if last else end
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", '"bench"')
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        block = memoryview(BLOCK)
+        offset = start
+        try:
+            while offset <= end:
+                block_offset = offset % len(BLOCK)
+                count = min(len(BLOCK) - block_offset, end - offset + 1)
+                self.wfile.write(block[block_offset:block_offset + count])
+                offset += count
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def log_message(self, format, *args):
+        pass
+
+
+def get_peak_rss() -> int:
+    """Peak resident memory of this process in bytes."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+
+
+def download_single_file_before(url: str, output_path: Path) -> None:
+    """The previous DependencyManager._download_single_file."""
+    req = Request(url, headers={'User-Agent': 'DarkAndDarker-Exporter'})
+    with urlopen(req) as response:
+        with open(output_path, 'wb') as f:
+            f.write(response.read())
+
+
+def download_file_before(url: str, output_path: Path, hasher=None) -> None:
+    """The previous DependencyManager._download_file, without its logging, optionally hashing each chunk like the current download does."""
+    req = Request(url, headers={'User-Agent': 'DarkAndDarker-Exporter'})
+    with urlopen(req) as response:
+        with open(output_path, 'wb') as f:
+            while True:
+                chunk = response.read(8192)
+                if not chunk:
+                    break
+                f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+
+
+def run_child(variant: str, url: str, path: Path, chunk_size: int) -> None:
+    """Download once in this process and print the time and peak RSS as JSON."""
+    import http_client
+    logger.remove()
+    start_rss = get_peak_rss()
+    start_time = time.perf_counter()
+    if variant == "single_file_before":
+        download_single_file_before(url, path)
+    elif variant == "file_before":
+        download_file_before(url, path)
+    elif variant == "file_before_hashed":
+        download_file_before(url, path, hashlib.sha256())
+    else:
+        http_client.HttpClient(path.with_name("cache.json")).download(url, path, chunk_size=chunk_size)
+    seconds = time.perf_counter() - start_time
+    print(json.dumps({"seconds": seconds, "start_rss": start_rss, "peak_rss": get_peak_rss(), "size": path.stat().st_size}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark download throughput and memory")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 2048], help="Payload sizes in MB")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[64 * 1024, 1024 * 1024], help="Chunk sizes of HttpClient.download in bytes")
+    parser.add_argument("--dir", default=None, help="Directory to download into")
+    parser.add_argument("--child", nargs=4, metavar=("VARIANT", "URL", "PATH", "CHUNK_SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        variant, url, path, chunk_size = args.child
+        run_child(variant, url, Path(path), int(chunk_size))
+        return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PayloadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    work_dir = Path(tempfile.mkdtemp(dir=args.dir))
+    variants = [("single_file_before", "before: read()", 0), ("file_before", "before: 8 KB read loop", 0), ("file_before_hashed", "before: 8 KB read + SHA-256", 0)]
+    variants += [("after", f"after: readinto {chunk_size // 1024} KB", chunk_size) for chunk_size in args.chunk_sizes]
+    try:
+        print(f"{'payload':>8}  {'variant':<28} {'seconds':>8} {'MB/s':>8} {'peak RSS':>10} {'RSS growth':>11}")
+        for size_mb in args.sizes:
+            url = f"http://127.0.0.1:{server.server_address[1]}/{size_mb * 1024 * 1024}.zip"
+            for variant, label, chunk_size in variants:
+                path = work_dir / "payload.zip"
+                output = subprocess.run([sys.executable, __file__, "--child", variant, url, str(path), str(chunk_size)], capture_output=True, text=True)
+                for leftover in work_dir.iterdir():
+                    leftover.unlink()
+                if output.returncode != 0:
+                    print(f"{size_mb:>5} MB  {label:<28} failed: {output.stderr.strip().splitlines()[-1] if output.stderr.strip() else output.returncode}")
+                    continue
+                result = json.loads(output.stdout.strip().splitlines()[-1])
+                assert result["size"] == size_mb * 1024 * 1024
+                print(f"{size_mb:>5} MB  {label:<28} {result['seconds']:8.2f} {size_mb / result['seconds']:8.1f} {result['peak_rss'] / 1024 ** 2:7.1f} MB {(result['peak_rss'] - result['start_rss']) / 1024 ** 2:8.1f} MB")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
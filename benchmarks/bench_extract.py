@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+from pathlib import Path
+from loguru import logger
+
+"""
+Benchmark of extracting a dependency archive.
+
+A synthetic release zip is created with FILES files of SIZE KB under one top-level folder, like
+UE4SS_v3.0.1/..., with the executable nested in a subfolder. The baseline is the previous
+DependencyManager extraction (extractall, then moving everything up out of the top-level folder,
+then searching the tree for the executable), compared with the current _extract_zip, which leaves
+the folder out while writing with several threads and records where the executable went.
+
+Usage: python benchmarks/bench_extract.py [--files 10000] [--size 16] [--workers 8] [--dir TEMP_DIR_ON_THE_VOLUME_TO_TEST]
+"""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+EXECUTABLE = "Tool.exe"
+
+
+def make_zip(zip_path: Path, files: int, size: int) -> None:
+    """Create a zip of files compressible files of size KB under one top-level folder, 100 per folder."""
+    data = (b"DarkAndDarker " * (size * 1024 // 14 + 1))[:size * 1024]
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"Tool_v1/bin/{EXECUTABLE}", os.urandom(size * 1024))
+        for index in range(files - 1):
+            zf.writestr(f"Tool_v1/Mods/d{index // 100}/file_{index}.dat", data)
+
+
+def extract_before(zip_path: Path, output_path: Path) -> Path:
+    """The previous _extract_zip, _flatten_extraction and _verify_executable."""
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        zf.extractall(output_path)
+    subdirs = [d for d in output_path.iterdir() if d.is_dir()]
+    files = [f for f in output_path.iterdir() if f.is_file()]
+    if len(subdirs) == 1 and len(files) == 0:
+        subdir = subdirs[0]
+        for item in subdir.iterdir():
+            shutil.move(str(item), str(output_path / item.name))
+        subdir.rmdir()
+    return list(output_path.rglob(EXECUTABLE))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extracting a dependency archive")
+    parser.add_argument("--files", type=int, default=10000, help="Number of files in the archive")
+    parser.add_argument("--size", type=int, default=16, help="Size of each file in KB")
+    parser.add_argument("--workers", type=int, default=8, help="Threads for the current extraction")
+    parser.add_argument("--dir", default=None, help="Directory to create the archive and extract in")
+    args = parser.parse_args()
+
+    from dependency_manager import DependencyManager
+    logger.remove()
+
+    work_dir = Path(tempfile.mkdtemp(dir=args.dir))
+    try:
+        zip_path = work_dir / "Tool_v1.zip"
+        make_zip(zip_path, args.files, args.size)
+        print(f"{args.files} files of {args.size} KB, {zip_path.stat().st_size / 1024 ** 2:.1f} MB compressed")
+
+        def run(label, extract):
+            output_path = work_dir / label.split()[0]
+            output_path.mkdir()
+            start_time = time.perf_counter()
+            executable_path = extract(output_path)
+            seconds = time.perf_counter() - start_time
+            assert executable_path == output_path / "bin" / EXECUTABLE
+            assert len(list(output_path.rglob("*.dat"))) == args.files - 1
+            print(f"{label:<32} {seconds:7.2f} s")
+
+        run("before (extractall + move)", lambda path: extract_before(zip_path, path))
+        manager = DependencyManager(temp_dir=work_dir / "temp")
+        run(f"after ({args.workers} threads)", lambda path: manager._extract_zip(zip_path, path, EXECUTABLE, workers=args.workers))
+        run("after1 (1 thread)", lambda path: manager._extract_zip(zip_path, path, EXECUTABLE, workers=1))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import time
+import select
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from loguru import logger
+
+"""
+Benchmark of how fast run_process takes in the output of a chatty tool.
+
+A child process prints lines like UnrealPak -Extract does, as fast as the pipe takes them. The
+baseline is the previous run_process loop (select, then readline and a loguru call per line),
+compared with the current run_process (chunked reads into an OutputSink, which spools the output
+and logs a sample). Loguru writes to a log file at DEBUG level in both, like a normal run.
+
+Usage: python benchmarks/bench_process_output.py [--lines 200000]
+"""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+CHILD_CODE = """
+import sys
+out = sys.stdout
+for index in range({lines}):
+    out.write(f'LogPakFile: Display: Extracted "DungeonCrawler/Content/DungeonCrawler/Data/Generated/V2/Item/Id_Item_{{index}}.uasset" to "PakExtract/Id_Item_{{index}}.uasset"\\n')
+"""
+
+
+def run_select_readline(cmd, name):
+    """The previous run_process loop, without its timeout handling."""
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    with process.stdout:
+        while True:
+            if process.poll() is not None:
+                remaining_output = process.stdout.read()
+                if remaining_output:
+                    for line in remaining_output.splitlines():
+                        logger.debug(f'[process: {name}] {line.strip()}')
+                break
+            ready, _, _ = select.select([process.stdout], [], [], 0.1)
+            if ready:
+                line = process.stdout.readline()
+                if line:
+                    logger.debug(f'[process: {name}] {line.strip()}')
+                elif process.poll() is not None:
+                    break
+    process.wait()
+
+
+def run_sink(cmd, name):
+    """The current run_process."""
+    from utils import run_process
+    run_process(cmd, name=name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run_process output throughput")
+    parser.add_argument("--lines", type=int, default=200000, help="Lines the child prints")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per variant, the best is reported")
+    args = parser.parse_args()
+
+    import output_sink
+    work_dir = Path(tempfile.mkdtemp())
+    try:
+        logger.remove()
+        logger.add(work_dir / "bench.log", level="DEBUG")
+        output_sink.configure(spool_dir=work_dir / "processes")
+        cmd = [sys.executable, "-c", CHILD_CODE.format(lines=args.lines)]
+
+        # Time for the child alone, writing to /dev/null, as the ceiling
+        start_time = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
+        child_seconds = time.perf_counter() - start_time
+        print(f"{'child alone':<28} {args.lines / child_seconds:>12,.0f} lines/s")
+
+        variants = [("select + readline (before)", run_select_readline)]
+        if os.name == 'nt':
+            variants = []  # The previous loop relied on select, which doesn't work on pipes on Windows
+        variants.append(("chunked + sink (after)", run_sink))
+        for label, run in variants:
+            best = min(timed(run, cmd, "bench") for _ in range(args.repeat))
+            print(f"{label:<28} {args.lines / best:>12,.0f} lines/s  ({best:.2f} s)")
+        log_size = (work_dir / "bench.log").stat().st_size
+        print(f"log file after all runs: {log_size / 1024 ** 2:.1f} MB")
+    finally:
+        logger.remove()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def timed(run, cmd, name):
+    start_time = time.perf_counter()
+    run(cmd, name)
+    return time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+from loguru import logger
+
+"""
+Benchmark of how long the repack cleanup keeps the pipeline waiting.
+
+A synthetic extracted game is created: FILES small files spread over directories like
+DungeonCrawler/Content/... The baseline is the previous Repacker.cleanup (os.walk bottom up, then
+os.remove and os.rmdir one by one), compared with the current one, which moves the tree to the
+trash and returns. The background deletion of the trash is timed as well, since it still has to
+happen, just not while the pipeline waits.
+
+Usage: python benchmarks/bench_trash.py [--files 500000] [--dir TEMP_DIR_ON_THE_VOLUME_TO_TEST]
+"""
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+FILES_PER_DIR = 100
+DIRS_PER_DIR = 10
+
+
+def make_tree(root: Path, files: int) -> None:
+    """Create files small files, FILES_PER_DIR per directory, in a tree DIRS_PER_DIR wide."""
+    directories = (files + FILES_PER_DIR - 1) // FILES_PER_DIR
+    data = b"u" * 512
+    for index in range(directories):
+        # Spread directory index over nested levels, e.g. 1234 -> d1/d2/d3/d4
+        parts = [f"d{digit}" for digit in str(index).zfill(len(str(directories)))]
+        directory = root.joinpath("DungeonCrawler", "Content", *parts)
+        directory.mkdir(parents=True, exist_ok=True)
+        for file_index in range(min(FILES_PER_DIR, files - index * FILES_PER_DIR)):
+            with open(directory / f"Id_Item_{file_index}.uasset", "wb") as file:
+                file.write(data)
+
+
+def cleanup_walk(extract_dir: Path) -> None:
+    """The previous Repacker.cleanup."""
+    for root, dirs, files in os.walk(extract_dir, topdown=False):
+        for name in files:
+            os.remove(os.path.join(root, name))
+        for name in dirs:
+            os.rmdir(os.path.join(root, name))
+    os.rmdir(extract_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the repack cleanup")
+    parser.add_argument("--files", type=int, default=500000, help="Files in the synthetic tree")
+    parser.add_argument("--dir", default=None, help="Directory to create the trees in, on the volume to test. Defaults to the system temp dir")
+    args = parser.parse_args()
+
+    from trash import Trash
+    logger.remove()
+    work_dir = Path(tempfile.mkdtemp(dir=args.dir))
+    try:
+        extract_dir = work_dir / "PakExtract"
+
+        start_time = time.perf_counter()
+        make_tree(extract_dir, args.files)
+        print(f"created {args.files:,} files in {time.perf_counter() - start_time:.1f} s")
+        start_time = time.perf_counter()
+        cleanup_walk(extract_dir)
+        walk_seconds = time.perf_counter() - start_time
+        print(f"{'os.walk + os.remove (before)':<36} pipeline waits {walk_seconds:8.2f} s")
+
+        make_tree(extract_dir, args.files)
+        trash = Trash(work_dir / "state" / "trash.json")
+        start_time = time.perf_counter()
+        trash.move(extract_dir)
+        move_seconds = time.perf_counter() - start_time
+        trash.wait()
+        background_seconds = time.perf_counter() - start_time
+        print(f"{'trash (after)':<36} pipeline waits {move_seconds:8.4f} s, background deletion took {background_seconds:.2f} s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,14 @@ OPTIONS_SCHEMA = {
         "section": "Logging",
         "help": "Logging level. Must be one of: DEBUG, INFO, WARNING, ERROR, CRITICAL."
     },
+    "PROCESS_LOG_LINES_PER_SECOND": {
+        "env": "PROCESS_LOG_LINES_PER_SECOND",
+        "arg": "--process-log-lines-per-second",
+        "type": int,
+        "default": 50,
+        "section": "Logging",
+        "help": "Lines of tool output (UnrealPak, BatchExport, DepotDownloader) logged per second per process. Lines that look like errors are always logged, and the full output is saved next to the log file. 0 logs every line."
+    },
     "SHOULD_DOWNLOAD_DEPENDENCIES": {
         "env": "SHOULD_DOWNLOAD_DEPENDENCIES",
         "arg": "--should-download-dependencies",
@@ -33,6 +41,33 @@ OPTIONS_SCHEMA = {
         "help": "Re-download dependencies even if they are already present.",
         "depends_on": ["SHOULD_DOWNLOAD_DEPENDENCIES"]
     },
+    "DEPENDENCIES_FROM_LOCK": {
+        "env": "DEPENDENCIES_FROM_LOCK",
+        "arg": "--dependencies-from-lock",
+        "type": bool,
+        "default": False,
+        "section": "Dependencies",
+        "help": "Install the dependency versions recorded in dependencies.lock (written by python src/dependency_manager.py --update-lock) instead of the latest releases, without calling the GitHub API.",
+        "depends_on": ["SHOULD_DOWNLOAD_DEPENDENCIES"]
+    },
+    "DEPENDENCY_MIRROR_DIR": {
+        "env": "DEPENDENCY_MIRROR_DIR",
+        "arg": "--dependency-mirror-dir",
+        "type": str,
+        "default": "",
+        "section": "Dependencies",
+        "help": "Directory to copy the dependencies.lock downloads from instead of downloading them, e.g. a shared drive for machines without internet access. Files are at the path of their download URL, e.g. <dir>/Surxe/CUE4P-BatchExport/releases/download/<tag>/BatchExport-windows-x64.zip. Blank downloads them.",
+        "depends_on": ["DEPENDENCIES_FROM_LOCK"]
+    },
+    "DEPENDENCY_STORE_MAX_SIZE": {
+        "env": "DEPENDENCY_STORE_MAX_SIZE",
+        "arg": "--dependency-store-max-size",
+        "type": int,
+        "default": 1024,
+        "section": "Dependencies",
+        "help": "Most MB of dependency versions kept in the dependency store (.state/dependencies) to switch back to without downloading. The least recently installed versions beyond it are removed; installed versions are always kept.",
+        "depends_on": ["SHOULD_DOWNLOAD_DEPENDENCIES"]
+    },
     "SHOULD_DOWNLOAD_STEAM_GAME": {
         "env": "SHOULD_DOWNLOAD_STEAM_GAME",
         "arg": "--should-download-steam-game",
@@ -89,6 +124,14 @@ OPTIONS_SCHEMA = {
         "section": "Steam Download",
         "depends_on": ["SHOULD_DOWNLOAD_STEAM_GAME", "SHOULD_REPACK"]
     },
+    "STEAM_DOWNLOAD_PROCESS_PROFILE": {
+        "env": "STEAM_DOWNLOAD_PROCESS_PROFILE",
+        "arg": "--steam-download-process-profile",
+        "type": str,
+        "default": "",
+        "help": "Process profile of DepotDownloader, over PROCESS_PROFILE. Blank uses PROCESS_PROFILE.",
+        "section": "Steam Download",
+    },
     "SHOULD_REPACK": {
         "env": "SHOULD_REPACK",
         "arg": "--should-repack",
@@ -102,7 +145,7 @@ OPTIONS_SCHEMA = {
         "arg": "--force-repack",
         "type": bool,
         "default": False,
-        "help": "Force repacking even if the output file already exists.",
+        "help": "Force repacking even if the source paks are unchanged since the last repack.",
         "section": "Repacking",
         "depends_on": ["SHOULD_REPACK"]
     },
@@ -125,6 +168,14 @@ OPTIONS_SCHEMA = {
         "section": "Repacking",
         "depends_on": ["SHOULD_REPACK", "SHOULD_BATCH_EXPORT"]
     },
+    "REPACK_PROCESS_PROFILE": {
+        "env": "REPACK_PROCESS_PROFILE",
+        "arg": "--repack-process-profile",
+        "type": str,
+        "default": "",
+        "help": "Process profile of UnrealPak, over PROCESS_PROFILE. Blank uses PROCESS_PROFILE.",
+        "section": "Repacking",
+    },
     "SHOULD_GET_MAPPER": {
         "env": "SHOULD_GET_MAPPER",
         "arg": "--should-get-mapper",
@@ -138,7 +189,7 @@ OPTIONS_SCHEMA = {
         "arg": "--force-get-mapper",
         "type": bool,
         "default": False,
-        "help": "Re-run the mapper extraction even if mapper file exists.",
+        "help": "Re-run the mapper extraction even if the game and UE4SS are unchanged since the last extraction.",
         "section": "Mapper",
         "depends_on": ["SHOULD_GET_MAPPER"]
     },
@@ -164,7 +215,7 @@ OPTIONS_SCHEMA = {
         "arg": "--force-export",
         "type": bool,
         "default": False,
-        "help": "Re-run the BatchExport even if output directory is not empty.",
+        "help": "Re-run the BatchExport even if the repacked pak, mapper file, and BatchExport are unchanged since the last export.",
         "section": "Batch Export",
         "depends_on": ["SHOULD_BATCH_EXPORT"]
     },
@@ -177,4 +228,140 @@ OPTIONS_SCHEMA = {
         "section": "Batch Export",
         "depends_on": ["SHOULD_BATCH_EXPORT"]
     },
+    "BATCH_EXPORT_PROCESS_PROFILE": {
+        "env": "BATCH_EXPORT_PROCESS_PROFILE",
+        "arg": "--batch-export-process-profile",
+        "type": str,
+        "default": "",
+        "help": "Process profile of BatchExport, over PROCESS_PROFILE. Blank uses PROCESS_PROFILE.",
+        "section": "Batch Export",
+    },
+    "RESUME": {
+        "env": "RESUME",
+        "arg": "--resume",
+        "type": bool,
+        "default": False,
+        "help": "Resume an interrupted run, skipping units of work it already completed (extracted paks, the repacked pak, UE4SS setup, the generated mappings file).",
+        "section": "Pipeline",
+    },
+    "WATCH": {
+        "env": "WATCH",
+        "arg": "--watch",
+        "type": bool,
+        "default": False,
+        "help": "Keep running and run the pipeline whenever Steam has a manifest newer than the downloaded one, instead of running once. Requires SHOULD_DOWNLOAD_STEAM_GAME.",
+        "section": "Pipeline",
+    },
+    "WATCH_INTERVAL": {
+        "env": "WATCH_INTERVAL",
+        "arg": "--watch-interval",
+        "type": int,
+        "default": 600,
+        "help": "Seconds between checks for a new manifest in watch mode.",
+        "section": "Pipeline",
+    },
+    "WATCH_JITTER": {
+        "env": "WATCH_JITTER",
+        "arg": "--watch-jitter",
+        "type": int,
+        "default": 60,
+        "help": "Maximum seconds randomly added to or removed from each watch interval.",
+        "section": "Pipeline",
+    },
+    "REGRESSION_THRESHOLD": {
+        "env": "REGRESSION_THRESHOLD",
+        "arg": "--regression-threshold",
+        "type": float,
+        "default": 1.5,
+        "help": "Warn when Repack, Get Mapper, or BatchExport takes this many times longer than the median of their recent runs, adjusted for input size.",
+        "section": "Pipeline",
+    },
+    "FAIL_ON_REGRESSION": {
+        "env": "FAIL_ON_REGRESSION",
+        "arg": "--fail-on-regression",
+        "type": bool,
+        "default": False,
+        "help": "Exit with an error instead of only warning when a performance regression is detected.",
+        "section": "Pipeline",
+    },
+    "CPU_SLOTS": {
+        "env": "CPU_SLOTS",
+        "arg": "--cpu-slots",
+        "type": int,
+        "default": 0,
+        "help": "Maximum tool processes (UnrealPak, BatchExport, DepotDownloader) running at once. 0 uses the number of CPU cores.",
+        "section": "Pipeline",
+    },
+    "IO_SLOTS_PER_VOLUME": {
+        "env": "IO_SLOTS_PER_VOLUME",
+        "arg": "--io-slots-per-volume",
+        "type": int,
+        "default": 0,
+        "help": "Maximum tool processes reading or writing the same volume at once. 0 detects it per volume from the measured throughput, so an HDD or network drive ends up with fewer than an SSD.",
+        "section": "Pipeline",
+    },
+    "PROCESS_IDLE_TIMEOUT": {
+        "env": "PROCESS_IDLE_TIMEOUT",
+        "arg": "--process-idle-timeout",
+        "type": int,
+        "default": 600,
+        "help": "Seconds a tool process (UnrealPak, BatchExport, DepotDownloader) may go without progress before it is checked for CPU and disk activity, and stopped if it has none. 0 turns the check off.",
+        "section": "Pipeline",
+    },
+    "PROCESS_PROFILE": {
+        "env": "PROCESS_PROFILE",
+        "arg": "--process-profile",
+        "type": str,
+        "default": "",
+        "help": "Scheduling of the tool processes (UnrealPak, BatchExport, DepotDownloader) as space separated settings, e.g. priority=below_normal io=idle cpus=0-3 memory=8G. priority is idle, below_normal, normal or above_normal, io is idle, low or normal, cpus are the CPUs they may run on, and memory is the most memory a tool and its children may use before it is stopped (MB, or with a K, M, G or T suffix). Blank leaves the tools as started.",
+        "section": "Pipeline",
+    },
+    "PLAN": {
+        "env": "PLAN",
+        "arg": "--plan",
+        "type": bool,
+        "default": False,
+        "help": "Print which steps would run and why, with their estimated time and disk use from previous runs, then exit without running anything.",
+        "section": "Pipeline",
+    },
+    "PROFILE_STARTUP": {
+        "env": "PROFILE_STARTUP",
+        "arg": "--profile-startup",
+        "type": bool,
+        "default": False,
+        "help": "Log how long startup took and the slowest module imports, including stage code loaded later in the run. Read before the .env file is loaded, so set it in the shell environment or pass the argument.",
+        "section": "Pipeline",
+    },
+    "BACKFILL_MANIFEST_IDS": {
+        "env": "BACKFILL_MANIFEST_IDS",
+        "arg": "--backfill-manifest-ids",
+        "type": str,
+        "default": "",
+        "help": "Comma separated manifest ids to export one after another in a single pipelined run, each into its own version directory. Blank runs a single version as usual.",
+        "section": "Backfill",
+    },
+    "BACKFILL_MAX_STAGED": {
+        "env": "BACKFILL_MAX_STAGED",
+        "arg": "--backfill-max-staged",
+        "type": int,
+        "default": 2,
+        "help": "Maximum versions downloaded but not yet fully exported at once during a backfill.",
+        "section": "Backfill",
+    },
+    "BACKFILL_MIN_FREE_GB": {
+        "env": "BACKFILL_MIN_FREE_GB",
+        "arg": "--backfill-min-free-gb",
+        "type": int,
+        "default": 50,
+        "help": "Free space in GB required on the download volume before a backfill starts downloading another version. Raised to the size of the largest version downloaded so far.",
+        "section": "Backfill",
+    },
+    "BACKFILL_KEEP_DOWNLOADS": {
+        "env": "BACKFILL_KEEP_DOWNLOADS",
+        "arg": "--backfill-keep-downloads",
+        "type": bool,
+        "default": False,
+        "help": "Keep each backfilled version's game files and repacked pak after it is exported, instead of removing them to free room for the next version.",
+        "section": "Backfill",
+    },
 }
\ No newline at end of file
@@ -0,0 +1,144 @@
+import copy
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from loguru import logger
+
+from pipeline import STATUS_PENDING, STATUS_RUNNING
+from utils import get_dir_size, get_free_space
+
+"""
+Backfill of many manifests in one pipelined run.
+
+Each manifest gets its own version directory under every path option, and its stages are named
+and wired per manifest, e.g. repack[<manifest id>]. Stages of the same kind share a lane, so
+manifest N+1 downloads while N repacks and N-1 exports. BackfillGate decides when the next
+manifest may start downloading, based on how many versions are staged and the free disk space.
+"""
+
+GB = 1024 ** 3
+
+
+def parse_manifest_ids(manifest_ids: str) -> List[str]:
+    """Split a comma or whitespace separated list of manifest ids, dropping blanks and duplicates but keeping the order."""
+    ids = []
+    for manifest_id in manifest_ids.replace(",", " ").split():
+        if manifest_id not in ids:
+            ids.append(manifest_id)
+    return ids
+
+
+def stage_name(stage: str, manifest_id: str) -> str:
+    """Name of a stage of one manifest's version."""
+    return f"{stage}[{manifest_id}]"
+
+
+def _version_dir(dir_path: Optional[Path], manifest_id: str) -> Optional[Path]:
+    return Path(dir_path) / manifest_id if dir_path is not None else None
+
+
+def _version_file(file: Optional[Path], manifest_id: str) -> Optional[Path]:
+    return Path(file).parent / manifest_id / Path(file).name if file is not None else None
+
+
+def version_options(options, manifest_id: str):
+    """
+    Get a copy of the options for one manifest's version, with every output in its own directory.
+
+    Directory options get the manifest id appended (STEAM_GAME_DOWNLOAD_DIR/<manifest id>), file options
+    get it as their parent directory (REPACK_OUTPUT_FILE's directory/<manifest id>/<file name>).
+
+    Args:
+        options (Options): Configuration options
+        manifest_id (str): Manifest id of the version
+
+    Returns:
+        Options: Copy of the options for the version
+    """
+    version = copy.copy(options)
+    version.manifest_id = manifest_id
+    version.steam_game_download_dir = _version_dir(options.steam_game_download_dir, manifest_id)
+    version.output_data_dir = _version_dir(options.output_data_dir, manifest_id)
+    version.repack_output_file = _version_file(options.repack_output_file, manifest_id)
+    version.output_mapper_file = _version_file(options.output_mapper_file, manifest_id)
+    return version
+
+
+class BackfillGate:
+    """
+    Admission check for the download stage of each backfilled version.
+
+    A version is staged from the moment its download starts until all its stages have finished
+    (including removing its intermediates). A new version is admitted while fewer than max_staged
+    versions are staged and the download volume has room for another version.
+    """
+
+    def __init__(self, manifest_ids: List[str], stage_names: Dict[str, List[str]], download_dir: Union[str, Path], max_staged: int, min_free_bytes: int) -> None:
+        """
+        Args:
+            manifest_ids (list[str]): Manifests of the backfill
+            stage_names (dict): Manifest id to the names of all its stages, the first being its download stage
+            download_dir (str or Path): Directory the versions are downloaded under
+            max_staged (int): Maximum versions staged at once
+            min_free_bytes (int): Free bytes required before downloading a version, raised to the largest version seen so far
+        """
+        if max_staged < 1:
+            raise ValueError(f"At least one version must be allowed to be staged, got {max_staged}")
+        self.manifest_ids = manifest_ids
+        self.stage_names = stage_names
+        self.download_dir = download_dir
+        self.max_staged = max_staged
+        self.min_free_bytes = min_free_bytes
+        self.largest_version_bytes = 0
+        self._lock = threading.Lock()
+        self._waiting_logged = set()
+
+    def record_version_size(self, version_bytes: int) -> None:
+        """Remember the size of a downloaded version, so the next one waits until there is room for it."""
+        with self._lock:
+            self.largest_version_bytes = max(self.largest_version_bytes, version_bytes)
+
+    def staged(self, results: Dict[str, str]) -> List[str]:
+        """Get the versions whose download has started but whose stages have not all finished."""
+        staged = []
+        for manifest_id in self.manifest_ids:
+            names = self.stage_names[manifest_id]
+            started = results[names[0]] != STATUS_PENDING
+            finished = all(results[name] not in (STATUS_PENDING, STATUS_RUNNING) for name in names)
+            if started and not finished:
+                staged.append(manifest_id)
+        return staged
+
+    def admit(self, manifest_id: str, results: Dict[str, str]) -> bool:
+        """
+        Check whether a version may start downloading.
+
+        Args:
+            manifest_id (str): Version waiting to download
+            results (dict): Current stage results of the pipeline
+
+        Returns:
+            bool: True if the version may start
+        """
+        staged = self.staged(results)
+        if len(staged) >= self.max_staged:
+            self._log_waiting(manifest_id, f"{len(staged)} version(s) already staged ({', '.join(staged)})")
+            return False
+
+        with self._lock:
+            required_bytes = max(self.min_free_bytes, self.largest_version_bytes)
+        free_bytes = get_free_space(self.download_dir)
+        if free_bytes < required_bytes:
+            self._log_waiting(manifest_id, f"{free_bytes / GB:.1f} GB free, {required_bytes / GB:.1f} GB required")
+            return False
+
+        logger.info(f"Starting version {manifest_id} ({len(staged) + 1}/{self.max_staged} staged, {free_bytes / GB:.1f} GB free)")
+        return True
+
+    def _log_waiting(self, manifest_id: str, reason: str) -> None:
+        """Log once per version why it is waiting."""
+        with self._lock:
+            if manifest_id in self._waiting_logged:
+                return
+            self._waiting_logged.add(manifest_id)
+        logger.info(f"Version {manifest_id} waits to download: {reason}")
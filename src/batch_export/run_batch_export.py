@@ -7,6 +7,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from optionsconfig import Options
 from utils import run_process
+from run_state import RunState, read_text_file
+from journal import Journal
+from telemetry import annotate
+from history import load_baseline
+from planner import get_timeout
 from loguru import logger
 
 class BatchExporter:
@@ -17,17 +22,19 @@ class BatchExporter:
     for extracting Dark and Darker game data from .pak files to JSON format.
     """
     
-    def __init__(self, options: Options, mapping_file_path: str) -> None:
+    def __init__(self, options: Options, mapping_file_path: str, wipe_output: Optional[bool] = None) -> None:
         """
         Initialize the BatchExporter.
         
         Args:
             options (Options, optional): Options object containing configuration. If None, will create default.
             mapping_file_path (str): Path to the mapping file for UE4 assets (required)
+            wipe_output (bool, optional): Wipe the output directory before exporting. Defaults to FORCE_EXPORT
         """
         
         self.options = options
         self.mapping_file_path = mapping_file_path
+        self.wipe_output = options.force_export if wipe_output is None else wipe_output
         
         # Path to BatchExport executable
         self.batch_export_dir = Path(__file__).parent / "BatchExport"
@@ -42,7 +49,7 @@ class BatchExporter:
             "--mapping-file-path", str(self.mapping_file_path),
             "--is-logging-enabled", "true" if self.options.log_level == "DEBUG" else "false",
             "--needed-exports-file-path", "null", #output everything
-            "--should-wipe-output-directory", "true" if self.options.force_export else "false"
+            "--should-wipe-output-directory", "true" if self.wipe_output else "false",
             "--aes-key-hex", "0x903DBEEB889CFB1C25AFA28A9463F6D4E816B174D68B3902427FE5867E8C688E"
         ]
         
@@ -91,13 +98,19 @@ class BatchExporter:
         logger.info(f"PAK files directory: {self.options.repack_output_file}")
         logger.info(f"Export output path: {self.options.output_data_dir}")
         
+        # The last export's duration sets the timeout, and its file count the ETA of the progress
+        baseline = load_baseline("batch_export")
+        expected_total = int(baseline["input_size"]) if baseline is not None and "input_size" in baseline else None
+        
         try:
             # Execute BatchExport using run_process from utils
             # run_process handles logging, timeouts, and error handling internally
             run_process(
                 options=self.command,
                 name="BatchExport",
-                timeout=3600  # 1 hour timeout
+                timeout=get_timeout(baseline),
+                io_paths=[self.options.repack_output_file, self.options.output_data_dir],
+                expected_total=expected_total
             )
             
             logger.success("BatchExport completed successfully!")
@@ -112,13 +125,26 @@ class BatchExporter:
         return ' '.join(f'"{arg}"' if ' ' in arg else arg for arg in self.command)
 
 
-def main(options: Optional[Options] = None, mapping_file_path: Optional[str] = None) -> bool:
+def get_fingerprint(options: Options, mapping_file_path: str, run_state: RunState) -> dict:
+    """
+    Fingerprint the BatchExport inputs: the repacked pak, the mapper file, and the BatchExport version.
+    """
+    return {
+        "repack_output_file": run_state.pak_signature(options.repack_output_file) if os.path.exists(options.repack_output_file) else None,
+        "mapping_file": run_state.hash_file(mapping_file_path) if os.path.exists(mapping_file_path) else None,
+        "batch_export_version": read_text_file(Path(__file__).parent / "BatchExport" / "version.txt"),
+    }
+
+
+def main(options: Optional[Options] = None, mapping_file_path: Optional[str] = None, run_state: Optional[RunState] = None, journal: Optional[Journal] = None) -> bool:
     """
     Main function to run BatchExport with the given options.
     
     Args:
         options (Options, optional): Configuration options
         mapping_file_path (str): Path to the mapping file (required)
+        run_state (RunState, optional): Run state used to skip the stage when its inputs are unchanged
+        journal (Journal, optional): Journal used to resume an interrupted run
     """
     if options is None:
         raise ValueError("Options must be provided")
@@ -126,20 +152,44 @@ def main(options: Optional[Options] = None, mapping_file_path: Optional[str] = N
     if mapping_file_path is None:
         raise ValueError("mapping_file_path must be provided")
     
-    # Check if export directory has contents and force is False
-    if os.path.exists(options.output_data_dir) and os.listdir(options.output_data_dir) and not options.force_export:
-        logger.info(f"Export directory {options.output_data_dir} already has contents and FORCE_EXPORT is False. Skipping batch export.")
+    if run_state is None:
+        run_state = RunState()
+    if journal is None:
+        journal = Journal()
+    
+    # Skip if the pak, mapper, and BatchExport are unchanged since the last successful export
+    fingerprint = get_fingerprint(options, mapping_file_path, run_state)
+    if not run_state.should_run("batch_export", options.output_data_dir, fingerprint, outputs=[options.output_data_dir], force=options.force_export):
         return True
     
     try:
-        batch_exporter = BatchExporter(options, mapping_file_path)
-        
-        # Show command preview
-        logger.info(f"Command to execute: {str(batch_exporter)}")
-        
-        # Run BatchExport
-        batch_exporter.run()
+        run_state.begin("batch_export", options.output_data_dir)
+        # BatchExport has no way to export part of the paks, so the whole export is one unit of work
+        journal_scope = journal.scope("batch_export", options.output_data_dir, fingerprint)
+        if journal_scope.is_done("export"):
+            logger.info("Skipping BatchExport, the interrupted run already finished exporting")
+        else:
+            # Exports from older inputs are stale, so wipe them instead of exporting on top of them
+            batch_exporter = BatchExporter(options, mapping_file_path, wipe_output=True)
+            
+            # Show command preview
+            logger.info(f"Command to execute: {str(batch_exporter)}")
+            
+            # Run BatchExport
+            batch_exporter.run()
+            journal_scope.mark_done("export")
+
+            # Export time scales with the number of exported files, so regressions are judged per file.
+            # The output size lets the planner estimate the disk use of the next export
+            file_count = 0
+            output_bytes = 0
+            for root, _, files in os.walk(options.output_data_dir):
+                file_count += len(files)
+                output_bytes += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+            annotate(input_size=file_count, output_bytes=output_bytes)
         
+        run_state.record("batch_export", options.output_data_dir, fingerprint)
+        journal_scope.clear()
         logger.success("BatchExport process completed successfully!")
         return True
         
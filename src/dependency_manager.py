@@ -4,28 +4,57 @@ import os
 import time
 import zipfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
+from http.client import HTTPException
 import json
-from typing import Optional, Union, List
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Union, List, Tuple
+from urllib.parse import urlsplit
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from loguru import logger
 
+from http_client import get_client, parse_sha256, DigestMismatchError
+from dependency_store import DependencyStore, get_store, get_content_key
+
+DOWNLOAD_SEGMENTS = 4  # Byte ranges a large release asset is downloaded as at once
+PARTIAL_DOWNLOAD_SUFFIXES = (".part", ".part.json")
+EXTRACT_WORKERS = min(8, os.cpu_count() or 1)  # Threads writing the files of a ZIP at once
+EXTRACT_BATCH_SIZE = 64  # Files a thread writes per task, so thousands of small files don't each cost a task
+COPY_SIZE = 1024 * 1024  # Bytes copied at once from a ZIP member or a mirrored file
+
 
 class DependencyManager:
     """
     A dependency manager that downloads and extracts GitHub release dependencies.
     
     This class handles downloading ZIP files from GitHub releases and extracting them
-    to specified output directories with proper validation and cleanup.
+    to specified output directories with proper validation and cleanup. Requests go through
+    the shared HTTP client, which reuses connections and caches release metadata (see http_client).
+    With a dependency store, releases are installed as versions of the store and the output
+    directory is switched to them (see dependency_store). With a mirror directory, files are copied
+    from the mirror instead of downloaded.
     """
     
-    def __init__(self) -> None:
-        """Initialize the dependency manager."""
-        self.temp_dir = Path.cwd() / ".temp"
-        self.temp_dir.mkdir(exist_ok=True)
+    def __init__(self, temp_dir: Optional[Union[str, Path]] = None, download_segments: int = DOWNLOAD_SEGMENTS, store: Optional[DependencyStore] = None, mirror_dir: Optional[Union[str, Path]] = None) -> None:
+        """
+        Initialize the dependency manager.
+        
+        Args:
+            temp_dir (str or Path, optional): Directory for temporary downloads. Defaults to .temp in the cwd.
+                Installs that may run at the same time must use different directories.
+            download_segments (int): Byte ranges a large download is split into and downloaded at once. 1 downloads in one stream
+            store (DependencyStore, optional): Store to install releases into. Without one, releases are extracted into the output directory
+            mirror_dir (str or Path, optional): Directory to copy files from instead of downloading them, see get_mirror_path
+        """
+        self.temp_dir = Path(temp_dir) if temp_dir is not None else Path.cwd() / ".temp"
+        self.download_segments = download_segments
+        self.store = store
+        self.mirror_dir = Path(mirror_dir) if mirror_dir else None
+        self.digests: Dict[str, str] = {}  # SHA-256 of each file downloaded, by URL
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
     
     def _get_installed_version(self, output_path: Union[str, Path]) -> Optional[str]:
         """
@@ -61,22 +90,26 @@ class DependencyManager:
         except Exception as e:
             logger.warning(f"Could not write version file: {e}")
     
-    def download_and_extract(self, download_url: str, output_path: Union[str, Path], executable_name: Optional[str] = None, create_output_dir: bool = True, version: Optional[str] = None) -> bool:
+    def download_and_extract(self, download_url: str, output_path: Union[str, Path], executable_name: Optional[str] = None, create_output_dir: bool = True, version: Optional[str] = None, sha256: Optional[str] = None) -> bool:
         """
         Download a ZIP file from a URL and extract it to the specified path.
         
+        The download is hashed as it is written. With a published SHA-256, a download that doesn't
+        match it is rejected before extraction. Without one, the file is only checked to be a ZIP.
+        
         Args:
             download_url (str): URL to download the ZIP file from
             output_path (str or Path): Directory to extract the contents to
             executable_name (str, optional): Name of main executable to verify after extraction
             create_output_dir (bool): Whether to create the output directory if it doesn't exist
             version (str, optional): Version string to write to version.txt file
+            sha256 (str, optional): Published hex SHA-256 of the ZIP file
             
         Returns:
             bool: True if successful, False otherwise
             
         Raises:
-            Exception: If download or extraction fails
+            Exception: If download, verification or extraction fails
         """
         start_time = time.time()
         logger.debug(f"Dependency download timer started at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))}")
@@ -113,19 +146,21 @@ class DependencyManager:
             logger.info(f"Downloading from: {download_url}")
             logger.info(f"Output directory: {output_path}")
             
-            self._download_file(download_url, zip_path)
+            self._download_file(download_url, zip_path, sha256)
             
-            # Validate the downloaded file
-            if not self._validate_zip_file(zip_path):
-                raise Exception("Downloaded file is not a valid ZIP archive")
+            # Without a digest to compare against, at least make sure it is a ZIP before extracting
+            if sha256 is None:
+                logger.warning(f"No published SHA-256 for {zip_filename}, only checking that it is a valid ZIP archive")
+                if not self._validate_zip_file(zip_path):
+                    raise Exception("Downloaded file is not a valid ZIP archive")
             
             # Extract the file
             logger.info("Extracting files...")
-            self._extract_zip(zip_path, output_path)
+            extracted_executable = self._extract_zip(zip_path, output_path, executable_name)
             
             # Verify extraction
             if executable_name:
-                self._verify_executable(output_path, executable_name)
+                self._verify_executable(output_path, executable_name, extracted_executable)
             
             # Write version file if version provided
             if version:
@@ -190,61 +225,155 @@ class DependencyManager:
                     return True
                 elif current_version:
                     logger.info(f"Updating from version {current_version} to {version}")
+                if self._switch_to_stored(f"{repo_owner}/{repo_name}", version, output_path):
+                    return True
             else:
                 logger.info("Force download enabled, downloading regardless of current version")
             
-            # Find matching assets
-            assets = release_info.get('assets', [])
-            matching_assets = []
+            matching_assets = self.find_release_assets(release_info, asset_pattern)
+            return self.install_release_assets(f"{repo_owner}/{repo_name}", version, matching_assets, output_path, executable_name)
             
-            # Normalize asset_pattern to a list
-            patterns = asset_pattern if isinstance(asset_pattern, list) else [asset_pattern]
+        except Exception as e:
+            logger.error(f"Failed to download latest release: {e}")
+            raise
+    
+    def find_release_assets(self, release_info: dict, asset_pattern: Union[str, List[str]]) -> List[dict]:
+        """
+        Find the assets of a GitHub release matching the patterns, the first match of each.
+        
+        Args:
+            release_info (dict): GitHub release
+            asset_pattern (str or list): Pattern(s) to match asset name (e.g., "windows-x64.zip" or ["BatchExport-windows-x64.zip", "README.md"])
             
-            for pattern in patterns:
-                for asset in assets:
-                    if pattern in asset['name']:
-                        matching_assets.append(asset)
-                        logger.info(f"Found matching asset: {asset['name']} (pattern: {pattern})")
-                        break
-                else:
-                    # This pattern didn't match any asset
-                    logger.warning(f"No asset found matching pattern: {pattern}")
+        Returns:
+            list: Matching assets
             
-            if not matching_assets:
-                raise Exception(f"No assets found matching patterns: {patterns}")
+        Raises:
+            Exception: If no asset matches
+        """
+        # Find matching assets
+        assets = release_info.get('assets', [])
+        matching_assets = []
+        
+        # Normalize asset_pattern to a list
+        patterns = asset_pattern if isinstance(asset_pattern, list) else [asset_pattern]
+        
+        for pattern in patterns:
+            for asset in assets:
+                if pattern in asset['name']:
+                    matching_assets.append(asset)
+                    logger.info(f"Found matching asset: {asset['name']} (pattern: {pattern})")
+                    break
+            else:
+                # This pattern didn't match any asset
+                logger.warning(f"No asset found matching pattern: {pattern}")
+        
+        if not matching_assets:
+            raise Exception(f"No assets found matching patterns: {patterns}")
+        return matching_assets
+    
+    def install_locked(self, entry: Dict[str, Any], output_path: Union[str, Path], executable_name: Optional[str] = None, force: bool = False) -> bool:
+        """
+        Install the release recorded in a dependencies.lock entry, without the GitHub API.
+        
+        The version is switched to from the store if it is there. Otherwise its assets are copied
+        from the mirror directory, or downloaded from their recorded URL without one, and checked
+        against their recorded SHA-256.
+        
+        Args:
+            entry (dict): Lock entry, see get_lock_entry
+            output_path (str or Path): Directory to install to
+            executable_name (str, optional): Name of main executable to verify
+            force (bool): Copy or download the assets even if the version is installed or stored
             
-            # Download and extract all matching assets
-            success = True
-            for asset in matching_assets:
-                download_url = asset['browser_download_url']
-                logger.info(f"Processing asset: {asset['name']}")
-                
-                try:
-                    # For non-ZIP files (like README.md), just download them directly
-                    if not asset['name'].lower().endswith('.zip'):
-                        self._download_single_file(download_url, output_path / asset['name'])
-                    else:
-                        # For ZIP files, use the existing extraction logic
-                        result = self.download_and_extract(download_url, output_path, executable_name, version=version)
-                        if not result:
-                            success = False
-                except Exception as e:
-                    logger.error(f"Failed to process asset {asset['name']}: {e}")
-                    success = False
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        output_path = Path(output_path)
+        key = get_content_key({asset['name']: asset['sha256'] for asset in entry['assets']})
+        if not force:
+            if self.store is not None and self.store.get_installed(output_path) == key:
+                logger.info(f"Locked version {entry['tag']} already installed. Skipping download.")
+                return True
+            if self.store is not None and self.store.has(key):
+                logger.info(f"Locked version {entry['tag']} is in the dependency store, switching to it")
+                self.store.activate(key, output_path)
+                return True
+        
+        logger.info(f"Installing locked version {entry['tag']} of {entry['repo']}")
+        assets = [{'name': asset['name'], 'browser_download_url': asset['url'], 'digest': f"sha256:{asset['sha256']}"} for asset in entry['assets']]
+        return self.install_release_assets(entry['repo'], entry['tag'], assets, output_path, executable_name)
+    
+    def install_release_assets(self, name: str, version: str, assets: List[dict], output_path: Union[str, Path], executable_name: Optional[str] = None) -> bool:
+        """
+        Download release assets, extracting the ZIP files, into the output directory.
+        
+        With a store, the assets are installed into a staging directory of the store instead, which
+        only becomes a version of the store, and the output directory is only switched to it, once
+        every asset is installed. A failed install leaves the output directory as it was.
+        
+        Args:
+            name (str): Dependency, e.g. 'Surxe/CUE4P-BatchExport'
+            version (str): Release tag
+            assets (list): GitHub release assets, with name, browser_download_url and digest
+            output_path (str or Path): Directory to install to
+            executable_name (str, optional): Name of main executable to verify
             
-            return success
+        Returns:
+            bool: True if every asset was installed, False otherwise
+        """
+        output_path = Path(output_path)
+        install_path = self.store.create_staging_dir() if self.store is not None else output_path
+        
+        # Download and extract all matching assets
+        success = True
+        for asset in assets:
+            download_url = asset['browser_download_url']
+            logger.info(f"Processing asset: {asset['name']}")
             
-        except Exception as e:
-            logger.error(f"Failed to download latest release: {e}")
-            raise
+            try:
+                sha256 = parse_sha256(asset.get('digest'))
+                # For non-ZIP files (like README.md), just download them directly
+                if not asset['name'].lower().endswith('.zip'):
+                    self._download_single_file(download_url, install_path / asset['name'], sha256)
+                else:
+                    # For ZIP files, use the existing extraction logic
+                    result = self.download_and_extract(download_url, install_path, executable_name, version=version, sha256=sha256)
+                    if not result:
+                        success = False
+            except Exception as e:
+                logger.error(f"Failed to process asset {asset['name']}: {e}")
+                success = False
+        
+        if self.store is None:
+            return success
+        if not success:
+            shutil.rmtree(install_path, ignore_errors=True)
+            return False
+        key = get_content_key({asset['name']: self.digests[asset['browser_download_url']] for asset in assets})
+        self.store.add(name, version, install_path, key)
+        self.store.activate(key, output_path)
+        return True
+    
+    def _switch_to_stored(self, name: str, version: str, output_path: Path) -> bool:
+        """Switch the output directory to a version already in the store, without downloading. False if there is no store or it doesn't have the version."""
+        if self.store is None:
+            return False
+        key = self.store.find(name, version)
+        if key is None:
+            return False
+        logger.info(f"Version {version} is in the dependency store, switching to it without downloading")
+        self.store.activate(key, output_path)
+        return True
     
-    def _download_single_file(self, url: str, output_path: Path) -> None:
+    def _download_single_file(self, url: str, output_path: Path, sha256: Optional[str] = None) -> None:
         """
         Download a single file (non-ZIP) from URL to output path.
         
         Args:
             url (str): URL to download from
             output_path (Path): Full path including filename to save to
+            sha256 (str, optional): Published hex SHA-256 of the file
         """
         try:
             logger.info(f"Downloading single file: {output_path.name}")
@@ -252,14 +381,12 @@ class DependencyManager:
             # Ensure the output directory exists
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Download the file
-            req = Request(url, headers={'User-Agent': 'DarkAndDarker-Exporter'})
-            
-            with urlopen(req) as response:
-                with open(output_path, 'wb') as f:
-                    f.write(response.read())
+            # Download the file, or copy it from the mirror
+            if self.mirror_dir is not None:
+                file_size, self.digests[url] = copy_file_verified(get_mirror_path(self.mirror_dir, url), output_path, sha256)
+            else:
+                file_size, self.digests[url] = get_client().download(url, output_path, sha256=sha256)
             
-            file_size = output_path.stat().st_size
             logger.info(f"Downloaded {output_path.name} ({file_size} bytes)")
             
         except Exception as e:
@@ -269,46 +396,43 @@ class DependencyManager:
         """Extract filename from URL."""
         return Path(url).name or "download.zip"
     
-    def _download_file(self, url: str, output_path: Path) -> None:
-        """Download a file from URL to local path."""
+    def _download_file(self, url: str, output_path: Path, sha256: Optional[str] = None) -> str:
+        """
+        Download a file from URL to local path, resuming a partial download left by an earlier attempt.
+        
+        Args:
+            url (str): URL to download from
+            output_path (Path): Full path including filename to save to
+            sha256 (str, optional): Published hex SHA-256 the file must have
+        
+        Returns:
+            str: Hex SHA-256 of the file
+        """
         try:
-            logger.info(f"Downloading file...")
+            start_time = time.monotonic()
+            if self.mirror_dir is not None:
+                mirror_path = get_mirror_path(self.mirror_dir, url)
+                logger.info(f"Copying file from the mirror: {mirror_path}")
+                actual_size, digest = copy_file_verified(mirror_path, output_path, sha256)
+            else:
+                logger.info(f"Downloading file...")
+                actual_size, digest = get_client().download(url, output_path, segments=self.download_segments, sha256=sha256)
+            self.digests[url] = digest
             
-            # Create request with user agent to avoid GitHub API restrictions
-            req = Request(url, headers={'User-Agent': 'DarkAndDarker-Exporter'})
+            elapsed_time = max(time.monotonic() - start_time, 1e-6)
+            logger.info(f"Downloaded {output_path.name} ({actual_size} bytes, {actual_size / elapsed_time / 1024 ** 2:.1f} MB/s)")
+            if sha256 is not None:
+                logger.info(f"Verified SHA-256 of {output_path.name}: {digest}")
+            return digest
             
-            with urlopen(req) as response:
-                file_size = int(response.headers.get('Content-Length', 0))
-                
-                with open(output_path, 'wb') as f:
-                    downloaded = 0
-                    chunk_size = 8192
-                    
-                    while True:
-                        chunk = response.read(chunk_size)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        
-                        if file_size > 0:
-                            progress = (downloaded / file_size) * 100
-                            if downloaded % (chunk_size * 100) == 0:  # Log every ~800KB
-                                logger.debug(f"Download progress: {progress:.1f}% ({downloaded}/{file_size} bytes)")
-            
-            actual_size = output_path.stat().st_size
-            logger.info(f"Downloaded {output_path.name} ({actual_size} bytes)")
-            
-        except (URLError, HTTPError) as e:
+        except (OSError, HTTPException, DigestMismatchError) as e:
             raise Exception(f"Failed to download file: {e}")
     
     def _get_json_from_url(self, url: str) -> dict:
-        """Get JSON data from URL."""
+        """Get JSON data from URL, from the metadata cache if GitHub reports it unchanged."""
         try:
-            req = Request(url, headers={'User-Agent': 'DarkAndDarker-Exporter'})
-            with urlopen(req) as response:
-                return json.loads(response.read().decode())
-        except (URLError, HTTPError, json.JSONDecodeError) as e:
+            return get_client().get_json(url)
+        except (OSError, HTTPException, json.JSONDecodeError) as e:
             raise Exception(f"Failed to fetch JSON from {url}: {e}")
     
     def _validate_zip_file(self, zip_path: Path) -> bool:
@@ -336,63 +460,65 @@ class DependencyManager:
             logger.error(f"Error validating ZIP file: {e}")
             return False
     
-    def _extract_zip(self, zip_path: Path, output_path: Path) -> None:
-        """Extract ZIP file to output directory."""
+    def _extract_zip(self, zip_path: Path, output_path: Path, executable_name: Optional[str] = None, workers: int = EXTRACT_WORKERS) -> Optional[Path]:
+        """
+        Extract ZIP file to output directory.
+        
+        If everything in the archive is inside a single top-level folder, that folder is left out
+        of the paths as the files are written, so they land directly in the output directory.
+        
+        Args:
+            zip_path (Path): ZIP file to extract
+            output_path (Path): Directory to extract to
+            executable_name (str, optional): Name of the main executable to look out for
+            workers (int): Threads writing files at once
+        
+        Returns:
+            Path or None: Where the executable was extracted to, the one closest to the output directory if there are several
+        """
         try:
             with zipfile.ZipFile(zip_path, 'r') as zf:
+                members = zf.infolist()
+                
                 # Log contents
-                file_list = zf.namelist()
                 logger.debug("Archive contents:")
-                for filename in file_list[:10]:  # Show first 10 files
-                    logger.debug(f"  {filename}")
-                if len(file_list) > 10:
-                    logger.debug(f"  ... and {len(file_list) - 10} more files")
-                
-                # Extract all files
-                zf.extractall(output_path)
-                
-                # Flatten structure if everything is in a single subdirectory
-                self._flatten_extraction(output_path)
-                
-                logger.info(f"Extracted {len(file_list)} files to {output_path}")
+                for info in members[:10]:  # Show first 10 files
+                    logger.debug(f"  {info.filename}")
+                if len(members) > 10:
+                    logger.debug(f"  ... and {len(members) - 10} more files")
+            
+            prefix = get_strip_prefix([info.filename for info in members])
+            if prefix:
+                logger.debug(f"Leaving out the top-level folder {prefix.rstrip('/')}")
+            targets = [(info, get_member_target(output_path, info.filename, prefix)) for info in members]
+            targets = [(info, target) for info, target in targets if target is not None]
+            
+            # Directories first, so the files can be written in any order
+            directories = {output_path} | {target for info, target in targets if info.is_dir()} | {target.parent for info, target in targets if not info.is_dir()}
+            for directory in sorted(directories, key=lambda path: len(path.parts)):
+                directory.mkdir(parents=True, exist_ok=True)
+            
+            files = [(info, target) for info, target in targets if not info.is_dir()]
+            extract_members(zip_path, files, workers)
+            
+            executable_path = None
+            if executable_name:
+                found = [target for info, target in files if target.name == executable_name]
+                executable_path = min(found, key=lambda path: len(path.parts)) if found else None
+            
+            logger.info(f"Extracted {len(members)} files to {output_path}")
+            return executable_path
                 
         except Exception as e:
             raise Exception(f"Failed to extract ZIP file: {e}")
     
-    def _flatten_extraction(self, output_path: Path) -> None:
-        """
-        If extraction created a single subdirectory containing all files,
-        move the files up to the main output directory.
-        """
-        subdirs = [d for d in output_path.iterdir() if d.is_dir()]
-        files = [f for f in output_path.iterdir() if f.is_file()]
-        
-        # If there's exactly one subdirectory and no files in root, flatten it
-        if len(subdirs) == 1 and len(files) == 0:
-            subdir = subdirs[0]
-            logger.debug(f"Flattening single subdirectory: {subdir.name}")
-            
-            # Move all files from subdirectory to parent
-            for item in subdir.iterdir():
-                dest = output_path / item.name
-                if dest.exists():
-                    if dest.is_dir():
-                        shutil.rmtree(dest)
-                    else:
-                        dest.unlink()
-                shutil.move(str(item), str(dest))
-            
-            # Remove empty subdirectory
-            subdir.rmdir()
-            logger.debug("Flattened directory structure")
-    
-    def _verify_executable(self, output_path: Path, executable_name: str) -> None:
-        """Verify that the expected executable was extracted."""
+    def _verify_executable(self, output_path: Path, executable_name: str, extracted_path: Optional[Path] = None) -> None:
+        """Verify that the expected executable was extracted, moving it to the output directory if it was extracted deeper (to extracted_path, or searched for without it)."""
         executable_path = output_path / executable_name
         
         if not executable_path.exists():
-            # Search for the executable in subdirectories
-            found_executables = list(output_path.rglob(executable_name))
+            # Search for the executable in subdirectories, unless the extraction saw where it went
+            found_executables = [extracted_path] if extracted_path is not None and extracted_path.exists() else list(output_path.rglob(executable_name))
             if found_executables:
                 # Move the first found executable to the root
                 src = found_executables[0]
@@ -409,12 +535,311 @@ class DependencyManager:
             executable_path.chmod(0o755)
     
     def cleanup_temp_files(self) -> None:
-        """Clean up temporary download directory."""
-        if self.temp_dir.exists():
-            shutil.rmtree(self.temp_dir)
+        """Clean up temporary download directory, keeping interrupted downloads (.part files) for the next attempt to resume."""
+        if not self.temp_dir.exists():
+            return
+        kept = 0
+        for item in self.temp_dir.iterdir():
+            if item.name.endswith(PARTIAL_DOWNLOAD_SUFFIXES):
+                kept += 1
+            elif item.is_dir():
+                shutil.rmtree(item)
+            else:
+                item.unlink()
+        if kept:
+            logger.debug(f"Cleaned up temporary download directory, kept {kept} partial download file(s) to resume")
+        else:
+            self.temp_dir.rmdir()
             logger.debug("Cleaned up temporary download directory")
 
 
+def get_mirror_path(mirror_dir: Path, url: str) -> Path:
+    """
+    Get where a mirror directory holds the file of a download URL: at the URL's path, e.g.
+    <mirror>/Surxe/CUE4P-BatchExport/releases/download/<tag>/BatchExport-windows-x64.zip.
+    """
+    return Path(mirror_dir).joinpath(*[part for part in urlsplit(url).path.split('/') if part])
+
+
+def copy_file_verified(source: Path, output_path: Path, sha256: Optional[str] = None) -> Tuple[int, str]:
+    """
+    Copy a file, hashing it with SHA-256 as it is copied.
+    
+    Args:
+        source (Path): File to copy
+        output_path (Path): Where to copy it to. Only written once the copy is verified
+        sha256 (str, optional): Hex SHA-256 the file must have
+    
+    Returns:
+        tuple: Size and hex SHA-256 of the file
+    
+    Raises:
+        OSError: If the file can't be read or written, e.g. it isn't in the mirror
+        DigestMismatchError: If the file doesn't have the expected SHA-256
+    """
+    temp_path = output_path.with_name(f"{output_path.name}.copy")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(source, 'rb') as source_file, open(temp_path, 'wb') as output_file:
+            while chunk := source_file.read(COPY_SIZE):
+                hasher.update(chunk)
+                output_file.write(chunk)
+                size += len(chunk)
+        digest = hasher.hexdigest()
+        if sha256 is not None and digest != sha256.lower():
+            raise DigestMismatchError(f"{source.name} is corrupt: its SHA-256 is {digest}, expected {sha256.lower()}")
+        os.replace(temp_path, output_path)
+        return size, digest
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def get_strip_prefix(names: List[str]) -> str:
+    """
+    Get the single top-level folder all members of an archive are in, such as 'UE4SS_v3/', to leave out when extracting.
+    
+    Args:
+        names (list[str]): Member names of the archive
+    
+    Returns:
+        str: The folder with a trailing slash, or '' if members are at the top level or in several folders
+    """
+    top_levels = {name.split('/', 1)[0] for name in names}
+    if len(top_levels) != 1 or top_levels & {'', '.', '..'}:
+        return ''
+    prefix = f"{top_levels.pop()}/"
+    # A single file at the top level, or the folder entry alone, isn't a wrapping folder
+    if not any(name.startswith(prefix) and len(name) > len(prefix) for name in names):
+        return ''
+    return prefix
+
+
+def get_member_target(output_path: Path, name: str, prefix: str = '') -> Optional[Path]:
+    """
+    Get where a member of an archive is extracted to, with the prefix left out.
+    
+    Args:
+        output_path (Path): Directory to extract to
+        name (str): Member name
+        prefix (str): Top-level folder to leave out, see get_strip_prefix
+    
+    Returns:
+        Path or None: Target path, None for the prefix folder itself
+    
+    Raises:
+        ValueError: If the member would be written outside of the output directory
+    """
+    relative = name[len(prefix):] if prefix and name.startswith(prefix) else name
+    parts = [part for part in relative.replace('\\', '/').split('/') if part not in ('', '.')]
+    if not parts:
+        return None
+    if '..' in parts or ':' in parts[0]:
+        raise ValueError(f"Archive member {name} would be extracted outside of {output_path}")
+    return output_path.joinpath(*parts)
+
+
+def extract_members(zip_path: Path, files: List[Tuple[zipfile.ZipInfo, Path]], workers: int = EXTRACT_WORKERS) -> None:
+    """
+    Write files of a ZIP to their targets from a thread pool. Their directories must exist.
+    
+    Args:
+        zip_path (Path): ZIP file
+        files (list): Members and the path to write each to
+        workers (int): Threads writing at once, each with its own handle on the ZIP
+    """
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+    
+    def extract_batch(batch: List[Tuple[zipfile.ZipInfo, Path]]) -> None:
+        zf = getattr(local, "zf", None)
+        if zf is None:
+            zf = local.zf = zipfile.ZipFile(zip_path, 'r')
+            with handles_lock:
+                handles.append(zf)
+        for info, target in batch:
+            with zf.open(info) as source, open(target, 'wb') as destination:
+                shutil.copyfileobj(source, destination, COPY_SIZE)
+    
+    batches = [files[index:index + EXTRACT_BATCH_SIZE] for index in range(0, len(files), EXTRACT_BATCH_SIZE)]
+    try:
+        if workers <= 1 or len(batches) <= 1:
+            for batch in batches:
+                extract_batch(batch)
+            return
+        with ThreadPoolExecutor(max_workers=min(workers, len(batches)), thread_name_prefix="extract") as executor:
+            for future in [executor.submit(extract_batch, batch) for batch in batches]:
+                future.result()
+    finally:
+        for zf in handles:
+            zf.close()
+
+
+INSTALL_DIRS = {
+    "BatchExport": Path(__file__).parent / "batch_export" / "BatchExport",
+    "DepotDownloader": Path(__file__).parent / "steam" / "DepotDownloader",
+    "UE4SS": Path(__file__).parent / "mapper" / "ue4ss",
+}
+
+# GitHub repository (owner, name) each dependency is released from
+GITHUB_REPOS = {
+    "BatchExport": ("Surxe", "CUE4P-BatchExport"),
+    "DepotDownloader": ("SteamRE", "DepotDownloader"),
+    "UE4SS": ("UE4SS-RE", "RE-UE4SS"),
+}
+
+# Release assets installed of each dependency, by pattern (see find_release_assets). UE4SS is found by get_latest_release
+ASSET_PATTERNS = {
+    "BatchExport": ["BatchExport-windows-x64.zip", "README.md"],
+    "DepotDownloader": "windows-x64.zip",
+}
+
+# Main executable verified after installing each dependency
+EXECUTABLE_NAMES = {
+    "BatchExport": "BatchExport.exe",
+    "DepotDownloader": "DepotDownloader.exe",
+    "UE4SS": None,
+}
+
+# Release, assets and SHA-256 of each dependency to install with from_lock, written by update_lock
+LOCK_FILE = Path(__file__).parent.parent / "dependencies.lock"
+
+
+def get_installed_versions() -> Dict[str, Optional[str]]:
+    """
+    Get the installed version of every dependency from its version.txt.
+
+    Returns:
+        dict: Dependency name to version, None if not installed
+    """
+    versions = {}
+    for name, install_dir in INSTALL_DIRS.items():
+        version_file = install_dir / "version.txt"
+        versions[name] = version_file.read_text().strip() if version_file.exists() else None
+    return versions
+
+
+def get_latest_release(dm: DependencyManager, name: str) -> Tuple[str, List[dict]]:
+    """
+    Get the latest release of a dependency from the GitHub API: the latest release, or for UE4SS
+    the latest pre-release.
+    
+    Args:
+        dm (DependencyManager): Manager to make the requests with
+        name (str): Dependency name, one of GITHUB_REPOS
+    
+    Returns:
+        tuple: Release tag and the assets to install
+    """
+    repo = "/".join(GITHUB_REPOS[name])
+    if name != "UE4SS":
+        api_url = f"https://api.github.com/repos/{repo}/releases/latest"
+        logger.info(f"Fetching latest release info from: {api_url}")
+        release_info = dm._get_json_from_url(api_url)
+        return release_info.get('tag_name', 'unknown'), dm.find_release_assets(release_info, ASSET_PATTERNS[name])
+    
+    # Get latest release info (including pre-releases)
+    releases = dm._get_json_from_url(f"https://api.github.com/repos/{repo}/releases")
+    if not releases:
+        raise Exception("No releases found")
+    
+    # First release in the list is the latest (includes pre-releases)
+    latest_release = releases[0]
+    for asset in latest_release.get('assets', []):
+        if asset['name'].startswith('UE4SS_') and asset['name'].endswith('.zip'):
+            return latest_release.get('tag_name', 'unknown'), [asset]
+    raise Exception("No matching UE4SS zip asset found in release")
+
+
+def get_lock_entry(dm: DependencyManager, name: str, version: str, assets: List[dict]) -> Dict[str, Any]:
+    """
+    Get the dependencies.lock entry of a release. An asset without a published SHA-256 is downloaded to hash it.
+    
+    Args:
+        dm (DependencyManager): Manager to download with
+        name (str): Dependency name, one of GITHUB_REPOS
+        version (str): Release tag
+        assets (list): GitHub release assets to install
+    
+    Returns:
+        dict: The repository, tag, and the name, download URL, size and SHA-256 of each asset
+    """
+    locked_assets = []
+    for asset in assets:
+        sha256 = parse_sha256(asset.get('digest'))
+        size = asset.get('size')
+        if sha256 is None:
+            logger.info(f"No published SHA-256 for {asset['name']}, downloading it to hash it")
+            temp_path = dm.temp_dir / asset['name']
+            sha256 = dm._download_file(asset['browser_download_url'], temp_path)
+            size = temp_path.stat().st_size
+            temp_path.unlink()
+        locked_assets.append({'name': asset['name'], 'url': asset['browser_download_url'], 'size': size, 'sha256': sha256})
+    return {'repo': "/".join(GITHUB_REPOS[name]), 'tag': version, 'assets': locked_assets}
+
+
+def read_lock(lock_file: Union[str, Path] = LOCK_FILE) -> Dict[str, Dict[str, Any]]:
+    """
+    Read dependencies.lock.
+    
+    Raises:
+        ValueError: If there is no lock file or it can't be read
+    """
+    try:
+        return json.loads(Path(lock_file).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        raise ValueError(f"There is no {lock_file}. Create it with: python src/dependency_manager.py --update-lock")
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Could not read {lock_file}: {e}")
+
+
+def update_lock(lock_file: Union[str, Path] = LOCK_FILE, mirror_dir: Optional[Union[str, Path]] = None, temp_dir: Optional[Union[str, Path]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Write the latest release of every dependency to dependencies.lock.
+    
+    Args:
+        lock_file (str or Path): Lock file to write
+        mirror_dir (str or Path, optional): Mirror directory to also download the locked assets into, see get_mirror_path
+        temp_dir (str or Path, optional): Directory for the downloads hashed for the lock. Defaults to .temp/lock in the cwd
+    
+    Returns:
+        dict: The new lock, by dependency name
+    """
+    lock_file = Path(lock_file)
+    try:
+        old_lock = read_lock(lock_file)
+    except ValueError:
+        old_lock = {}
+    
+    dm = DependencyManager(temp_dir=temp_dir if temp_dir is not None else Path.cwd() / ".temp" / "lock")
+    try:
+        lock = {}
+        for name in DEPENDENCIES:
+            version, assets = get_latest_release(dm, name)
+            lock[name] = get_lock_entry(dm, name, version, assets)
+            old_version = old_lock.get(name, {}).get('tag')
+            if old_version != version:
+                logger.info(f"Locked {name} {old_version or '(none)'} -> {version}")
+    finally:
+        dm.cleanup_temp_files()
+    
+    temp_file = lock_file.with_name(f"{lock_file.name}.tmp")
+    temp_file.write_text(json.dumps(lock, indent=2) + "\n", encoding='utf-8')
+    os.replace(temp_file, lock_file)
+    logger.success(f"Wrote {lock_file}")
+    
+    if mirror_dir:
+        for entry in lock.values():
+            for asset in entry['assets']:
+                mirror_path = get_mirror_path(Path(mirror_dir), asset['url'])
+                if not mirror_path.exists():
+                    mirror_path.parent.mkdir(parents=True, exist_ok=True)
+                    logger.info(f"Downloading {asset['name']} to the mirror: {mirror_path}")
+                    get_client().download(asset['url'], mirror_path, sha256=asset['sha256'])
+    return lock
+
+
 def install_batch_export(output_path: Optional[Union[str, Path]] = None, force: bool = False) -> bool:
     """
     Install BatchExport dependency.
@@ -424,17 +849,17 @@ def install_batch_export(output_path: Optional[Union[str, Path]] = None, force:
         force (bool): Force download even if same version exists
     """
     if output_path is None:
-        script_dir = Path(__file__).parent
-        output_path = script_dir / "batch_export" / "BatchExport"
+        output_path = INSTALL_DIRS["BatchExport"]
     
-    dm = DependencyManager()
+    dm = DependencyManager(temp_dir=Path.cwd() / ".temp" / "BatchExport", store=get_store())
+    repo_owner, repo_name = GITHUB_REPOS["BatchExport"]
     try:
         return dm.download_github_release_latest(
-            repo_owner="Surxe",
-            repo_name="CUE4P-BatchExport", 
-            asset_pattern=["BatchExport-windows-x64.zip", "README.md"],
+            repo_owner=repo_owner,
+            repo_name=repo_name,
+            asset_pattern=ASSET_PATTERNS["BatchExport"],
             output_path=output_path,
-            executable_name="BatchExport.exe",
+            executable_name=EXECUTABLE_NAMES["BatchExport"],
             force=force
         )
     finally:
@@ -450,17 +875,17 @@ def install_depot_downloader(output_path: Optional[Union[str, Path]] = None, for
         force (bool): Force download even if same version exists
     """
     if output_path is None:
-        script_dir = Path(__file__).parent
-        output_path = script_dir / "steam" / "DepotDownloader"
+        output_path = INSTALL_DIRS["DepotDownloader"]
     
-    dm = DependencyManager()
+    dm = DependencyManager(temp_dir=Path.cwd() / ".temp" / "DepotDownloader", store=get_store())
+    repo_owner, repo_name = GITHUB_REPOS["DepotDownloader"]
     try:
         return dm.download_github_release_latest(
-            repo_owner="SteamRE",
-            repo_name="DepotDownloader",
-            asset_pattern="windows-x64.zip",
+            repo_owner=repo_owner,
+            repo_name=repo_name,
+            asset_pattern=ASSET_PATTERNS["DepotDownloader"],
             output_path=output_path,
-            executable_name="DepotDownloader.exe",
+            executable_name=EXECUTABLE_NAMES["DepotDownloader"],
             force=force
         )
     finally:
@@ -476,20 +901,12 @@ def install_ue4ss(output_path: Optional[Union[str, Path]] = None, force: bool =
         force (bool): Force download even if same version exists
     """
     if output_path is None:
-        script_dir = Path(__file__).parent
-        output_path = script_dir / "mapper" / "ue4ss"
+        output_path = INSTALL_DIRS["UE4SS"]
     
-    dm = DependencyManager()
+    dm = DependencyManager(temp_dir=Path.cwd() / ".temp" / "UE4SS", store=get_store())
+    repo = "/".join(GITHUB_REPOS["UE4SS"])
     try:
-        # Get latest release info (including pre-releases)
-        api_url = "https://api.github.com/repos/UE4SS-RE/RE-UE4SS/releases"
-        releases = dm._get_json_from_url(api_url)
-        if not releases:
-            raise Exception("No releases found")
-        
-        # First release in the list is the latest (includes pre-releases)
-        latest_release = releases[0]
-        version = latest_release.get('tag_name', 'unknown')
+        version, assets = get_latest_release(dm, "UE4SS")
         
         # Skip if we already have this version and force is False
         if not force:
@@ -499,63 +916,160 @@ def install_ue4ss(output_path: Optional[Union[str, Path]] = None, force: bool =
                 return True
             elif current_version:
                 logger.info(f"Updating UE4SS from version {current_version} to {version}")
-        
-        # Find the UE4SS zip asset
-        matching_asset = None
-        for asset in latest_release.get('assets', []):
-            if asset['name'].startswith('UE4SS_') and asset['name'].endswith('.zip'):
-                matching_asset = asset
-                break
-        
-        if not matching_asset:
-            raise Exception("No matching UE4SS zip asset found in release")
+            if dm._switch_to_stored(repo, version, Path(output_path)):
+                return True
         
         # Download and extract
-        download_url = matching_asset['browser_download_url']
-        logger.info(f"Downloading UE4SS version {version} from: {download_url}")
-        
-        dm.download_and_extract(
-            download_url=download_url,
-            output_path=output_path,
-            version=version
-        )
-        
-        return True
+        logger.info(f"Downloading UE4SS version {version} from: {assets[0]['browser_download_url']}")
+        return dm.install_release_assets(repo, version, assets, output_path, EXECUTABLE_NAMES["UE4SS"])
         
     finally:
         dm.cleanup_temp_files()
 
 
-def main(force_download: bool = False) -> bool:
+def install_locked_dependency(name: str, force: bool = False, mirror_dir: Optional[Union[str, Path]] = None, lock_file: Union[str, Path] = LOCK_FILE) -> bool:
+    """
+    Install the version of a dependency recorded in dependencies.lock, without the GitHub API.
+    
+    Args:
+        name (str): Dependency name, one of DEPENDENCIES
+        force (bool): Copy or download the assets even if the version is installed or stored
+        mirror_dir (str or Path, optional): Mirror directory to copy the assets from instead of downloading them, see get_mirror_path
+        lock_file (str or Path): Lock file to install from
+    
+    Raises:
+        ValueError: If there is no lock file or the dependency isn't in it
+    """
+    lock = read_lock(lock_file)
+    if name not in lock:
+        raise ValueError(f"{name} is not in {lock_file}. Update it with: python src/dependency_manager.py --update-lock")
+    
+    dm = DependencyManager(temp_dir=Path.cwd() / ".temp" / name, store=get_store(), mirror_dir=mirror_dir)
+    try:
+        return dm.install_locked(lock[name], INSTALL_DIRS[name], EXECUTABLE_NAMES[name], force=force)
+    finally:
+        dm.cleanup_temp_files()
+
+
+# Installers by dependency name, in installation order
+DEPENDENCIES = {
+    "BatchExport": install_batch_export,
+    "DepotDownloader": install_depot_downloader,
+    "UE4SS": install_ue4ss,
+}
+
+
+def install_dependency(name: str, force: bool = False, from_lock: bool = False, mirror_dir: Optional[Union[str, Path]] = None) -> bool:
+    """
+    Install a single dependency by name.
+    
+    Args:
+        name (str): Dependency name, one of DEPENDENCIES
+        force (bool): Force download even if same version exists
+        from_lock (bool): Install the version in dependencies.lock instead of the latest release
+        mirror_dir (str or Path, optional): With from_lock, mirror directory to copy the assets from instead of downloading them
+    """
+    if name not in DEPENDENCIES:
+        raise ValueError(f"Unknown dependency {name}. Must be one of: {', '.join(DEPENDENCIES)}")
+    logger.info(f"Installing {name}...")
+    if from_lock:
+        return install_locked_dependency(name, force=force, mirror_dir=mirror_dir)
+    return DEPENDENCIES[name](force=force)
+
+
+def switch_dependency(name: str, version: Optional[str] = None) -> None:
+    """
+    Switch a dependency to a version in the dependency store, without the network.
+    
+    Args:
+        name (str): Dependency name, one of DEPENDENCIES
+        version (str, optional): Release tag to switch to. Defaults to the version installed before the current one
+    
+    Raises:
+        ValueError: If the dependency is unknown or the version isn't in the store
+    """
+    if name not in GITHUB_REPOS:
+        raise ValueError(f"Unknown dependency {name}. Must be one of: {', '.join(GITHUB_REPOS)}")
+    store = get_store()
+    repo = "/".join(GITHUB_REPOS[name])
+    key = store.find(repo, version) if version is not None else store.get_previous(INSTALL_DIRS[name])
+    if key is None:
+        stored = [tag for entry in store.list_versions(repo) for tag in entry['tags']]
+        wanted = f"Version {version} of {name}" if version is not None else f"A previous version of {name}"
+        raise ValueError(f"{wanted} is not in the dependency store. Stored versions: {', '.join(stored) or 'none'}")
+    store.activate(key, INSTALL_DIRS[name])
+
+
+def list_stored_versions() -> None:
+    """Log the versions of each dependency in the dependency store, marking the installed one."""
+    store = get_store()
+    for name, (repo_owner, repo_name) in GITHUB_REPOS.items():
+        installed = store.get_installed(INSTALL_DIRS[name])
+        logger.info(f"{name}:")
+        for entry in store.list_versions(f"{repo_owner}/{repo_name}"):
+            marker = "*" if entry['key'] == installed else " "
+            logger.info(f"  {marker} {', '.join(entry['tags'])} ({entry['size'] / 1024 ** 2:.1f} MB, installed {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))})")
+
+
+def main(force_download: bool = False, from_lock: bool = False, mirror_dir: Optional[Union[str, Path]] = None) -> bool:
     """
     Main function to install all dependencies.
     
+    The dependencies are installed at the same time, each downloading into its own temporary
+    directory, since installing them is mostly waiting on the network. One failing doesn't stop
+    the others; every failure is reported.
+    
     Args:
         force_download (bool): Force download even if same version exists
+        from_lock (bool): Install the versions in dependencies.lock instead of the latest releases
+        mirror_dir (str or Path, optional): With from_lock, mirror directory to copy the assets from instead of downloading them
     """
     logger.info("Installing DarkAndDarker-Exporter dependencies...")
     
-    try:
-        # Install BatchExport
-        logger.info("Installing BatchExport...")
-        install_batch_export(force=force_download)
-        
-        # Install DepotDownloader
-        logger.info("Installing DepotDownloader...")
-        install_depot_downloader(force=force_download)
-        
-        # Install UE4SS
-        logger.info("Installing UE4SS...")
-        install_ue4ss(force=force_download)
-        
-        logger.success("All dependencies installed successfully!")
-        
-    except Exception as e:
-        logger.error(f"Failed to install dependencies: {e}")
+    errors = {}
+    with ThreadPoolExecutor(max_workers=len(DEPENDENCIES), thread_name_prefix="dependency") as executor:
+        futures = {name: executor.submit(install_dependency, name, force=force_download, from_lock=from_lock, mirror_dir=mirror_dir) for name in DEPENDENCIES}
+        for name, future in futures.items():
+            try:
+                if not future.result():
+                    errors[name] = "some of its assets could not be installed"
+            except Exception as e:
+                errors[name] = e
+    
+    for name, error in errors.items():
+        logger.error(f"Failed to install {name}: {error}")
+    if errors:
+        logger.error(f"Failed to install dependencies: {', '.join(errors)}")
         return False
     
+    logger.success("All dependencies installed successfully!")
     return True
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Install the DarkAndDarker-Exporter dependencies, or switch between stored versions of them")
+    parser.add_argument("--force", action="store_true", help="Re-download dependencies even if they are already installed")
+    parser.add_argument("--list", action="store_true", help="List the versions in the dependency store")
+    parser.add_argument("--switch", nargs=2, metavar=("NAME", "VERSION"), help="Switch a dependency to a stored version")
+    parser.add_argument("--rollback", metavar="NAME", help="Switch a dependency back to the version installed before")
+    parser.add_argument("--update-lock", action="store_true", help=f"Write the latest release of every dependency to {LOCK_FILE.name}")
+    parser.add_argument("--from-lock", action="store_true", help=f"Install the versions in {LOCK_FILE.name}, without the GitHub API")
+    parser.add_argument("--mirror", metavar="DIR", help="With --from-lock, copy the assets from this mirror directory instead of downloading them. With --update-lock, download the locked assets into it")
+    args = parser.parse_args()
+    
+    try:
+        if args.list:
+            list_stored_versions()
+        elif args.switch:
+            switch_dependency(*args.switch)
+        elif args.rollback:
+            switch_dependency(args.rollback)
+        elif args.update_lock:
+            update_lock(mirror_dir=args.mirror)
+        else:
+            sys.exit(0 if main(force_download=args.force, from_lock=args.from_lock, mirror_dir=args.mirror) else 1)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
@@ -0,0 +1,330 @@
+import os
+import json
+import stat
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from loguru import logger
+
+from run_state import STATE_DIR
+
+"""
+Versioned store of the installed dependencies.
+
+Each version of a dependency is extracted once into a directory of the store named after the
+SHA-256 of its downloads (its content address), so a release re-tagged without changes is stored
+once. An install directory such as src/batch_export/BatchExport is a link (a symlink, or a
+junction on Windows, which doesn't need administrator rights) to one of those directories.
+Installing a version extracts it into a staging directory of the store, moves it into place, and
+only then points the link at it, so a failed or interrupted update never leaves a mixed tree.
+Switching to a version that is already stored, including rolling back to the previous one, only
+replaces the link and needs no network.
+
+The least recently installed versions are removed once the store is over its size cap, except the
+versions that are installed.
+"""
+
+STORE_DIR = STATE_DIR / "dependencies"
+INDEX_FILE_NAME = "index.json"
+STAGING_DIR_NAME = ".staging"
+MAX_SIZE = 1024 * 1024 * 1024  # Bytes of versions kept before the least recently installed ones are removed
+IO_REPARSE_TAG_MOUNT_POINT = 0xA0000003  # Windows junction, which the stat module only defines on Windows
+
+_store: Optional["DependencyStore"] = None
+_store_lock = threading.Lock()
+_max_size: int = MAX_SIZE
+
+
+def configure(max_size: int = MAX_SIZE) -> None:
+    """
+    Configure the shared store.
+
+    Args:
+        max_size (int): Bytes of versions kept. Installed versions are kept even if they alone are larger
+    """
+    global _max_size
+    _max_size = max_size
+    with _store_lock:
+        if _store is not None:
+            _store.max_size = max_size
+
+
+def get_store() -> "DependencyStore":
+    """Get the store shared by the dependency installs, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DependencyStore(max_size=_max_size)
+        return _store
+
+
+def get_content_key(digests: Dict[str, str]) -> str:
+    """
+    Get the content address of a version from the SHA-256 of each of its downloads.
+
+    Args:
+        digests (dict): Hex SHA-256 by file name
+
+    Returns:
+        str: Hex SHA-256 of the names and digests, the same whatever order they were downloaded in
+    """
+    lines = "".join(f"{name} {digest}\n" for name, digest in sorted(digests.items()))
+    return hashlib.sha256(lines.encode()).hexdigest()
+
+
+def is_link(path: Union[str, Path]) -> bool:
+    """Whether path is a symlink or a Windows junction, rather than a directory of its own."""
+    try:
+        path_stat = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISLNK(path_stat.st_mode) or getattr(path_stat, "st_reparse_tag", None) == IO_REPARSE_TAG_MOUNT_POINT
+
+
+def create_link(target: Path, link: Path) -> None:
+    """Create link pointing at the directory target: a junction on Windows, a symlink elsewhere."""
+    if os.name == 'nt':
+        import _winapi
+        _winapi.CreateJunction(str(target), str(link))
+    else:
+        os.symlink(target, link, target_is_directory=True)
+
+
+def remove_link(link: Path) -> None:
+    """Remove a link created by create_link, leaving its target alone."""
+    if os.name == 'nt':
+        os.rmdir(link)  # Removes a junction or directory symlink itself, not what it points at
+    else:
+        os.unlink(link)
+
+
+def switch_link(link: Path, target: Path) -> None:
+    """
+    Point link at the directory target, replacing the link already there.
+
+    A new link is created next to it and renamed over the old one, which is atomic on POSIX. Windows
+    can't rename over a directory link, so there the old link is renamed away first and removed after.
+
+    Args:
+        link (Path): Link to create or replace. Must not be a directory of its own
+        target (Path): Directory to point it at
+    """
+    new_link = link.with_name(f"{link.name}.{os.getpid()}.{threading.get_ident()}.new")
+    create_link(target, new_link)
+    try:
+        if os.name != 'nt' or not is_link(link):
+            os.replace(new_link, link)
+            return
+        old_link = link.with_name(f"{link.name}.{os.getpid()}.{threading.get_ident()}.old")
+        os.rename(link, old_link)
+        os.rename(new_link, link)
+        remove_link(old_link)
+    except OSError:
+        if is_link(new_link):
+            remove_link(new_link)
+        raise
+
+
+def get_tree_size(path: Path) -> int:
+    """Total bytes of the files in a directory tree, without following links."""
+    size = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.lstat(os.path.join(directory, name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+class DependencyStore:
+    """
+    Content-addressed directories of dependency versions and the install links pointing at them.
+
+    The index file records, for each stored version, the dependency it belongs to, its release
+    tags, its size and when it was last installed, and for each install directory which version it
+    points at and which one it pointed at before.
+    """
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, max_size: int = MAX_SIZE) -> None:
+        """
+        Initialize the store, removing staging directories left by an interrupted install.
+
+        Args:
+            root (str | Path, optional): Directory of the store. Defaults to .state/dependencies
+            max_size (int): Bytes of versions kept. Installed versions are kept even if they alone are larger
+        """
+        self.root = Path(root if root is not None else STORE_DIR).absolute()
+        self.max_size = max_size
+        self.index_file = self.root / INDEX_FILE_NAME
+        self.staging_dir = self.root / STAGING_DIR_NAME
+        self._lock = threading.RLock()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            index = json.loads(self.index_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("versions", {})
+        index.setdefault("installs", {})
+        return index
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        temp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        temp_file.write_text(json.dumps(index, indent=2), encoding='utf-8')
+        os.replace(temp_file, self.index_file)
+
+    def create_staging_dir(self) -> Path:
+        """Create an empty directory to install a version into, on the same volume as the store so it moves in instantly."""
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(dir=self.staging_dir))
+
+    def find(self, name: str, version: str) -> Optional[str]:
+        """
+        Get the content address of a stored version.
+
+        Args:
+            name (str): Dependency, e.g. 'Surxe/CUE4P-BatchExport'
+            version (str): Release tag
+
+        Returns:
+            str or None: Content address, None if that version isn't stored
+        """
+        with self._lock:
+            for key, entry in self._load_index()["versions"].items():
+                if entry["name"] == name and version in entry["tags"] and (self.root / key).is_dir():
+                    return key
+        return None
+
+    def has(self, key: str) -> bool:
+        """Whether a version is stored, by its content address."""
+        with self._lock:
+            return key in self._load_index()["versions"] and (self.root / key).is_dir()
+
+    def list_versions(self, name: str) -> List[Dict[str, Any]]:
+        """
+        Get the stored versions of a dependency, most recently installed first.
+
+        Args:
+            name (str): Dependency, e.g. 'Surxe/CUE4P-BatchExport'
+
+        Returns:
+            list: Index entries, each with its content address as 'key'
+        """
+        with self._lock:
+            versions = self._load_index()["versions"]
+        entries = [dict(entry, key=key) for key, entry in versions.items() if entry["name"] == name]
+        return sorted(entries, key=lambda entry: entry["last_used"], reverse=True)
+
+    def get_installed(self, install_dir: Union[str, Path]) -> Optional[str]:
+        """Get the content address of the version install_dir points at, None if it isn't a link into the store."""
+        with self._lock:
+            install = self._load_index()["installs"].get(os.path.abspath(install_dir))
+        return install["key"] if install is not None and is_link(install_dir) else None
+
+    def get_previous(self, install_dir: Union[str, Path]) -> Optional[str]:
+        """Get the content address of the version install_dir pointed at before the current one, None if there is none still stored."""
+        with self._lock:
+            install = self._load_index()["installs"].get(os.path.abspath(install_dir))
+        key = install.get("previous") if install is not None else None
+        return key if key is not None and (self.root / key).is_dir() else None
+
+    def add(self, name: str, version: str, staging_path: Path, key: str) -> str:
+        """
+        Move a version installed into a staging directory into the store.
+
+        If the same content is already stored (e.g. re-tagged), the staging directory is removed and
+        the version is added as another tag of it.
+
+        Args:
+            name (str): Dependency, e.g. 'Surxe/CUE4P-BatchExport'
+            version (str): Release tag
+            staging_path (Path): Directory from create_staging_dir with the version installed
+            key (str): Content address, see get_content_key
+
+        Returns:
+            str: The content address
+        """
+        with self._lock:
+            index = self._load_index()
+            version_dir = self.root / key
+            if version_dir.is_dir():
+                logger.debug(f"{name} {version} is already stored as {key[:12]}")
+                shutil.rmtree(staging_path, ignore_errors=True)
+            else:
+                os.replace(staging_path, version_dir)
+            entry = index["versions"].get(key) or {"name": name, "tags": [], "size": get_tree_size(version_dir), "last_used": time.time()}
+            if version not in entry["tags"]:
+                entry["tags"].append(version)
+            index["versions"][key] = entry
+            self._save_index(index)
+        return key
+
+    def activate(self, key: str, install_dir: Union[str, Path]) -> None:
+        """
+        Point install_dir at a stored version, then remove old versions over the size cap.
+
+        A directory of its own at install_dir, from before installs went through the store, is removed.
+
+        Args:
+            key (str): Content address of the version
+            install_dir (str | Path): Directory the tools run the dependency from
+
+        Raises:
+            ValueError: If the version isn't stored
+        """
+        install_dir = Path(install_dir)
+        with self._lock:
+            index = self._load_index()
+            entry = index["versions"].get(key)
+            if entry is None or not (self.root / key).is_dir():
+                raise ValueError(f"Version {key[:12]} is not in the dependency store {self.root}")
+
+            start_time = time.perf_counter()
+            install_dir.parent.mkdir(parents=True, exist_ok=True)
+            if install_dir.exists() and not is_link(install_dir):
+                logger.info(f"Replacing {install_dir} installed outside of the dependency store")
+                shutil.rmtree(install_dir)
+            switch_link(install_dir, self.root / key)
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+
+            install_key = os.path.abspath(install_dir)
+            install = index["installs"].get(install_key)
+            if install is None or install["key"] != key:
+                index["installs"][install_key] = {"key": key, "previous": install["key"] if install is not None else None}
+            entry["last_used"] = time.time()
+            self._save_index(index)
+            logger.info(f"Switched {install_dir} to {entry['name']} {', '.join(entry['tags'])} in {elapsed_ms:.1f} ms")
+            self.evict()
+
+    def evict(self) -> List[str]:
+        """
+        Remove the least recently installed versions until the store is within its size cap. Installed versions are kept.
+
+        Returns:
+            list: Content addresses of the removed versions
+        """
+        removed = []
+        with self._lock:
+            index = self._load_index()
+            installed = {install["key"] for install_dir, install in index["installs"].items() if is_link(install_dir)}
+            total_size = sum(entry["size"] for entry in index["versions"].values())
+            for key, entry in sorted(index["versions"].items(), key=lambda item: item[1]["last_used"]):
+                if total_size <= self.max_size:
+                    break
+                if key in installed:
+                    continue
+                logger.info(f"Removing {entry['name']} {', '.join(entry['tags'])} from the dependency store, least recently installed")
+                shutil.rmtree(self.root / key, ignore_errors=True)
+                del index["versions"][key]
+                total_size -= entry["size"]
+                removed.append(key)
+            if removed:
+                self._save_index(index)
+        return removed
@@ -0,0 +1,355 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from loguru import logger
+
+from utils import get_volume_path
+
+"""
+Resource governor for the processes started through run_process.
+
+Every process takes a CPU slot, and an I/O slot on each volume it reads or writes. UnrealPak,
+BatchExport, and DepotDownloader are all disk heavy, so running several of them on one spinning
+or network volume is slower in total than running them one after another.
+
+I/O slot limits can be fixed per volume, or found automatically: each volume starts with one slot
+and the governor samples the disk throughput of the processes holding its slots. While adding a
+concurrent process still raises the throughput, another slot is opened. Once it stops helping
+(typically right away on an HDD, later on an SSD), the volume is saturated and the limit goes
+back down, so parallel work such as per-pak extraction runs at the concurrency the volume handles best.
+"""
+
+SAMPLE_INTERVAL = 2.0  # Seconds between throughput samples of the processes holding I/O slots
+MIN_SAMPLES = 3  # Samples at a concurrency level before deciding whether it helped
+SATURATION_GAIN = 1.15  # Throughput one more process has to add (15%) for the volume to count as not saturated
+MAX_AUTO_IO_SLOTS = 8  # Highest I/O slot limit automatic detection goes up to
+
+_governor: Optional["Governor"] = None
+_governor_lock = threading.Lock()
+
+
+def configure(cpu_slots: int = 0, io_slots: int = 0) -> "Governor":
+    """
+    Replace the governor used by run_process.
+
+    Args:
+        cpu_slots (int): Processes running at once. 0 uses the number of CPU cores
+        io_slots (int): Processes using one volume at once. 0 finds the limit of each volume from its throughput
+
+    Returns:
+        Governor: The new governor
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is not None:
+            _governor.shutdown()
+        _governor = Governor(cpu_slots, io_slots)
+    return _governor
+
+
+def get_governor() -> "Governor":
+    """Get the governor used by run_process, creating one with automatic limits if none was configured."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = Governor()
+        return _governor
+
+
+def get_volume_id(path: Union[str, Path]) -> int:
+    """Get an id of the volume a path is (or will be created) on."""
+    return os.stat(get_volume_path(path)).st_dev
+
+
+class SlotPool:
+    """A counted set of slots whose limit can change while they are in use."""
+
+    def __init__(self, name: str, limit: int) -> None:
+        """
+        Args:
+            name (str): Name used in logs
+            limit (int): Slots that may be in use at once
+        """
+        self.name = name
+        self.limit = limit
+        self.in_use = 0
+        self.closed = False
+        self._condition = threading.Condition()
+        # Waiters as (-priority, arrival), so the first in the heap takes the next free slot
+        self._waiting: List[tuple] = []
+        self._arrivals = itertools.count()
+
+    def acquire(self, priority: int = 0) -> None:
+        """
+        Wait for a free slot and take it.
+
+        Args:
+            priority (int, optional): Waiters with a higher priority get a free slot first, equal ones in order of arrival. Defaults to 0
+        """
+        with self._condition:
+            ticket = (-priority, next(self._arrivals))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while (self.in_use >= self.limit or self._waiting[0] != ticket) and not self.closed:
+                    self._condition.wait()
+                if self.closed:
+                    raise RuntimeError(f"Resource governor is shut down, not starting more work on {self.name}")
+                self.in_use += 1
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()  # The next waiter may take a slot too
+
+    def release(self) -> None:
+        """Give a slot back."""
+        with self._condition:
+            self.in_use -= 1
+            self._condition.notify_all()
+
+    def set_limit(self, limit: int) -> None:
+        """Change the limit. Lowering it lets running work finish but admits nothing new until below it."""
+        with self._condition:
+            self.limit = limit
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """Fail every current and future wait for a slot."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class VolumeSlots(SlotPool):
+    """I/O slots of one volume, with a limit that follows its measured throughput when adaptive."""
+
+    def __init__(self, name: str, limit: int, adaptive: bool) -> None:
+        """
+        Args:
+            name (str): Path on the volume, used in logs
+            limit (int): Starting limit
+            adaptive (bool): Adjust the limit from throughput samples
+        """
+        super().__init__(name, limit)
+        self.adaptive = adaptive
+        self.max_limit = MAX_AUTO_IO_SLOTS if adaptive else limit
+        # Concurrency level -> throughput samples in bytes per second
+        self.samples: Dict[int, List[float]] = {}
+
+    def _median(self, concurrency: int) -> Optional[float]:
+        values = sorted(self.samples.get(concurrency, []))
+        if len(values) < MIN_SAMPLES:
+            return None
+        return values[len(values) // 2]
+
+    def record(self, concurrency: int, bytes_per_second: float) -> None:
+        """
+        Add a throughput sample taken while a number of processes held slots, and adjust the limit.
+
+        Args:
+            concurrency (int): Processes holding slots during the whole sample
+            bytes_per_second (float): Bytes read and written per second by those processes
+        """
+        if not self.adaptive or concurrency < 1:
+            return
+        self.samples.setdefault(concurrency, []).append(bytes_per_second)
+        self.samples[concurrency] = self.samples[concurrency][-MIN_SAMPLES * 3:]
+
+        current = self._median(concurrency)
+        if current is None:
+            return
+        previous = self._median(concurrency - 1) if concurrency > 1 else None
+        if previous is not None and current < previous * SATURATION_GAIN:
+            # One more process did not add throughput, so the volume is saturated at this level
+            self.max_limit = concurrency - 1
+            if self.limit > self.max_limit:
+                logger.info(f"Volume of {self.name} is saturated at {concurrency} concurrent processes ({current / 1024**2:.0f} MB/s vs {previous / 1024**2:.0f} MB/s), limiting it to {self.max_limit}")
+                self.set_limit(self.max_limit)
+        elif concurrency == self.limit and self.limit < self.max_limit:
+            logger.debug(f"Volume of {self.name} reached {current / 1024**2:.0f} MB/s with {concurrency} process(es), allowing {self.limit + 1}")
+            self.set_limit(self.limit + 1)
+
+    def reset(self) -> None:
+        """Forget the samples and the saturation found, and probe the volume again from one slot."""
+        if not self.adaptive:
+            return
+        self.samples = {}
+        self.max_limit = MAX_AUTO_IO_SLOTS
+        self.set_limit(1)
+
+
+class Governor:
+    """
+    Hands out CPU slots and per-volume I/O slots to processes.
+
+    Safe to share between stages running at the same time.
+    """
+
+    def __init__(self, cpu_slots: int = 0, io_slots: int = 0, sample_interval: float = SAMPLE_INTERVAL) -> None:
+        """
+        Args:
+            cpu_slots (int): Processes running at once. 0 uses the number of CPU cores
+            io_slots (int): Processes using one volume at once. 0 finds the limit of each volume from its throughput
+            sample_interval (float): Seconds between throughput samples
+        """
+        self.cpu = SlotPool("CPU", cpu_slots or os.cpu_count() or 1)
+        self.io_slots = io_slots
+        self.sample_interval = sample_interval
+        self.volumes: Dict[int, VolumeSlots] = {}
+        # Volume id -> pids of the processes holding one of its slots
+        self.holders: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def volume(self, path: Union[str, Path]) -> VolumeSlots:
+        """Get the I/O slots of the volume a path is on."""
+        volume_id = get_volume_id(path)
+        with self._lock:
+            if volume_id not in self.volumes:
+                adaptive = self.io_slots == 0
+                self.volumes[volume_id] = VolumeSlots(str(get_volume_path(path)), 1 if adaptive else self.io_slots, adaptive)
+                self.holders[volume_id] = []
+            return self.volumes[volume_id]
+
+    def io_limit(self, path: Union[str, Path]) -> int:
+        """Get the current I/O slot limit of the volume a path is on."""
+        return self.volume(path).limit
+
+    def reset_limits(self) -> None:
+        """
+        Have every adaptive volume find its limit again, e.g. at the start of each pipeline run in --watch.
+
+        A saturation found during one run may have been a passing dip, or come from a mix of tools that
+        doesn't run again, so it shouldn't cap the volume for the rest of a long-running process.
+        """
+        with self._lock:
+            volumes = list(self.volumes.values())
+        for volume in volumes:
+            volume.reset()
+
+    def acquire(self, name: str, paths: Optional[List[Union[str, Path]]] = None, priority: int = 0) -> "SlotLease":
+        """
+        Wait for and take a CPU slot and an I/O slot on every volume of the given paths.
+
+        Volumes are always taken in the same order, so two processes waiting for each other's volumes can't deadlock.
+
+        Args:
+            name (str): Process name used in logs
+            paths (list, optional): Files or directories the process reads or writes
+            priority (int, optional): Processes with a higher priority get free slots first. Defaults to 0
+
+        Returns:
+            SlotLease: Call attach(pid) on it once the process started so its throughput is sampled, and release() once it exited
+        """
+        for path in paths or []:
+            self.volume(path)
+        volume_ids = sorted({get_volume_id(path) for path in paths or []})
+
+        start_time = time.monotonic()
+        pools: List[SlotPool] = []
+        try:
+            for volume_id in volume_ids:
+                self.volumes[volume_id].acquire(priority)
+                pools.append(self.volumes[volume_id])
+            self.cpu.acquire(priority)
+            pools.append(self.cpu)
+        except BaseException:
+            for pool in reversed(pools):
+                pool.release()
+            raise
+        waited = time.monotonic() - start_time
+        if waited >= 1:
+            logger.debug(f"{name} waited {waited:.1f}s for a free slot")
+        return SlotLease(self, volume_ids, pools)
+
+    def _attach(self, volume_ids: List[int], pid: int) -> None:
+        with self._lock:
+            for volume_id in volume_ids:
+                self.holders[volume_id].append(pid)
+            adaptive = any(self.volumes[volume_id].adaptive for volume_id in volume_ids)
+            if adaptive and (self._sampler is None or not self._sampler.is_alive()) and not self._stop.is_set():
+                self._sampler = threading.Thread(target=self._run_sampler, name="governor-sampler", daemon=True)
+                self._sampler.start()
+
+    def _detach(self, volume_ids: List[int], pid: int) -> None:
+        with self._lock:
+            for volume_id in volume_ids:
+                if pid in self.holders[volume_id]:
+                    self.holders[volume_id].remove(pid)
+
+    def _io_bytes(self, pids: List[int]) -> Optional[int]:
+        """Get the bytes read and written so far by processes and their children, None if not measurable."""
+        import psutil  # Only needed once a process runs, see stage_registry
+        total = 0
+        for pid in pids:
+            try:
+                root = psutil.Process(pid)
+                for proc in [root] + root.children(recursive=True):
+                    if not hasattr(proc, "io_counters"):  # Not available on macOS
+                        return None
+                    io = proc.io_counters()
+                    total += io.read_bytes + io.write_bytes
+            except (psutil.Error, TypeError, ValueError):
+                return None  # Exited during the sample, so the sample is not comparable
+        return total
+
+    def sample(self, interval: float) -> None:
+        """Measure the throughput of every adaptive volume over an interval, and feed it to its slots."""
+        with self._lock:
+            before = {volume_id: (list(pids), self._io_bytes(pids)) for volume_id, pids in self.holders.items() if pids and self.volumes[volume_id].adaptive}
+        if not before:
+            return
+        self._stop.wait(interval)
+        with self._lock:
+            for volume_id, (pids, start_bytes) in before.items():
+                # Only a sample taken with the same processes throughout says something about a concurrency level
+                if start_bytes is None or self.holders[volume_id] != pids:
+                    continue
+                end_bytes = self._io_bytes(pids)
+                if end_bytes is not None:
+                    self.volumes[volume_id].record(len(pids), (end_bytes - start_bytes) / interval)
+
+    def _run_sampler(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                busy = any(self.holders.values())
+            if not busy:
+                return
+            self.sample(self.sample_interval)
+
+    def shutdown(self) -> None:
+        """Stop sampling and fail everything still waiting for a slot, e.g. on Ctrl+C."""
+        self._stop.set()
+        self.cpu.close()
+        with self._lock:
+            volumes = list(self.volumes.values())
+        for volume in volumes:
+            volume.close()
+
+
+class SlotLease:
+    """The slots held by one process, from Governor.acquire."""
+
+    def __init__(self, governor: Governor, volume_ids: List[int], pools: List[SlotPool]) -> None:
+        self.governor = governor
+        self.volume_ids = volume_ids
+        self.pools = pools
+        self.pid: Optional[int] = None
+
+    def attach(self, pid: int) -> None:
+        """Sample the throughput of the started process for the volumes of this lease."""
+        self.pid = pid
+        self.governor._attach(self.volume_ids, pid)
+
+    def release(self) -> None:
+        """Stop sampling the process and give its slots back. Safe to call more than once."""
+        if self.pid is not None:
+            self.governor._detach(self.volume_ids, self.pid)
+            self.pid = None
+        pools, self.pools = self.pools, []
+        for pool in reversed(pools):
+            pool.release()
@@ -0,0 +1,239 @@
+import re
+import json
+import time
+import sqlite3
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from loguru import logger
+
+from run_state import STATE_DIR
+
+"""
+Historical run database for catching performance regressions.
+
+Every run appends the timings and resource numbers of its stages (from the telemetry report) to
+a SQLite database. Each stage is then compared against the median of its recent runs. Stages
+that report an input size (pak bytes for Repack, exported files for BatchExport) are compared
+per unit of input, so a bigger game update is not mistaken for a slowdown.
+"""
+
+BASELINE_RUNS = 10  # Recent runs of a stage the baseline is the median of
+MIN_BASELINE_RUNS = 3  # Runs a stage needs before it is checked at all
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    version TEXT,
+    manifest_id TEXT,
+    dependency_versions TEXT NOT NULL,
+    success INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stage_runs (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    stage TEXT NOT NULL,
+    status TEXT,
+    up_to_date INTEGER NOT NULL,
+    wall_seconds REAL,
+    cpu_seconds REAL,
+    peak_rss_bytes INTEGER,
+    read_bytes INTEGER,
+    write_bytes INTEGER,
+    input_size REAL,
+    extracted_bytes INTEGER,
+    output_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS stage_runs_stage ON stage_runs (stage, run_id);
+"""
+
+# Columns added to stage_runs after its first release, added to older databases on open
+ADDED_COLUMNS = {
+    "extracted_bytes": "INTEGER",
+    "output_bytes": "INTEGER",
+}
+
+
+class RunHistory:
+    """
+    SQLite history of stage timings with a rolling, input size aware baseline.
+    """
+
+    def __init__(self, db_file: Optional[Union[str, Path]] = None) -> None:
+        """
+        Args:
+            db_file (str or Path, optional): SQLite database file. Defaults to .state/history.sqlite3 in the cwd.
+        """
+        self.db_file = Path(db_file) if db_file is not None else STATE_DIR / "history.sqlite3"
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.db_file)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self) -> None:
+        """Upgrade a database created by an older version."""
+        existing = {row["name"] for row in self.connection.execute("PRAGMA table_info(stage_runs)")}
+        with self.connection:
+            for name, column_type in ADDED_COLUMNS.items():
+                if name not in existing:
+                    self.connection.execute(f"ALTER TABLE stage_runs ADD COLUMN {name} {column_type}")
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+    def record_run(self, report: dict, success: bool, dependency_versions: Dict[str, Optional[str]], version: Optional[str] = None, manifest_id: Optional[str] = None) -> int:
+        """
+        Append a run and its stages.
+
+        Args:
+            report (dict): Telemetry report of the run
+            success (bool): Whether the whole run succeeded
+            dependency_versions (dict): Dependency name to installed version
+            version (str, optional): Game version the run was for, e.g. the log file name
+            manifest_id (str, optional): Manifest id the run was for
+
+        Returns:
+            int: Id of the recorded run
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (started_at, version, manifest_id, dependency_versions, success) VALUES (?, ?, ?, ?, ?)",
+                (report.get("started_at", time.time()), version, manifest_id, json.dumps(dependency_versions, sort_keys=True), int(success)),
+            )
+            run_id = cursor.lastrowid
+            for name, entry in report.get("stages", {}).items():
+                # Backfill stages are named per manifest, e.g. repack[<manifest id>], and share their stage's baseline
+                stage = re.sub(r"\[[^\]]*\]$", "", name)
+                self.connection.execute(
+                    "INSERT INTO stage_runs (run_id, stage, status, up_to_date, wall_seconds, cpu_seconds, peak_rss_bytes, read_bytes, write_bytes, input_size, extracted_bytes, output_bytes) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        stage,
+                        entry.get("status"),
+                        int(entry.get("up_to_date", False)),
+                        entry.get("wall_seconds"),
+                        entry.get("python_cpu_seconds", 0) + entry.get("process_cpu_seconds", 0),
+                        entry.get("process_peak_rss_bytes"),
+                        entry.get("process_read_bytes"),
+                        entry.get("process_write_bytes"),
+                        entry.get("input_size"),
+                        entry.get("extracted_bytes"),
+                        entry.get("output_bytes"),
+                    ),
+                )
+        return run_id
+
+    def _comparable_runs(self, stage: str, before_run_id: int, sized: bool) -> List[sqlite3.Row]:
+        """Get the recent runs of a stage that did real work, newest first."""
+        return self.connection.execute(
+            "SELECT stage_runs.*, runs.dependency_versions FROM stage_runs JOIN runs ON runs.id = stage_runs.run_id "
+            "WHERE stage = ? AND run_id < ? AND status = 'success' AND up_to_date = 0 AND wall_seconds IS NOT NULL "
+            f"AND input_size IS {'NOT NULL AND input_size > 0' if sized else 'NULL'} "
+            "ORDER BY run_id DESC LIMIT ?",
+            (stage, before_run_id, BASELINE_RUNS),
+        ).fetchall()
+
+    def find_regressions(self, run_id: int, threshold: float, stages: Optional[List[str]] = None) -> List[dict]:
+        """
+        Compare the stages of a recorded run against their baselines.
+
+        Args:
+            run_id (int): Run to check
+            threshold (float): Slowdown factor over the baseline that counts as a regression, e.g. 1.5
+            stages (list[str], optional): Only check these stages. Defaults to all stages of the run
+
+        Returns:
+            list[dict]: One entry per regressed stage with the expected and actual seconds and any dependency versions that changed
+        """
+        run = self.connection.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        current_versions = json.loads(run["dependency_versions"])
+        rows = self.connection.execute(
+            "SELECT * FROM stage_runs WHERE run_id = ? AND status = 'success' AND up_to_date = 0 AND wall_seconds IS NOT NULL", (run_id,)
+        ).fetchall()
+
+        regressions = []
+        for row in rows:
+            if stages is not None and row["stage"] not in stages:
+                continue
+            sized = row["input_size"] is not None and row["input_size"] > 0
+            baseline_runs = self._comparable_runs(row["stage"], run_id, sized)
+            if len(baseline_runs) < MIN_BASELINE_RUNS:
+                logger.debug(f"Not checking {row['stage']} for regressions: only {len(baseline_runs)} comparable previous run(s)")
+                continue
+
+            if sized:
+                # Seconds per unit of input, scaled back up to this run's input size
+                rate = statistics.median(r["wall_seconds"] / r["input_size"] for r in baseline_runs)
+                expected_seconds = rate * row["input_size"]
+            else:
+                expected_seconds = statistics.median(r["wall_seconds"] for r in baseline_runs)
+            if expected_seconds <= 0:
+                continue
+
+            ratio = row["wall_seconds"] / expected_seconds
+            logger.debug(f"{row['stage']} took {row['wall_seconds']:.1f}s, baseline {expected_seconds:.1f}s ({ratio:.2f}x)")
+            if ratio < threshold:
+                continue
+
+            previous_versions = json.loads(baseline_runs[0]["dependency_versions"])
+            regressions.append({
+                "stage": row["stage"],
+                "wall_seconds": row["wall_seconds"],
+                "expected_seconds": round(expected_seconds, 3),
+                "ratio": round(ratio, 2),
+                "baseline_runs": len(baseline_runs),
+                "normalized_by_input_size": sized,
+                "changed_dependencies": {
+                    name: {"from": previous_versions.get(name), "to": version}
+                    for name, version in current_versions.items()
+                    if previous_versions.get(name) != version
+                },
+            })
+        return regressions
+
+    def baseline(self, stage: str) -> Optional[dict]:
+        """
+        Summarize the recent runs of a stage that did real work, for estimating its next run.
+
+        Args:
+            stage (str): Stage name, without a backfill manifest suffix
+
+        Returns:
+            dict: Medians of the recent runs, or None if the stage never ran. Always has runs and wall_seconds.
+            Stages that report an input size also have input_size (of the latest run) and seconds_per_input,
+            and extracted_per_input and output_per_input when they report those sizes. output_bytes is set
+            for stages that report it.
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM stage_runs WHERE stage = ? AND status = 'success' AND up_to_date = 0 AND wall_seconds IS NOT NULL "
+            "ORDER BY run_id DESC LIMIT ?",
+            (stage, BASELINE_RUNS),
+        ).fetchall()
+        if not rows:
+            return None
+
+        baseline = {"runs": len(rows), "wall_seconds": statistics.median(r["wall_seconds"] for r in rows)}
+        sized = [r for r in rows if r["input_size"] is not None and r["input_size"] > 0]
+        if sized:
+            baseline["input_size"] = sized[0]["input_size"]
+            baseline["seconds_per_input"] = statistics.median(r["wall_seconds"] / r["input_size"] for r in sized)
+            for column, key in (("extracted_bytes", "extracted_per_input"), ("output_bytes", "output_per_input")):
+                values = [r[column] / r["input_size"] for r in sized if r[column] is not None]
+                if values:
+                    baseline[key] = statistics.median(values)
+        output_bytes = [r["output_bytes"] for r in rows if r["output_bytes"] is not None]
+        if output_bytes:
+            baseline["output_bytes"] = statistics.median(output_bytes)
+        return baseline
+
+
+def load_baseline(stage: str) -> Optional[dict]:
+    """Get the baseline of a stage from the default history database, see RunHistory.baseline."""
+    history = RunHistory()
+    try:
+        return history.baseline(stage)
+    finally:
+        history.close()
@@ -0,0 +1,596 @@
+import os
+import re
+import ssl
+import json
+import time
+import hashlib
+import threading
+import http.client
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit, urljoin
+from urllib.request import getproxies, proxy_bypass
+from loguru import logger
+
+from run_state import STATE_DIR
+
+"""
+HTTP client shared by the dependency installs.
+
+Connections are kept alive and reused per host, so the GitHub API calls and downloads of one run
+don't each pay for a new TCP and TLS handshake. Release metadata (JSON) is cached on disk with its
+ETag and Last-Modified, and asked for again with a conditional request: GitHub answers 304 Not
+Modified without a body and doesn't count it against the unauthenticated rate limit. In watch
+mode, metadata younger than a short TTL isn't asked for at all.
+
+Downloads go to a .part file next to their destination, with the byte ranges already written
+recorded in a .part.json file. A dropped connection is resumed with an HTTP Range request from
+where it stopped, in the same run or the next one, as long as the server still has the same file
+(If-Range with its ETag). Large files can be downloaded as several byte ranges at once, each on
+its own connection, into the preallocated .part file.
+
+Downloads are hashed with SHA-256 as they are written: the bytes from the start of the file are
+hashed on their way to disk, and only what was written out of order (by the other ranges, or by a
+run before a resume) is read back once at the end. A digest that doesn't match the published one
+rejects the file before anything uses it.
+
+Each range reads into one buffer allocated when it starts (readinto), which is written and hashed
+from before the next read, so a download uses the same few MB of memory however large the file is.
+"""
+
+USER_AGENT = 'DarkAndDarker-Exporter'
+TIMEOUT = 60  # Seconds to wait for a connection or data
+MAX_REDIRECTS = 5
+MAX_IDLE_CONNECTIONS = 4  # Idle connections kept per host
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+WATCH_METADATA_TTL = 10 * 60  # Seconds release metadata is reused without asking GitHub in watch mode
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes read from a download at once, the size of each range's buffer
+DOWNLOAD_RETRIES = 5  # Times a dropped download is resumed in one run before giving up
+RETRY_DELAY = 1.0  # Seconds before the first resume, doubling with each one
+MIN_SEGMENT_SIZE = 16 * 1024 * 1024  # Files are only split into byte ranges this large or larger
+PART_SAVE_INTERVAL = 4 * 1024 * 1024  # Bytes a range downloads between updates of the .part.json file
+PROGRESS_LOG_INTERVAL = 5.0  # Seconds between download progress logs
+
+_client: Optional["HttpClient"] = None
+_client_lock = threading.Lock()
+_metadata_ttl: float = 0
+
+
+class HttpError(OSError):
+    """A request was answered with an error status."""
+
+    def __init__(self, url: str, status: int, reason: str) -> None:
+        super().__init__(f"HTTP Error {status}: {reason} ({url})")
+        self.url = url
+        self.status = status
+
+
+class DownloadChangedError(Exception):
+    """The file on the server changed, or stopped supporting ranges, partway through a download."""
+
+
+class DigestMismatchError(Exception):
+    """A downloaded file doesn't have the published SHA-256 digest."""
+
+
+def parse_sha256(digest: Optional[str]) -> Optional[str]:
+    """Get the hex SHA-256 of a published digest, such as a GitHub release asset's 'sha256:<hex>'. None for other algorithms or none."""
+    if not digest:
+        return None
+    algorithm, separator, value = digest.strip().partition(":")
+    if not separator:
+        algorithm, value = "sha256", algorithm
+    if algorithm.lower() != "sha256" or not re.fullmatch(r"[0-9a-fA-F]{64}", value):
+        return None
+    return value.lower()
+
+
+def configure(metadata_ttl: float = 0) -> None:
+    """
+    Configure the shared client.
+
+    Args:
+        metadata_ttl (float): Seconds cached release metadata is used without a request. 0 always asks GitHub, conditionally
+    """
+    global _metadata_ttl
+    _metadata_ttl = metadata_ttl
+    with _client_lock:
+        if _client is not None:
+            _client.metadata_ttl = metadata_ttl
+
+
+def get_client() -> "HttpClient":
+    """Get the client shared by the dependency installs, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(metadata_ttl=_metadata_ttl)
+        return _client
+
+
+def get_content_range(response: "HttpResponse") -> Tuple[int, Optional[int]]:
+    """Get the first byte and the total size of a response from its Content-Range, or 0 and Content-Length without one."""
+    content_range = response.headers.get("Content-Range")
+    if response.status == 206 and content_range:
+        match = re.match(r"bytes (\d+)-\d+/(\d+|\*)", content_range)
+        if match:
+            return int(match.group(1)), None if match.group(2) == "*" else int(match.group(2))
+    content_length = response.headers.get("Content-Length")
+    return 0, int(content_length) if content_length and content_length.isdigit() else None
+
+
+def split_ranges(size: int, segments: int) -> List[Dict[str, Any]]:
+    """Split size bytes into up to segments byte ranges of at least MIN_SEGMENT_SIZE, as .part.json ranges."""
+    count = max(1, min(segments, size // MIN_SEGMENT_SIZE))
+    bounds = [size * index // count for index in range(count + 1)]
+    return [{"start": bounds[index], "end": bounds[index + 1] - 1, "done": 0} for index in range(count)]
+
+
+class Download:
+    """A download into a .part file, resumable from the byte ranges recorded next to it."""
+
+    def __init__(self, client: "HttpClient", url: str, path: Path, segments: int = 1, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> None:
+        """
+        Args:
+            client (HttpClient): Client to download with
+            url (str): URL of the file
+            path (Path): Where the finished file goes
+            segments (int): Byte ranges to download at once, if the file is large enough and the server supports ranges
+            chunk_size (int): Bytes read at once, and the size of the buffer each range reads into
+        """
+        self.client = client
+        self.url = url
+        self.path = path
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self.part_file = path.with_name(f"{path.name}.part")
+        self.state_file = path.with_name(f"{path.name}.part.json")
+        self.state: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._started_at = self._logged_at = time.monotonic()
+        self._hasher = hashlib.sha256()
+        self._hashed = 0  # Bytes from the start of the file fed to the hasher
+        self._received = 0  # Bytes read in this run, for the download rate
+        self._attempt_start = 0  # Bytes recorded when the current attempt started
+        self._attempt_received = 0  # Bytes read in the current attempt
+
+    @property
+    def downloaded(self) -> int:
+        """Bytes written and recorded so far."""
+        return sum(byte_range["done"] for byte_range in self.state["ranges"]) if self.state else 0
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        """Get the recorded ranges of an earlier attempt at the same URL, if its .part file is still there."""
+        try:
+            state = json.loads(self.state_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != self.url or not self.part_file.exists():
+            return None
+        return state
+
+    def _save_state(self) -> None:
+        with self._lock:
+            self.state_file.write_text(json.dumps(self.state), encoding='utf-8')
+
+    def _discard(self) -> None:
+        self.state = None
+        self._hasher = hashlib.sha256()
+        self._hashed = 0
+        for file in (self.part_file, self.state_file):
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _start(self) -> "HttpResponse":
+        """Request the whole file to learn its size and ETag, and plan the ranges. Returns the response for the first range."""
+        response = self.client.get(self.url, {"Range": "bytes=0-"})
+        first_byte, size = get_content_range(response)
+        if first_byte != 0:
+            response.close()
+            raise DownloadChangedError(f"Server answered a download of {self.url} from byte {first_byte}")
+        supports_ranges = response.status == 206
+        self.state = {
+            "url": self.url,
+            "etag": response.headers.get("ETag") if supports_ranges else None,
+            "size": size,
+            "ranges": split_ranges(size, self.segments) if supports_ranges and size else [{"start": 0, "end": None if size is None else size - 1, "done": 0}],
+        }
+        with open(self.part_file, 'wb') as file:
+            if size:
+                file.truncate(size)  # Preallocated, so every range can write at its offset
+        self._save_state()
+        return response
+
+    def _fetch_range(self, byte_range: Dict[str, Any], response: Optional["HttpResponse"] = None) -> None:
+        """Download what is left of one byte range into the .part file, using response if it already starts there."""
+        offset = byte_range["start"] + byte_range["done"]
+        end = byte_range["end"]
+        if end is not None and offset > end:
+            return
+        if response is None:
+            headers = {"Range": f"bytes={offset}-{'' if end is None else end}"}
+            if self.state["etag"]:
+                headers["If-Range"] = self.state["etag"]
+            response = self.client.get(self.url, headers)
+            if get_content_range(response)[0] != offset or (offset > 0 and response.status != 206):
+                response.close()
+                raise DownloadChangedError(f"{self.url} changed on the server or no longer supports resuming")
+        buffer = memoryview(bytearray(self.chunk_size))
+        with response, open(self.part_file, 'r+b') as file:
+            file.seek(offset)
+            try:
+                while end is None or offset <= end:
+                    count = response.readinto(buffer if end is None else buffer[:min(self.chunk_size, end - offset + 1)])
+                    if not count:
+                        break
+                    chunk = buffer[:count]
+                    file.write(chunk)
+                    self._hash_in_order(offset, chunk)
+                    offset += count
+                    if offset - byte_range["start"] - byte_range["done"] >= PART_SAVE_INTERVAL:
+                        file.flush()  # Before recording, so the .part.json never claims bytes that aren't written
+                        byte_range["done"] = offset - byte_range["start"]
+                        self._save_state()
+                    self._log_progress(count)
+            finally:
+                file.flush()
+                byte_range["done"] = offset - byte_range["start"]
+        if end is not None and offset <= end:
+            raise http.client.IncompleteRead(b"", end - offset + 1)
+        if end is None and self.state["size"] is None:
+            self.state["size"] = offset
+
+    def _hash_in_order(self, offset: int, chunk: memoryview) -> None:
+        """Hash a chunk being written if it continues the bytes hashed so far."""
+        with self._lock:
+            if offset == self._hashed:
+                self._hasher.update(chunk)
+                self._hashed += len(chunk)
+
+    def _finish_hash(self) -> str:
+        """Hash what was written out of order from the .part file, returning the SHA-256 of the whole file."""
+        size = self.part_file.stat().st_size
+        if self._hashed < size:
+            logger.debug(f"Hashed {self._hashed} of {size} bytes of {self.path.name} while downloading, reading back the rest")
+        buffer = memoryview(bytearray(self.chunk_size))
+        with open(self.part_file, 'rb') as file:
+            file.seek(self._hashed)
+            while count := file.readinto(buffer):
+                self._hasher.update(buffer[:count])
+                self._hashed += count
+        return self._hasher.hexdigest()
+
+    def _log_progress(self, count: int) -> None:
+        """Count bytes read by any range, logging the progress at most every PROGRESS_LOG_INTERVAL seconds."""
+        now = time.monotonic()
+        with self._lock:
+            self._received += count
+            self._attempt_received += count
+            if now - self._logged_at < PROGRESS_LOG_INTERVAL:
+                return
+            self._logged_at = now
+            received = self._received
+            downloaded = self._attempt_start + self._attempt_received
+        rate = received / max(now - self._started_at, 1e-6) / 1024 ** 2
+        size = self.state["size"]
+        if size:
+            logger.info(f"Downloading {self.path.name}: {downloaded / size * 100:.1f}% ({downloaded / 1024 ** 2:.1f}/{size / 1024 ** 2:.1f} MB, {rate:.1f} MB/s)")
+        else:
+            logger.info(f"Downloading {self.path.name}: {downloaded / 1024 ** 2:.1f} MB ({rate:.1f} MB/s)")
+
+    def _fetch(self) -> None:
+        """Download every range that isn't complete, at once if there are several."""
+        first_response = None
+        if self.state is None:
+            self.state = self._load_state()
+            if self.state is not None:
+                logger.info(f"Resuming download of {self.path.name} from {self.downloaded} of {self.state['size']} bytes")
+            else:
+                first_response = self._start()
+        ranges = self.state["ranges"]
+        with self._lock:
+            self._attempt_start, self._attempt_received = self.downloaded, 0
+        try:
+            if len(ranges) == 1:
+                self._fetch_range(ranges[0], first_response)
+                return
+            with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="download") as executor:
+                futures = [executor.submit(self._fetch_range, byte_range, first_response if index == 0 else None) for index, byte_range in enumerate(ranges)]
+                for future in futures:
+                    future.result()
+        finally:
+            self._save_state()
+
+    def run(self, retries: int = DOWNLOAD_RETRIES, sha256: Optional[str] = None) -> Tuple[int, str]:
+        """
+        Download the file, resuming after dropped connections.
+
+        Args:
+            retries (int): Times a dropped download is resumed before giving up
+            sha256 (str, optional): Expected hex SHA-256 of the file
+
+        Returns:
+            tuple: Size and hex SHA-256 of the file
+
+        Raises:
+            HttpError: If the server answered with an error status
+            DigestMismatchError: If the file doesn't have the expected SHA-256. Nothing is kept of it
+            OSError | http.client.HTTPException: If the download still failed after the retries
+        """
+        for attempt in range(retries + 1):
+            try:
+                self._fetch()
+                break
+            except DownloadChangedError as e:
+                logger.warning(f"Restarting the download of {self.path.name}: {e}")
+                self._discard()
+                if attempt == retries:
+                    raise OSError(str(e)) from e
+            except HttpError:
+                raise
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == retries:
+                    raise
+                delay = RETRY_DELAY * 2 ** attempt
+                logger.warning(f"Download of {self.path.name} interrupted at {self.downloaded} bytes ({e!r}), resuming in {delay:.0f}s")
+                time.sleep(delay)
+        size = self.part_file.stat().st_size
+        digest = self._finish_hash()
+        if sha256 is not None and digest != sha256.lower():
+            self._discard()
+            raise DigestMismatchError(f"{self.path.name} is corrupt: its SHA-256 is {digest}, expected {sha256.lower()}")
+        os.replace(self.part_file, self.path)
+        self.state_file.unlink()
+        return size, digest
+
+
+def get_proxy(scheme: str, host: str) -> Optional[Tuple[str, int]]:
+    """Get the proxy host and port for a URL from the environment (HTTPS_PROXY, NO_PROXY, ...), None for a direct connection."""
+    proxy = getproxies().get(scheme)
+    if not proxy or host in ("localhost", "127.0.0.1", "::1") or proxy_bypass(host):
+        return None
+    parts = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    return parts.hostname, parts.port or 80
+
+
+class HttpResponse:
+    """A response being read. Closing it after reading all of it hands its connection back to the pool."""
+
+    def __init__(self, client: "HttpClient", key: Tuple[str, str, int], connection: http.client.HTTPConnection, response: http.client.HTTPResponse, url: str) -> None:
+        self.client = client
+        self.key = key
+        self.connection = connection
+        self.response = response
+        self.url = url
+        self.status = response.status
+        self.headers = response.headers
+
+    def read(self, size: Optional[int] = None) -> bytes:
+        """Read up to size bytes of the body, all of it by default."""
+        return self.response.read(size) if size is not None else self.response.read()
+
+    def readinto(self, buffer) -> int:
+        """Read the body into a buffer, returning the number of bytes read."""
+        return self.response.readinto(buffer)
+
+    def close(self) -> None:
+        """Release the connection: back to the pool if the body was read to the end, closed otherwise."""
+        if self.connection is None:
+            return
+        if self.response.isclosed() and not self.response.will_close:
+            self.client._release(self.key, self.connection)
+        else:
+            self.response.close()
+            self.connection.close()
+        self.connection = None
+
+    def __enter__(self) -> "HttpResponse":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class HttpClient:
+    """HTTP client with a pool of keep-alive connections and an on-disk cache of release metadata. Safe to share between threads."""
+
+    def __init__(self, cache_file: Optional[Union[str, Path]] = None, metadata_ttl: float = 0, timeout: float = TIMEOUT) -> None:
+        """
+        Args:
+            cache_file (str | Path, optional): JSON file caching metadata with its ETag. Defaults to .state/http_cache.json in the cwd
+            metadata_ttl (float): Seconds cached metadata is used without a request. 0 always asks, conditionally
+            timeout (float): Seconds to wait for a connection or data
+        """
+        self.cache_file = Path(cache_file) if cache_file is not None else STATE_DIR / "http_cache.json"
+        self.metadata_ttl = metadata_ttl
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self._cache: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _connect(self, key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        """Get an idle connection to a host, or open a new one. Returns it and whether it was reused."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+            self.connections_opened += 1
+        scheme, host, port = key
+        proxy = get_proxy(scheme, host)
+        if scheme == "https":
+            connection = http.client.HTTPSConnection(*(proxy or (host, port)), timeout=self.timeout, context=ssl.create_default_context())
+            if proxy:
+                connection.set_tunnel(host, port)
+        else:
+            connection = http.client.HTTPConnection(*(proxy or (host, port)), timeout=self.timeout)
+        return connection, False
+
+    def _release(self, key: Tuple[str, str, int], connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < MAX_IDLE_CONNECTIONS:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _send(self, url: str, headers: Dict[str, str]) -> HttpResponse:
+        """Send one GET request, retrying once on a fresh connection if a reused one was closed by the server."""
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+        if scheme == "http" and get_proxy(scheme, parts.hostname):
+            target = url  # Plain HTTP proxies take the full URL
+        while True:
+            connection, reused = self._connect(key)
+            try:
+                connection.request("GET", target, headers={"User-Agent": USER_AGENT, **headers})
+                return HttpResponse(self, key, connection, connection.getresponse(), url)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if not reused:
+                    raise
+                logger.debug(f"Kept-alive connection to {parts.hostname} was closed, reconnecting")
+            except BaseException:
+                connection.close()
+                raise
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+        """
+        Send a GET request, following redirects.
+
+        Args:
+            url (str): URL to get
+            headers (dict, optional): Extra request headers
+
+        Returns:
+            HttpResponse: The response, to be closed (or used as a context manager) once read. Its status is below 400
+
+        Raises:
+            HttpError: If the response has an error status
+            OSError | http.client.HTTPException: If the request failed
+        """
+        headers = dict(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self._send(url, headers)
+            location = response.headers.get("Location")
+            if response.status not in REDIRECT_STATUSES or not location:
+                break
+            response.read()  # Drained, so the connection can be reused
+            response.close()
+            next_url = urljoin(url, location)
+            if urlsplit(next_url).hostname != urlsplit(url).hostname:
+                headers.pop("Authorization", None)
+            url = next_url
+        else:
+            raise HttpError(url, response.status, f"More than {MAX_REDIRECTS} redirects")
+        if response.status >= 400:
+            reason = response.response.reason
+            response.read()
+            response.close()
+            raise HttpError(url, response.status, reason)
+        return response
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        if self._cache is None:
+            try:
+                self._cache = json.loads(self.cache_file.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                self._cache = {}
+        return self._cache
+
+    def _save_cache(self) -> None:
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_name(f"{self.cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            temp_file.write_text(json.dumps(self._cache), encoding='utf-8')
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Could not save the HTTP cache {self.cache_file}: {e}")
+
+    def get_json(self, url: str) -> Any:
+        """
+        Get JSON metadata, such as a GitHub release, from the cache when it is fresh or unchanged.
+
+        Within the metadata TTL the cached JSON is returned without a request. Otherwise the request
+        carries the cached ETag and Last-Modified, and a 304 Not Modified returns the cached JSON.
+
+        Args:
+            url (str): URL of the JSON
+
+        Returns:
+            Any: The decoded JSON
+
+        Raises:
+            HttpError: If the response has an error status
+            ValueError: If the response isn't JSON
+            OSError | http.client.HTTPException: If the request failed
+        """
+        with self._lock:
+            entry = self._load_cache().get(url)
+        if entry is not None and self.metadata_ttl and time.time() - entry["fetched_at"] < self.metadata_ttl:
+            logger.debug(f"Using cached {url}, fetched {time.time() - entry['fetched_at']:.0f}s ago")
+            return entry["body"]
+
+        headers = {"Accept": "application/vnd.github+json"}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        with self.get(url, headers) as response:
+            body = response.read()
+            if response.status == 304 and entry is not None:
+                logger.debug(f"{url} not modified since it was cached")
+                entry = dict(entry, fetched_at=time.time())
+            else:
+                entry = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                    "body": json.loads(body.decode()),
+                }
+        with self._lock:
+            self._load_cache()[url] = entry
+            self._save_cache()
+        return entry["body"]
+
+    def download(self, url: str, path: Union[str, Path], segments: int = 1, retries: int = DOWNLOAD_RETRIES, sha256: Optional[str] = None, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> Tuple[int, str]:
+        """
+        Download a file, resuming after dropped connections, including from an earlier run.
+
+        The file is written to path + '.part' and only moved to path once complete and, if an
+        expected SHA-256 is given, verified. If the server supports ranges, a file of at least
+        MIN_SEGMENT_SIZE bytes per segment is downloaded as up to segments byte ranges at once.
+
+        Args:
+            url (str): URL of the file
+            path (str | Path): Where to save the file
+            segments (int): Byte ranges to download at once. Defaults to one
+            retries (int): Times a dropped download is resumed before giving up
+            sha256 (str, optional): Expected hex SHA-256 of the file, checked before it is moved to path
+            chunk_size (int): Bytes read at once. Memory use is one buffer of this size per segment
+
+        Returns:
+            tuple: Size and hex SHA-256 of the file
+
+        Raises:
+            HttpError: If the server answered with an error status
+            DigestMismatchError: If the file doesn't have the expected SHA-256. Nothing is kept of it
+            OSError | http.client.HTTPException: If the download failed. The .part file is kept to resume from
+        """
+        return Download(self, url, Path(path), segments, chunk_size).run(retries, sha256)
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
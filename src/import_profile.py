@@ -0,0 +1,116 @@
+import sys
+import copy
+import time
+from importlib.abc import MetaPathFinder
+from typing import Dict, List, Optional, Tuple
+
+"""
+Import time profile for diagnosing slow startup.
+
+Enabled with --profile-startup (or PROFILE_STARTUP=True in the environment) before anything else
+is imported, since options are only parsed after the imports they would profile. Times every
+module loaded from then on, including the stage modules loaded lazily later in the run.
+
+Only depends on the standard library so that enabling it does not import anything itself.
+"""
+
+
+class TimedLoader:
+    """Proxy of a module's loader that times its exec_module, leaving the real loader untouched."""
+
+    def __init__(self, loader, fullname: str, profiler: "ImportProfiler") -> None:
+        """
+        Args:
+            loader: The real loader of the module
+            fullname (str): Module name
+            profiler (ImportProfiler): Profiler recording the time
+        """
+        self.loader = loader
+        self.fullname = fullname
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        self.profiler.time_exec_module(self.loader, self.fullname, module)
+
+    def __getattr__(self, name):
+        # Everything else (get_resource_reader, is_package, get_code, ...) is the real loader's
+        return getattr(self.loader, name)
+
+
+class ImportProfiler(MetaPathFinder):
+    """Meta path finder that times the loading of every module it sees, without loading anything itself."""
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        # Module name -> (seconds including nested imports, seconds excluding them)
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self._stack: List[List[float]] = []
+        self._finding = set()
+
+    def install(self) -> None:
+        """Start timing imports."""
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        """Stop timing imports."""
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self._finding:
+            return None
+        self._finding.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(fullname)
+
+        if spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        # A copy with a proxy loader, since the real loader may be shared with other modules, or be a class
+        # (BuiltinImporter, FrozenImporter) that would stay patched after uninstalling
+        timed_spec = copy.copy(spec)
+        timed_spec.loader = TimedLoader(spec.loader, fullname, self)
+        return timed_spec
+
+    def time_exec_module(self, loader, fullname: str, module) -> None:
+        """Execute a module with its real loader, recording how long it took with and without its nested imports."""
+        # Nested imports add their time to the frame below, which is subtracted for the self time
+        self._stack.append([0.0])
+        start_time = time.perf_counter()
+        try:
+            loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            nested = self._stack.pop()[0]
+            self.timings[fullname] = (elapsed, elapsed - nested)
+            if self._stack:
+                self._stack[-1][0] += elapsed
+
+    def report(self, limit: int = 20, elapsed: Optional[float] = None) -> str:
+        """
+        Format the slowest imports.
+
+        Args:
+            limit (int): Number of modules to list
+            elapsed (float, optional): Seconds to report as the total. Defaults to the time since the profiler was created
+
+        Returns:
+            str: Multi-line report
+        """
+        elapsed = elapsed if elapsed is not None else time.perf_counter() - self.started_at
+        lines = [f"{len(self.timings)} modules imported in the {elapsed * 1000:.0f} ms since startup. Slowest imports (including nested / self):"]
+        for name, (total, own) in sorted(self.timings.items(), key=lambda item: item[1][0], reverse=True)[:limit]:
+            lines.append(f"  {total * 1000:8.1f} ms {own * 1000:8.1f} ms  {name}")
+        return "\n".join(lines)
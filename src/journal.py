@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple, Union
+from loguru import logger
+
+from run_state import STATE_DIR
+
+"""
+Checkpoint journal for resuming interrupted runs.
+
+Stages record each completed unit of work (e.g. one extracted pak) as a line in an append-only
+JSON lines file, flushed to disk immediately. With RESUME enabled, a stage skips the units a
+previous run already completed, as long as the stage's inputs are unchanged. Without RESUME,
+a stage starts by discarding its old units.
+"""
+
+
+def hash_fingerprint(fingerprint: dict) -> str:
+    """Get a short stable hash of a stage fingerprint."""
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()[:16]
+
+
+class JournalScope:
+    """The journal entries of one stage writing to one target with one set of inputs."""
+
+    def __init__(self, journal: "Journal", stage: str, target: str, fingerprint_hash: str) -> None:
+        self.journal = journal
+        self.stage = stage
+        self.target = target
+        self.fingerprint_hash = fingerprint_hash
+
+    def is_done(self, unit: str) -> bool:
+        """Check whether a unit was completed by this or an interrupted run."""
+        return self.journal._is_done(self.stage, self.target, self.fingerprint_hash, unit)
+
+    def mark_done(self, unit: str) -> None:
+        """Durably record that a unit completed."""
+        self.journal._mark_done(self.stage, self.target, self.fingerprint_hash, unit)
+
+    def has_progress(self) -> bool:
+        """Whether any unit was completed by an interrupted run."""
+        return self.journal._has_units(self.stage, self.target, self.fingerprint_hash)
+
+    def clear(self) -> None:
+        """Forget the completed units once the whole stage has succeeded."""
+        self.journal._reset(self.stage, self.target, self.fingerprint_hash)
+
+
+class Journal:
+    """
+    Append-only journal of completed units of work.
+
+    Safe to share between stages running at the same time.
+    """
+
+    def __init__(self, journal_file: Optional[Union[str, Path]] = None, resume: bool = False) -> None:
+        """
+        Args:
+            journal_file (str or Path, optional): JSON lines file to append to. Defaults to .state/journal.jsonl in the cwd.
+            resume (bool): Whether stages may skip units completed by a previous run
+        """
+        self.journal_file = Path(journal_file) if journal_file is not None else STATE_DIR / "journal.jsonl"
+        self.resume = resume
+        self._lock = threading.Lock()
+        self._file = None
+        # (stage, target) -> (fingerprint hash, completed units)
+        self._done: Dict[Tuple[str, str], Tuple[str, Set[str]]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Replay the journal file, then compact it to only the live entries."""
+        if not self.journal_file.exists():
+            return
+        with open(self.journal_file, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write can leave a partial last line
+                    logger.debug(f"Ignoring malformed journal line: {line.strip()}")
+                    continue
+                key = (entry["stage"], entry["target"])
+                if entry["event"] == "reset":
+                    self._done[key] = (entry["fingerprint"], set())
+                elif entry["event"] == "done":
+                    fingerprint_hash, units = self._done.get(key, (entry["fingerprint"], set()))
+                    if fingerprint_hash == entry["fingerprint"]:
+                        units.add(entry["unit"])
+                        self._done[key] = (fingerprint_hash, units)
+        self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the journal file with only the entries that are still relevant."""
+        self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.journal_file.with_name(self.journal_file.name + ".tmp")
+        with open(temp_file, "w") as f:
+            for (stage, target), (fingerprint_hash, units) in self._done.items():
+                f.write(json.dumps({"event": "reset", "stage": stage, "target": target, "fingerprint": fingerprint_hash}) + "\n")
+                for unit in sorted(units):
+                    f.write(json.dumps({"event": "done", "stage": stage, "target": target, "fingerprint": fingerprint_hash, "unit": unit}) + "\n")
+        os.replace(temp_file, self.journal_file)
+
+    def _append(self, entry: dict) -> None:
+        """Append an entry and force it to disk so it survives a crash."""
+        entry["at"] = time.time()
+        with self._lock:
+            if self._file is None:
+                self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.journal_file, "a")
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def scope(self, stage: str, target: Union[str, Path], fingerprint: dict) -> JournalScope:
+        """
+        Get the journal entries for a stage that is about to run.
+
+        Completed units are kept only when resuming and the stage's inputs are unchanged,
+        otherwise the stage starts over.
+
+        Args:
+            stage (str): Stage name
+            target (str or Path): Primary output of the stage
+            fingerprint (dict): Fingerprint of the stage's inputs
+
+        Returns:
+            JournalScope: Entries to check and record units with
+        """
+        target = Path(target).as_posix()
+        fingerprint_hash = hash_fingerprint(fingerprint)
+        key = (stage, target)
+        with self._lock:
+            previous_hash, units = self._done.get(key, (None, set()))
+            keep = self.resume and previous_hash == fingerprint_hash and units
+
+        if keep:
+            logger.info(f"Resuming {stage}: {len(units)} unit(s) completed by a previous run ({', '.join(sorted(units))})")
+        else:
+            if self.resume and units:
+                logger.info(f"Not resuming {stage}: inputs changed since the interrupted run")
+            self._reset(stage, target, fingerprint_hash)
+        return JournalScope(self, stage, target, fingerprint_hash)
+
+    def _reset(self, stage: str, target: str, fingerprint_hash: str) -> None:
+        with self._lock:
+            self._done[(stage, target)] = (fingerprint_hash, set())
+        self._append({"event": "reset", "stage": stage, "target": target, "fingerprint": fingerprint_hash})
+
+    def _has_units(self, stage: str, target: str, fingerprint_hash: str) -> bool:
+        with self._lock:
+            recorded_hash, units = self._done.get((stage, target), (None, set()))
+            return recorded_hash == fingerprint_hash and bool(units)
+
+    def _is_done(self, stage: str, target: str, fingerprint_hash: str, unit: str) -> bool:
+        with self._lock:
+            recorded_hash, units = self._done.get((stage, target), (None, set()))
+            return recorded_hash == fingerprint_hash and unit in units
+
+    def _mark_done(self, stage: str, target: str, fingerprint_hash: str, unit: str) -> None:
+        with self._lock:
+            recorded_hash, units = self._done.setdefault((stage, target), (fingerprint_hash, set()))
+            if recorded_hash == fingerprint_hash:
+                units.add(unit)
+        self._append({"event": "done", "stage": stage, "target": target, "fingerprint": fingerprint_hash, "unit": unit})
+        logger.debug(f"Journaled {stage} unit {unit}")
+
+    def has_progress(self) -> bool:
+        """Whether any stage has completed units that a resumed run could skip."""
+        with self._lock:
+            return any(units for _, units in self._done.values())
+
+    def close(self) -> None:
+        """Flush and close the journal file. Later entries reopen it."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
@@ -6,6 +6,10 @@ from typing import Optional
 from loguru import logger
 from optionsconfig import Options
 from utils import run_process, kill_process_tree, ensure_parent_dir
+from run_state import RunState, read_text_file
+from journal import Journal
+from history import load_baseline
+from planner import get_timeout
 
 """
 Mapper extraction process via UE4SS.
@@ -15,7 +19,7 @@ Process:
 * Copy src/mapper/ue4ss_mod/AutoUSMAP/ to gamedir/DungeonCrawler/Binaries/Win64/Mods/AutoUSMAP
 * Copy src/mapper/ue4ss_mod/mods.txt to gamedir/DungeonCrawler/Binaries/Win64/Mods/mods.txt, overwriting if exists.
 * Run gamedir/Tavern.exe with args  -server=localhost -steam=1 -taverntype=steam -tavernapp=dad to launch the game locally. UE4SS hooks into the game process.
-* Wait for Mappings file to exist. Timeout after 120s. 
+* Wait for Mappings file to exist. Timeout after 3x the usual wait of earlier runs, at least 120s. 
 * Shutdown the game process
 * Copy generated .usmap from gamedir/DungeonCrawler/Binaries/Win64/Mappings.json to OUTPUT_MAPPER_FILE, renaming it.
 """
@@ -61,12 +65,86 @@ def setup_ue4ss(steam_game_dir: str) -> None:
     logger.info(f"Copying mods.txt to {mods_dest}")
     shutil.copy2(mods_txt_src, mods_dest)
 
-def main(options: Optional[Options] = None) -> bool:
+def generate_mappings(game_dir: str, mappings_file: Path) -> None:
+    """Launch the game with UE4SS hooked, wait for it to write the mappings file, then shut it down."""
+    # Run the game with required arguments
+    tavern_exe = Path(game_dir) / "Tavern.exe"
+    if not tavern_exe.exists():
+        raise FileNotFoundError(f"Tavern.exe not found at {tavern_exe}")
+
+    logger.info("Starting game process...")
+    game_process = run_process(
+        options=[
+            str(tavern_exe),
+            "-server=localhost",
+            "-steam=1",
+            "-taverntype=steam",
+            "-tavernapp=dad"
+        ],
+        name="DarkAndDarker",
+        background=True
+    )
+    logger.info(f"Waiting for game to launch, UE4SS to hook, and mappings file to be generated at {mappings_file}...")
+
+    # Wait for mappings file with timeout
+    # Slower machines take longer to launch the game, so the wait follows the stage's history
+    timeout = get_timeout(load_baseline("get_mapper"), default=120, minimum=120)
+    start_time = time.time()
+    while not mappings_file.exists():
+        time_waited = time.time() - start_time
+        if time_waited > timeout:
+            kill_process_tree(game_process.pid)
+            raise TimeoutError(f"Timed out waiting for mappings file after {timeout} seconds")
+        time.sleep(5)
+        logger.info(f"Waiting for mappings file to be generated. Time waited: {time_waited:.2f} seconds / {timeout} seconds")
+
+    logger.info("Mappings file located. Waiting for file to be released...")
+    write_timeout = 30  # 30 seconds timeout for write access
+    write_start_time = time.time()
+    while not os.access(mappings_file, os.W_OK):
+        time_waited = time.time() - write_start_time
+        if time_waited > write_timeout:
+            kill_process_tree(game_process.pid)
+            raise TimeoutError(f"Timed out waiting for mappings file to be released after {write_timeout} seconds")
+        time.sleep(3)
+        logger.info(f"File is still locked. Time waited: {time_waited:.2f} seconds / {write_timeout} seconds")
+
+    logger.info("Mappings file generated successfully and ready for processing")
+
+    # Kill the game process
+    logger.info("Shutting down game process...")
+    kill_process_tree(game_process.pid)
+
+def get_fingerprint(options: Options, run_state: RunState) -> dict:
+    """
+    Fingerprint the mapper inputs: the game manifest and executables, the UE4SS version, and the AutoUSMAP mod.
+    """
+    src_dir = Path(__file__).parent
+    bin_dir = Path(options.steam_game_download_dir) / "DungeonCrawler" / "Binaries" / "Win64"
+    executables = {}
+    if bin_dir.exists():
+        for exe_file in sorted(bin_dir.glob("*.exe")):
+            stat = exe_file.stat()
+            executables[exe_file.name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    mod_files = {}
+    for mod_file in sorted((src_dir / "ue4ss_mod").rglob("*")):
+        if mod_file.is_file():
+            mod_files[mod_file.relative_to(src_dir).as_posix()] = run_state.hash_file(mod_file)
+    return {
+        "manifest_id": read_text_file(Path(options.steam_game_download_dir) / "manifest.txt"),
+        "game_executables": executables,
+        "ue4ss_version": read_text_file(src_dir / "ue4ss" / "version.txt"),
+        "ue4ss_mod": mod_files,
+    }
+
+def main(options: Optional[Options] = None, run_state: Optional[RunState] = None, journal: Optional[Journal] = None) -> bool:
     """
     Main function to run the mapper extraction process.
     
     Args:
         options (Options): Configuration options
+        run_state (RunState, optional): Run state used to skip the stage when its inputs are unchanged
+        journal (Journal, optional): Journal used to resume an interrupted extraction
         
     Returns:
         bool: True if successful, False otherwise
@@ -76,6 +154,11 @@ def main(options: Optional[Options] = None) -> bool:
     
     if not options.output_mapper_file:
         raise ValueError("OUTPUT_MAPPER_FILE must be set")
+    
+    if run_state is None:
+        run_state = RunState()
+    if journal is None:
+        journal = Journal()
 
     try:
         logger.info("Running mapper extraction process...")
@@ -85,63 +168,29 @@ def main(options: Optional[Options] = None) -> bool:
         bin_dir = Path(game_dir) / "DungeonCrawler" / "Binaries" / "Win64"
         mappings_file = bin_dir / "Mappings.usmap"
         
-        # Skip if output exists and force is False
-        if os.path.exists(options.output_mapper_file) and not options.force_get_mapper:
-            logger.info(f"Mapper file already exists at {options.output_mapper_file} and FORCE_GET_MAPPER is False. Skipping mapper extraction.")
+        # Skip if the game and UE4SS are unchanged since the last successful extraction
+        fingerprint = get_fingerprint(options, run_state)
+        if not run_state.should_run("get_mapper", options.output_mapper_file, fingerprint, outputs=[options.output_mapper_file], force=options.force_get_mapper):
             return True
+        run_state.begin("get_mapper", options.output_mapper_file)
+        journal_scope = journal.scope("get_mapper", options.output_mapper_file, fingerprint)
         
         # Ensure parent directory exists
         ensure_parent_dir(options.output_mapper_file)
         
         # Setup UE4SS and mods
-        setup_ue4ss(game_dir)
-        
-        # Run the game with required arguments
-        tavern_exe = Path(game_dir) / "Tavern.exe"
-        if not tavern_exe.exists():
-            raise FileNotFoundError(f"Tavern.exe not found at {tavern_exe}")
-        
-        logger.info("Starting game process...")
-        game_process = run_process(
-            options=[
-                str(tavern_exe),
-                "-server=localhost",
-                "-steam=1",
-                "-taverntype=steam",
-                "-tavernapp=dad"
-            ],
-            name="DarkAndDarker",
-            background=True
-        )
-        logger.info(f"Waiting for game to launch, UE4SS to hook, and mappings file to be generated at {mappings_file}...")
-        
-        # Wait for mappings file with timeout
-        timeout = 120  # 2 minutes
-        start_time = time.time()
-        while not mappings_file.exists():
-            time_waited = time.time() - start_time
-            if time_waited > timeout:
-                kill_process_tree(game_process.pid)
-                raise TimeoutError(f"Timed out waiting for mappings file after {timeout} seconds")
-            time.sleep(5)
-            logger.info(f"Waiting for mappings file to be generated. Time waited: {time_waited:.2f} seconds / {timeout} seconds")
-
-        logger.info("Mappings file located. Waiting for file to be released...")
-        write_timeout = 30  # 30 seconds timeout for write access
-        write_start_time = time.time()
-        while not os.access(mappings_file, os.W_OK):
-            time_waited = time.time() - write_start_time
-            if time_waited > write_timeout:
-                kill_process_tree(game_process.pid)
-                raise TimeoutError(f"Timed out waiting for mappings file to be released after {write_timeout} seconds")
-            time.sleep(3)
-            logger.info(f"File is still locked. Time waited: {time_waited:.2f} seconds / {write_timeout} seconds")
-        
-        logger.info("Mappings file generated successfully and ready for processing")
+        if journal_scope.is_done("setup_ue4ss"):
+            logger.info("Skipping UE4SS setup, already copied by the interrupted run")
+        else:
+            setup_ue4ss(game_dir)
+            journal_scope.mark_done("setup_ue4ss")
         
-        # Kill the game process
-        logger.info("Shutting down game process...")
-        kill_process_tree(game_process.pid)
+        # Launch the game to generate the mappings file, unless the interrupted run already did
+        if journal_scope.is_done("generate_mappings") and mappings_file.exists():
+            logger.info(f"Using mappings file at {mappings_file} generated by the interrupted run")
+        else:
+            generate_mappings(game_dir, mappings_file)
+            journal_scope.mark_done("generate_mappings")
         
         # Copy the mappings file to output location
         logger.info(f"Copying mappings file to {options.output_mapper_file}")
@@ -151,6 +200,8 @@ def main(options: Optional[Options] = None) -> bool:
         logger.info(f"Removing temporary mappings file at {mappings_file}")
         os.remove(mappings_file)
         
+        run_state.record("get_mapper", options.output_mapper_file, fingerprint)
+        journal_scope.clear()
         logger.success("Mapper extraction completed successfully!")
         return True
         
@@ -0,0 +1,201 @@
+import io
+import re
+import gzip
+import time
+from collections import deque
+from pathlib import Path
+from typing import List, Optional, Union
+from loguru import logger
+
+from progress import ProgressTracker, get_parser
+
+"""
+Sink for the output of the processes started through run_process.
+
+UnrealPak -Extract and BatchExport print a line per file, hundreds of thousands in a run. Logging
+each one through loguru costs more than the tools take to print them, so the pipe fills up and the
+tool waits on the logger. Instead, the raw output is spooled to a gzip file per process in large
+writes, and only a rate-limited sample of lines goes to the log, plus every line that looks like an
+error. The last lines are kept in memory and logged when the process fails. Tools with a progress
+parser also get their progress followed from every line (see progress).
+"""
+
+LOG_LINES_PER_SECOND = 50  # Lines per process forwarded to the log per second, on average
+MAX_ERROR_LINES = 200  # Error lines per process forwarded to the log regardless of the rate limit
+TAIL_LINES = 50  # Last lines kept to log when the process fails
+SKIPPED_NOTICE_INTERVAL = 10.0  # Seconds between notices of how many lines were not logged
+SPOOL_BUFFER_SIZE = 1024 * 1024  # Bytes buffered before a compressed write to the spool file
+ERROR_WORDS = (b'error', b'exception', b'fatal', b'failed')  # Lines containing one of these (in any case) are always logged
+
+_spool_dir: Optional[Path] = None
+_lines_per_second: float = LOG_LINES_PER_SECOND
+
+
+def configure(spool_dir: Optional[Union[str, Path]] = None, lines_per_second: float = LOG_LINES_PER_SECOND) -> None:
+    """
+    Configure the sinks created for processes from now on.
+
+    Args:
+        spool_dir (str | Path, optional): Directory the full output of every process is spooled to. Defaults to not spooling
+        lines_per_second (float): Lines per process forwarded to the log per second. 0 forwards every line
+    """
+    global _spool_dir, _lines_per_second
+    _spool_dir = Path(spool_dir) if spool_dir is not None else None
+    _lines_per_second = lines_per_second
+
+
+def create_sink(name: str, pid: int, expected_total: Optional[int] = None) -> "OutputSink":
+    """
+    Create the sink for a started process.
+
+    Args:
+        name (str): Process name, which also picks the progress parser
+        pid (int): Process id
+        expected_total (int, optional): Units of work expected, for the ETA of tools that don't report a total
+
+    Returns:
+        OutputSink: Sink spooling to <spool dir>/<name>-<pid>.log.gz if configured
+    """
+    spool_file = None
+    if _spool_dir is not None:
+        safe_name = re.sub(r'[^\w.-]+', '_', name) or 'process'
+        spool_file = _spool_dir / f"{safe_name}-{pid}.log.gz"
+    parser = get_parser(name)
+    progress = ProgressTracker(name, parser, expected_total) if parser is not None else None
+    return OutputSink(name, spool_file, _lines_per_second, progress=progress)
+
+
+def is_error_line(line: bytes) -> bool:
+    """Check whether output contains one of the ERROR_WORDS."""
+    lowered = line.lower()
+    return any(word in lowered for word in ERROR_WORDS)
+
+
+def decode_line(line: bytes) -> str:
+    """Decode a line of output for the log."""
+    return line.decode('utf-8', errors='replace').strip()
+
+
+class OutputSink:
+    """Takes a process's output in chunks, spools it, and forwards a sample of it to the log."""
+
+    def __init__(self, name: str, spool_file: Optional[Union[str, Path]] = None, lines_per_second: float = LOG_LINES_PER_SECOND, tail_lines: int = TAIL_LINES, progress: Optional[ProgressTracker] = None) -> None:
+        """
+        Args:
+            name (str): Process name used in logs
+            spool_file (str | Path, optional): Gzip file to write the full output to. Defaults to not spooling
+            lines_per_second (float): Lines forwarded to the log per second. 0 forwards every line
+            tail_lines (int): Last lines kept to log on failure, at least 1
+            progress (ProgressTracker, optional): Tracker fed every line of output
+        """
+        self.name = name
+        self.progress = progress
+        self.spool_file = Path(spool_file) if spool_file is not None else None
+        self.lines_per_second = lines_per_second
+        self.tail = deque(maxlen=tail_lines)
+        self.line_count = 0
+        self.byte_count = 0
+        self.skipped = 0
+        self.error_lines = 0
+        # Token bucket holding the lines that may be logged right now, refilled at lines_per_second
+        self._tokens = float(lines_per_second)
+        self._refilled_at = time.monotonic()
+        self._notified_at = self._refilled_at
+        self.last_output_at = self._refilled_at  # For the idle watchdog, see process_runner
+        self._pending = b''
+        self._spool = None
+        if self.spool_file is not None:
+            self.spool_file.parent.mkdir(parents=True, exist_ok=True)
+            self._spool = io.BufferedWriter(gzip.GzipFile(self.spool_file, 'wb', compresslevel=1), buffer_size=SPOOL_BUFFER_SIZE)
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Take the next chunk of output.
+
+        Args:
+            chunk (bytes): Raw output, not necessarily ending at a line break
+        """
+        self.last_output_at = time.monotonic()
+        if self._spool is not None:
+            self._spool.write(chunk)
+        self.byte_count += len(chunk)
+        lines = (self._pending + chunk).split(b'\n')
+        self._pending = lines.pop()  # Incomplete last line, completed by the next chunk
+        if lines:
+            self._take_lines(lines)
+
+    def _take_lines(self, lines: List[bytes]) -> None:
+        self.line_count += len(lines)
+        self.tail.extend(lines[-self.tail.maxlen:])
+        joined = b'\n'.join(lines)
+        if self.progress is not None:
+            self.progress.feed(joined)
+
+        if not self.lines_per_second:
+            for line in lines:
+                self._log(line)
+            return
+
+        # Plain substring searches over the whole chunk are far cheaper than a regex or a check per line
+        errors = set()
+        if self.error_lines < MAX_ERROR_LINES and is_error_line(joined):
+            errors = {index for index, line in enumerate(lines) if is_error_line(line)}
+            errors = set(sorted(errors)[:MAX_ERROR_LINES - self.error_lines])
+            self.error_lines += len(errors)
+
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._refilled_at) * self.lines_per_second, self.lines_per_second)
+        self._refilled_at = now
+        allowed = int(self._tokens)
+        if allowed >= len(lines):
+            sampled = range(len(lines))
+        elif allowed > 0:
+            # Spread the sample over the chunk rather than only logging its start
+            step = len(lines) / allowed
+            sampled = [int(index * step) for index in range(allowed)]
+        else:
+            sampled = []
+        self._tokens -= len(sampled)
+
+        for index in sorted(errors.union(sampled)):
+            self._log(lines[index], error=index in errors)
+        self.skipped += len(lines) - len(errors.union(sampled))
+        if self.skipped and now - self._notified_at >= SKIPPED_NOTICE_INTERVAL:
+            self._notify_skipped(now)
+
+    def _log(self, line: bytes, error: bool = False) -> None:
+        text = decode_line(line)
+        if not text:
+            return
+        if error:
+            logger.warning(f'[process: {self.name}] {text}')
+        else:
+            logger.debug(f'[process: {self.name}] {text}')
+
+    def _notify_skipped(self, now: float) -> None:
+        where = f", full output in {self.spool_file}" if self.spool_file is not None else ""
+        logger.debug(f'[process: {self.name}] ({self.skipped} lines not logged{where})')
+        self.skipped = 0
+        self._notified_at = now
+
+    def close(self) -> None:
+        """Take the last line if it had no line break, and finish the spool file."""
+        if self._pending:
+            pending, self._pending = self._pending, b''
+            self._take_lines([pending])
+        if self.skipped:
+            self._notify_skipped(time.monotonic())
+        if self.progress is not None:
+            self.progress.finish()
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def log_tail(self) -> None:
+        """Log the last lines of output, e.g. after the process failed."""
+        lines = [decode_line(line) for line in self.tail.copy()]  # Copied at once, the loop thread may still append
+        lines = [line for line in lines if line]
+        if not lines:
+            return
+        where = f" (full output in {self.spool_file})" if self.spool_file is not None else ""
+        logger.error(f"Last {len(lines)} lines of {self.name} output{where}:\n" + "\n".join(lines))
@@ -0,0 +1,221 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+
+from telemetry import Telemetry
+from supervisor import get_supervisor
+
+"""
+Stage graph executor.
+
+Each stage declares the artifacts it consumes (inputs) and the artifacts it produces (outputs).
+A stage starts as soon as every enabled stage producing one of its inputs has succeeded, so
+independent stages run at the same time. A failed stage only stops the stages downstream of it.
+
+Inputs produced by a disabled stage (or by no stage at all) are expected to already exist,
+e.g. a mapper file provided by the user with SHOULD_GET_MAPPER=False.
+
+Stages can share a lane to limit how many of them run at once (e.g. one repack at a time while
+several versions are backfilled), and can have an admission check that must pass before they
+start (e.g. enough free disk space for another version).
+
+Each stage runs in a process group of its own (see supervisor), so when a stage fails the tool
+processes it leaves behind are stopped, while independent stages carry on.
+"""
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+STATUS_DISABLED = "disabled"
+
+WAIT_SLICE = 1.0  # Seconds the executor waits for a stage at once, so Ctrl+C still interrupts it on Windows
+
+
+class Stage:
+    """A single unit of pipeline work and the artifacts it consumes and produces."""
+
+    def __init__(self, name: str, func: Callable[[], bool], inputs: Optional[List[str]] = None, outputs: Optional[List[str]] = None, enabled: bool = True, lane: Optional[str] = None, admit: Optional[Callable[[Dict[str, str]], bool]] = None) -> None:
+        """
+        Args:
+            name (str): Unique stage name used in logs and results
+            func (Callable): Runs the stage. Returns True on success, False or raises on failure
+            inputs (list[str], optional): Artifacts this stage needs before it can start
+            outputs (list[str], optional): Artifacts this stage produces
+            enabled (bool): Whether the stage should run. Disabled stages never block their consumers
+            lane (str, optional): Stages in the same lane run one at a time (or up to the pipeline's lane limit)
+            admit (Callable, optional): Called with the current results once the stage is otherwise ready. The stage waits while it returns False
+        """
+        self.name = name
+        self.func = func
+        self.inputs = inputs or []
+        self.outputs = outputs or []
+        self.enabled = enabled
+        self.lane = lane
+        self.admit = admit
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name})"
+
+
+class Pipeline:
+    """
+    Runs a graph of stages, starting each stage as soon as its upstream stages succeed.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None, telemetry: Optional[Telemetry] = None, lane_limits: Optional[Dict[str, int]] = None) -> None:
+        """
+        Args:
+            stages (list[Stage]): Stages to run. When stages compete for a lane, earlier stages start first
+            max_workers (int, optional): Maximum stages running at once. Defaults to the number of stages
+            telemetry (Telemetry, optional): Records the time and resources used by each stage
+            lane_limits (dict, optional): Maximum stages running at once per lane. Lanes not listed run one stage at a time
+        """
+        self.stages = stages
+        self.max_workers = max_workers or max(len(stages), 1)
+        self.telemetry = telemetry
+        self.lane_limits = lane_limits or {}
+        self.results: Dict[str, str] = {stage.name: STATUS_PENDING for stage in stages}
+        self._producers = self._map_producers()
+        self._order = self._topological_order()
+
+    def _map_producers(self) -> Dict[str, Stage]:
+        """Map each artifact to the stage that produces it."""
+        producers = {}
+        names = set()
+        for stage in self.stages:
+            if stage.name in names:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            names.add(stage.name)
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"Artifact {output} is produced by both {producers[output].name} and {stage.name}")
+                producers[output] = stage
+        return producers
+
+    def _upstream(self, stage: Stage) -> List[Stage]:
+        """Get the enabled stages that produce the inputs of a stage."""
+        upstream = []
+        for artifact in stage.inputs:
+            producer = self._producers.get(artifact)
+            if producer is not None and producer.enabled and producer not in upstream:
+                upstream.append(producer)
+        return upstream
+
+    def _topological_order(self) -> List[Stage]:
+        """Order stages so that every stage comes after its producers, raising on cycles."""
+        order = []
+        visiting = set()
+        visited = set()
+
+        def visit(stage: Stage) -> None:
+            if stage.name in visited:
+                return
+            if stage.name in visiting:
+                raise ValueError(f"Stage graph has a cycle through {stage.name}")
+            visiting.add(stage.name)
+            for artifact in stage.inputs:
+                producer = self._producers.get(artifact)
+                if producer is not None:
+                    visit(producer)
+            visiting.remove(stage.name)
+            visited.add(stage.name)
+            order.append(stage)
+
+        for stage in self.stages:
+            visit(stage)
+        return order
+
+    def _lane_is_full(self, stage: Stage, running: List[Stage]) -> bool:
+        """Check whether the stage's lane already runs as many stages as it may."""
+        if stage.lane is None:
+            return False
+        in_lane = sum(1 for other in running if other.lane == stage.lane)
+        return in_lane >= self.lane_limits.get(stage.lane, 1)
+
+    def _run_stage(self, stage: Stage) -> bool:
+        """Run a stage, converting exceptions into a failed result and cancelling the processes a failed stage left running."""
+        supervisor = get_supervisor()
+        try:
+            with self.telemetry.stage(stage.name) if self.telemetry is not None else nullcontext(), supervisor.group(stage.name) as group:
+                if stage.func():
+                    return True
+                supervisor.cancel(group, reason=f"stage {stage.name} failed")
+                return False
+        except Exception as e:
+            logger.error(f"Stage {stage.name} raised: {e}")
+            return False
+
+    def run(self) -> bool:
+        """
+        Run all enabled stages.
+
+        Returns:
+            bool: True if every enabled stage succeeded, False otherwise
+        """
+        pending = []
+        for stage in self._order:
+            if stage.enabled:
+                pending.append(stage)
+            else:
+                self.results[stage.name] = STATUS_DISABLED
+                logger.info(f"Stage {stage.name} is disabled, skipping")
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+        running = {}
+        try:
+            while pending or running:
+                # Start or skip every pending stage whose upstream stages have finished
+                not_admitted = []
+                for stage in list(pending):
+                    upstream_results = [self.results[u.name] for u in self._upstream(stage)]
+                    blocked_by = [u.name for u in self._upstream(stage) if self.results[u.name] in (STATUS_FAILED, STATUS_SKIPPED)]
+                    if blocked_by:
+                        pending.remove(stage)
+                        self.results[stage.name] = STATUS_SKIPPED
+                        logger.error(f"Skipping stage {stage.name} because upstream stage(s) did not succeed: {', '.join(blocked_by)}")
+                    elif all(result == STATUS_SUCCESS for result in upstream_results):
+                        if self._lane_is_full(stage, list(running.values())):
+                            continue
+                        if stage.admit is not None and not stage.admit(dict(self.results)):
+                            not_admitted.append(stage)
+                            continue
+                        pending.remove(stage)
+                        self.results[stage.name] = STATUS_RUNNING
+                        logger.debug(f"Starting stage {stage.name}")
+                        running[executor.submit(self._run_stage, stage)] = stage
+
+                if not running:
+                    if not not_admitted:
+                        break
+                    # Nothing running will change the admission checks' minds, so give up on those stages
+                    for stage in not_admitted:
+                        pending.remove(stage)
+                        self.results[stage.name] = STATUS_FAILED
+                        logger.error(f"Stage {stage.name} failed: it was not admitted and nothing else is running")
+                    continue
+
+                # In slices, so Ctrl+C still interrupts the wait on Windows
+                done = set()
+                while not done:
+                    done, _ = wait(running, timeout=WAIT_SLICE, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    if future.result():
+                        self.results[stage.name] = STATUS_SUCCESS
+                        logger.debug(f"Stage {stage.name} succeeded")
+                    else:
+                        self.results[stage.name] = STATUS_FAILED
+                        logger.error(f"Stage {stage.name} failed")
+        except KeyboardInterrupt:
+            # Don't start anything new. Running stages are left to the caller to stop
+            for stage in pending:
+                self.results[stage.name] = STATUS_SKIPPED
+            logger.warning(f"Pipeline interrupted. Stages still running: {', '.join(stage.name for stage in running.values()) or 'none'}")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown(wait=True)
+
+        return all(result in (STATUS_SUCCESS, STATUS_DISABLED) for result in self.results.values())
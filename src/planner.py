@@ -0,0 +1,283 @@
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from history import RunHistory
+from run_state import RunState, read_text_file
+from utils import get_dir_size, get_free_space, get_volume_path
+
+"""
+Dry-run plan of a run: which stages will run and why, and what they are expected to cost.
+
+Estimates come from the run history. Repack time and disk use scale with the bytes of paks to
+extract (using the expansion ratio PakExtract had in earlier repacks), BatchExport time with its
+throughput in files per second. The disk needed on each volume is checked before anything runs,
+and again by Repack right before it extracts, when it also picks a volume with room for the
+extraction instead of running out of space halfway.
+"""
+
+GB = 1024 ** 3
+DEFAULT_EXPANSION_RATIO = 3.0  # Extracted bytes per pak byte assumed until a repack has been recorded
+DEFAULT_OUTPUT_RATIO = 1.0  # Repacked pak bytes per source pak byte assumed until a repack has been recorded
+DISK_MARGIN = 1.1  # Estimated disk use is scaled by this before comparing it with the free space
+TIMEOUT_FACTOR = 3.0  # Hard timeouts allow this many times the duration expected from the history
+MIN_TIMEOUT = 600  # Shortest hard timeout set from the history, in seconds
+NO_HISTORY_TIMEOUT = 6 * 60 * 60  # Hard timeout until a stage has history. Hangs are still caught by the idle watchdog
+
+
+class StagePlan:
+    """What one stage is expected to do in the next run."""
+
+    def __init__(self, name: str, runs: Optional[bool], reason: str, wall_seconds: Optional[float] = None, disk_bytes: Optional[Dict[Path, int]] = None, scratch_bytes: Optional[Dict[Path, int]] = None) -> None:
+        """
+        Args:
+            name (str): Stage name
+            runs (bool, optional): Whether the stage will run, None if it is only decided during the run
+            reason (str): Why it runs, is skipped, or is undecided
+            wall_seconds (float, optional): Estimated wall time, None if there is nothing to estimate from
+            disk_bytes (dict, optional): Path to the bytes the stage adds under it and leaves behind
+            scratch_bytes (dict, optional): Path to the bytes the stage writes under it and removes before it ends
+        """
+        self.name = name
+        self.runs = runs
+        self.reason = reason
+        self.wall_seconds = wall_seconds
+        self.disk_bytes = disk_bytes or {}
+        self.scratch_bytes = scratch_bytes or {}
+
+
+def format_bytes(size: float) -> str:
+    """Format a byte count in GB, or MB below a GB."""
+    return f"{size / GB:.1f} GB" if size >= GB else f"{size / 1024 ** 2:.0f} MB"
+
+
+def check_disk(plans: List[StagePlan]) -> List[str]:
+    """
+    Check that every volume has room for the stages that will or may run.
+
+    What a stage leaves behind adds up across stages, while scratch space is freed again, so a
+    volume needs the sum of the lasting bytes plus the largest scratch use of any one stage.
+
+    Args:
+        plans (list[StagePlan]): Plan of the run
+
+    Returns:
+        list[str]: One message per volume that is too full, empty if everything fits
+    """
+    lasting: Dict[int, int] = {}
+    scratch: Dict[int, int] = {}
+    volume_paths: Dict[int, Path] = {}
+    for plan in plans:
+        if plan.runs is False:
+            continue
+        for totals, needs, combine in ((lasting, plan.disk_bytes, sum), (scratch, plan.scratch_bytes, max)):
+            for path, size in needs.items():
+                volume_path = get_volume_path(path)
+                device = os.stat(volume_path).st_dev
+                volume_paths.setdefault(device, volume_path)
+                totals[device] = combine((totals.get(device, 0), size))
+
+    problems = []
+    for device, volume_path in volume_paths.items():
+        required = (lasting.get(device, 0) + scratch.get(device, 0)) * DISK_MARGIN
+        free = get_free_space(volume_path)
+        if free < required:
+            problems.append(f"The volume of {volume_path} has {format_bytes(free)} free, but the run needs about {format_bytes(required)} there")
+    return problems
+
+
+def estimate_repack_disk(options, input_bytes: int, baseline: Optional[dict]) -> Tuple[int, int]:
+    """
+    Estimate the disk used by a repack.
+
+    Args:
+        options (Options): Configuration options
+        input_bytes (int): Bytes of the paks to extract
+        baseline (dict, optional): Repack baseline from RunHistory.baseline
+
+    Returns:
+        tuple[int, int]: Bytes extracted (removed once repacked), and the bytes the repacked pak adds over the one it replaces
+    """
+    baseline = baseline or {}
+    extracted_bytes = int(input_bytes * baseline.get("extracted_per_input", DEFAULT_EXPANSION_RATIO))
+    output_bytes = int(input_bytes * baseline.get("output_per_input", DEFAULT_OUTPUT_RATIO))
+    existing_bytes = os.path.getsize(options.repack_output_file) if os.path.isfile(options.repack_output_file) else 0
+    return extracted_bytes, max(output_bytes - existing_bytes, 0)
+
+
+def choose_extract_dir(options, candidates: List[Path], extracted_bytes: int, output_bytes: int) -> Optional[Path]:
+    """
+    Pick the first extraction directory whose volume has room for the extraction and the repacked pak.
+
+    Args:
+        options (Options): Configuration options
+        candidates (list[Path]): Extraction directories in order of preference
+        extracted_bytes (int): Estimated bytes extracted
+        output_bytes (int): Estimated bytes the repacked pak adds
+
+    Returns:
+        Path: Extraction directory, or None if no candidate has room
+    """
+    for candidate in candidates:
+        plan = StagePlan("repack", True, "", disk_bytes={Path(options.repack_output_file): output_bytes}, scratch_bytes={candidate: extracted_bytes})
+        problems = check_disk([plan])
+        if not problems:
+            return candidate
+        logger.debug(f"Not extracting to {candidate}: {'; '.join(problems)}")
+    return None
+
+
+def _baseline_seconds(baseline: Optional[dict], input_size: Optional[float] = None) -> Optional[float]:
+    """Estimate a stage's wall time from its baseline, scaled to an input size when both are known."""
+    if baseline is None:
+        return None
+    if "seconds_per_input" in baseline:
+        return baseline["seconds_per_input"] * (input_size if input_size is not None else baseline["input_size"])
+    return baseline["wall_seconds"]
+
+
+def get_timeout(baseline: Optional[dict], input_size: Optional[float] = None, default: int = NO_HISTORY_TIMEOUT, minimum: int = MIN_TIMEOUT) -> int:
+    """
+    Get a hard timeout for a stage's work from how long it took in earlier runs.
+
+    Args:
+        baseline (dict, optional): Stage baseline from RunHistory.baseline
+        input_size (float, optional): Input size of this work, in the unit the stage records (e.g. pak bytes for Repack).
+            Defaults to the input size of the latest run
+        default (int): Timeout in seconds while the stage has no history
+        minimum (int): Shortest timeout in seconds
+
+    Returns:
+        int: TIMEOUT_FACTOR times the expected duration, at least minimum
+    """
+    expected = _baseline_seconds(baseline, input_size)
+    if expected is None:
+        return default
+    return max(int(expected * TIMEOUT_FACTOR), minimum)
+
+
+def build_plan(options, run_state: RunState, history: Optional[RunHistory] = None) -> List[StagePlan]:
+    """
+    Plan a single run of the enabled stages without running anything.
+
+    Stages after the Steam download are judged by the game files downloaded now. If the download
+    will (or may) fetch a new manifest, they are decided again after it during the actual run.
+
+    Args:
+        options (Options): Configuration options
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        history (RunHistory, optional): Run history to estimate from. Defaults to opening .state/history.sqlite3
+
+    Returns:
+        list[StagePlan]: One plan per enabled stage, in pipeline order
+    """
+    # Imported on use like the stages themselves (see stage_registry), so --help doesn't load stage code
+    from repack.repack import get_extract_dir_candidates, get_fingerprint as get_repack_fingerprint
+    from mapper.get_mapper import get_fingerprint as get_mapper_fingerprint
+    from batch_export.run_batch_export import get_fingerprint as get_batch_export_fingerprint
+
+    own_history = history is None
+    history = history or RunHistory()
+    try:
+        plans = []
+        if options.should_download_dependencies:
+            from dependency_manager import DEPENDENCIES
+            for dependency in DEPENDENCIES:
+                name = f"dependency_manager.{dependency}"
+                if options.force_download_dependencies:
+                    reason = "force option is set"
+                elif options.dependencies_from_lock:
+                    reason = "installs the version in dependencies.lock"
+                else:
+                    reason = "checks GitHub for a newer release"
+                plans.append(StagePlan(name, True, reason, _baseline_seconds(history.baseline(name))))
+
+        update_pending = False
+        if options.should_download_steam_game:
+            downloaded = read_text_file(Path(options.steam_game_download_dir) / "manifest.txt")
+            if options.force_steam_download:
+                runs, reason = True, "force option is set"
+            elif options.manifest_id:
+                runs = options.manifest_id != downloaded
+                reason = f"manifest {options.manifest_id} requested, {downloaded or 'none'} downloaded"
+            else:
+                runs, reason = None, f"checks Steam for a manifest newer than {downloaded or 'none downloaded yet'}"
+            update_pending = runs is not False
+            plans.append(StagePlan("steam_download", runs, reason, _baseline_seconds(history.baseline("steam_download")) if runs is not False else None))
+        after_download = " (decided again after the download)" if update_pending else ""
+
+        if options.should_repack:
+            fingerprint = get_repack_fingerprint(options, run_state)
+            runs, reason = run_state.explain("repack", options.repack_output_file, fingerprint, outputs=[options.repack_output_file], force=options.force_repack)
+            plan = StagePlan("repack", runs, reason + after_download)
+            if runs:
+                input_bytes = sum(signature["size"] for signature in fingerprint["paks"].values())
+                baseline = history.baseline("repack")
+                extracted_bytes, output_bytes = estimate_repack_disk(options, input_bytes, baseline)
+                candidates = get_extract_dir_candidates(options)
+                extract_dir = choose_extract_dir(options, candidates, extracted_bytes, output_bytes)
+                if extract_dir is None:
+                    extract_dir = candidates[0]
+                elif extract_dir != candidates[0]:
+                    plan.reason += f"; extracting to {extract_dir} because the volume of {candidates[0]} is too full"
+                plan.wall_seconds = _baseline_seconds(baseline, input_bytes)
+                plan.disk_bytes = {Path(options.repack_output_file): output_bytes}
+                plan.scratch_bytes = {extract_dir: extracted_bytes}
+            plans.append(plan)
+
+        if options.should_get_mapper:
+            fingerprint = get_mapper_fingerprint(options, run_state)
+            runs, reason = run_state.explain("get_mapper", options.output_mapper_file, fingerprint, outputs=[options.output_mapper_file], force=options.force_get_mapper)
+            plans.append(StagePlan("get_mapper", runs, reason + after_download, _baseline_seconds(history.baseline("get_mapper")) if runs else None))
+
+        if options.should_batch_export:
+            fingerprint = get_batch_export_fingerprint(options, options.output_mapper_file, run_state)
+            runs, reason = run_state.explain("batch_export", options.output_data_dir, fingerprint, outputs=[options.output_data_dir], force=options.force_export)
+            # A new repacked pak changes the inputs of the export
+            repack_pending = any(plan.name == "repack" and plan.runs for plan in plans)
+            plan = StagePlan("batch_export", runs, reason + (after_download or (" (decided again after the repack)" if repack_pending else "")))
+            if runs:
+                baseline = history.baseline("batch_export")
+                plan.wall_seconds = _baseline_seconds(baseline)
+                if baseline is not None and "output_bytes" in baseline:
+                    # The output directory is wiped before exporting, so only growth over the current export counts
+                    existing_bytes = get_dir_size(options.output_data_dir) if os.path.isdir(options.output_data_dir) else 0
+                    plan.disk_bytes = {Path(options.output_data_dir): max(int(baseline["output_bytes"]) - existing_bytes, 0)}
+            plans.append(plan)
+        return plans
+    finally:
+        if own_history:
+            history.close()
+
+
+def format_plan(plans: List[StagePlan], problems: List[str]) -> str:
+    """
+    Format a plan for the log.
+
+    Args:
+        plans (list[StagePlan]): Plan of the run
+        problems (list[str]): Disk problems from check_disk
+
+    Returns:
+        str: Multi-line description of the plan
+    """
+    lines = ["Plan:"]
+    for plan in plans:
+        status = {True: "runs", False: "skipped", None: "may run"}[plan.runs]
+        lines.append(f"  {plan.name:<35} {status:<8} {plan.reason}")
+        if plan.runs is False:
+            continue
+        estimates = [f"~{plan.wall_seconds / 60:.1f} min" if plan.wall_seconds is not None else "no timing history"]
+        estimates += [f"{format_bytes(size)} scratch in {path}" for path, size in plan.scratch_bytes.items()]
+        estimates += [f"+{format_bytes(size)} in {path}" for path, size in plan.disk_bytes.items()]
+        lines.append(f"  {'':<35} {'':<8} {', '.join(estimates)}")
+
+    estimated = [plan.wall_seconds for plan in plans if plan.runs is not False and plan.wall_seconds is not None]
+    if estimated:
+        lines.append(f"Estimated time if the stages ran one after another: ~{sum(estimated) / 60:.1f} min (independent stages overlap, so usually less)")
+    if problems:
+        lines += [f"Not enough disk space: {problem}" for problem in problems]
+    else:
+        lines.append("Disk space: enough on every volume")
+    return "\n".join(lines)
@@ -0,0 +1,251 @@
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Set
+from loguru import logger
+
+"""
+Process profiles: the scheduling priority, I/O priority, CPU affinity and memory ceiling of the
+tools started through run_process.
+
+When the machine running the exporter also serves other work, the tools can be kept out of its
+way. A profile is written as space separated settings, e.g. "priority=below_normal io=idle
+cpus=0-3,6 memory=8G":
+
+* priority: idle, below_normal, normal or above_normal (nice 19, 10, 0 and -5 on Linux and macOS)
+* io: idle, low or normal
+* cpus: CPU numbers and ranges the tool may run on
+* memory: memory ceiling of the tool and its children together, in MB or with a K, M, G or T suffix
+
+Priority, I/O priority and affinity are set through psutil on the process and the children it
+already started right after it is spawned. Processes it starts later inherit them from it. The
+memory ceiling is enforced by the process runner, which stops the tool once its process tree uses
+more (see process_runner.watch_memory), since psutil can't set memory limits on Windows.
+
+The profile of a process is the one of the pipeline stage it runs in, falling back to the default
+profile for anything not set in it.
+"""
+
+PRIORITIES = ("idle", "below_normal", "normal", "above_normal")
+IO_PRIORITIES = ("idle", "low", "normal")
+NICE_VALUES = {"idle": 19, "below_normal": 10, "normal": 0, "above_normal": -5}
+MEMORY_UNITS = {"": 1024 ** 2, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+_default: Optional["ProcessProfile"] = None
+_stages: Dict[str, "ProcessProfile"] = {}
+_warned: Set[str] = set()
+_warned_lock = threading.Lock()
+
+
+class ProcessProfile:
+    """Priority, I/O priority, CPU affinity and memory ceiling for a tool. Unset fields leave the process as started."""
+
+    def __init__(self, priority: Optional[str] = None, io_priority: Optional[str] = None, cpu_affinity: Optional[List[int]] = None, memory_limit: Optional[int] = None) -> None:
+        """
+        Args:
+            priority (str, optional): One of PRIORITIES
+            io_priority (str, optional): One of IO_PRIORITIES
+            cpu_affinity (list[int], optional): CPUs the process may run on
+            memory_limit (int, optional): Bytes the process tree may use
+        """
+        self.priority = priority
+        self.io_priority = io_priority
+        self.cpu_affinity = cpu_affinity
+        self.memory_limit = memory_limit
+
+    def __bool__(self) -> bool:
+        return any(value is not None for value in (self.priority, self.io_priority, self.cpu_affinity, self.memory_limit))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ProcessProfile) and vars(self) == vars(other)
+
+    def __repr__(self) -> str:
+        return f"ProcessProfile({', '.join(f'{key}={value!r}' for key, value in vars(self).items() if value is not None)})"
+
+    def merged_over(self, base: Optional["ProcessProfile"]) -> "ProcessProfile":
+        """Get this profile with the fields it doesn't set taken from base."""
+        if base is None:
+            return self
+        return ProcessProfile(**{key: value if value is not None else getattr(base, key) for key, value in vars(self).items()})
+
+
+def parse_cpus(text: str) -> List[int]:
+    """Parse CPU numbers and ranges such as '0-3,6' into a sorted list."""
+    cpus = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        match = re.fullmatch(r"(\d+)(?:-(\d+))?", part)
+        if match is None:
+            raise ValueError(f"Invalid CPU list '{text}', expected numbers and ranges like 0-3,6")
+        first, last = int(match.group(1)), int(match.group(2) or match.group(1))
+        if last < first:
+            raise ValueError(f"Invalid CPU range '{part}'")
+        cpus.update(range(first, last + 1))
+    if not cpus:
+        raise ValueError("Empty CPU list")
+    return sorted(cpus)
+
+
+def parse_memory(text: str) -> int:
+    """Parse a memory size such as '8G', '512M' or '4096' (MB) into bytes."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMGT]?)B?", text.strip().upper())
+    if match is None:
+        raise ValueError(f"Invalid memory size '{text}', expected e.g. 8G, 512M or 4096 (MB)")
+    return int(float(match.group(1)) * MEMORY_UNITS[match.group(2)])
+
+
+def parse_profile(text: Optional[str]) -> ProcessProfile:
+    """
+    Parse a profile such as 'priority=below_normal io=idle cpus=0-3 memory=8G'.
+
+    Args:
+        text (str, optional): Space separated key=value settings. Blank sets nothing
+
+    Returns:
+        ProcessProfile: The parsed profile
+
+    Raises:
+        ValueError: If a setting is unknown or its value invalid
+    """
+    profile = ProcessProfile()
+    for setting in (text or "").split():
+        key, separator, value = setting.partition("=")
+        key, value = key.strip().lower(), value.strip().lower()
+        if not separator or not value:
+            raise ValueError(f"Invalid process profile setting '{setting}', expected key=value")
+        if key == "priority":
+            if value not in PRIORITIES:
+                raise ValueError(f"Invalid priority '{value}', expected one of {', '.join(PRIORITIES)}")
+            profile.priority = value
+        elif key == "io":
+            if value not in IO_PRIORITIES:
+                raise ValueError(f"Invalid I/O priority '{value}', expected one of {', '.join(IO_PRIORITIES)}")
+            profile.io_priority = value
+        elif key == "cpus":
+            profile.cpu_affinity = parse_cpus(value)
+        elif key == "memory":
+            profile.memory_limit = parse_memory(value)
+        else:
+            raise ValueError(f"Unknown process profile setting '{key}', expected priority, io, cpus or memory")
+    return profile
+
+
+def configure(default: Optional[str] = None, stages: Optional[Dict[str, Optional[str]]] = None) -> None:
+    """
+    Configure the profiles of the processes started from now on.
+
+    Args:
+        default (str, optional): Profile of every process, see parse_profile
+        stages (dict, optional): Stage name -> profile of the processes of that stage, over the default
+
+    Raises:
+        ValueError: If a profile is invalid
+    """
+    global _default, _stages
+    default_profile = parse_profile(default)
+    stage_profiles = {}
+    for stage, text in (stages or {}).items():
+        try:
+            stage_profiles[stage] = parse_profile(text).merged_over(default_profile)
+        except ValueError as e:
+            raise ValueError(f"Process profile of {stage}: {e}") from e
+    _default = default_profile
+    _stages = stage_profiles
+
+
+def get_profile(stage: Optional[str] = None) -> ProcessProfile:
+    """
+    Get the profile of a process.
+
+    Args:
+        stage (str, optional): Pipeline stage the process runs in. Backfill stages such as repack[<manifest id>] use their stage's profile
+
+    Returns:
+        ProcessProfile: Profile of the stage, or the default profile
+    """
+    if stage is not None:
+        stage = re.sub(r"\[[^\]]*\]$", "", stage)
+        if stage in _stages:
+            return _stages[stage]
+    return _default or ProcessProfile()
+
+
+def warn_once(message: str) -> None:
+    """Log a warning the first time it comes up, e.g. for each tool started with an unsupported setting."""
+    with _warned_lock:
+        if message in _warned:
+            return
+        _warned.add(message)
+    logger.warning(message)
+
+
+def apply_profile(pid: int, profile: ProcessProfile, name: str = '') -> None:
+    """
+    Apply the priority, I/O priority and CPU affinity of a profile to a process and its children.
+
+    Settings the platform doesn't support, or that need more rights than the exporter has (e.g. a
+    higher priority on Linux), are skipped with a warning, once per setting.
+
+    Args:
+        pid (int): Process id of the root of the tree
+        profile (ProcessProfile): Profile to apply
+        name (str, optional): Process name used in logs
+
+    Raises:
+        ValueError: If a setting is invalid on this machine, e.g. CPUs it doesn't have
+    """
+    if not (profile.priority or profile.io_priority or profile.cpu_affinity):
+        return
+    import psutil  # Imported here, like in utils, so only processes with a profile need it
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return  # Already exited
+
+    for proc in processes:
+        try:
+            if profile.priority is not None:
+                proc.nice(get_nice_value(psutil, profile.priority))
+            if profile.io_priority is not None:
+                if not hasattr(proc, "ionice"):
+                    warn_once(f"I/O priority is not supported on this platform, ignoring io={profile.io_priority}")
+                else:
+                    proc.ionice(*get_ionice_args(psutil, profile.io_priority))
+            if profile.cpu_affinity is not None:
+                if not hasattr(proc, "cpu_affinity"):
+                    warn_once("CPU affinity is not supported on this platform, ignoring cpus")
+                else:
+                    proc.cpu_affinity(profile.cpu_affinity)
+        except psutil.NoSuchProcess:
+            continue
+        except psutil.AccessDenied as e:
+            warn_once(f"Could not apply the process profile {profile} to {name or pid}: {e}")
+        except ValueError as e:
+            raise ValueError(f"Could not apply the process profile {profile} to {name or pid}: {e}") from e
+    logger.debug(f"Applied {profile} to {name} (PID {pid}) and {len(processes) - 1} child process(es)")
+
+
+def get_nice_value(psutil, priority: str) -> int:
+    """Get the psutil nice value of a priority: a priority class on Windows, a nice level elsewhere."""
+    if os.name == 'nt':
+        return {
+            "idle": psutil.IDLE_PRIORITY_CLASS,
+            "below_normal": psutil.BELOW_NORMAL_PRIORITY_CLASS,
+            "normal": psutil.NORMAL_PRIORITY_CLASS,
+            "above_normal": psutil.ABOVE_NORMAL_PRIORITY_CLASS,
+        }[priority]
+    return NICE_VALUES[priority]
+
+
+def get_ionice_args(psutil, io_priority: str) -> tuple:
+    """Get the psutil ionice arguments of an I/O priority."""
+    if os.name == 'nt':
+        return ({"idle": psutil.IOPRIO_VERYLOW, "low": psutil.IOPRIO_LOW, "normal": psutil.IOPRIO_NORMAL}[io_priority],)
+    return {
+        "idle": (psutil.IOPRIO_CLASS_IDLE,),
+        "low": (psutil.IOPRIO_CLASS_BE, 7),
+        "normal": (psutil.IOPRIO_CLASS_BE, 4),
+    }[io_priority]
@@ -0,0 +1,403 @@
+import os
+import time
+import shlex
+import asyncio
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import List, Optional, Tuple, Union
+
+from output_sink import OutputSink, create_sink
+
+"""
+Asyncio engine for the processes started through run_process.
+
+Every process is supervised by a coroutine on one event loop running on a background thread, so
+any number of UnrealPak, BatchExport or DepotDownloader processes can run at once with their
+output read by that one thread instead of a thread per process. Output is read in large chunks as
+it arrives and handed to an OutputSink, which spools it and logs a sample of it (see output_sink),
+and timeouts are timers on the loop rather than a polling loop. This works the same on Windows,
+where the loop uses I/O completion ports, as on Unix.
+
+Besides the hard timeout, an idle watchdog stops a process that went quiet: no new progress for
+tools with a progress parser, no new output for the rest, and no CPU or disk activity in its
+process tree either. A tool that is silently busy, e.g. BatchExport loading the mappings, is
+left alone, while a hung one is stopped long before its hard timeout.
+
+A process with a memory limit (see process_profile) is stopped as well once its process tree uses
+more memory than that, checked every MEMORY_CHECK_INTERVAL seconds.
+
+Callers stay synchronous: ProcessRunner.start returns a ProcessHandle with the parts of the
+subprocess.Popen interface they use (pid, poll, wait, terminate, kill).
+"""
+
+CHUNK_SIZE = 64 * 1024  # Bytes of output read at once
+TERMINATE_GRACE = 5  # Seconds a process gets to exit after terminate() before it is killed
+WAIT_SLICE = 1.0  # Seconds a blocked caller waits at once, so Ctrl+C still interrupts it on Windows
+IDLE_TIMEOUT = 600  # Seconds without progress or output after which a quiet process is checked for activity
+IDLE_CPU_SHARE = 0.05  # Share of one core the process tree must average to count as busy while quiet
+IDLE_IO_RATE = 64 * 1024  # Bytes per second the process tree must read or write to count as busy while quiet
+MEMORY_CHECK_INTERVAL = 1.0  # Seconds between checks of the memory of a process with a memory limit
+
+_runner: Optional["ProcessRunner"] = None
+_runner_lock = threading.Lock()
+_idle_timeout: float = IDLE_TIMEOUT
+
+
+class ProcessStalledError(TimeoutError):
+    """A process made no progress and used no CPU or disk for its idle timeout."""
+
+
+class ProcessMemoryError(MemoryError):
+    """A process tree used more memory than its limit."""
+
+
+def configure(idle_timeout: float = IDLE_TIMEOUT) -> None:
+    """
+    Configure the processes started from now on.
+
+    Args:
+        idle_timeout (float): Seconds a process may go without progress or output before it is checked for activity. 0 turns the watchdog off
+    """
+    global _idle_timeout
+    _idle_timeout = idle_timeout
+
+
+def get_runner() -> "ProcessRunner":
+    """Get the process runner used by run_process, starting its event loop on first use."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = ProcessRunner()
+        return _runner
+
+
+def split_windows_command_line(command_line: str) -> List[str]:
+    """Split a command line into the program and its arguments the way Windows parses it (CommandLineToArgvW)."""
+    if not command_line.strip():
+        return []  # CommandLineToArgvW gives the path of the current program for an empty command line
+    import ctypes
+    from ctypes import wintypes
+    shell32 = ctypes.windll.shell32
+    shell32.CommandLineToArgvW.argtypes = [wintypes.LPCWSTR, ctypes.POINTER(ctypes.c_int)]
+    shell32.CommandLineToArgvW.restype = ctypes.POINTER(wintypes.LPWSTR)
+    count = ctypes.c_int()
+    argv = shell32.CommandLineToArgvW(command_line, ctypes.byref(count))
+    if not argv:
+        raise ctypes.WinError()
+    try:
+        return [argv[index] for index in range(count.value)]
+    finally:
+        ctypes.windll.kernel32.LocalFree(argv)
+
+
+def split_command_line(command_line: str) -> List[str]:
+    """Split a command line string into the program and its arguments, with the platform's quoting rules."""
+    if os.name == 'nt':
+        # Joined again with subprocess.list2cmdline when spawned, so Windows gets the command line it was given
+        return split_windows_command_line(command_line)
+    return shlex.split(command_line)
+
+
+def get_command(options: Union[List[str], str]) -> List[str]:
+    """
+    Turn run_process options into the program and arguments to execute.
+
+    Args:
+        options (list[str] | str): The command and arguments, or a command line string
+
+    Returns:
+        list[str]: Program and arguments, with shell scripts run through bash on Windows
+    """
+    command = split_command_line(options) if isinstance(options, str) else list(options)
+    # Handle shell scripts on Windows by explicitly using bash
+    if command and command[0].endswith('.sh') and os.name == 'nt':
+        command = ['bash'] + command
+    return command
+
+
+async def read_output(process: asyncio.subprocess.Process, sink: OutputSink) -> None:
+    """Pass a process's output to its sink in chunks as it arrives, until the process exits."""
+    try:
+        while True:
+            chunk = await process.stdout.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            sink.write(chunk)
+    finally:
+        sink.close()
+    await process.wait()
+
+
+def get_tree_usage(pid: int) -> Optional[Tuple[float, Optional[int]]]:
+    """
+    Measure the resources a process and its children used so far.
+
+    Args:
+        pid (int): Process id of the root of the tree
+
+    Returns:
+        tuple: CPU seconds, and bytes read and written (None where not measurable, e.g. on macOS). None if the process is gone
+    """
+    import psutil  # Imported here, like in utils, so only the watchdog needs it
+    cpu_seconds = 0.0
+    io_bytes = 0
+    try:
+        root = psutil.Process(pid)
+        for proc in [root] + root.children(recursive=True):
+            cpu_times = proc.cpu_times()
+            cpu_seconds += cpu_times.user + cpu_times.system
+            if io_bytes is not None and hasattr(proc, "io_counters"):
+                io = proc.io_counters()
+                io_bytes += io.read_bytes + io.write_bytes
+            else:
+                io_bytes = None
+    except psutil.Error:
+        return None
+    return cpu_seconds, io_bytes
+
+
+def get_tree_memory(pid: int) -> Optional[int]:
+    """Get the resident memory of a process and its children in bytes, None if the process is gone."""
+    import psutil
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass  # Exited in the meantime
+    return total
+
+
+def is_busy(before: Optional[Tuple[float, Optional[int]]], after: Optional[Tuple[float, Optional[int]]], seconds: float) -> bool:
+    """Check whether a process tree used CPU or disk between two get_tree_usage samples taken seconds apart."""
+    if before is None or after is None or seconds <= 0:
+        return False
+    if after[0] - before[0] >= IDLE_CPU_SHARE * seconds:
+        return True
+    return before[1] is not None and after[1] is not None and after[1] - before[1] >= IDLE_IO_RATE * seconds
+
+
+def last_activity(sink: OutputSink) -> float:
+    """Get the monotonic time of the last progress of a process, or of its last output if it has no progress parser."""
+    if sink.progress is not None:
+        return sink.progress.last_progress_at
+    return sink.last_output_at
+
+
+async def watch_idle(process: asyncio.subprocess.Process, sink: OutputSink, idle_timeout: float) -> None:
+    """
+    Wait until a process went idle_timeout seconds without progress (or output) while its tree used
+    no CPU or disk, checking its resource use each time the window runs out.
+
+    Raises:
+        ProcessStalledError: Once the process stalled. Never returns otherwise
+    """
+    usage = get_tree_usage(process.pid)
+    checked_at = time.monotonic()
+    while True:
+        remaining = max(last_activity(sink), checked_at) + idle_timeout - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+            continue
+        new_usage = get_tree_usage(process.pid)
+        now = time.monotonic()
+        if not is_busy(usage, new_usage, now - checked_at):
+            what = "progress" if sink.progress is not None else "output"
+            raise ProcessStalledError(f'Process {sink.name} stalled: no {what} and no CPU or disk activity for {idle_timeout:.0f} seconds')
+        usage, checked_at = new_usage, now
+
+
+async def watch_memory(process: asyncio.subprocess.Process, sink: OutputSink, memory_limit: int) -> None:
+    """
+    Wait until a process tree uses more than memory_limit bytes of resident memory.
+
+    Raises:
+        ProcessMemoryError: Once the process went over the limit. Never returns otherwise
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        # Walking the process tree blocks, so it runs off the loop
+        memory = await loop.run_in_executor(None, get_tree_memory, process.pid)
+        if memory is not None and memory > memory_limit:
+            raise ProcessMemoryError(f'Process {sink.name} used {memory / 1024 ** 2:,.0f} MB, over its memory limit of {memory_limit / 1024 ** 2:,.0f} MB')
+        await asyncio.sleep(MEMORY_CHECK_INTERVAL)
+
+
+async def read_watched(process: asyncio.subprocess.Process, sink: OutputSink, idle_timeout: Optional[float] = None, memory_limit: Optional[int] = None) -> None:
+    """Pass a process's output to its sink until it exits, like read_output, unless a watchdog stops it first (see watch_idle and watch_memory)."""
+    watchdogs = []
+    if idle_timeout:
+        watchdogs.append(watch_idle(process, sink, idle_timeout))
+    if memory_limit:
+        watchdogs.append(watch_memory(process, sink, memory_limit))
+    if not watchdogs:
+        await read_output(process, sink)
+        return
+    reader = asyncio.ensure_future(read_output(process, sink))
+    tasks = [asyncio.ensure_future(watchdog) for watchdog in watchdogs]
+    try:
+        await asyncio.wait({reader, *tasks}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        reader_done = reader.done()
+        for task in (reader, *tasks):
+            task.cancel()
+        await asyncio.gather(reader, *tasks, return_exceptions=True)
+    if not reader_done:
+        for task in tasks:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()  # ProcessStalledError or ProcessMemoryError
+    reader.result()
+
+
+async def stop_process(process: asyncio.subprocess.Process) -> None:
+    """Terminate a process, killing it if it doesn't exit within TERMINATE_GRACE seconds."""
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+        await asyncio.wait_for(process.wait(), TERMINATE_GRACE)
+    except ProcessLookupError:
+        pass  # Exited in the meantime
+    except asyncio.TimeoutError:
+        process.kill()  # Force kill if it doesn't terminate
+        await process.wait()
+
+
+async def supervise(process: asyncio.subprocess.Process, sink: OutputSink, timeout: Optional[float] = None, idle_timeout: Optional[float] = None, memory_limit: Optional[int] = None) -> int:
+    """
+    Pass a process's output to its sink until it exits, stopping it if it runs longer than the timeout, stalls or uses too much memory.
+
+    Args:
+        process (asyncio.subprocess.Process): Started process with its output piped
+        sink (OutputSink): Sink for the output
+        timeout (float, optional): Seconds after which the process is stopped. Defaults to no limit
+        idle_timeout (float, optional): Seconds without progress and activity after which the process is stopped (see watch_idle). Defaults to no limit
+        memory_limit (int, optional): Bytes of memory the process tree may use before it is stopped (see watch_memory). Defaults to no limit
+
+    Returns:
+        int: Exit code
+
+    Raises:
+        ProcessStalledError: If the process stalled
+        ProcessMemoryError: If the process used more memory than its limit
+        TimeoutError: If the process ran longer than the timeout
+    """
+    try:
+        await asyncio.wait_for(read_watched(process, sink, idle_timeout, memory_limit), timeout)
+        return process.returncode
+    except (ProcessStalledError, ProcessMemoryError):
+        await stop_process(process)
+        raise
+    except asyncio.TimeoutError:
+        await stop_process(process)
+        raise TimeoutError(f'Process {sink.name} timed out after {timeout} seconds')
+    except asyncio.CancelledError:
+        await stop_process(process)
+        raise
+
+
+class ProcessHandle:
+    """A process supervised by the runner, usable from any thread like a subprocess.Popen."""
+
+    def __init__(self, runner: "ProcessRunner", process: asyncio.subprocess.Process, sink: OutputSink, done: Future) -> None:
+        """
+        Args:
+            runner (ProcessRunner): Runner whose loop supervises the process
+            process (asyncio.subprocess.Process): The started process
+            sink (OutputSink): Sink of the process's output, holding its last lines
+            done (Future): Resolves to the exit code once the process exited and its output was read
+        """
+        self.runner = runner
+        self.process = process
+        self.sink = sink
+        self.name = sink.name
+        self.pid = process.pid
+        self.done = done
+
+    def poll(self) -> Optional[int]:
+        """Get the exit code, or None while the process is running."""
+        return self.process.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """
+        Wait for the process to exit and its output to be read.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to waiting indefinitely
+
+        Returns:
+            int: Exit code
+
+        Raises:
+            subprocess.TimeoutExpired: If the process is still running after timeout seconds
+            TimeoutError: If the runner stopped the process for exceeding its own timeout
+        """
+        remaining = timeout
+        while True:
+            wait_slice = WAIT_SLICE if remaining is None else min(WAIT_SLICE, remaining)
+            try:
+                return self.done.result(wait_slice)
+            except FutureTimeoutError:
+                if self.done.done():
+                    raise  # The supervisor itself timed out the process
+                if remaining is not None:
+                    remaining -= wait_slice
+                    if remaining <= 0:
+                        raise subprocess.TimeoutExpired(self.name, timeout)
+
+    def terminate(self) -> None:
+        """Ask the process to exit."""
+        self.runner.loop.call_soon_threadsafe(self._signal, "terminate")
+
+    def kill(self) -> None:
+        """Force the process to exit."""
+        self.runner.loop.call_soon_threadsafe(self._signal, "kill")
+
+    def _signal(self, method: str) -> None:
+        if self.process.returncode is None:
+            try:
+                getattr(self.process, method)()
+            except ProcessLookupError:
+                pass  # Exited in the meantime
+
+
+class ProcessRunner:
+    """Starts processes and supervises all of them on a single event loop thread."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="process-runner", daemon=True)
+        self._thread.start()
+
+    def start(self, options: Union[List[str], str], name: str = '', timeout: Optional[float] = None, expected_total: Optional[int] = None, idle_timeout: Optional[float] = None, memory_limit: Optional[int] = None) -> ProcessHandle:
+        """
+        Start a process and supervise it until it exits.
+
+        Args:
+            options (list[str] | str): The command and arguments to execute
+            name (str, optional): Name to identify the process in logs. Defaults to ''
+            timeout (float, optional): Seconds after which the process is stopped. Defaults to no limit
+            expected_total (int, optional): Units of work expected, for the progress ETA (see progress)
+            idle_timeout (float, optional): Seconds without progress and activity after which the process is stopped (see watch_idle).
+                Defaults to the configured idle timeout. 0 turns the watchdog off
+            memory_limit (int, optional): Bytes of memory the process tree may use before it is stopped (see watch_memory). Defaults to no limit
+
+        Returns:
+            ProcessHandle: The running process
+
+        Raises:
+            OSError: If the process could not be started
+        """
+        spawn = asyncio.create_subprocess_exec(*get_command(options), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        process = asyncio.run_coroutine_threadsafe(spawn, self.loop).result()
+        sink = create_sink(name, process.pid, expected_total)
+        if idle_timeout is None:
+            idle_timeout = _idle_timeout
+        done = asyncio.run_coroutine_threadsafe(supervise(process, sink, timeout, idle_timeout, memory_limit), self.loop)
+        return ProcessHandle(self, process, sink, done)
@@ -0,0 +1,246 @@
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Type
+from loguru import logger
+
+"""
+Structured progress of the tools started through run_process.
+
+A parser is attached to a process by its run_process name (see PARSERS). It reads the same
+chunks of output as the OutputSink and turns them into ProgressEvents: DepotDownloader's percent
+and downloaded bytes, UnrealPak's files extracted or added, BatchExport's assets exported and
+failed. A ProgressTracker turns the events into live throughput (files/s, MB/s) and an ETA in the
+log, so a stuck tool can be told apart from a slow one long before its timeout.
+
+Parsers work on whole chunks with substring counts instead of a regex per line, since the tools
+print hundreds of thousands of lines.
+"""
+
+MB = 1024 ** 2
+PROGRESS_LOG_INTERVAL = 30.0  # Seconds between progress lines in the log
+
+
+class ProgressEvent:
+    """Progress of a tool so far. Counts are cumulative, not per chunk."""
+
+    def __init__(self, done: int = 0, failed: int = 0, bytes_done: Optional[int] = None, fraction: Optional[float] = None, total: Optional[int] = None) -> None:
+        """
+        Args:
+            done (int): Units (files, assets) finished so far
+            failed (int): Units that failed so far
+            bytes_done (int, optional): Bytes processed so far, if the tool reports them
+            fraction (float, optional): Share of the work done from 0 to 1, if the tool reports it
+            total (int, optional): Units to do in total, if the tool reports it
+        """
+        self.done = done
+        self.failed = failed
+        self.bytes_done = bytes_done
+        self.fraction = fraction
+        self.total = total
+
+
+class ProgressParser(ABC):
+    """Turns chunks of one process's output into ProgressEvents. One instance per process."""
+
+    unit = "files"
+
+    def __init__(self) -> None:
+        self.event = ProgressEvent()
+
+    @abstractmethod
+    def parse(self, data: bytes) -> Optional[ProgressEvent]:
+        """
+        Parse complete lines of output.
+
+        Args:
+            data (bytes): One or more complete lines, without the final line break
+
+        Returns:
+            ProgressEvent: Progress so far if the lines changed it, otherwise None
+        """
+
+
+class DepotDownloaderParser(ProgressParser):
+    """
+    DepotDownloader prints a line per downloaded file starting with the share of the depot done,
+    e.g. ' 12.34% game/Paks/pakchunk0-Windows.pak', and the downloaded bytes once a depot is done.
+    """
+
+    BYTES_PATTERN = re.compile(rb'Total downloaded: (\d+) bytes|Depot \d+ - Downloaded (\d+) bytes')
+
+    def parse(self, data: bytes) -> Optional[ProgressEvent]:
+        changed = False
+        percent_at = data.rfind(b'%')
+        if percent_at != -1:
+            line_start = data.rfind(b'\n', 0, percent_at) + 1
+            try:
+                self.event.fraction = float(data[line_start:percent_at]) / 100
+                self.event.done += data.count(b'%')
+                changed = True
+            except ValueError:
+                pass  # A % in another kind of line
+        if b'ownloaded' in data:
+            for match in self.BYTES_PATTERN.finditer(data):
+                self.event.bytes_done = int(match.group(1) or match.group(2))
+                changed = True
+        return self.event if changed else None
+
+
+class UnrealPakParser(ProgressParser):
+    """
+    UnrealPak prints 'Extracted "<file>" to "<destination>"' per file with -Extract, and a summary line
+    per pak, 'Finished extracting N files (including M errors)' or 'Added N files, B bytes total'.
+    """
+
+    EXTRACTED = b'Extracted "'
+    FAILED = b'Unable to '
+    EXTRACT_SUMMARY = re.compile(rb'Finished extracting (\d+) files \(including (\d+) errors\)')
+    ADD_SUMMARY = re.compile(rb'Added (\d+) files, (\d+) bytes total')
+
+    def parse(self, data: bytes) -> Optional[ProgressEvent]:
+        extracted = data.count(self.EXTRACTED)
+        failed = data.count(self.FAILED)
+        self.event.done += extracted
+        self.event.failed += failed
+        changed = bool(extracted or failed)
+        if b'Finished extracting' in data:
+            for match in self.EXTRACT_SUMMARY.finditer(data):
+                self.event.done, self.event.failed = int(match.group(1)), int(match.group(2))
+                changed = True
+        if b' bytes total' in data:
+            for match in self.ADD_SUMMARY.finditer(data):
+                self.event.done, self.event.bytes_done = int(match.group(1)), int(match.group(2))
+                changed = True
+        return self.event if changed else None
+
+
+class BatchExportParser(ProgressParser):
+    """BatchExport logs a line per exported asset starting with 'Exported', and per failed one with 'Failed'."""
+
+    unit = "assets"
+    EXPORTED = b'Exported '
+    FAILED = b'Failed'
+    TOTAL_PATTERN = re.compile(rb'(\d+) (?:packages|files|assets) to export')
+
+    def parse(self, data: bytes) -> Optional[ProgressEvent]:
+        exported = data.count(self.EXPORTED)
+        failed = data.count(self.FAILED)
+        self.event.done += exported
+        self.event.failed += failed
+        changed = bool(exported or failed)
+        if b' to export' in data:
+            for match in self.TOTAL_PATTERN.finditer(data):
+                self.event.total = int(match.group(1))
+                changed = True
+        return self.event if changed else None
+
+
+# run_process name prefix -> parser of that tool's output
+PARSERS: Dict[str, Type[ProgressParser]] = {
+    "download-game-files": DepotDownloaderParser,
+    "UnrealPak": UnrealPakParser,
+    "BatchExport": BatchExportParser,
+}
+
+
+def get_parser(name: str) -> Optional[ProgressParser]:
+    """Create a parser for the process with a run_process name, None if no parser is registered for it."""
+    for prefix, parser_class in PARSERS.items():
+        if name.startswith(prefix):
+            return parser_class()
+    return None
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration in seconds, or minutes from 2 minutes up."""
+    return f"{seconds / 60:.1f} min" if seconds >= 120 else f"{seconds:.0f}s"
+
+
+class ProgressTracker:
+    """Follows the progress events of one process, logging throughput and an ETA now and then."""
+
+    def __init__(self, name: str, parser: ProgressParser, expected_total: Optional[int] = None, log_interval: float = PROGRESS_LOG_INTERVAL) -> None:
+        """
+        Args:
+            name (str): Process name used in logs
+            parser (ProgressParser): Parser of the process's output
+            expected_total (int, optional): Units expected if the tool doesn't say, e.g. from the last run's history
+            log_interval (float): Seconds between progress lines in the log
+        """
+        self.name = name
+        self.parser = parser
+        self.expected_total = expected_total
+        self.log_interval = log_interval
+        self.event = ProgressEvent()
+        self.started_at = time.monotonic()
+        self.last_progress_at = self.started_at
+        self._logged_at = self.started_at
+        self._logged_done = 0
+        self._logged_bytes = 0
+
+    @property
+    def total(self) -> Optional[int]:
+        """Units to do, as reported by the tool or else as expected."""
+        return self.event.total or self.expected_total
+
+    def feed(self, data: bytes) -> None:
+        """
+        Parse complete lines of output and log the progress if it's time to.
+
+        Args:
+            data (bytes): One or more complete lines, without the final line break
+        """
+        event = self.parser.parse(data)
+        if event is None:
+            return
+        now = time.monotonic()
+        self.event = event
+        self.last_progress_at = now
+        if now - self._logged_at >= self.log_interval:
+            logger.info(self.describe(now))
+            self._logged_at = now
+            self._logged_done = event.done
+            self._logged_bytes = event.bytes_done or 0
+
+    def eta(self, now: Optional[float] = None) -> Optional[float]:
+        """Estimate the seconds left from the average rate so far, None if there is nothing to estimate from."""
+        elapsed = (time.monotonic() if now is None else now) - self.started_at
+        if self.event.fraction:
+            return elapsed * (1 - self.event.fraction) / self.event.fraction
+        if self.total and self.event.done:
+            return max(self.total - self.event.done, 0) * elapsed / self.event.done
+        return None
+
+    def describe(self, now: Optional[float] = None) -> str:
+        """Describe the progress, with the throughput since the last description and the ETA."""
+        now = time.monotonic() if now is None else now
+        interval = max(now - self._logged_at, 1e-9)
+        unit = self.parser.unit
+        parts = [f"{self.event.done:,} {unit}"]
+        if self.total:
+            parts[0] = f"{self.event.done:,} / {'' if self.event.total else '~'}{self.total:,} {unit}"
+        if self.event.fraction is not None:
+            parts.append(f"{self.event.fraction:.1%}")
+        parts.append(f"{(self.event.done - self._logged_done) / interval:,.1f} {unit}/s")
+        if self.event.bytes_done is not None:
+            parts.append(f"{(self.event.bytes_done - self._logged_bytes) / interval / MB:,.1f} MB/s")
+        if self.event.failed:
+            parts.append(f"{self.event.failed:,} failed")
+        eta = self.eta(now)
+        if eta is not None:
+            parts.append(f"ETA {format_duration(eta)}")
+        return f"[progress: {self.name}] " + ", ".join(parts)
+
+    def finish(self) -> None:
+        """Log a summary of the whole run of the process."""
+        if not (self.event.done or self.event.failed or self.event.bytes_done):
+            return
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        unit = self.parser.unit
+        parts = [f"{self.event.done:,} {unit} in {format_duration(elapsed)} ({self.event.done / elapsed:,.1f} {unit}/s)"]
+        if self.event.bytes_done:
+            parts.append(f"{self.event.bytes_done / MB:,.0f} MB ({self.event.bytes_done / elapsed / MB:,.1f} MB/s)")
+        if self.event.failed:
+            parts.append(f"{self.event.failed:,} failed")
+        logger.info(f"[progress: {self.name}] Finished " + ", ".join(parts))
@@ -1,28 +1,91 @@
 import os
 from pathlib import Path
 import shlex
-from typing import Optional
+from typing import List, Optional
 from loguru import logger
 from optionsconfig import Options
-from utils import run_process
+from utils import run_process, get_dir_size
+from run_state import RunState, read_text_file
+from journal import Journal, JournalScope
+from telemetry import annotate
+from supervisor import TaskGroup
+from trash import get_trash
+from history import load_baseline
+from planner import choose_extract_dir, estimate_repack_disk, format_bytes, get_timeout
 
 def format_command(cmd):
     """Format a command list for logging, properly handling spaces and quotes."""
     return ' '.join(shlex.quote(str(c)) for c in cmd)
 
+PAK_EXTRACT_DIR = Path(__file__).parent / "PakExtract"
+
+def get_paks_dir(steam_game_download_dir: str) -> Path:
+    """Get the directory holding the game's .pak files."""
+    return Path(steam_game_download_dir) / "DungeonCrawler" / "Content" / "Paks"
+
+def get_parts_dir(pak_extract_dir: Path) -> Path:
+    """Get the directory each pak is extracted into separately before the paks are merged into pak_extract_dir."""
+    return pak_extract_dir.with_name(pak_extract_dir.name + ".parts")
+
+def get_pak_order(paks_dir: Path) -> List[Path]:
+    """
+    Get the .pak files in the order the game mounts them: base paks first, then patch paks (ending in _P),
+    by path within each. A file in a later pak overrides the same file in an earlier one.
+    """
+    return sorted(Path(paks_dir).rglob("*.pak"), key=lambda pak_file: (pak_file.stem.endswith("_P"), pak_file.relative_to(paks_dir).as_posix()))
+
+def merge_tree(source_dir: Path, target_dir: Path) -> None:
+    """Move every file under source_dir to the same relative path under target_dir, replacing existing files, then remove source_dir."""
+    for root, dirs, files in os.walk(source_dir):
+        target_root = Path(target_dir) / Path(root).relative_to(source_dir)
+        target_root.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            os.replace(os.path.join(root, name), target_root / name)
+    for root, dirs, files in os.walk(source_dir, topdown=False):
+        os.rmdir(root)
+
+def get_extract_dir_candidates(options: Options) -> List[Path]:
+    """
+    Get the directories the paks can be extracted to, in order of preference: next to this script,
+    then next to the repacked pak, then next to the game download, which may be on other volumes.
+    """
+    candidates = []
+    for candidate in (PAK_EXTRACT_DIR, Path(options.repack_output_file).parent / "PakExtract", Path(options.steam_game_download_dir).parent / "PakExtract"):
+        if candidate.resolve() not in [c.resolve() for c in candidates]:
+            candidates.append(candidate)
+    return candidates
+
+def get_fingerprint(options: Options, run_state: RunState) -> dict:
+    """
+    Fingerprint the repack inputs: the game manifest, every source pak's size and footer, and the crypto keys.
+    """
+    paks_dir = get_paks_dir(options.steam_game_download_dir)
+    paks = {}
+    if paks_dir.exists():
+        for pak_file in sorted(paks_dir.rglob("*.pak")):
+            paks[pak_file.relative_to(paks_dir).as_posix()] = run_state.pak_signature(pak_file)
+    return {
+        "manifest_id": read_text_file(Path(options.steam_game_download_dir) / "manifest.txt"),
+        "paks": paks,
+        "crypto_json": run_state.hash_file(Path(__file__).parent / "Crypto.json"),
+    }
+
 class Repacker:
     """
     Handles extraction and repacking of Unreal Engine .pak files using UnrealPak.exe.
     """
-    def __init__(self, options: Options) -> None:
+    def __init__(self, options: Options, journal_scope: Optional[JournalScope] = None, pak_extract_dir: Optional[Path] = None, baseline: Optional[dict] = None) -> None:
         self.options = options
+        self.journal_scope = journal_scope
+        # Repack baseline from the run history, scaling the UnrealPak timeouts to the bytes of this run
+        self.baseline = baseline
         self.repack_output_file = options.repack_output_file
         self.ue_install_dir = options.ue_install_dir
         self.steam_game_download_dir = options.steam_game_download_dir
         self.crypto_json = Path(__file__).parent / "Crypto.json"
-        self.pak_extract_dir = Path(__file__).parent / "PakExtract"
+        self.pak_extract_dir = Path(pak_extract_dir) if pak_extract_dir is not None else PAK_EXTRACT_DIR
         self.unrealpak_exe = Path(self.ue_install_dir) / "Engine" / "Binaries" / "Win64" / "UnrealPak.exe"
-        self.paks_dir = Path(self.steam_game_download_dir) / "DungeonCrawler" / "Content" / "Paks"
+        self.paks_dir = get_paks_dir(self.steam_game_download_dir)
         self._validate_setup()
 
     def _validate_setup(self) -> None:
@@ -34,23 +97,84 @@ class Repacker:
             raise FileNotFoundError(f"PAK files directory not found: {self.paks_dir}")
         logger.info(f"Validated UnrealPak.exe, Crypto.json, and PAKs directory.")
 
+    def _is_done(self, unit: str) -> bool:
+        """Check whether an interrupted run already completed a unit of work."""
+        return self.journal_scope is not None and self.journal_scope.is_done(unit)
+
+    def _mark_done(self, unit: str) -> None:
+        if self.journal_scope is not None:
+            self.journal_scope.mark_done(unit)
+
+    def prepare(self):
+        """Remove extraction leftovers of an interrupted run unless that run is being resumed."""
+        resuming = self.journal_scope is not None and self.journal_scope.has_progress()
+        leftovers = self.pak_extract_dir.exists() or get_parts_dir(self.pak_extract_dir).exists()
+        if leftovers and not resuming:
+            logger.info(f"Removing leftover {self.pak_extract_dir} from a previous run")
+            self.cleanup()
+
+    def _extract_pak(self, pak_file: Path, part_dir: Path, timeout: int) -> None:
+        """Extract one pak into its own directory."""
+        cmd = [
+            str(self.unrealpak_exe),
+            f"-cryptokeys={self.crypto_json}",
+            str(pak_file),
+            "-Extract",
+            str(part_dir),
+            "-extracttomountpoint"
+        ]
+        logger.info(f"Extracting {pak_file}")
+        logger.debug(f"Command: {format_command(cmd)}")
+        run_process(options=cmd, name="UnrealPak Extract", timeout=timeout, io_paths=[pak_file, part_dir])
+        self._mark_done(f"extract:{pak_file.relative_to(self.paks_dir).as_posix()}")
+
     def extract_paks(self):
+        """
+        Extract the paks in parallel, each into its own directory, then merge them in mount order.
+
+        How many extractions actually run at once is decided by the resource governor from the CPU
+        count and the throughput of the volumes. Merging in mount order keeps the result the same
+        as extracting one pak after another, whichever extraction finishes first. The largest paks
+        start first, so a big pak doesn't end up extracting alone at the end. If an extraction fails,
+        the others are cancelled rather than left to finish.
+        """
         logger.info(f"Extracting all .pak files from {self.paks_dir} to {self.pak_extract_dir}")
-        for pak_file in Path(self.paks_dir).rglob("*.pak"):
-            cmd = [
-                str(self.unrealpak_exe),
-                f"-cryptokeys={self.crypto_json}",
-                str(pak_file),
-                "-Extract",
-                str(self.pak_extract_dir),
-                "-extracttomountpoint"
-            ]
-            logger.info(f"Extracting {pak_file}")
-            logger.debug(f"Command: {format_command(cmd)}")
-            run_process(options=cmd, name="UnrealPak Extract", timeout=1800)
+        pak_files = get_pak_order(self.paks_dir)
+        parts_dir = get_parts_dir(self.pak_extract_dir)
+        part_dirs = {pak_file: parts_dir / pak_file.relative_to(self.paks_dir).as_posix().replace("/", "_") for pak_file in pak_files}
+
+        pending = []
+        for pak_file in pak_files:
+            relative = pak_file.relative_to(self.paks_dir).as_posix()
+            if self._is_done(f"merge:{relative}") or self._is_done(f"extract:{relative}"):
+                logger.info(f"Skipping {pak_file}, already extracted by the interrupted run")
+            else:
+                pending.append(pak_file)
+
+        if pending:
+            # The baseline times the whole stage, paks extracting side by side and the repack included, so it
+            # doesn't tell how long one pak takes while competing for the disk. Each pak gets the stage's timeout
+            timeout = get_timeout(self.baseline, input_size=sum(pak_file.stat().st_size for pak_file in pak_files))
+            extractions = TaskGroup("extract", max_workers=min(len(pending), os.cpu_count() or 1))
+            for pak_file in pending:
+                extractions.submit(self._extract_pak, pak_file, part_dirs[pak_file], timeout, priority=pak_file.stat().st_size)
+            extractions.run()
+
+        for pak_file in pak_files:
+            unit = f"merge:{pak_file.relative_to(self.paks_dir).as_posix()}"
+            if self._is_done(unit):
+                continue
+            if part_dirs[pak_file].exists():
+                merge_tree(part_dirs[pak_file], self.pak_extract_dir)
+            self._mark_done(unit)
+        if parts_dir.exists():
+            os.rmdir(parts_dir)
         logger.success("Extraction of all .pak files completed.")
 
     def repack(self):
+        if self._is_done("repack") and Path(self.repack_output_file).exists():
+            logger.info(f"Skipping repack, {self.repack_output_file} was already created by the interrupted run")
+            return
         logger.info(f"Repacking {self.repack_output_file} from {self.pak_extract_dir}")
         cmd = [
             str(self.unrealpak_exe),
@@ -61,40 +185,91 @@ class Repacker:
             "-compressionformat=Oodle"
         ]
         logger.debug(f"Command: {' '.join(shlex.quote(str(c)) for c in cmd)}")
-        run_process(options=cmd, name="UnrealPak Repack", timeout=1800)
+        input_bytes = sum(pak_file.stat().st_size for pak_file in get_pak_order(self.paks_dir))
+        run_process(options=cmd, name="UnrealPak Repack", timeout=get_timeout(self.baseline, input_size=input_bytes), io_paths=[self.pak_extract_dir, self.repack_output_file])
+        self._mark_done("repack")
         logger.success("Repacking completed.")
 
     def cleanup(self):
+        """Move the extracted files to the trash, which deletes them in the background while later stages run."""
         logger.info(f"Cleaning up {self.pak_extract_dir}")
-        if self.pak_extract_dir.exists():
-            for root, dirs, files in os.walk(self.pak_extract_dir, topdown=False):
-                for name in files:
-                    os.remove(os.path.join(root, name))
-                for name in dirs:
-                    os.rmdir(os.path.join(root, name))
-            os.rmdir(self.pak_extract_dir)
-        logger.success("Cleanup completed.")
+        trash = get_trash()
+        for extract_dir in (self.pak_extract_dir, get_parts_dir(self.pak_extract_dir)):
+            trash.move(extract_dir)
+        logger.success("Cleanup completed, the extracted files are deleted in the background.")
 
     def run(self):
+        self.prepare()
         self.extract_paks()
+        # The expansion ratio and output size let the planner estimate the disk use of the next repack
+        annotate(extracted_bytes=get_dir_size(self.pak_extract_dir))
         self.repack()
+        annotate(output_bytes=os.path.getsize(self.repack_output_file))
         self.cleanup()
 
 
-def main(options: Optional[Options] = None, repack_output_file: Optional[str] = None):
+def get_extract_dir(options: Options, input_bytes: int, journal_scope: JournalScope, baseline: Optional[dict] = None) -> Path:
+    """
+    Pick where to extract the paks, checking there is room for the extraction and the repacked pak first.
+
+    A resumed run keeps extracting where the interrupted run did. Otherwise the first candidate
+    with room is used, so a full disk is found before extracting rather than 40 minutes into it.
+
+    Args:
+        options (Options): Configuration options
+        input_bytes (int): Bytes of the paks to extract
+        journal_scope (JournalScope): Journal scope of the repack, to find the directory of an interrupted run
+        baseline (dict, optional): Repack baseline from the run history
+
+    Raises:
+        RuntimeError: If no candidate volume has room
+    """
+    candidates = get_extract_dir_candidates(options)
+    if journal_scope.has_progress():
+        for candidate in candidates:
+            if candidate.exists() or get_parts_dir(candidate).exists():
+                return candidate
+
+    extracted_bytes, output_bytes = estimate_repack_disk(options, input_bytes, baseline)
+    pak_extract_dir = choose_extract_dir(options, candidates, extracted_bytes, output_bytes)
+    if pak_extract_dir is None:
+        raise RuntimeError(
+            f"Not enough disk space to repack: extracting needs about {format_bytes(extracted_bytes)} and the repacked pak "
+            f"about {format_bytes(output_bytes)} more, and none of {', '.join(str(c) for c in candidates)} has room"
+        )
+    if pak_extract_dir != candidates[0]:
+        logger.warning(f"Extracting to {pak_extract_dir} because the volume of {candidates[0]} does not have room for about {format_bytes(extracted_bytes)}")
+    return pak_extract_dir
+
+
+def main(options: Optional[Options] = None, repack_output_file: Optional[str] = None, run_state: Optional[RunState] = None, journal: Optional[Journal] = None):
     if options is None:
         raise ValueError("Options must be provided")
     if repack_output_file is None:
         raise ValueError("repack_output_file must be provided")
+    if run_state is None:
+        run_state = RunState()
+    if journal is None:
+        journal = Journal()
     
-    # Check if repack output file exists
-    if Path(repack_output_file).exists() and not options.force_repack:
-        logger.info(f"Repack output file {repack_output_file} already exists and FORCE_REPACK is False. Skipping repack.")
+    # Skip if the source paks are unchanged since the last successful repack
+    fingerprint = get_fingerprint(options, run_state)
+    if not run_state.should_run("repack", repack_output_file, fingerprint, outputs=[repack_output_file], force=options.force_repack):
         return True
 
+    # Repack time scales with the bytes of paks to extract, so regressions are judged per byte
+    input_bytes = sum(signature["size"] for signature in fingerprint["paks"].values())
+    annotate(input_size=input_bytes)
+
     try:
-        repacker = Repacker(options)
+        run_state.begin("repack", repack_output_file)
+        journal_scope = journal.scope("repack", repack_output_file, fingerprint)
+        baseline = load_baseline("repack")
+        pak_extract_dir = get_extract_dir(options, input_bytes, journal_scope, baseline)
+        repacker = Repacker(options, journal_scope, pak_extract_dir, baseline)
         repacker.run()
+        run_state.record("repack", repack_output_file, fingerprint)
+        journal_scope.clear()
         logger.success("Repack process completed successfully!")
         return True
     except Exception as e:
@@ -5,20 +5,44 @@ DarkAndDarker-Exporter Main Runner
 This script orchestrates the complete DarkAndDarker data extraction process:
 1. Dependency Manager - Downloads/updates all required dependencies
 2. Steam Download/Update - Downloads/updates game files via DepotDownloader
-3. DLL Injection for Mapper - Creates mapper file via game injection
-4. BatchExport - Converts game assets to JSON format
+3. Repack - Repacks the game paks into a single pak
+4. Get Mapper - Creates mapper file via UE4SS
+5. BatchExport - Converts game assets to JSON format
+
+Steps run as a stage graph (see pipeline.py), so steps that do not depend on each other run
+at the same time, e.g. Get Mapper runs alongside Repack.
+
+With --watch, the process keeps running and runs the steps whenever Steam has a new manifest.
+With BACKFILL_MANIFEST_IDS, a list of manifests is exported in one pipelined run.
 
 Usage:
     python run.py [options]
 
 Example:
     python run.py --help
+
+Only what is needed to parse options is imported at startup. Stage code is loaded through
+stage_registry when a stage first runs, and the pipeline machinery when a run starts, so --help
+and runs with disabled stages stay fast. Pass --profile-startup to log an import time profile.
 """
 
+from __future__ import annotations
+
 import sys
 import os
 import time
-from typing import Optional
+
+# Must be set up before the imports it profiles, so it is checked before options are parsed
+if "--profile-startup" in sys.argv or os.environ.get("PROFILE_STARTUP", "").lower() in ("1", "true", "yes"):
+    from import_profile import ImportProfiler
+    import_profiler = ImportProfiler()
+    import_profiler.install()
+else:
+    import_profiler = None
+
+import signal
+import threading
+from typing import TYPE_CHECKING, List, Optional
 from argparse import Namespace
 from pathlib import Path
 
@@ -27,60 +51,77 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from optionsconfig import init_options, ArgumentWriter, Options
+from loguru import logger
 import traceback
-from dependency_manager import main as dependency_main
+from stage_registry import load_stage
+
+if TYPE_CHECKING:
+    from pipeline import Stage
+    from run_state import RunState
+    from journal import Journal
+
+# Stages compared against their history. Download times depend on the network and the size of the update instead
+REGRESSION_CHECKED_STAGES = ["repack", "get_mapper", "batch_export"]
 
 
-def run_dependency_manager(options: Options) -> bool:
+def run_dependency_manager(options: Options, dependency: str) -> bool:
     """
-    Run the dependency manager to download/update all required dependencies.
+    Run the dependency manager to download/update a required dependency.
     
     Args:
         options (Options): Configuration options
+        dependency (str): Name of the dependency to install, one of dependency_manager.DEPENDENCIES
         
     Returns:
         bool: True if successful, False otherwise
     """
     start_time = time.time()
-    logger.debug(f"Dependency manager timer started at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))}")
+    logger.debug(f"Dependency manager ({dependency}) timer started at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time))}")
 
     try:
         logger.info("=" * 60)
-        logger.info("STEP 1: DEPENDENCY MANAGER")
+        logger.info(f"STEP 1: DEPENDENCY MANAGER ({dependency})")
         logger.info("=" * 60)
         
-        logger.info("Running dependency manager to ensure all dependencies are up to date...")
-        result = dependency_main(force_download=options.force_download_dependencies)
+        logger.info(f"Running dependency manager to ensure {dependency} is up to date...")
+        install_dependency = load_stage("dependency_manager")
+        result = install_dependency(
+            dependency,
+            force=options.force_download_dependencies,
+            from_lock=options.dependencies_from_lock,
+            mirror_dir=options.dependency_mirror_dir or None,
+        )
         
         end_time = time.time()
         elapsed_time = end_time - start_time
-        logger.debug(f"Dependency manager timer ended at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end_time))}")
-        logger.debug(f"Dependency manager execution time: {elapsed_time:.2f} seconds ({elapsed_time/60:.2f} minutes)")
+        logger.debug(f"Dependency manager ({dependency}) timer ended at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end_time))}")
+        logger.debug(f"Dependency manager ({dependency}) execution time: {elapsed_time:.2f} seconds ({elapsed_time/60:.2f} minutes)")
 
         if not result:
-            logger.error("Dependency manager reported failure.")
+            logger.error(f"Dependency manager reported failure for {dependency}.")
             return False
         
-        logger.success("Dependency manager completed successfully!")
+        logger.success(f"Dependency manager completed successfully for {dependency}!")
         return True
         
     except Exception as e:
         end_time = time.time()
         elapsed_time = end_time - start_time
-        logger.debug(f"Dependency manager timer ended (with error) at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end_time))}")
-        logger.debug(f"Dependency manager execution time before error: {elapsed_time:.2f} seconds ({elapsed_time/60:.2f} minutes)")
+        logger.debug(f"Dependency manager ({dependency}) timer ended (with error) at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end_time))}")
+        logger.debug(f"Dependency manager ({dependency}) execution time before error: {elapsed_time:.2f} seconds ({elapsed_time/60:.2f} minutes)")
         
-        logger.error(f"Dependency manager failed: {e}")
+        logger.error(f"Dependency manager failed for {dependency}: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
 
 
-def run_steam_download_update(options: Options) -> bool:
+def run_steam_download_update(options: Options, manifest_id: Optional[str] = None) -> bool:
     """
     Run DepotDownloader to download/update the latest Dark and Darker game version.
     
     Args:
         options (Options): Configuration options
+        manifest_id (str, optional): Manifest id to download, overriding options.manifest_id. Used by watch mode, which already looked up the latest id
         
     Returns:
         bool: True if successful, False otherwise
@@ -93,7 +134,7 @@ def run_steam_download_update(options: Options) -> bool:
         logger.info("STEP 2: STEAM DOWNLOAD/UPDATE")
         logger.info("=" * 60)
         
-        from steam.run_depot_downloader import DepotDownloader
+        DepotDownloader = load_stage("steam_download")
         
         logger.info("Running DepotDownloader to download/update Dark and Darker...")
         logger.info(f"Target download path: {options.steam_game_download_dir}")
@@ -104,7 +145,8 @@ def run_steam_download_update(options: Options) -> bool:
             steam_password=options.steam_password,
             force=options.force_steam_download,
         )
-        manifest_id = None if options.manifest_id == "" else options.manifest_id
+        if manifest_id is None:
+            manifest_id = None if options.manifest_id == "" else options.manifest_id
         result = downloader.run(manifest_id=manifest_id)
 
         end_time = time.time()
@@ -128,12 +170,14 @@ def run_steam_download_update(options: Options) -> bool:
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
 
-def run_repack(options: Options) -> bool:
+def run_repack(options: Options, run_state: RunState, journal: Journal) -> bool:
     """
     Run the repack process to repack game files into a single archive.
     
     Args:
         options (Options): Configuration options
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        journal (Journal): Journal of completed units of work, for resuming interrupted runs
         
     Returns:
         bool: True if successful, False otherwise
@@ -146,18 +190,10 @@ def run_repack(options: Options) -> bool:
         logger.info("STEP 3: REPACK")
         logger.info("=" * 60)
         
-        # Import with correct module name (handle hyphen in directory name)
-        import importlib.util
-        spec = importlib.util.spec_from_file_location(
-            "repack", 
-            os.path.join(os.path.dirname(__file__), "repack", "repack.py")
-        )
-        repack_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(repack_module)
-        repack_main = repack_module.main
+        repack_main = load_stage("repack")
         
         logger.info("Running repack process to repack game files...")
-        result = repack_main(options, options.repack_output_file)
+        result = repack_main(options, options.repack_output_file, run_state, journal)
         
         end_time = time.time()
         elapsed_time = end_time - start_time
@@ -181,12 +217,14 @@ def run_repack(options: Options) -> bool:
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
 
-def run_get_mapper(options: Options) -> bool:
+def run_get_mapper(options: Options, run_state: RunState, journal: Journal) -> bool:
     """
     Run the mapper extraction process.
     
     Args:
         options (Options): Configuration options
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        journal (Journal): Journal of completed units of work, for resuming interrupted runs
         
     Returns:
         bool: True if successful, False otherwise
@@ -199,18 +237,10 @@ def run_get_mapper(options: Options) -> bool:
         logger.info("STEP 4: GET MAPPER")
         logger.info("=" * 60)
         
-        # Import with correct module name (handle hyphen in directory name)
-        import importlib.util
-        spec = importlib.util.spec_from_file_location(
-            "get_mapper", 
-            os.path.join(os.path.dirname(__file__), "mapper", "get_mapper.py")
-        )
-        get_mapper_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(get_mapper_module)
-        get_mapper_main = get_mapper_module.main
+        get_mapper_main = load_stage("get_mapper")
         
         logger.info("Running mapper extraction process...")
-        result = get_mapper_main(options)
+        result = get_mapper_main(options, run_state, journal)
         
         end_time = time.time()
         elapsed_time = end_time - start_time
@@ -234,13 +264,15 @@ def run_get_mapper(options: Options) -> bool:
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
 
-def run_batch_export(options: Options, mapper_file_path: str) -> bool:
+def run_batch_export(options: Options, mapper_file_path: str, run_state: RunState, journal: Journal) -> bool:
     """
     Run BatchExport to convert game assets to JSON format.
     
     Args:
         options (Options): Configuration options
         mapper_file_path (str): Path to the mapper file
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        journal (Journal): Journal of completed units of work, for resuming interrupted runs
         
     Returns:
         bool: True if successful, False otherwise
@@ -250,25 +282,22 @@ def run_batch_export(options: Options, mapper_file_path: str) -> bool:
     
     try:
         logger.info("=" * 60)
-        logger.info("STEP 4: BATCHEXPORT")
+        logger.info("STEP 5: BATCHEXPORT")
         logger.info("=" * 60)
         
-        # Import with correct module name (handle hyphen in directory name)
-        import importlib.util
-        spec = importlib.util.spec_from_file_location(
-            "run_batch_export", 
-            os.path.join(os.path.dirname(__file__), "batch_export", "run_batch_export.py")
-        )
-        run_batch_export_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(run_batch_export_module)
-        batchexport_main = run_batch_export_module.main
+        batchexport_main = load_stage("batch_export")
+        
+        # If skipped mapper creation, use the expected output path
+        if not os.path.exists(mapper_file_path):
+            logger.error(f"Mapper file not found at {mapper_file_path}. Cannot skip mapper creation for BatchExport.")
+            return False
         
         logger.info("Running BatchExport to convert game assets to JSON...")
         logger.info(f"Using mapper file: {mapper_file_path}")
         logger.info(f"Source PAK files: {options.steam_game_download_dir}")
         logger.info(f"Output JSON directory: {options.output_data_dir}")
         
-        result = batchexport_main(options, mapper_file_path)
+        result = batchexport_main(options, mapper_file_path, run_state, journal)
         
         end_time = time.time()
         elapsed_time = end_time - start_time
@@ -293,6 +322,381 @@ def run_batch_export(options: Options, mapper_file_path: str) -> bool:
         return False
 
 
+def build_dependency_stages(options: Options) -> List[Stage]:
+    """
+    Build one stage per dependency, each producing an artifact named after the dependency.
+    
+    Args:
+        options (Options): Configuration options
+        
+    Returns:
+        list[Stage]: Dependency stages
+    """
+    from pipeline import Stage
+    if not options.should_download_dependencies:
+        return []  # Also skips importing the dependency manager
+    from dependency_manager import DEPENDENCIES
+    stages = []
+    for dependency in DEPENDENCIES:
+        stages.append(Stage(
+            name=f"dependency_manager.{dependency}",
+            func=lambda dependency=dependency: run_dependency_manager(options, dependency),
+            outputs=[dependency],
+        ))
+    return stages
+
+
+def build_stages(options: Options, run_state: RunState, journal: Journal, manifest_id: Optional[str] = None) -> List[Stage]:
+    """
+    Build the stage graph for the enabled steps.
+    
+    Inputs and outputs name the artifacts passed between stages. A stage waits only for the
+    enabled stages producing its inputs, so e.g. Get Mapper runs alongside Repack, and the
+    BatchExport and UE4SS dependency checks run alongside the Steam download.
+    
+    Args:
+        options (Options): Configuration options
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        journal (Journal): Journal of completed units of work, for resuming interrupted runs
+        manifest_id (str, optional): Manifest id to download, overriding options.manifest_id
+        
+    Returns:
+        list[Stage]: Stages of the pipeline
+    """
+    from pipeline import Stage
+    stages = build_dependency_stages(options)
+    stages += [
+        Stage(
+            name="steam_download",
+            func=lambda: run_steam_download_update(options, manifest_id),
+            inputs=["DepotDownloader"],
+            outputs=["steam_game"],
+            enabled=options.should_download_steam_game,
+        ),
+        Stage(
+            name="repack",
+            func=lambda: run_repack(options, run_state, journal),
+            inputs=["steam_game"],
+            outputs=["repack_output_file"],
+            enabled=options.should_repack,
+        ),
+        Stage(
+            name="get_mapper",
+            func=lambda: run_get_mapper(options, run_state, journal),
+            inputs=["steam_game", "UE4SS"],
+            outputs=["output_mapper_file"],
+            enabled=options.should_get_mapper,
+        ),
+        Stage(
+            name="batch_export",
+            func=lambda: run_batch_export(options, options.output_mapper_file, run_state, journal),
+            inputs=["BatchExport", "repack_output_file", "output_mapper_file"],
+            outputs=["output_data_dir"],
+            enabled=options.should_batch_export,
+        ),
+    ]
+    return stages
+
+
+def build_backfill_stages(options: Options, manifest_ids: List[str], run_state: RunState, journal: Journal) -> List[Stage]:
+    """
+    Build the stage graph for backfilling several manifests, each into its own version directory.
+    
+    Every manifest gets its own download, repack, get mapper, export, and cleanup stages. Stages of
+    the same kind share a lane, so one manifest downloads while the previous one repacks and the one
+    before that exports. Downloads wait for a BackfillGate, which limits how many versions are
+    staged on disk at once.
+    
+    Args:
+        options (Options): Configuration options
+        manifest_ids (list[str]): Manifests to export, in order
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        journal (Journal): Journal of completed units of work, for resuming interrupted runs
+        
+    Returns:
+        list[Stage]: Stages of the pipeline
+    """
+    from pipeline import Stage
+    from backfill import BackfillGate, GB, get_dir_size, stage_name, version_options
+    stage_names = {
+        manifest_id: [stage_name(stage, manifest_id) for stage in ("steam_download", "repack", "get_mapper", "batch_export", "cleanup")]
+        for manifest_id in manifest_ids
+    }
+    gate = BackfillGate(
+        manifest_ids,
+        stage_names,
+        download_dir=options.steam_game_download_dir,
+        max_staged=options.backfill_max_staged,
+        min_free_bytes=options.backfill_min_free_gb * GB,
+    )
+
+    def build_version_stages(manifest_id: str) -> List[Stage]:
+        version = version_options(options, manifest_id)
+        artifact = lambda name: f"{name}[{manifest_id}]"
+
+        def download() -> bool:
+            if not run_steam_download_update(version, manifest_id):
+                return False
+            gate.record_version_size(get_dir_size(version.steam_game_download_dir))
+            return True
+
+        return [
+            Stage(
+                name=stage_name("steam_download", manifest_id),
+                func=download,
+                inputs=["DepotDownloader"],
+                outputs=[artifact("steam_game")],
+                lane="steam_download",
+                admit=lambda results: gate.admit(manifest_id, results),
+            ),
+            Stage(
+                name=stage_name("repack", manifest_id),
+                func=lambda: run_repack(version, run_state, journal),
+                inputs=[artifact("steam_game")],
+                outputs=[artifact("repack_output_file")],
+                enabled=options.should_repack,
+                lane="repack",
+            ),
+            Stage(
+                name=stage_name("get_mapper", manifest_id),
+                func=lambda: run_get_mapper(version, run_state, journal),
+                inputs=[artifact("steam_game"), "UE4SS"],
+                outputs=[artifact("output_mapper_file")],
+                enabled=options.should_get_mapper,
+                lane="get_mapper",
+            ),
+            Stage(
+                name=stage_name("batch_export", manifest_id),
+                func=lambda: run_batch_export(version, version.output_mapper_file, run_state, journal),
+                inputs=["BatchExport", artifact("repack_output_file"), artifact("output_mapper_file")],
+                outputs=[artifact("output_data_dir")],
+                enabled=options.should_batch_export,
+                lane="batch_export",
+            ),
+            Stage(
+                name=stage_name("cleanup", manifest_id),
+                func=lambda: run_backfill_cleanup(version),
+                inputs=[artifact(name) for name in ("steam_game", "repack_output_file", "output_mapper_file", "output_data_dir")],
+                enabled=not options.backfill_keep_downloads,
+            ),
+        ]
+
+    stages = build_dependency_stages(options)
+    for manifest_id in manifest_ids:
+        stages += build_version_stages(manifest_id)
+    return stages
+
+
+def run_backfill_cleanup(options: Options) -> bool:
+    """
+    Remove the intermediates of a backfilled version once all its steps succeeded, freeing room for the next version.
+    
+    The downloaded game files are always removed. The repacked pak is removed only if BatchExport
+    consumed it, otherwise it is the version's output.
+    
+    Args:
+        options (Options): Options of the version, from backfill.version_options
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    import shutil
+    try:
+        removable = [Path(options.steam_game_download_dir)]
+        if options.should_batch_export and options.repack_output_file:
+            removable.append(Path(options.repack_output_file))
+        for path in removable:
+            if path.is_dir():
+                logger.info(f"Removing backfill intermediate {path}")
+                shutil.rmtree(path)
+            elif path.exists():
+                logger.info(f"Removing backfill intermediate {path}")
+                path.unlink()
+        return True
+    except Exception as e:
+        logger.error(f"Backfill cleanup failed for {options.manifest_id}: {e}")
+        return False
+
+
+def run_pipeline(options: Options, stages: List[Stage], report_file: Path, manifest_id: Optional[str] = None) -> bool:
+    """
+    Run a stage graph, overlapping the stages that do not depend on each other.
+    
+    Args:
+        options (Options): Configuration options
+        stages (list[Stage]): Stages to run, from build_stages or build_backfill_stages
+        report_file (Path): JSON file to write the resource report of the run to
+        manifest_id (str, optional): Manifest id the run is for, recorded in the run history
+        
+    Returns:
+        bool: True if every enabled step succeeded, False otherwise
+    """
+    import telemetry
+    from pipeline import Pipeline, STATUS_FAILED, STATUS_SKIPPED
+    from supervisor import get_supervisor
+    from governor import get_governor
+    from run_state import read_text_file
+    run_telemetry = telemetry.Telemetry()
+    telemetry.activate(run_telemetry)
+    pipeline = Pipeline(stages, telemetry=run_telemetry)
+    get_supervisor().prune()  # The report covers this run, not the processes of earlier runs or --watch polls
+    get_governor().reset_limits()
+    try:
+        success = pipeline.run()
+    finally:
+        telemetry.activate(None)
+        report = run_telemetry.write_report(report_file, statuses=pipeline.results)
+
+    get_supervisor().log_report()
+    get_supervisor().prune()
+    if not success:
+        failed = [name for name, status in pipeline.results.items() if status in (STATUS_FAILED, STATUS_SKIPPED)]
+        logger.error(f"Pipeline did not complete. Failed or skipped stages: {', '.join(failed)}")
+
+    if manifest_id is None and options.steam_game_download_dir:
+        manifest_id = read_text_file(Path(options.steam_game_download_dir) / "manifest.txt")
+    if not check_performance(options, report, success, version=Path(report_file).name.split(".")[0], manifest_id=manifest_id):
+        return False
+    return success
+
+
+def check_performance(options: Options, report: dict, success: bool, version: Optional[str] = None, manifest_id: Optional[str] = None) -> bool:
+    """
+    Record a run in the history database and warn about stages that got slower than their baseline.
+    
+    Args:
+        options (Options): Configuration options
+        report (dict): Telemetry report of the run
+        success (bool): Whether the run succeeded
+        version (str, optional): Game version the run was for
+        manifest_id (str, optional): Manifest id the run was for
+        
+    Returns:
+        bool: False if FAIL_ON_REGRESSION is set and a stage regressed, True otherwise
+    """
+    try:
+        from history import RunHistory
+        from dependency_manager import get_installed_versions
+        history = RunHistory()
+        try:
+            run_id = history.record_run(report, success, get_installed_versions(), version=version, manifest_id=manifest_id)
+            regressions = history.find_regressions(run_id, options.regression_threshold, stages=REGRESSION_CHECKED_STAGES)
+        finally:
+            history.close()
+    except Exception as e:
+        # Losing the history should never fail an otherwise good run
+        logger.warning(f"Could not update run history: {e}")
+        return True
+
+    for regression in regressions:
+        changed = ", ".join(f"{name} {versions['from']} -> {versions['to']}" for name, versions in regression["changed_dependencies"].items())
+        logger.warning(
+            f"Performance regression in {regression['stage']}: took {regression['wall_seconds']:.1f}s, "
+            f"expected {regression['expected_seconds']:.1f}s from the last {regression['baseline_runs']} runs ({regression['ratio']:.2f}x)"
+            + (f". Dependencies changed since then: {changed}" if changed else "")
+        )
+
+    if regressions and options.fail_on_regression:
+        logger.error(f"Failing the run because of {len(regressions)} performance regression(s) and FAIL_ON_REGRESSION is set")
+        return False
+    return True
+
+
+def check_plan(options: Options, run_state: RunState) -> bool:
+    """
+    Plan the run and check every volume has room for it, logging the plan if PLAN is set.
+    
+    Args:
+        options (Options): Configuration options
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        
+    Returns:
+        bool: False if the run would run out of disk space, True otherwise
+    """
+    from planner import build_plan, check_disk, format_plan
+    try:
+        plans = build_plan(options, run_state)
+        problems = check_disk(plans)
+    except Exception as e:
+        if options.plan:
+            raise
+        # The plan is only a precaution, Repack checks its disk space again before extracting
+        logger.warning(f"Could not plan the run, starting without checking disk space: {e}")
+        return True
+    if options.plan:
+        logger.info(format_plan(plans, problems))
+    elif problems:
+        for problem in problems:
+            logger.error(f"Not enough disk space: {problem}")
+        logger.error("Not starting the run. Free up space, or run with --plan to see what each step needs.")
+    return not problems
+
+
+def run_watch(options: Options, run_state: RunState, journal: Journal, report_file: Path) -> bool:
+    """
+    Poll Steam for new manifests and run the pipeline for each one until interrupted.
+    
+    Args:
+        options (Options): Configuration options
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        journal (Journal): Journal of completed units of work, for resuming interrupted runs
+        report_file (Path): JSON file to write the resource report of the latest run to
+        
+    Returns:
+        bool: False if watch mode cannot start, otherwise only returns via KeyboardInterrupt
+    """
+    if not options.should_download_steam_game:
+        logger.error("WATCH requires SHOULD_DOWNLOAD_STEAM_GAME to detect new manifests.")
+        return False
+    if options.manifest_id:
+        logger.error("WATCH cannot be used with a fixed MANIFEST_ID.")
+        return False
+
+    # Each manifest runs the dependency steps again, which don't need to ask GitHub every time
+    import http_client
+    http_client.configure(metadata_ttl=http_client.WATCH_METADATA_TTL)
+
+    # Polling needs DepotDownloader before the first pipeline run would install it
+    if options.should_download_dependencies and not run_dependency_manager(options, "DepotDownloader"):
+        return False
+
+    from watch import Watcher
+    watcher = Watcher(
+        options,
+        run_pipeline=lambda manifest_id: run_pipeline(options, build_stages(options, run_state, journal, manifest_id), report_file, manifest_id),
+        interval=options.watch_interval,
+        jitter=options.watch_jitter,
+    )
+    watcher.run()
+    return True
+
+
+def run_backfill(options: Options, run_state: RunState, journal: Journal, report_file: Path) -> bool:
+    """
+    Export every manifest in BACKFILL_MANIFEST_IDS in one pipelined run.
+    
+    Args:
+        options (Options): Configuration options
+        run_state (RunState): Run state holding the fingerprints of previous runs
+        journal (Journal): Journal of completed units of work, for resuming interrupted runs
+        report_file (Path): JSON file to write the resource report of the run to
+        
+    Returns:
+        bool: True if every manifest was exported, False otherwise
+    """
+    if not options.should_download_steam_game:
+        logger.error("BACKFILL_MANIFEST_IDS requires SHOULD_DOWNLOAD_STEAM_GAME to download each manifest.")
+        return False
+    if options.watch or options.manifest_id:
+        logger.error("BACKFILL_MANIFEST_IDS cannot be combined with WATCH or MANIFEST_ID.")
+        return False
+
+    from backfill import parse_manifest_ids
+    manifest_ids = parse_manifest_ids(options.backfill_manifest_ids)
+    logger.info(f"Backfilling {len(manifest_ids)} manifest(s) with up to {options.backfill_max_staged} staged at once: {', '.join(manifest_ids)}")
+    return run_pipeline(options, build_backfill_stages(options, manifest_ids, run_state, journal), report_file)
+
+
 def validate_environment(options: Options) -> bool:
     """
     Validate that all required environment variables and paths are properly configured.
@@ -317,6 +721,11 @@ def validate_environment(options: Options) -> bool:
         return False
 
 
+def handle_termination(signum, frame) -> None:
+    """Handle SIGTERM like Ctrl+C so the run shuts down the same way."""
+    raise KeyboardInterrupt(f"Received signal {signum}")
+
+
 def main(args: Namespace, log_file: str) -> bool:
     """
     Main function to run the complete DarkAndDarker-Exporter process.
@@ -325,6 +734,9 @@ def main(args: Namespace, log_file: str) -> bool:
         bool: True if all steps completed successfully, False otherwise
     """
     overall_start_time = time.time()
+    journal = None
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, handle_termination)
 
     # Initialize basic loguru logger early for startup messages
     from loguru import logger as temp_logger
@@ -339,55 +751,55 @@ def main(args: Namespace, log_file: str) -> bool:
         global logger
         from optionsconfig import logger
         
+        if import_profiler is not None:
+            logger.info(import_profiler.report())
+        
         # Validate environment
         if not validate_environment(options):
             logger.error("Environment validation failed. Cannot continue.")
             return False
         
-        # Step 1: Dependency Manager
-        if options.should_download_dependencies:
-            if not run_dependency_manager(options):
-                logger.error("Dependency manager failed. Cannot continue.")
-                return False
-        else:
-            logger.info("Skipping dependency manager step...")
-        
-        # Step 2: Steam Download/Update
-        if options.should_download_steam_game:
-            if not run_steam_download_update(options):
-                logger.error("Steam download/update failed. Cannot continue.")
-                return False
-        else:
-            logger.info("Skipping steam download/update step...")
+        import governor
+        import output_sink
+        import process_runner
+        import process_profile
+        governor.configure(cpu_slots=options.cpu_slots, io_slots=options.io_slots_per_volume)
+        output_sink.configure(spool_dir=Path(log_file).with_suffix(".processes"), lines_per_second=options.process_log_lines_per_second)
+        process_runner.configure(idle_timeout=options.process_idle_timeout)
+        import dependency_store
+        dependency_store.configure(max_size=options.dependency_store_max_size * 1024 * 1024)
+        try:
+            process_profile.configure(default=options.process_profile, stages={
+                "steam_download": options.steam_download_process_profile,
+                "repack": options.repack_process_profile,
+                "batch_export": options.batch_export_process_profile,
+            })
+        except ValueError as e:
+            logger.error(f"Invalid process profile: {e}")
+            return False
+        from trash import get_trash
+        get_trash().recover()  # Deletes what a stopped run left in the trash while this run goes on
+        
+        from run_state import RunState
+        from journal import Journal
+        run_state = RunState()
+        journal = Journal(resume=options.resume)
+        report_file = Path(log_file).with_suffix(".report.json")
+        if options.plan and (options.backfill_manifest_ids or options.watch):
+            logger.error("PLAN only plans a single run and cannot be combined with BACKFILL_MANIFEST_IDS or WATCH.")
+            return False
+        if options.backfill_manifest_ids:
+            return run_backfill(options, run_state, journal, report_file)
+        if options.watch:
+            return run_watch(options, run_state, journal, report_file)
 
-        # Step 3: Repack
-        if options.should_repack:
-            if not run_repack(options):
-                logger.error("Repack failed. Cannot continue.")
-                return False
-        else:
-            logger.info("Skipping repack step...")
+        if not check_plan(options, run_state):
+            return False
+        if options.plan:
+            return True
 
-        # Step 4: Get Mapper
-        if options.should_get_mapper:
-            if not run_get_mapper(options):
-                logger.error("Get mapper failed. Cannot continue.")
-                return False
-        else:
-            logger.info("Skipping mapper extraction step...")
-
-        # Step 5: BatchExport
-        if options.should_batch_export:
-            # If skipped mapper creation, use the expected output path
-            mapper_file_path = options.output_mapper_file
-            if not os.path.exists(mapper_file_path):
-                logger.error(f"Mapper file not found at {mapper_file_path}. Cannot skip mapper creation for BatchExport.")
-                return False
-            if not run_batch_export(options, mapper_file_path):
-                logger.error("BatchExport failed.")
-                return False
-        else:
-            logger.info("Skipping batch export step...")
+        if not run_pipeline(options, build_stages(options, run_state, journal), report_file):
+            return False
         
         # Success!
         overall_end_time = time.time()
@@ -401,8 +813,21 @@ def main(args: Namespace, log_file: str) -> bool:
         
         return True
         
-    except KeyboardInterrupt:
-        logger.warning("Process interrupted by user (Ctrl+C)")
+    except KeyboardInterrupt as e:
+        logger.warning(f"Process interrupted: {e or 'Ctrl+C'}")
+        # Stop running tools so their stages fail now instead of finishing in the background,
+        # and stop the governor so stages waiting for a slot don't start new ones
+        from utils import kill_child_processes
+        from supervisor import get_supervisor
+        import governor
+        governor.get_governor().shutdown()
+        get_supervisor().cancel_all("interrupted")
+        kill_child_processes()  # Anything not started through run_process
+        get_supervisor().log_report()
+        if journal is not None:
+            journal.close()
+            if journal.has_progress():
+                logger.warning(f"Progress was saved to {journal.journal_file}. Rerun with --resume to continue from the last completed unit.")
         return False
     except Exception as e:
         overall_end_time = time.time()
@@ -413,6 +838,14 @@ def main(args: Namespace, log_file: str) -> bool:
         logger.error(f"Unexpected error in main process: {e}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
+    finally:
+        if journal is not None:
+            journal.close()
+        import trash
+        trash.finish()
+        if import_profiler is not None:
+            # Again at the end, to include the stage code loaded during the run
+            logger.info(import_profiler.report())
     
 def get_log_file_path(args: Namespace) -> Optional[str]:
     """
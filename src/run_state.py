@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from loguru import logger
+
+from telemetry import annotate
+
+"""
+Persistent run state for deciding whether a stage needs to run.
+
+Each stage records a fingerprint of its inputs (manifest id, dependency versions, pak footers and
+sizes, mapper hash, ...) after it succeeds. On the next run the stage is skipped only if its
+fingerprint is unchanged and its outputs still exist, and the reason for running or skipping is logged.
+"""
+
+STATE_DIR = Path(".state")
+PAK_FOOTER_SIZE = 4096  # Pak index info lives at the end of the file, so hashing the tail changes whenever the pak does
+
+
+def read_text_file(file: Union[str, Path]) -> Optional[str]:
+    """Read a small text file such as manifest.txt or version.txt, returning None if it doesn't exist."""
+    try:
+        return Path(file).read_text().strip()
+    except (FileNotFoundError, OSError):
+        return None
+
+
+class RunState:
+    """
+    Stores stage fingerprints and a file hash cache in a JSON file.
+
+    Safe to share between stages running at the same time.
+    """
+
+    def __init__(self, state_file: Optional[Union[str, Path]] = None) -> None:
+        """
+        Args:
+            state_file (str or Path, optional): JSON file to persist state to. Defaults to .state/run_state.json in the cwd.
+        """
+        self.state_file = Path(state_file) if state_file is not None else STATE_DIR / "run_state.json"
+        self._lock = threading.RLock()
+        self.stages: Dict[str, dict] = {}
+        self.file_hashes: Dict[str, dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Load the state file if it exists."""
+        if not self.state_file.exists():
+            return
+        try:
+            data = json.loads(self.state_file.read_text())
+            self.stages = data.get("stages", {})
+            self.file_hashes = data.get("file_hashes", {})
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read run state {self.state_file}, starting fresh: {e}")
+
+    def save(self) -> None:
+        """Atomically write the state file."""
+        with self._lock:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.state_file.with_name(self.state_file.name + ".tmp")
+            temp_file.write_text(json.dumps({"stages": self.stages, "file_hashes": self.file_hashes}, indent=2, sort_keys=True))
+            os.replace(temp_file, self.state_file)
+
+    @staticmethod
+    def _key(stage: str, target: Union[str, Path]) -> str:
+        """Stage records are keyed by stage and output so that separate output locations don't overwrite each other."""
+        return f"{stage}|{Path(target).as_posix()}"
+
+    ###############################
+    #         Fingerprints        #
+    ###############################
+
+    def hash_file(self, file: Union[str, Path]) -> str:
+        """
+        Get the SHA-256 of a file, reusing the cached hash while its size and mtime are unchanged.
+
+        Args:
+            file (str or Path): File to hash
+
+        Returns:
+            str: Hex digest
+        """
+        path = Path(file)
+        stat = path.stat()
+        cache_key = str(path.resolve())
+        with self._lock:
+            cached = self.file_hashes.get(cache_key)
+            if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+                return cached["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+
+        with self._lock:
+            self.file_hashes[cache_key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+    @staticmethod
+    def pak_signature(file: Union[str, Path]) -> dict:
+        """
+        Get a cheap content signature of a .pak file from its size and footer.
+
+        Args:
+            file (str or Path): .pak file
+
+        Returns:
+            dict: Size and SHA-256 of the last PAK_FOOTER_SIZE bytes
+        """
+        path = Path(file)
+        size = path.stat().st_size
+        with open(path, "rb") as f:
+            f.seek(max(size - PAK_FOOTER_SIZE, 0))
+            footer = f.read()
+        return {"size": size, "footer_sha256": hashlib.sha256(footer).hexdigest()}
+
+    ###############################
+    #            Stages           #
+    ###############################
+
+    def explain(self, stage: str, target: Union[str, Path], fingerprint: dict, outputs: Optional[List[Union[str, Path]]] = None, force: bool = False) -> Tuple[bool, str]:
+        """
+        Decide whether a stage needs to run, without logging or side effects.
+
+        Args:
+            stage (str): Stage name, e.g. "repack"
+            target (str or Path): Primary output of the stage, distinguishing separate runs of the same stage
+            fingerprint (dict): JSON-serializable description of the stage's inputs
+            outputs (list, optional): Files or directories that must exist for the stage to be skipped
+            force (bool): Run regardless of the recorded fingerprint
+
+        Returns:
+            tuple[bool, str]: True if the stage should run, and the reason it runs or is skipped
+        """
+        if force:
+            return True, "force option is set"
+
+        with self._lock:
+            record = self.stages.get(self._key(stage, target))
+
+        if record is None:
+            return True, f"no previous successful run recorded for {target}"
+
+        for output in outputs or []:
+            if not os.path.exists(output):
+                return True, f"output {output} is missing"
+            if os.path.isdir(output) and not os.listdir(output):
+                return True, f"output directory {output} is empty"
+
+        previous = record["fingerprint"]
+        changed = sorted(key for key in set(previous) | set(fingerprint) if previous.get(key) != fingerprint.get(key))
+        if changed:
+            return True, f"inputs changed since last run ({', '.join(changed)})"
+
+        recorded_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record["recorded_at"]))
+        return False, f"inputs unchanged since the successful run at {recorded_at}"
+
+    def should_run(self, stage: str, target: Union[str, Path], fingerprint: dict, outputs: Optional[List[Union[str, Path]]] = None, force: bool = False) -> bool:
+        """
+        Decide whether a stage needs to run, logging why it runs or is skipped.
+
+        Args:
+            stage (str): Stage name, e.g. "repack"
+            target (str or Path): Primary output of the stage, distinguishing separate runs of the same stage
+            fingerprint (dict): JSON-serializable description of the stage's inputs
+            outputs (list, optional): Files or directories that must exist for the stage to be skipped
+            force (bool): Run regardless of the recorded fingerprint
+
+        Returns:
+            bool: True if the stage should run, False if it can be skipped
+        """
+        run, reason = self.explain(stage, target, fingerprint, outputs, force)
+        if run:
+            logger.info(f"Running {stage}: {reason}")
+            return True
+        logger.info(f"Skipping {stage}: {reason}")
+        annotate(up_to_date=True)
+        return False
+
+    def begin(self, stage: str, target: Union[str, Path]) -> None:
+        """
+        Forget the recorded fingerprint of a stage that is about to run, so a run that dies
+        halfway is never mistaken for a finished one.
+        """
+        with self._lock:
+            if self.stages.pop(self._key(stage, target), None) is not None:
+                self.save()
+
+    def record(self, stage: str, target: Union[str, Path], fingerprint: dict) -> None:
+        """
+        Record the fingerprint of a stage that completed successfully.
+
+        Args:
+            stage (str): Stage name
+            target (str or Path): Primary output of the stage
+            fingerprint (dict): Fingerprint the stage ran with
+        """
+        with self._lock:
+            self.stages[self._key(stage, target)] = {"fingerprint": fingerprint, "recorded_at": time.time()}
+            self.save()
+        logger.debug(f"Recorded {stage} fingerprint for {target}")
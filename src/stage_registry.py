@@ -0,0 +1,44 @@
+import time
+import importlib
+from typing import Any
+from loguru import logger
+
+"""
+Lazy registry of stage entry points.
+
+Stage code (and the libraries it pulls in, e.g. urllib and zipfile for the dependency manager)
+is imported the first time a stage runs, so --help, watch mode polling, and runs with disabled
+stages never pay for it.
+"""
+
+# Stage name -> "module:attribute", importable with src on sys.path
+STAGE_ENTRY_POINTS = {
+    "dependency_manager": "dependency_manager:install_dependency",
+    "steam_download": "steam.run_depot_downloader:DepotDownloader",
+    "repack": "repack.repack:main",
+    "get_mapper": "mapper.get_mapper:main",
+    "batch_export": "batch_export.run_batch_export:main",
+}
+
+
+def load_stage(name: str) -> Any:
+    """
+    Import a stage's entry point on first use.
+
+    Args:
+        name (str): Stage name, one of STAGE_ENTRY_POINTS
+
+    Returns:
+        The stage's entry point, usually its main function
+
+    Raises:
+        ValueError: If no stage with that name is registered
+    """
+    if name not in STAGE_ENTRY_POINTS:
+        raise ValueError(f"Unknown stage: {name}. Registered stages: {', '.join(STAGE_ENTRY_POINTS)}")
+    module_name, attribute = STAGE_ENTRY_POINTS[name].split(":")
+
+    start_time = time.perf_counter()
+    module = importlib.import_module(module_name)  # Cached in sys.modules after the first call
+    logger.debug(f"Loaded stage {name} from {module_name} in {(time.perf_counter() - start_time) * 1000:.1f} ms")
+    return getattr(module, attribute)
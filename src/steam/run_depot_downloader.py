@@ -3,6 +3,8 @@ import shutil
 from pathlib import Path
 from loguru import logger
 from utils import run_process
+from planner import NO_HISTORY_TIMEOUT
+from telemetry import annotate
 from typing import Optional
 
 APP_ID = '2016590'  # dark and darker's app_id
@@ -36,6 +38,7 @@ class DepotDownloader:
         downloaded_manifest_id = self._read_downloaded_manifest_id()
         if downloaded_manifest_id == manifest_id and not self.force:
             logger.info(f'Already downloaded manifest {manifest_id}')
+            annotate(up_to_date=True)
             return True
 
         self._download(manifest_id)
@@ -57,7 +60,9 @@ class DepotDownloader:
             '-remember-password',
             '-dir', self.dad_dir,
         ]
-        run_process(subprocess_options, name='download-game-files')
+        # The size of an update isn't known before downloading it, so earlier runs don't predict how long this one
+        # takes. The timeout stays generous and a stalled download is stopped by the idle watchdog instead
+        run_process(subprocess_options, name='download-game-files', timeout=NO_HISTORY_TIMEOUT, io_paths=[self.dad_dir])
 
         #TODO, verify files are downloaded
 
@@ -0,0 +1,405 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+
+from telemetry import in_current_stage
+from utils import kill_process_tree
+
+"""
+Supervisor of the processes started through run_process.
+
+Every process is registered with the supervisor, in the process group of the thread that started
+it. Groups nest: each pipeline stage runs in a group of its own, and parallel work within a stage
+(e.g. one UnrealPak extraction per pak) runs in a TaskGroup inside it. When work in a group fails,
+or the run is interrupted with Ctrl+C, the process trees still running in that group are cancelled
+with kill_process_tree (terminate, then kill whatever is left), so no orphaned tool keeps using the
+disk. How every process ended is kept and logged at the end of the run.
+
+A TaskGroup runs its tasks on at most max_workers threads, highest priority first. The priority
+of the task also orders the waits for the governor's slots, so the processes of urgent work get
+the next free CPU or I/O slot.
+"""
+
+OUTCOME_RUNNING = "running"
+OUTCOME_SUCCEEDED = "succeeded"
+OUTCOME_FAILED = "failed"
+OUTCOME_TIMED_OUT = "timed out"
+OUTCOME_STALLED = "stalled"
+OUTCOME_OVER_MEMORY = "over memory limit"
+OUTCOME_CANCELLED = "cancelled"
+
+_supervisor: Optional["Supervisor"] = None
+_supervisor_lock = threading.Lock()
+
+
+def get_outcome(error: BaseException) -> str:
+    """Get the outcome of a process whose run raised an error."""
+    from process_runner import ProcessStalledError, ProcessMemoryError
+    if isinstance(error, ProcessStalledError):
+        return OUTCOME_STALLED
+    if isinstance(error, ProcessMemoryError):
+        return OUTCOME_OVER_MEMORY
+    if isinstance(error, TimeoutError):
+        return OUTCOME_TIMED_OUT
+    if isinstance(error, KeyboardInterrupt):
+        return OUTCOME_CANCELLED
+    return OUTCOME_FAILED
+
+
+def get_supervisor() -> "Supervisor":
+    """Get the supervisor used by run_process."""
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = Supervisor()
+        return _supervisor
+
+
+class ProcessGroup:
+    """Processes (and nested groups) that are cancelled together."""
+
+    def __init__(self, name: str, parent: Optional["ProcessGroup"] = None) -> None:
+        """
+        Args:
+            name (str): Name used in logs
+            parent (ProcessGroup, optional): Group this group is part of
+        """
+        self.name = name
+        self.parent = parent
+        self.cancelled = False
+
+    @property
+    def is_cancelled(self) -> bool:
+        """Check whether this group or a group it is nested in was cancelled."""
+        group = self
+        while group is not None:
+            if group.cancelled:
+                return True
+            group = group.parent
+        return False
+
+    def contains(self, group: Optional["ProcessGroup"]) -> bool:
+        """Check whether a group is this group or nested in it."""
+        while group is not None:
+            if group is self:
+                return True
+            group = group.parent
+        return False
+
+    @property
+    def root(self) -> "ProcessGroup":
+        """Get the outermost group this group is nested in, e.g. the group of the pipeline stage."""
+        group = self
+        while group.parent is not None:
+            group = group.parent
+        return group
+
+    @property
+    def path(self) -> str:
+        """Names of the group and the groups it is nested in, e.g. 'repack/extract'."""
+        return self.name if self.parent is None else f"{self.parent.path}/{self.name}"
+
+
+class ChildProcess:
+    """A process started through run_process, and how it ended."""
+
+    def __init__(self, handle, name: str, group: Optional[ProcessGroup], background: bool = False) -> None:
+        """
+        Args:
+            handle (ProcessHandle): The running process
+            name (str): Process name used in logs
+            group (ProcessGroup, optional): Group the process was started in
+            background (bool): Whether the process runs in the background, ended by its caller
+        """
+        self.handle = handle
+        self.name = name
+        self.pid = handle.pid
+        self.group = group
+        self.background = background
+        self.started_at = time.monotonic()
+        self.ended_at: Optional[float] = None
+        self.exit_code: Optional[int] = None
+        self.cancelled = False
+        self._outcome: Optional[str] = None
+
+    @property
+    def outcome(self) -> str:
+        """How the process ended, or OUTCOME_RUNNING. Background processes ended by their caller count by exit code."""
+        if self._outcome is not None:
+            return self._outcome
+        # Before polling, since a killed process only has an exit code once the runner's loop reaped it
+        if self.cancelled:
+            return OUTCOME_CANCELLED
+        exit_code = self.handle.poll()
+        if exit_code is None:
+            return OUTCOME_RUNNING
+        return OUTCOME_SUCCEEDED if exit_code == 0 or self.background else OUTCOME_FAILED
+
+    def end(self, outcome: str, exit_code: Optional[int] = None) -> None:
+        """
+        Record how the process ended. A cancelled process stays cancelled, whatever it exited with.
+
+        Args:
+            outcome (str): One of the OUTCOME_* values
+            exit_code (int, optional): Exit code, if the process exited
+        """
+        if self._outcome is not None:
+            return
+        self._outcome = OUTCOME_CANCELLED if self.cancelled else outcome
+        self.exit_code = exit_code if exit_code is not None else self.handle.poll()
+        self.ended_at = time.monotonic()
+
+    def describe(self) -> str:
+        """Describe the process and how it ended, for the log."""
+        seconds = (self.ended_at or time.monotonic()) - self.started_at
+        where = f" in {self.group.path}" if self.group is not None else ""
+        code = f", exit code {self.exit_code}" if self.exit_code not in (None, 0) else ""
+        return f"{self.name} (PID {self.pid}){where}: {self.outcome} after {seconds:.0f}s{code}"
+
+
+class Supervisor:
+    """
+    Keeps every process started through run_process, grouped by the work that started it.
+
+    Safe to share between stages running at the same time.
+    """
+
+    def __init__(self) -> None:
+        self.children: List[ChildProcess] = []
+        self.closed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def current_group(self) -> Optional[ProcessGroup]:
+        """Get the process group of the current thread."""
+        return getattr(self._local, "group", None)
+
+    def current_priority(self) -> int:
+        """Get the priority of the task running on the current thread, 0 outside of a TaskGroup."""
+        return getattr(self._local, "priority", 0)
+
+    @contextmanager
+    def group(self, name: str, priority: Optional[int] = None) -> Iterator[ProcessGroup]:
+        """
+        Run the block in a new process group nested in the current one.
+
+        If the block raises, the processes of the group still running are cancelled.
+
+        Args:
+            name (str): Group name used in logs
+            priority (int, optional): Priority of the processes started in the block. Defaults to the current priority
+        """
+        group = ProcessGroup(name, self.current_group())
+        with self.enter(group, priority):
+            try:
+                yield group
+            except BaseException as e:
+                self.cancel(group, reason=f"{name} failed: {e or type(e).__name__}")
+                raise
+
+    @contextmanager
+    def enter(self, group: ProcessGroup, priority: Optional[int] = None) -> Iterator[None]:
+        """Start the processes of the block in an existing group, e.g. on a worker thread of a TaskGroup."""
+        previous = self.current_group(), self.current_priority()
+        self._local.group = group
+        if priority is not None:
+            self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.group, self._local.priority = previous
+
+    def register(self, handle, name: str, background: bool = False) -> ChildProcess:
+        """
+        Take a started process under supervision, in the current thread's group.
+
+        A process started in a cancelled group, or after cancel_all, is cancelled right away, e.g.
+        one that was still waiting for a governor slot when its group was cancelled.
+
+        Args:
+            handle (ProcessHandle): The running process
+            name (str): Process name used in logs
+            background (bool): Whether the process runs in the background
+
+        Returns:
+            ChildProcess: Record to end() once the process exited
+        """
+        group = self.current_group()
+        child = ChildProcess(handle, name, group, background)
+        with self._lock:
+            self.children.append(child)
+            closed = self.closed
+        if closed:
+            self._cancel_children([child], "the run is being stopped")
+        elif group is not None and group.is_cancelled:
+            self._cancel_children([child], f"{group.path} was cancelled")
+        return child
+
+    def running(self, group: Optional[ProcessGroup] = None) -> List[ChildProcess]:
+        """Get the processes still running, in a group (including nested groups) or in all."""
+        with self._lock:
+            children = list(self.children)
+        return [child for child in children if child.outcome == OUTCOME_RUNNING and (group is None or group.contains(child.group))]
+
+    def cancel(self, group: ProcessGroup, reason: str = "") -> List[ChildProcess]:
+        """
+        Cancel the processes still running in a group and its nested groups, killing their process trees,
+        and the ones started in them from now on.
+
+        Args:
+            group (ProcessGroup): Group to cancel
+            reason (str, optional): Why, for the log
+
+        Returns:
+            list[ChildProcess]: The cancelled processes
+        """
+        with self._lock:
+            group.cancelled = True
+        return self._cancel_children(self.running(group), reason)
+
+    def cancel_all(self, reason: str = "") -> List[ChildProcess]:
+        """Cancel every running process and every process started from now on, e.g. on Ctrl+C."""
+        with self._lock:
+            self.closed = True
+        return self._cancel_children(self.running(), reason)
+
+    def _cancel_children(self, children: List[ChildProcess], reason: str) -> List[ChildProcess]:
+        if not children:
+            return []
+        for child in children:
+            child.cancelled = True
+            logger.warning(f"Cancelling {child.name} (PID {child.pid}){f': {reason}' if reason else ''}")
+        # kill_process_tree waits for each tree to exit, so the trees are stopped at the same time
+        threads = [threading.Thread(target=kill_process_tree, args=(child.pid,), name=f"cancel-{child.pid}", daemon=True) for child in children]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return children
+
+    def prune(self) -> List[ChildProcess]:
+        """
+        Forget the processes that ended, e.g. once a pipeline run was reported, so --watch doesn't keep
+        the processes (and their output) of every earlier run.
+
+        Returns:
+            list[ChildProcess]: The forgotten processes
+        """
+        with self._lock:
+            ended = [child for child in self.children if child.outcome != OUTCOME_RUNNING]
+            self.children = [child for child in self.children if child.outcome == OUTCOME_RUNNING]
+        return ended
+
+    def outcomes(self) -> Dict[str, int]:
+        """Count the processes by how they ended."""
+        with self._lock:
+            children = list(self.children)
+        counts: Dict[str, int] = {}
+        for child in children:
+            counts[child.outcome] = counts.get(child.outcome, 0) + 1
+        return counts
+
+    def log_report(self) -> None:
+        """Log how the processes ended: a count per outcome, and a line per process that didn't succeed."""
+        with self._lock:
+            children = list(self.children)
+        if not children:
+            return
+        counts = self.outcomes()
+        logger.info("Processes: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(counts.items())))
+        for child in children:
+            if child.outcome != OUTCOME_SUCCEEDED:
+                logger.warning(f"Process {child.describe()}")
+
+
+class TaskGroup:
+    """
+    Runs tasks on up to max_workers threads, highest priority first, as one process group.
+
+    The first task to fail cancels the group: tasks not started yet are dropped, and the process
+    trees of the running ones are killed. run() raises that first error once every thread is done.
+    """
+
+    def __init__(self, name: str, max_workers: int, supervisor: Optional[Supervisor] = None) -> None:
+        """
+        Args:
+            name (str): Group name used in logs
+            max_workers (int): Tasks running at once
+            supervisor (Supervisor, optional): Supervisor of the processes. Defaults to the one used by run_process
+        """
+        self.supervisor = supervisor or get_supervisor()
+        self.group = ProcessGroup(name, self.supervisor.current_group())
+        self.max_workers = max(max_workers, 1)
+        self.error: Optional[BaseException] = None
+        self._queue: List[Tuple[int, int, Callable, tuple, dict]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def submit(self, func: Callable, *args, priority: int = 0, **kwargs) -> None:
+        """
+        Queue a task.
+
+        Args:
+            func (Callable): Runs the task, raising on failure
+            priority (int, optional): Higher priorities start first, equal ones in order of submission. Defaults to 0
+        """
+        with self._lock:
+            heapq.heappush(self._queue, (-priority, next(self._order), func, args, kwargs))
+
+    def _next_task(self) -> Optional[Tuple[int, Callable, tuple, dict]]:
+        with self._lock:
+            if self.error is not None or not self._queue:
+                return None
+            negative_priority, _, func, args, kwargs = heapq.heappop(self._queue)
+            return -negative_priority, func, args, kwargs
+
+    def _work(self) -> None:
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            priority, func, args, kwargs = task
+            try:
+                with self.supervisor.enter(self.group, priority):
+                    func(*args, **kwargs)
+            except BaseException as e:
+                self._fail(e)
+                return
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            first = self.error is None
+            if first:
+                self.error = error
+                dropped = len(self._queue)
+                self._queue.clear()
+        if first:
+            logger.error(f"{self.group.path} failed, cancelling the rest of it ({dropped} task(s) not started): {error}")
+            self.supervisor.cancel(self.group, reason=f"{self.group.path} failed")
+
+    def run(self) -> None:
+        """
+        Run the queued tasks and wait for them.
+
+        Raises:
+            BaseException: The first error raised by a task, after the other tasks stopped
+        """
+        with self._lock:
+            workers = min(self.max_workers, len(self._queue))
+        work = in_current_stage(self._work)
+        threads = [threading.Thread(target=work, name=f"{self.group.name}-{index}", daemon=True) for index in range(workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(1.0)  # In slices, so Ctrl+C still interrupts the wait on Windows
+        except BaseException as e:
+            self._fail(e)
+            raise
+        if self.error is not None:
+            raise self.error
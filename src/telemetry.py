@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import threading
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Union
+import psutil
+from loguru import logger
+
+"""
+Resource telemetry for stages and the processes they run.
+
+Each stage records its wall time and the CPU time of the thread running it. Every process
+started through run_process is sampled together with its children (UnrealPak, BatchExport,
+DepotDownloader, the game) for CPU seconds, peak RSS, disk read/write bytes and open handles.
+At the end of a run the numbers are written to a JSON report next to the log file.
+"""
+
+SAMPLE_INTERVAL = 1.0  # Seconds between samples of a process tree
+CPU_BOUND_CORES = 0.8  # Averaging at least this many busy cores counts as CPU bound
+MEMORY_BOUND_PERCENT = 80  # Peak RSS above this share of system memory counts as memory bound
+
+_active: Optional["Telemetry"] = None
+
+
+def activate(telemetry: Optional["Telemetry"]) -> None:
+    """Set the telemetry that run_process reports to. None disables process sampling."""
+    global _active
+    _active = telemetry
+
+
+def track_process(process: subprocess.Popen, name: str) -> Optional["ProcessSampler"]:
+    """
+    Start sampling a process tree if telemetry is active.
+
+    Args:
+        process (subprocess.Popen): Started process
+        name (str): Process name used in logs
+
+    Returns:
+        ProcessSampler: The running sampler, or None if telemetry is not active
+    """
+    if _active is None:
+        return None
+    return _active.track_process(process, name)
+
+
+def annotate(**fields) -> None:
+    """Add fields to the report entry of the stage running on the current thread, if telemetry is active."""
+    if _active is not None:
+        _active.annotate(**fields)
+
+
+def in_current_stage(func: Callable) -> Callable:
+    """
+    Wrap a function to run on another thread (e.g. a thread pool) as part of the calling thread's stage,
+    so processes it starts and fields it annotates are attributed to that stage.
+    """
+    if _active is None:
+        return func
+    return _active.in_current_stage(func)
+
+
+def _classify(cpu_seconds: float, wall_seconds: float, peak_rss: int, io_bytes: int) -> str:
+    """Guess what limited a process tree from its averages."""
+    if peak_rss * 100 >= MEMORY_BOUND_PERCENT * psutil.virtual_memory().total:
+        return "memory"
+    if wall_seconds > 0 and cpu_seconds / wall_seconds >= CPU_BOUND_CORES:
+        return "cpu"
+    if io_bytes > 0:
+        return "disk"
+    return "waiting"
+
+
+class ProcessSampler:
+    """Samples a process and its children on a background thread until the process exits."""
+
+    def __init__(self, process: subprocess.Popen, name: str, stage: Optional[str], interval: float = SAMPLE_INTERVAL) -> None:
+        """
+        Args:
+            process (subprocess.Popen): Started process
+            name (str): Process name used in logs
+            stage (str, optional): Stage the process was started by
+            interval (float): Seconds between samples
+        """
+        self.process = process
+        self.name = name
+        self.stage = stage
+        self.interval = interval
+        self.started_at = time.time()
+        self.ended_at: Optional[float] = None
+        self.peak_rss = 0
+        self.peak_open_handles = 0
+        self.peak_processes = 0
+        # Counters are cumulative per process, so keep the last value seen for every pid
+        self._cpu: Dict[int, float] = {}
+        self._read: Dict[int, int] = {}
+        self._write: Dict[int, int] = {}
+        self._procs: Dict[int, psutil.Process] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"telemetry-{name}", daemon=True)
+        self._thread.start()
+
+    def _tree(self) -> List[psutil.Process]:
+        """Get the root process and its current children, reusing Process objects between samples."""
+        try:
+            root = self._procs.setdefault(self.process.pid, psutil.Process(self.process.pid))
+            children = root.children(recursive=True)
+        except psutil.Error:
+            return []
+        for child in children:
+            self._procs.setdefault(child.pid, child)
+        return [root] + [self._procs[child.pid] for child in children]
+
+    def sample(self) -> None:
+        """Take one sample of the process tree."""
+        rss = 0
+        handles = 0
+        tree = self._tree()
+        for proc in tree:
+            try:
+                with proc.oneshot():
+                    cpu = proc.cpu_times()
+                    self._cpu[proc.pid] = cpu.user + cpu.system
+                    rss += proc.memory_info().rss
+                    handles += proc.num_handles() if os.name == 'nt' else proc.num_fds()
+                    if hasattr(proc, "io_counters"):  # Not available on macOS
+                        io = proc.io_counters()
+                        self._read[proc.pid] = io.read_bytes
+                        self._write[proc.pid] = io.write_bytes
+            except psutil.Error:
+                continue  # Exited or not accessible since the tree was listed
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_open_handles = max(self.peak_open_handles, handles)
+        self.peak_processes = max(self.peak_processes, len(tree))
+
+    def _run(self) -> None:
+        while self.process.poll() is None and not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+        self.ended_at = time.time()
+
+    def stop(self) -> None:
+        """Take a last sample if the process is still running and wait for the sampler to finish."""
+        if self.process.poll() is None:
+            self.sample()
+        self._stop.set()
+        self._thread.join()
+
+    def to_dict(self) -> dict:
+        """Summarize the samples."""
+        wall_seconds = (self.ended_at or time.time()) - self.started_at
+        cpu_seconds = sum(self._cpu.values())
+        read_bytes = sum(self._read.values())
+        write_bytes = sum(self._write.values())
+        return {
+            "name": self.name,
+            "stage": self.stage,
+            "pid": self.process.pid,
+            "exit_code": self.process.poll(),
+            "wall_seconds": round(wall_seconds, 3),
+            "cpu_seconds": round(cpu_seconds, 3),
+            "average_cores": round(cpu_seconds / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+            "peak_rss_bytes": self.peak_rss,
+            "read_bytes": read_bytes,
+            "write_bytes": write_bytes,
+            "peak_open_handles": self.peak_open_handles,
+            "peak_processes": self.peak_processes,
+            "likely_bound_by": _classify(cpu_seconds, wall_seconds, self.peak_rss, read_bytes + write_bytes),
+        }
+
+
+class Telemetry:
+    """
+    Collects stage timings and process samples for one run.
+
+    Safe to share between stages running at the same time.
+    """
+
+    def __init__(self, sample_interval: float = SAMPLE_INTERVAL) -> None:
+        """
+        Args:
+            sample_interval (float): Seconds between samples of each process tree
+        """
+        self.sample_interval = sample_interval
+        self.started_at = time.time()
+        self.stages: Dict[str, dict] = {}
+        self.samplers: List[ProcessSampler] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage running on the current thread and attribute processes it starts to it."""
+        self._local.stage = name
+        self._local.fields = {}
+        start_time = time.time()
+        start_thread_time = time.thread_time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] = {
+                    "started_at": start_time,
+                    "wall_seconds": round(time.time() - start_time, 3),
+                    "python_cpu_seconds": round(time.thread_time() - start_thread_time, 3),
+                    **self._local.fields,
+                }
+            self._local.stage = None
+            self._local.fields = {}
+
+    def annotate(self, **fields) -> None:
+        """Add fields to the report entry of the stage running on the current thread."""
+        if getattr(self._local, "stage", None) is not None:
+            self._local.fields.update(fields)
+
+    def in_current_stage(self, func: Callable) -> Callable:
+        """Wrap a function to run on another thread as part of the stage running on the current thread."""
+        stage = getattr(self._local, "stage", None)
+        fields = getattr(self._local, "fields", {})
+
+        def run_in_stage(*args, **kwargs):
+            self._local.stage = stage
+            self._local.fields = fields  # Shared, so annotations end up in the stage's entry
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.stage = None
+                self._local.fields = {}
+        return run_in_stage
+
+    def track_process(self, process: subprocess.Popen, name: str) -> ProcessSampler:
+        """Start sampling a process tree, attributing it to the stage running on the current thread."""
+        sampler = ProcessSampler(process, name, getattr(self._local, "stage", None), self.sample_interval)
+        with self._lock:
+            self.samplers.append(sampler)
+        return sampler
+
+    def report(self, statuses: Optional[Dict[str, str]] = None) -> dict:
+        """
+        Build the report of everything recorded so far.
+
+        Args:
+            statuses (dict, optional): Stage name to pipeline status, added to the stage entries
+
+        Returns:
+            dict: JSON-serializable report
+        """
+        with self._lock:
+            processes = [sampler.to_dict() for sampler in self.samplers]
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+
+        for name, status in (statuses or {}).items():
+            stages.setdefault(name, {})["status"] = status
+
+        for name, entry in stages.items():
+            stage_processes = [p for p in processes if p["stage"] == name]
+            entry["processes"] = [p["name"] for p in stage_processes]
+            entry["process_cpu_seconds"] = round(sum(p["cpu_seconds"] for p in stage_processes), 3)
+            entry["process_peak_rss_bytes"] = max((p["peak_rss_bytes"] for p in stage_processes), default=0)
+            entry["process_read_bytes"] = sum(p["read_bytes"] for p in stage_processes)
+            entry["process_write_bytes"] = sum(p["write_bytes"] for p in stage_processes)
+
+        return {
+            "started_at": self.started_at,
+            "wall_seconds": round(time.time() - self.started_at, 3),
+            "system": {
+                "cpu_count": psutil.cpu_count(),
+                "total_memory_bytes": psutil.virtual_memory().total,
+            },
+            "stages": stages,
+            "processes": processes,
+        }
+
+    def write_report(self, report_file: Union[str, Path], statuses: Optional[Dict[str, str]] = None) -> dict:
+        """
+        Write the report as JSON and log a one line summary per process.
+
+        Args:
+            report_file (str or Path): File to write
+            statuses (dict, optional): Stage name to pipeline status
+
+        Returns:
+            dict: The written report
+        """
+        report = self.report(statuses)
+        report_file = Path(report_file)
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        report_file.write_text(json.dumps(report, indent=2))
+
+        for p in sorted(report["processes"], key=lambda p: p["wall_seconds"], reverse=True):
+            logger.info(
+                f"{p['name']} ({p['stage']}): {p['wall_seconds']:.1f}s wall, {p['average_cores']:.2f} cores, "
+                f"peak {p['peak_rss_bytes'] / 1024**2:.0f} MB RSS, read {p['read_bytes'] / 1024**2:.0f} MB, "
+                f"wrote {p['write_bytes'] / 1024**2:.0f} MB, likely {p['likely_bound_by']} bound"
+            )
+        logger.info(f"Resource report written to {report_file}")
+        return report
@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import stat
+import time
+import ctypes
+import platform
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Deque, List, Optional, Union
+from loguru import logger
+
+from run_state import STATE_DIR
+
+"""
+Background deletion of large directories.
+
+Deleting an extracted game (hundreds of thousands of files, tens of GB) file by file takes
+minutes. Instead, the directory is renamed into a trash directory of this tool's own next to it,
+which is on the same volume so the rename is instant, and it is deleted by a background thread.
+The deletion walks the tree with os.scandir on a few threads at once and at idle I/O priority, so
+it gets out of the way of the tools still running.
+
+Every path moved to the trash is recorded in the state directory until it is deleted, so whatever
+a run didn't get to delete (e.g. because it was stopped) is deleted by the next run. Only those
+paths are ever deleted, never anything else that happens to be in a trash directory.
+"""
+
+TRASH_DIR_NAME = ".dad-exporter-trash"
+DELETE_WORKERS = 8  # Threads deleting one tree at once
+
+# Linux ioprio_set syscall numbers, which the os module doesn't expose
+IOPRIO_SYSCALLS = {"x86_64": 251, "amd64": 251, "aarch64": 30, "arm64": 30, "i386": 289, "i686": 289}
+IOPRIO_WHO_PROCESS = 1  # With id 0, the calling thread
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000  # Windows: low I/O and memory priority for the calling thread
+IOPOL_TYPE_DISK, IOPOL_SCOPE_THREAD, IOPOL_THROTTLE = 0, 1, 3  # macOS setiopolicy_np
+
+_trash: Optional["Trash"] = None
+_trash_lock = threading.Lock()
+
+
+def get_trash() -> "Trash":
+    """Get the trash used by clear_dir and the repack cleanup, starting its deletion thread on first use."""
+    global _trash
+    with _trash_lock:
+        if _trash is None:
+            _trash = Trash()
+        return _trash
+
+
+def finish() -> None:
+    """Wait for the deletions still running, if anything was trashed. Ctrl+C leaves them to the next run."""
+    with _trash_lock:
+        trash = _trash
+    if trash is not None:
+        trash.finish()
+
+
+def lower_io_priority() -> bool:
+    """
+    Put the calling thread at idle (or the lowest available) I/O priority.
+
+    Returns:
+        bool: True if the priority was lowered, False where it isn't supported
+    """
+    try:
+        if os.name == 'nt':
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN))
+        if sys.platform.startswith("linux"):
+            syscall_number = IOPRIO_SYSCALLS.get(platform.machine().lower())
+            if syscall_number is None:
+                return False
+            libc = ctypes.CDLL(None, use_errno=True)
+            return libc.syscall(syscall_number, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0
+        if sys.platform == "darwin":
+            libc = ctypes.CDLL(None, use_errno=True)
+            return libc.setiopolicy_np(IOPOL_TYPE_DISK, IOPOL_SCOPE_THREAD, IOPOL_THROTTLE) == 0
+    except (AttributeError, OSError):
+        pass
+    return False
+
+
+def remove_file(path: str) -> None:
+    """Remove a file or symlink, clearing the read-only flag Windows refuses to delete if needed."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+
+def is_trashed_path(path: Union[str, Path]) -> bool:
+    """Check that a path is directly inside a trash directory of this tool, so it is safe to delete as trash."""
+    return Path(path).parent.name == TRASH_DIR_NAME
+
+
+def clear_directory(directory: str) -> List[str]:
+    """Remove the files of one directory, returning its subdirectories."""
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                else:
+                    remove_file(entry.path)
+    except FileNotFoundError:
+        pass
+    return subdirs
+
+
+def delete_tree(path: Union[str, Path], workers: int = DELETE_WORKERS) -> int:
+    """
+    Delete a directory tree, clearing its directories on several threads at once.
+
+    Args:
+        path (str | Path): Directory to delete
+        workers (int): Threads deleting at once
+
+    Returns:
+        int: Directories deleted
+    """
+    directories = [str(path)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="trash", initializer=lower_io_priority) as executor:
+        pending = {executor.submit(clear_directory, directories[0])}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for subdir in future.result():
+                    directories.append(subdir)
+                    pending.add(executor.submit(clear_directory, subdir))
+    # Found breadth first, so in reverse every directory comes after its subdirectories
+    for directory in reversed(directories):
+        try:
+            os.rmdir(directory)
+        except FileNotFoundError:
+            pass
+    return len(directories)
+
+
+class Trash:
+    """Moves directories out of the way at once and deletes them on a background thread."""
+
+    def __init__(self, registry_file: Optional[Union[str, Path]] = None, workers: int = DELETE_WORKERS) -> None:
+        """
+        Args:
+            registry_file (str | Path, optional): JSON list of the paths moved to the trash and not deleted yet. Defaults to .state/trash.json in the cwd
+            workers (int): Threads deleting one tree at once
+        """
+        self.registry_file = Path(registry_file) if registry_file is not None else STATE_DIR / "trash.json"
+        self.workers = workers
+        self._queue: Deque[Path] = deque()
+        self._deleting = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read_registry(self) -> List[str]:
+        try:
+            return json.loads(self.registry_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return []
+
+    def _write_registry(self, entries: List[str]) -> None:
+        self.registry_file.parent.mkdir(parents=True, exist_ok=True)
+        self.registry_file.write_text(json.dumps(entries, indent=2), encoding='utf-8')
+
+    def _register(self, trashed: Path) -> None:
+        entries = self._read_registry()
+        if str(trashed) not in entries:
+            self._write_registry(entries + [str(trashed)])
+
+    def _unregister(self, trashed: Path) -> None:
+        """Forget a deleted path, and remove its trash directory if that left it empty."""
+        entries = self._read_registry()
+        if str(trashed) in entries:
+            entries.remove(str(trashed))
+            self._write_registry(entries)
+        try:
+            os.rmdir(trashed.parent)
+        except OSError:
+            pass  # Not empty, e.g. trashed into since, or already removed
+
+    def move(self, path: Union[str, Path], trash_dir: Optional[Union[str, Path]] = None) -> Optional[Path]:
+        """
+        Move a file or directory into the trash and have it deleted in the background.
+
+        If it can't be renamed (e.g. a file in it is open on Windows), it is deleted right away instead.
+
+        Args:
+            path (str | Path): File or directory to delete
+            trash_dir (str | Path, optional): Trash directory, which must be on the same volume. Defaults to TRASH_DIR_NAME next to the path
+
+        Returns:
+            Path: Where the path was moved to, None if it didn't exist or was deleted right away
+        """
+        path = Path(path)
+        if not os.path.lexists(path):
+            return None
+        trash_dir = Path(trash_dir) if trash_dir is not None else path.parent / TRASH_DIR_NAME
+        if trash_dir.name != TRASH_DIR_NAME:
+            raise ValueError(f"Trash directory {trash_dir} must be named {TRASH_DIR_NAME}")
+        trashed = trash_dir.absolute() / f"{path.name}-{time.time_ns()}"
+        try:
+            # Under the lock, so the deletion thread doesn't remove the trash directory as empty in between.
+            # Recorded before the rename, so a run stopped right after it still has the path deleted by the next run
+            with self._condition:
+                trash_dir.mkdir(parents=True, exist_ok=True)
+                self._register(trashed)
+                try:
+                    os.replace(path, trashed)
+                except OSError:
+                    self._unregister(trashed)
+                    raise
+        except OSError as e:
+            logger.warning(f"Could not move {path} to the trash, deleting it now: {e}")
+            self._delete(path)
+            return None
+        logger.debug(f"Moved {path} to {trashed}, deleting it in the background")
+        self._enqueue([trashed])
+        return trashed
+
+    def recover(self) -> int:
+        """
+        Delete in the background the paths earlier runs moved to the trash and didn't get to delete.
+
+        Only the recorded paths are deleted, not whatever else is in their trash directories.
+
+        Returns:
+            int: Entries queued for deletion
+        """
+        leftovers = []
+        with self._condition:
+            entries = self._read_registry()
+            kept = []
+            for entry in entries:
+                path = Path(entry)
+                if not is_trashed_path(path):
+                    logger.warning(f"Not deleting {path}, which is not in a {TRASH_DIR_NAME} directory")
+                elif os.path.lexists(path):
+                    leftovers.append(path)
+                    kept.append(entry)
+                elif not path.parent.exists():
+                    kept.append(entry)  # On a drive that isn't connected right now
+            if kept != entries:
+                self._write_registry(kept)
+        if leftovers:
+            logger.info(f"Deleting {len(leftovers)} item(s) left in the trash by an earlier run in the background")
+            self._enqueue(leftovers)
+        return len(leftovers)
+
+    @property
+    def pending(self) -> int:
+        """Entries queued or being deleted."""
+        with self._condition:
+            return len(self._queue) + self._deleting
+
+    def _enqueue(self, paths: List[Path]) -> None:
+        with self._condition:
+            self._queue.extend(paths)
+            if self._thread is None:
+                # A daemon, so a stopped run exits at once. What it didn't delete is recovered by the next run
+                self._thread = threading.Thread(target=self._run, name="trash", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def _delete(self, path: Path) -> None:
+        if path.is_dir() and not path.is_symlink():
+            delete_tree(path, self.workers)
+        else:
+            remove_file(str(path))
+
+    def _run(self) -> None:
+        lower_io_priority()
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._thread = None  # Under the lock, so the next move starts a new thread
+                    self._condition.notify_all()
+                    return
+                path = self._queue.popleft()
+                self._deleting += 1
+            start_time = time.monotonic()
+            try:
+                self._delete(path)
+                logger.debug(f"Deleted {path} in {time.monotonic() - start_time:.1f}s")
+                with self._condition:
+                    self._unregister(path)
+            except Exception as e:
+                logger.warning(f"Could not delete {path}, the next run will retry: {e}")
+            finally:
+                with self._condition:
+                    self._deleting -= 1
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the queued deletions.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to waiting until done
+
+        Returns:
+            bool: True if nothing is left to delete
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self._deleting:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                # In slices, so Ctrl+C still interrupts the wait on Windows
+                self._condition.wait(1.0 if remaining is None else min(remaining, 1.0))
+            return True
+
+    def finish(self) -> None:
+        """Wait for the queued deletions before exiting. Ctrl+C leaves them to the next run."""
+        if not self.pending:
+            return
+        logger.info(f"Waiting for the background deletion of {self.pending} item(s) to finish (Ctrl+C leaves it to the next run)")
+        try:
+            self.wait()
+        except KeyboardInterrupt:
+            logger.warning("Left the rest of the trash to be deleted by the next run")
@@ -1,25 +1,32 @@
-from dotenv import load_dotenv
-
-import os
-import subprocess
 import os
 import shutil
+from pathlib import Path
 from loguru import logger
-from typing import Union, List, Optional, Any
-load_dotenv()
+from typing import TYPE_CHECKING, Union, List, Optional, Any
+
+if TYPE_CHECKING:
+    from process_runner import ProcessHandle
+    from trash import Trash
 
 ###############################
 #             FILE            #
 ###############################
 
-def clear_dir(dir_path: str) -> None:
-    """Clear directory contents but keep the directory itself"""
+def clear_dir(dir_path: str, trash: Optional["Trash"] = None) -> None:
+    """Clear directory contents but keep the directory itself.
+
+    The contents are moved to the tool's trash directory next to it and deleted in the background (see trash).
+
+    Args:
+        dir_path (str): Directory to clear
+        trash (Trash, optional): Trash to move the contents to. Defaults to trash.get_trash()
+    """
+    from trash import get_trash, TRASH_DIR_NAME  # Imported here so it is only loaded once something is deleted
+    if trash is None:
+        trash = get_trash()
+    trash_dir = Path(dir_path).absolute().parent / TRASH_DIR_NAME
     for item in os.listdir(dir_path):
-        item_path = os.path.join(dir_path, item)
-        if os.path.isdir(item_path):
-            shutil.rmtree(item_path)
-        else:
-            os.remove(item_path)
+        trash.move(os.path.join(dir_path, item), trash_dir)
 
 def normalize_path(path: str) -> str:
     """Normalize a file path to use forward slashes for cross-platform consistency."""
@@ -30,6 +37,21 @@ def normalize_path(path: str) -> str:
     # but preserve the platform-specific absolute path characteristics
     return normalized.replace('\\', '/')
 
+def get_dir_size(dir_path: Union[str, Path]) -> int:
+    """Get the total size in bytes of the files under a directory."""
+    return sum(file.stat().st_size for file in Path(dir_path).rglob("*") if file.is_file())
+
+def get_volume_path(path: Union[str, Path]) -> Path:
+    """Get the closest existing parent of a path (or the path itself), to query the volume it will be created on."""
+    path = Path(path).resolve()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return path
+
+def get_free_space(path: Union[str, Path]) -> int:
+    """Get the free bytes on the volume of a path, or of its closest existing parent."""
+    return shutil.disk_usage(get_volume_path(path)).free
+
 
 ###############################
 #           Process           #
@@ -79,6 +101,18 @@ def kill_process_tree(parent_pid) -> None:
     except (psutil.NoSuchProcess, ImportError) as e:
         logger.warning(f"Error killing process tree: {e}")
 
+def kill_child_processes() -> None:
+    """Kill every process tree started by the current process."""
+    try:
+        import psutil  # Import here to avoid making psutil a requirement for other utils
+        children = psutil.Process().children(recursive=False)
+    except ImportError as e:
+        logger.warning(f"Error listing child processes: {e}")
+        return
+    for child in children:
+        logger.info(f"Stopping child process {child.pid}")
+        kill_process_tree(child.pid)
+
 def ensure_parent_dir(file_path: str) -> None:
     """Ensure the parent directory of a file exists.
     
@@ -88,101 +122,107 @@ def ensure_parent_dir(file_path: str) -> None:
     parent_dir = os.path.dirname(file_path)
     os.makedirs(parent_dir, exist_ok=True)
 
-def run_process(options: Union[List[str], str], name: str = '', timeout: int = 60*60, background: bool = False) -> Optional[subprocess.Popen]: #times out after 1hr
-    """Runs a subprocess with the given options and logs its output line by line
+def run_process(options: Union[List[str], str], name: str = '', timeout: int = 60*60, background: bool = False, io_paths: Optional[List[Union[str, Path]]] = None, expected_total: Optional[int] = None, idle_timeout: Optional[float] = None) -> Optional["ProcessHandle"]: #times out after 1hr
+    """Runs a subprocess with the given options and logs a sample of its output
+
+    The full output is spooled to a file per process if configured, and the last lines of it are
+    logged if the process fails (see output_sink). Tools with a progress parser registered for their
+    name (DepotDownloader, UnrealPak, BatchExport) log their throughput and ETA (see progress).
+
+    The process is supervised by the asyncio process runner, which reads its output in large chunks
+    and enforces the timeout on its event loop, so several processes can run at once from different
+    threads (see process_runner). A process that makes no progress and uses no CPU or disk for the
+    idle timeout is stopped before its timeout, unless it runs in the background.
+
+    Unless it runs in the background, the process first waits for a CPU slot and an I/O slot on the
+    volume of each of io_paths from the resource governor, so parallel stages don't thrash one disk.
+
+    The process gets the priority, I/O priority, CPU affinity and memory limit of the process profile
+    of its pipeline stage, if one is configured (see process_profile).
+
+    The process is registered with the supervisor in the process group of the calling thread, so it
+    is cancelled with the rest of its group when related work fails or the run is interrupted, and
+    how it ended is reported at the end of the run (see supervisor).
 
     Args:
-        options (list[str] | str): The command and arguments to execute
+        options (list[str] | str): The command and arguments to execute, or a command line string
         name (str, optional): An optional name to identify the process in logs. Defaults to ''
         timeout (int, optional): Maximum time to wait for process completion in seconds. Defaults to 3600 (1 hour)
-        background (bool, optional): If True, starts the process in background and returns the process object. Defaults to False.
+        background (bool, optional): If True, starts the process in background and returns the process object. Its output is still logged. Defaults to False.
+        io_paths (list, optional): Files or directories the process reads or writes heavily. Defaults to none, taking only a CPU slot
+        expected_total (int, optional): Files or assets the process is expected to handle, for the ETA of its progress. Defaults to what the tool reports, if anything
+        idle_timeout (float, optional): Seconds without progress and activity before the process is stopped. Defaults to PROCESS_IDLE_TIMEOUT. 0 turns the watchdog off
     
     Returns:
-        subprocess.Popen: If background=True, returns the process object for later management
+        ProcessHandle: If background=True, returns the process object for later management
         None: If background=False (default), waits for completion and returns None
     """
-    import select
-    import time
+    from governor import get_governor  # Imported here since the governor itself uses these utils
+    from process_runner import get_runner
+    from supervisor import get_supervisor, get_outcome, OUTCOME_SUCCEEDED, OUTCOME_FAILED
+    from process_profile import get_profile, apply_profile
+    from telemetry import track_process  # Imported here since it loads psutil, which other utils don't need
     
+    supervisor = get_supervisor()
+    group = supervisor.current_group()
+    profile = get_profile(group.root.name if group is not None else None)
     process = None
+    child = None
+    sampler = None
+    lease = None
     try:
-        # Handle shell scripts on Windows by explicitly using bash
-        if isinstance(options, str) and options.endswith('.sh') and os.name == 'nt':
-            options = ['bash', options]
-        elif isinstance(options, list) and len(options) > 0 and options[0].endswith('.sh') and os.name == 'nt':
-            options = ['bash'] + options
-
-        process = subprocess.Popen(  # noqa: F821
-            options, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        # Background processes (the game for the mapper) run until stopped, so they would hold their slots indefinitely
+        if not background:
+            lease = get_governor().acquire(name, io_paths, priority=supervisor.current_priority())
+
+        process = get_runner().start(
+            options,
+            name,
+            timeout=None if background else timeout,
+            expected_total=expected_total,
+            idle_timeout=0 if background else idle_timeout,
+            memory_limit=profile.memory_limit,
         )
+        # Supervised right away, so the process is stopped with its group even if the rest of the setup fails
+        child = supervisor.register(process, name, background)
+        if lease is not None:
+            lease.attach(process.pid)
+        apply_profile(process.pid, profile, name)
+        sampler = track_process(process, name)
 
         # If background mode, return the process object immediately
         if background:
             logger.info(f'Started background process {name} with PID {process.pid}')
             return process
 
-        start_time = time.time()
-        
-        # Read output line by line with timeout protection
-        with process.stdout:
-            while True:
-                # Check if process has finished
-                if process.poll() is not None:
-                    # Process finished, read any remaining output
-                    remaining_output = process.stdout.read()
-                    if remaining_output:
-                        for line in remaining_output.splitlines():
-                            logger.debug(f'[process: {name}] {line.strip()}')
-                    break
-                
-                # Check timeout
-                if time.time() - start_time > timeout:
-                    process.terminate()
-                    try:
-                        process.wait(timeout=5)  # Give it 5 seconds to terminate gracefully
-                    except subprocess.TimeoutExpired:
-                        process.kill()  # Force kill if it doesn't terminate
-                    raise Exception(f'Process {name} timed out after {timeout} seconds')
-                
-                # Use select on Unix-like systems for non-blocking read
-                if hasattr(select, 'select') and os.name != 'nt':
-                    ready, _, _ = select.select([process.stdout], [], [], 0.1)
-                    if ready:
-                        line = process.stdout.readline()
-                        if line:
-                            logger.debug(f'[process: {name}] {line.strip()}')
-                        elif process.poll() is not None:
-                            # Process finished and no more output
-                            break
-                else:
-                    # Windows fallback - read with short timeout simulation
-                    try:
-                        line = process.stdout.readline()
-                        if line:
-                            logger.debug(f'[process: {name}] {line.strip()}')
-                        elif process.poll() is not None:
-                            # Process finished and no more output
-                            break
-                    except Exception:
-                        # If readline fails, check if process is still running
-                        if process.poll() is not None:
-                            break
-                        time.sleep(0.1)  # Brief pause to prevent tight loop
-
-    except Exception as e:
-        # Clean up process if it's still running
-        if process and process.poll() is None:
+        exit_code = process.wait()
+    except BaseException as e:
+        # Clean up process if it's still running, e.g. on Ctrl+C while waiting for it
+        if process is not None and process.poll() is None:
+            process.terminate()
             try:
-                process.terminate()
                 process.wait(timeout=5)
-            except:
-                try:
-                    process.kill()
-                except:
-                    pass
+            except Exception:
+                process.kill()
+        if sampler is not None:
+            sampler.stop()
+        if lease is not None:
+            lease.release()
+        if child is not None:
+            child.end(get_outcome(e))
+        if process is not None and (child is None or not child.cancelled):
+            process.sink.log_tail()
+        if not isinstance(e, Exception):
+            raise
         raise Exception(f'Failed to run {name} process', e)
 
-    # Wait for process to complete and get exit code
-    exit_code = process.wait()
+    if sampler is not None:
+        sampler.stop()
+    if lease is not None:
+        lease.release()
+    child.end(OUTCOME_SUCCEEDED if exit_code == 0 else OUTCOME_FAILED, exit_code)
+    if child.cancelled:
+        raise Exception(f'Process {name} was cancelled')
     if exit_code != 0:
+        process.sink.log_tail()
         raise Exception(f'Process {name} exited with code {exit_code}')
\ No newline at end of file
@@ -0,0 +1,115 @@
+import random
+import threading
+from typing import Callable, Optional
+from loguru import logger
+
+from steam.run_depot_downloader import DepotDownloader
+
+"""
+Watch mode.
+
+Keeps a single process running that polls Steam for the latest manifest id and runs the pipeline
+only when it differs from the downloaded manifest.txt. Everything the pipeline keeps between runs
+(run state fingerprints, the file hash cache, the journal) stays loaded instead of being rebuilt
+by a fresh process each time.
+"""
+
+
+class Watcher:
+    """
+    Polls for new manifests on an interval and runs the pipeline for each one.
+    """
+
+    def __init__(self, options, run_pipeline: Callable[[str], bool], interval: int, jitter: int = 0) -> None:
+        """
+        Args:
+            options (Options): Configuration options
+            run_pipeline (Callable): Runs the pipeline for a manifest id. Returns True on success
+            interval (int): Seconds between checks for a new manifest
+            jitter (int): Maximum seconds added to or removed from each interval, so checks don't line up with other schedules
+        """
+        if interval <= 0:
+            raise ValueError(f"Watch interval must be positive, got {interval}")
+        self.options = options
+        self.run_pipeline = run_pipeline
+        self.interval = interval
+        self.jitter = max(jitter, 0)
+        self.failed_manifest_id: Optional[str] = None
+        self._downloader: Optional[DepotDownloader] = None
+        self._stop = threading.Event()
+
+    @property
+    def downloader(self) -> DepotDownloader:
+        """DepotDownloader used for polling, created on first use so a missing install is reported per check."""
+        if self._downloader is None:
+            self._downloader = DepotDownloader(
+                dad_dir=self.options.steam_game_download_dir,
+                steam_username=self.options.steam_username,
+                steam_password=self.options.steam_password,
+                force=False,
+            )
+        return self._downloader
+
+    def next_delay(self) -> float:
+        """Get the seconds to wait before the next check."""
+        return max(self.interval + random.uniform(-self.jitter, self.jitter), 0)
+
+    def check(self) -> bool:
+        """
+        Check for a new manifest once and run the pipeline if there is one.
+
+        A manifest whose pipeline run failed is retried on the next check even though it is
+        already downloaded. Stages that completed are skipped by their fingerprints.
+
+        Returns:
+            bool: True if the pipeline ran, False otherwise
+        """
+        try:
+            latest_manifest_id = self.downloader._get_latest_manifest_id()
+            downloaded_manifest_id = self.downloader._read_downloaded_manifest_id()
+        except Exception as e:
+            logger.error(f"Could not check for a new manifest: {e}")
+            return False
+
+        if latest_manifest_id is None:
+            logger.warning("Could not determine the latest manifest id, will check again later")
+            return False
+
+        if latest_manifest_id == downloaded_manifest_id and latest_manifest_id != self.failed_manifest_id:
+            logger.debug(f"No new manifest, latest is still {latest_manifest_id}")
+            return False
+
+        if latest_manifest_id == self.failed_manifest_id:
+            logger.info(f"Retrying manifest {latest_manifest_id} after the previous run failed")
+        else:
+            logger.info(f"New manifest {latest_manifest_id} (downloaded: {downloaded_manifest_id or 'none'})")
+
+        if self.run_pipeline(latest_manifest_id):
+            self.failed_manifest_id = None
+        else:
+            logger.error(f"Pipeline failed for manifest {latest_manifest_id}, will retry on the next check")
+            self.failed_manifest_id = latest_manifest_id
+        return True
+
+    def run(self, max_checks: Optional[int] = None) -> None:
+        """
+        Check for new manifests until stopped.
+
+        Args:
+            max_checks (int, optional): Stop after this many checks. Runs until stop() or Ctrl+C if not given
+        """
+        logger.info(f"Watching for new manifests every {self.interval}s (jitter {self.jitter}s)")
+        checks = 0
+        while not self._stop.is_set():
+            self.check()
+            checks += 1
+            if max_checks is not None and checks >= max_checks:
+                break
+            delay = self.next_delay()
+            logger.debug(f"Next manifest check in {delay:.0f}s")
+            self._stop.wait(delay)
+        logger.info("Stopped watching for new manifests")
+
+    def stop(self) -> None:
+        """Stop after the current check."""
+        self._stop.set()
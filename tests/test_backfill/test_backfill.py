@@ -0,0 +1,122 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import backfill
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.backfill module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_backfill", os.path.join(src_path, "backfill.py"))
+src_backfill = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_backfill)
+
+BackfillGate = src_backfill.BackfillGate
+
+STAGES = ("steam_download", "repack", "batch_export", "cleanup")
+
+
+class TestBackfill(unittest.TestCase):
+    """Test cases for backfill versions and the admission gate"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.logger_patcher = patch.object(src_backfill, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+        self.manifest_ids = ["111", "222", "333"]
+        self.stage_names = {m: [src_backfill.stage_name(stage, m) for stage in STAGES] for m in self.manifest_ids}
+        self.results = {name: "pending" for names in self.stage_names.values() for name in names}
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _gate(self, max_staged=2, min_free_bytes=0):
+        return BackfillGate(self.manifest_ids, self.stage_names, self.test_path, max_staged, min_free_bytes)
+
+    def _set_version(self, manifest_id, status):
+        for name in self.stage_names[manifest_id]:
+            self.results[name] = status
+
+    def test_parse_manifest_ids(self):
+        """Test that manifest ids can be separated by commas or whitespace and duplicates are dropped."""
+        self.assertEqual(src_backfill.parse_manifest_ids("111, 222 333,,111"), ["111", "222", "333"])
+        self.assertEqual(src_backfill.parse_manifest_ids(""), [])
+
+    def test_version_options_puts_outputs_in_version_dirs(self):
+        """Test that each version gets its own directory under every path option."""
+        options = SimpleNamespace(
+            manifest_id="",
+            steam_game_download_dir=Path("steam"),
+            output_data_dir=Path("data"),
+            repack_output_file=Path("out/DungeonCrawler.pak"),
+            output_mapper_file=None,
+        )
+
+        version = src_backfill.version_options(options, "222")
+
+        self.assertEqual(version.manifest_id, "222")
+        self.assertEqual(version.steam_game_download_dir, Path("steam/222"))
+        self.assertEqual(version.output_data_dir, Path("data/222"))
+        self.assertEqual(version.repack_output_file, Path("out/222/DungeonCrawler.pak"))
+        self.assertIsNone(version.output_mapper_file)
+        self.assertEqual(options.steam_game_download_dir, Path("steam"))
+
+    def test_admit_limits_staged_versions(self):
+        """Test that a version waits while the maximum number of versions is staged."""
+        gate = self._gate(max_staged=2)
+        self.results[self.stage_names["111"][0]] = "success"
+        self.results[self.stage_names["222"][0]] = "running"
+
+        self.assertEqual(gate.staged(self.results), ["111", "222"])
+        self.assertFalse(gate.admit("333", self.results))
+
+        self._set_version("111", "success")
+        self.assertTrue(gate.admit("333", self.results))
+
+    def test_admit_failed_version_is_no_longer_staged(self):
+        """Test that a version whose stages all failed or were skipped frees its slot."""
+        gate = self._gate(max_staged=1)
+        self.results[self.stage_names["111"][0]] = "failed"
+        for name in self.stage_names["111"][1:]:
+            self.results[name] = "skipped"
+
+        self.assertTrue(gate.admit("222", self.results))
+
+    def test_admit_waits_for_disk_space(self):
+        """Test that a version waits until the volume has room for the largest version seen."""
+        gate = self._gate()
+        free_bytes = shutil.disk_usage(self.test_path).free
+
+        self.assertTrue(gate.admit("111", self.results))
+        gate.record_version_size(free_bytes * 2)
+        self.assertFalse(gate.admit("111", self.results))
+
+    def test_get_free_space_of_missing_dir(self):
+        """Test that free space is measured on the closest existing parent of a directory not created yet."""
+        self.assertEqual(
+            src_backfill.get_free_space(self.test_path / "not" / "yet"),
+            shutil.disk_usage(self.test_path).free,
+        )
+
+    def test_get_dir_size(self):
+        """Test that the size of a directory is the sum of its files."""
+        (self.test_path / "sub").mkdir()
+        (self.test_path / "a.bin").write_bytes(b"x" * 10)
+        (self.test_path / "sub" / "b.bin").write_bytes(b"x" * 5)
+
+        self.assertEqual(src_backfill.get_dir_size(self.test_path), 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import io
+import threading
+import unittest
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""
+Stand-in for GitHub release downloads, shared by the dependency manager tests that download over HTTP.
+"""
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    """Serves server.files by path, and 404 for anything else."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = self.server.files.get(self.path)
+        self.send_response(200 if body is not None else 404)
+        self.send_header("Content-Length", str(len(body or b"")))
+        self.end_headers()
+        self.wfile.write(body or b"")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_zip(files):
+    """ZIP archive of files by name. Pass incompressible contents (e.g. os.urandom) to get over the 1000 byte minimum of a valid download."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+class ReleaseServerTestCase(unittest.TestCase):
+    """Test case with a stand-in release server shared by its tests, serving cls.server.files from cls.base_url."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stand-in server shared by the tests."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ReleaseHandler)
+        cls.server.files = {}
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stand-in server."""
+        cls.server.shutdown()
+        cls.server.server_close()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import hashlib
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+import sys
+
+# Add the src directory to the Python path to import dependency_manager
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.dependency_manager module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_dependency_manager", os.path.join(src_path, "dependency_manager.py"))
+src_dependency_manager = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_dependency_manager)
+
+from tests.test_dependency_manager.release_server import ReleaseServerTestCase, make_zip
+
+DependencyManager = src_dependency_manager.DependencyManager
+
+
+class TestDownloadAndExtract(ReleaseServerTestCase):
+    """Test cases for download_and_extract verifying downloads"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_path = Path(tempfile.mkdtemp())
+        self.output_path = self.test_path / "output"
+        self.dm = DependencyManager(temp_dir=self.test_path / "temp")
+        self.zip_data = make_zip({"Tool.exe": os.urandom(4096), "README.txt": b"tool"})
+        self.server.files = {"/tool.zip": self.zip_data}
+        self.logger_patcher = patch.object(src_dependency_manager, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        shutil.rmtree(self.test_path, ignore_errors=True)
+
+    def test_download_and_extract_verified_digest(self):
+        """Test that a download with the published digest is extracted without a separate validation pass."""
+        sha256 = hashlib.sha256(self.zip_data).hexdigest()
+
+        with patch.object(DependencyManager, '_validate_zip_file') as mock_validate:
+            result = self.dm.download_and_extract(f"{self.base_url}/tool.zip", self.output_path, "Tool.exe", version="v1", sha256=sha256)
+
+        self.assertTrue(result)
+        mock_validate.assert_not_called()
+        self.assertTrue((self.output_path / "Tool.exe").exists())
+        self.assertEqual((self.output_path / "version.txt").read_text(), "v1")
+        self.mock_logger.info.assert_any_call(f"Verified SHA-256 of tool.zip: {sha256}")
+
+    def test_download_and_extract_rejects_corrupt_download(self):
+        """Test that a download without the published digest is rejected before extraction and not kept."""
+        with self.assertRaises(Exception) as cm:
+            self.dm.download_and_extract(f"{self.base_url}/tool.zip", self.output_path, "Tool.exe", version="v1", sha256="0" * 64)
+
+        self.assertIn("tool.zip is corrupt", str(cm.exception))
+        self.assertEqual(list(self.output_path.iterdir()), [])
+        self.assertEqual(list((self.test_path / "temp").iterdir()), [])
+
+    def test_download_and_extract_without_digest_validates_zip(self):
+        """Test that without a published digest the download is still checked to be a ZIP."""
+        self.server.files = {"/tool.zip": os.urandom(4096)}
+
+        with self.assertRaises(Exception) as cm:
+            self.dm.download_and_extract(f"{self.base_url}/tool.zip", self.output_path, "Tool.exe", version="v1")
+
+        self.assertIn("not a valid ZIP archive", str(cm.exception))
+        self.mock_logger.warning.assert_any_call("No published SHA-256 for tool.zip, only checking that it is a valid ZIP archive")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ import tempfile
 import zipfile
 import shutil
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 import sys
 
 # Add the src directory to the Python path to import dependency_manager
@@ -158,32 +158,64 @@ class TestExtractZip(unittest.TestCase):
         
         self.assertIn("Failed to extract ZIP file", str(context.exception))
 
-    @patch('zipfile.ZipFile')
-    def test_extract_zip_handles_extraction_error(self, mock_zipfile_class):
-        """Test _extract_zip handles errors during extraction process."""
-        # Mock ZipFile to raise exception during extractall
-        mock_zipfile = MagicMock()
-        mock_zipfile.__enter__ = MagicMock(return_value=mock_zipfile)
-        mock_zipfile.__exit__ = MagicMock(return_value=None)
-        mock_zipfile.namelist.return_value = ['file1.txt', 'file2.txt']
-        mock_zipfile.extractall.side_effect = PermissionError("Access denied")
-        mock_zipfile_class.return_value = mock_zipfile
+    def test_extract_zip_handles_extraction_error(self):
+        """Test _extract_zip handles errors while writing the files."""
+        self._create_test_zip(self.zip_path, {'file1.txt': 'content1', 'file2.txt': 'content2'})
         
-        with self.assertRaises(Exception) as context:
-            self.dm._extract_zip(self.zip_path, self.output_path)
+        with patch.object(src_dependency_manager.shutil, 'copyfileobj', side_effect=PermissionError("Access denied")):
+            with patch.object(src_dependency_manager, 'logger'):
+                with self.assertRaises(Exception) as context:
+                    self.dm._extract_zip(self.zip_path, self.output_path)
         
         self.assertIn("Failed to extract ZIP file: Access denied", str(context.exception))
 
-    def test_extract_zip_calls_flatten_extraction(self):
-        """Test that _extract_zip calls _flatten_extraction."""
-        files = {'test.txt': 'content'}
-        self._create_test_zip(self.zip_path, files)
+    def test_extract_zip_strips_top_level_folder_without_moving(self):
+        """Test that a single top-level folder is left out while writing, even with files already in the output directory."""
+        (self.output_path / 'version.txt').write_text('v1')  # From the previous install
+        files = {'app.exe': 'binary', 'nested/file.txt': 'Content'}
+        self._create_test_zip(self.zip_path, files, use_subdirectory=True)
         
-        with patch.object(self.dm, '_flatten_extraction') as mock_flatten:
+        with patch.object(src_dependency_manager.shutil, 'move') as mock_move:
             with patch.object(src_dependency_manager, 'logger'):
+                executable_path = self.dm._extract_zip(self.zip_path, self.output_path, 'app.exe')
+        
+        mock_move.assert_not_called()
+        self.assertEqual(executable_path, self.output_path / 'app.exe')
+        self.assertEqual((self.output_path / 'nested' / 'file.txt').read_text(), 'Content')
+        self.assertFalse((self.output_path / 'subdir').exists())
+
+    def test_extract_zip_records_nested_executable(self):
+        """Test that the executable closest to the top is recorded where it was extracted."""
+        files = {'bin/tools/app.exe': 'deep', 'bin/app.exe': 'shallow', 'readme.txt': 'Hello'}
+        self._create_test_zip(self.zip_path, files)
+        
+        with patch.object(src_dependency_manager, 'logger'):
+            executable_path = self.dm._extract_zip(self.zip_path, self.output_path, 'app.exe')
+        
+        self.assertEqual(executable_path, self.output_path / 'bin' / 'app.exe')
+
+    def test_extract_zip_many_files_in_parallel(self):
+        """Test that an archive with more files than one batch is written completely by several threads."""
+        files = {f'dir_{i % 7}/file_{i}.txt': f'Content {i}' for i in range(500)}
+        self._create_test_zip(self.zip_path, files)
+        
+        with patch.object(src_dependency_manager, 'logger'):
+            self.dm._extract_zip(self.zip_path, self.output_path, workers=4)
+        
+        for name, content in files.items():
+            self.assertEqual((self.output_path / name).read_text(), content)
+
+    def test_extract_zip_rejects_member_outside_output(self):
+        """Test that a member with .. in its path is not written outside of the output directory."""
+        with zipfile.ZipFile(self.zip_path, 'w') as zf:
+            zf.writestr('../escape.txt', 'outside')
+        
+        with patch.object(src_dependency_manager, 'logger'):
+            with self.assertRaises(Exception) as context:
                 self.dm._extract_zip(self.zip_path, self.output_path)
-                
-                mock_flatten.assert_called_once_with(self.output_path)
+        
+        self.assertIn("outside of", str(context.exception))
+        self.assertFalse((self.test_path / 'escape.txt').exists())
 
     def test_extract_zip_large_file_count_logging(self):
         """Test logging behavior with exactly 10 files (boundary condition)."""
@@ -0,0 +1,149 @@
+import unittest
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+import sys
+
+# Add the src directory to the Python path to import dependency_manager
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.dependency_manager module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_dependency_manager", os.path.join(src_path, "dependency_manager.py"))
+src_dependency_manager = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_dependency_manager)
+
+import dependency_store
+
+from tests.test_dependency_manager.release_server import ReleaseServerTestCase, make_zip
+
+DependencyManager = src_dependency_manager.DependencyManager
+
+
+class TestInstallLocked(ReleaseServerTestCase):
+    """Test cases for installing dependencies from dependencies.lock"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_path = Path(tempfile.mkdtemp())
+        self.output_path = self.test_path / "DepotDownloader"
+        self.mirror_dir = self.test_path / "mirror"
+        self.store = dependency_store.DependencyStore(self.test_path / "store")
+        self.zip_data = make_zip({"DepotDownloader.exe": os.urandom(4096)})
+        self.entry = {
+            "repo": "SteamRE/DepotDownloader",
+            "tag": "DepotDownloader_3.0.0",
+            "assets": [{
+                "name": "DepotDownloader-windows-x64.zip",
+                "url": f"{self.base_url}/SteamRE/DepotDownloader/releases/download/DepotDownloader_3.0.0/DepotDownloader-windows-x64.zip",
+                "size": len(self.zip_data),
+                "sha256": hashlib.sha256(self.zip_data).hexdigest(),
+            }],
+        }
+        self.mirror_path = self.mirror_dir / "SteamRE" / "DepotDownloader" / "releases" / "download" / "DepotDownloader_3.0.0" / "DepotDownloader-windows-x64.zip"
+        self.mirror_path.parent.mkdir(parents=True)
+        self.mirror_path.write_bytes(self.zip_data)
+        self.server.files = {}
+        self.logger_patchers = [patch.object(src_dependency_manager, 'logger'), patch.object(dependency_store, 'logger')]
+        for patcher in self.logger_patchers:
+            patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        for patcher in self.logger_patchers:
+            patcher.stop()
+        shutil.rmtree(self.test_path, ignore_errors=True)
+
+    def _manager(self, mirror_dir=None):
+        return DependencyManager(temp_dir=self.test_path / "temp", store=self.store, mirror_dir=mirror_dir)
+
+    def test_install_locked_from_mirror_without_network(self):
+        """Test that a locked release is installed from the mirror without any request."""
+        with patch.object(src_dependency_manager, 'get_client') as mock_get_client:
+            result = self._manager(self.mirror_dir).install_locked(self.entry, self.output_path, "DepotDownloader.exe")
+
+        self.assertTrue(result)
+        mock_get_client.assert_not_called()
+        self.assertEqual((self.output_path / "version.txt").read_text(), "DepotDownloader_3.0.0")
+        self.assertTrue((self.output_path / "DepotDownloader.exe").exists())
+
+    def test_install_locked_rejects_corrupt_mirror_file(self):
+        """Test that a mirrored file with a different SHA-256 than the lock is not installed."""
+        self.mirror_path.write_bytes(make_zip({"DepotDownloader.exe": os.urandom(4096)}))
+
+        result = self._manager(self.mirror_dir).install_locked(self.entry, self.output_path, "DepotDownloader.exe")
+
+        self.assertFalse(result)
+        self.assertFalse(self.output_path.exists())
+
+    def test_install_locked_switches_to_stored_version(self):
+        """Test that a locked version already in the store is switched to without the mirror or the network."""
+        self._manager(self.mirror_dir).install_locked(self.entry, self.output_path, "DepotDownloader.exe")
+        shutil.rmtree(self.mirror_dir)
+        dependency_store.remove_link(self.output_path)
+
+        with patch.object(src_dependency_manager, 'get_client') as mock_get_client:
+            result = self._manager(self.mirror_dir).install_locked(self.entry, self.output_path, "DepotDownloader.exe")
+
+        self.assertTrue(result)
+        mock_get_client.assert_not_called()
+        self.assertEqual((self.output_path / "version.txt").read_text(), "DepotDownloader_3.0.0")
+
+    def test_install_locked_downloads_recorded_url_without_mirror(self):
+        """Test that without a mirror the asset is downloaded from the URL in the lock."""
+        self.server.files = {"/SteamRE/DepotDownloader/releases/download/DepotDownloader_3.0.0/DepotDownloader-windows-x64.zip": self.zip_data}
+
+        result = self._manager().install_locked(self.entry, self.output_path, "DepotDownloader.exe")
+
+        self.assertTrue(result)
+        self.assertTrue((self.output_path / "DepotDownloader.exe").exists())
+
+    def test_update_lock_records_latest_releases(self):
+        """Test that the lock records each dependency's latest release, hashing assets without a published digest."""
+        unhashed = b"readme without digest"
+        self.server.files = {"/README.md": unhashed}
+        releases = {
+            "https://api.github.com/repos/Surxe/CUE4P-BatchExport/releases/latest": {"tag_name": "v2", "assets": [
+                {"name": "BatchExport-windows-x64.zip", "browser_download_url": "https://example.invalid/b.zip", "size": 10, "digest": "sha256:" + "a" * 64},
+                {"name": "README.md", "browser_download_url": f"{self.base_url}/README.md", "size": len(unhashed), "digest": None},
+            ]},
+            "https://api.github.com/repos/SteamRE/DepotDownloader/releases/latest": {"tag_name": "DepotDownloader_3.0.0", "assets": [
+                {"name": "DepotDownloader-linux-x64.zip", "browser_download_url": "https://example.invalid/linux.zip", "size": 5, "digest": "sha256:" + "c" * 64},
+                {"name": "DepotDownloader-windows-x64.zip", "browser_download_url": "https://example.invalid/d.zip", "size": 20, "digest": "sha256:" + "b" * 64},
+            ]},
+            "https://api.github.com/repos/UE4SS-RE/RE-UE4SS/releases": [
+                {"tag_name": "experimental", "assets": [{"name": "UE4SS_v3.0.1-1.zip", "browser_download_url": "https://example.invalid/u.zip", "size": 30, "digest": "sha256:" + "d" * 64}]},
+                {"tag_name": "v3.0.1", "assets": []},
+            ],
+        }
+        lock_file = self.test_path / "dependencies.lock"
+
+        with patch.object(DependencyManager, '_get_json_from_url', side_effect=lambda url: releases[url]):
+            src_dependency_manager.update_lock(lock_file, temp_dir=self.test_path / "temp")
+
+        lock = json.loads(lock_file.read_text())
+        self.assertEqual(lock["BatchExport"]["tag"], "v2")
+        self.assertEqual(lock["BatchExport"]["assets"][1], {"name": "README.md", "url": f"{self.base_url}/README.md", "size": len(unhashed), "sha256": hashlib.sha256(unhashed).hexdigest()})
+        self.assertEqual(lock["DepotDownloader"]["assets"], [{"name": "DepotDownloader-windows-x64.zip", "url": "https://example.invalid/d.zip", "size": 20, "sha256": "b" * 64}])
+        self.assertEqual(lock["UE4SS"]["repo"], "UE4SS-RE/RE-UE4SS")
+        self.assertEqual(lock["UE4SS"]["tag"], "experimental")
+
+    def test_install_locked_dependency_without_lock_file(self):
+        """Test that installing from a lock file that doesn't exist fails with how to create it."""
+        with self.assertRaises(ValueError) as cm:
+            src_dependency_manager.install_locked_dependency("UE4SS", lock_file=self.test_path / "dependencies.lock")
+
+        self.assertIn("--update-lock", str(cm.exception))
+
+    def test_get_mirror_path_follows_url_path(self):
+        """Test that a mirrored file is found at the path of its download URL."""
+        self.assertEqual(src_dependency_manager.get_mirror_path(self.mirror_dir, self.entry["assets"][0]["url"]), self.mirror_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
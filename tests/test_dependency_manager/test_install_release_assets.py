@@ -0,0 +1,93 @@
+import unittest
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+import sys
+
+# Add the src directory to the Python path to import dependency_manager
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.dependency_manager module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_dependency_manager", os.path.join(src_path, "dependency_manager.py"))
+src_dependency_manager = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_dependency_manager)
+
+import dependency_store
+
+from tests.test_dependency_manager.release_server import ReleaseServerTestCase, make_zip
+
+DependencyManager = src_dependency_manager.DependencyManager
+
+
+class TestInstallReleaseAssets(ReleaseServerTestCase):
+    """Test cases for install_release_assets installing through the dependency store"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_path = Path(tempfile.mkdtemp())
+        self.output_path = self.test_path / "BatchExport"
+        self.store = dependency_store.DependencyStore(self.test_path / "store")
+        self.dm = DependencyManager(temp_dir=self.test_path / "temp", store=self.store)
+        self.logger_patchers = [patch.object(src_dependency_manager, 'logger'), patch.object(dependency_store, 'logger')]
+        for patcher in self.logger_patchers:
+            patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        for patcher in self.logger_patchers:
+            patcher.stop()
+        shutil.rmtree(self.test_path, ignore_errors=True)
+
+    def _release(self, version, exe):
+        """Serve a release of a ZIP with BatchExport.exe (padded so the ZIP is over the 1000 byte minimum) and a README, and get its assets."""
+        self.server.files = {
+            f"/{version}/BatchExport.zip": make_zip({"BatchExport-v/BatchExport.exe": exe, "BatchExport-v/padding.bin": os.urandom(2048)}),
+            f"/{version}/README.md": b"readme",
+        }
+        return [{"name": path.rsplit("/", 1)[1], "browser_download_url": f"{self.base_url}{path}"} for path in self.server.files]
+
+    def test_install_release_assets_switches_output_to_stored_version(self):
+        """Test that every asset of a release ends up in a stored version the output directory links to."""
+        result = self.dm.install_release_assets("Surxe/CUE4P-BatchExport", "v1", self._release("v1", b"one"), self.output_path, "BatchExport.exe")
+
+        self.assertTrue(result)
+        self.assertTrue(dependency_store.is_link(self.output_path))
+        self.assertEqual((self.output_path / "BatchExport.exe").read_bytes(), b"one")
+        self.assertEqual((self.output_path / "README.md").read_bytes(), b"readme")
+        self.assertEqual((self.output_path / "version.txt").read_text(), "v1")
+        self.assertIsNotNone(self.store.find("Surxe/CUE4P-BatchExport", "v1"))
+
+    def test_install_release_assets_failure_keeps_installed_version(self):
+        """Test that a release with an asset that fails to download leaves the installed version in place."""
+        self.dm.install_release_assets("Surxe/CUE4P-BatchExport", "v1", self._release("v1", b"one"), self.output_path, "BatchExport.exe")
+        assets = self._release("v2", b"two")
+        del self.server.files["/v2/README.md"]
+
+        result = self.dm.install_release_assets("Surxe/CUE4P-BatchExport", "v2", assets, self.output_path, "BatchExport.exe")
+
+        self.assertFalse(result)
+        self.assertEqual((self.output_path / "version.txt").read_text(), "v1")
+        self.assertIsNone(self.store.find("Surxe/CUE4P-BatchExport", "v2"))
+        self.assertEqual(list(self.store.staging_dir.iterdir()), [])
+
+    def test_switch_to_stored_without_network(self):
+        """Test that switching back to a stored version downloads nothing."""
+        self.dm.install_release_assets("Surxe/CUE4P-BatchExport", "v1", self._release("v1", b"one"), self.output_path, "BatchExport.exe")
+        self.dm.install_release_assets("Surxe/CUE4P-BatchExport", "v2", self._release("v2", b"two"), self.output_path, "BatchExport.exe")
+        self.server.files = {}
+
+        with patch.object(src_dependency_manager, 'get_client') as mock_get_client:
+            result = self.dm._switch_to_stored("Surxe/CUE4P-BatchExport", "v1", self.output_path)
+
+        self.assertTrue(result)
+        mock_get_client.assert_not_called()
+        self.assertEqual((self.output_path / "BatchExport.exe").read_bytes(), b"one")
+        self.assertFalse(self.dm._switch_to_stored("Surxe/CUE4P-BatchExport", "v3", self.output_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
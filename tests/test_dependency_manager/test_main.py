@@ -0,0 +1,74 @@
+import unittest
+import os
+import threading
+from unittest.mock import patch
+import sys
+
+# Add the src directory to the Python path to import dependency_manager
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.dependency_manager module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_dependency_manager", os.path.join(src_path, "dependency_manager.py"))
+src_dependency_manager = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_dependency_manager)
+
+
+class TestMain(unittest.TestCase):
+    """Test cases for main installing every dependency"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.logger_patcher = patch.object(src_dependency_manager, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+
+    def test_main_installs_dependencies_concurrently(self):
+        """Test that every install runs at the same time, so each sees the others started."""
+        barrier = threading.Barrier(3, timeout=5)
+        forced = []
+
+        def install(force=False):
+            forced.append(force)
+            barrier.wait()  # Times out (BrokenBarrierError) if the installs ran one after another
+            return True
+
+        with patch.dict(src_dependency_manager.DEPENDENCIES, {"A": install, "B": install, "C": install}, clear=True):
+            result = src_dependency_manager.main(force_download=True)
+
+        self.assertTrue(result)
+        self.assertEqual(forced, [True, True, True])
+        self.mock_logger.success.assert_called_once_with("All dependencies installed successfully!")
+
+    def test_main_reports_every_failure(self):
+        """Test that a failing install doesn't stop the others and every failure is reported."""
+        installed = []
+
+        def fail(force=False):
+            raise Exception("GitHub API rate limit exceeded")
+
+        def partial(force=False):
+            return False
+
+        def install(force=False):
+            installed.append("C")
+            return True
+
+        with patch.dict(src_dependency_manager.DEPENDENCIES, {"A": fail, "B": partial, "C": install}, clear=True):
+            result = src_dependency_manager.main()
+
+        self.assertFalse(result)
+        self.assertEqual(installed, ["C"])
+        errors = [call_args[0][0] for call_args in self.mock_logger.error.call_args_list]
+        self.assertIn("Failed to install A: GitHub API rate limit exceeded", errors)
+        self.assertIn("Failed to install B: some of its assets could not be installed", errors)
+        self.assertIn("Failed to install dependencies: A, B", errors)
+        self.mock_logger.success.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1 @@
+# Test package for dependency_store module
\ No newline at end of file
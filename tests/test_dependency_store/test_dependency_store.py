@@ -0,0 +1,149 @@
+import unittest
+import os
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import dependency_store
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.dependency_store module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_dependency_store", os.path.join(src_path, "dependency_store.py"))
+src_dependency_store = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_dependency_store)
+
+DependencyStore = src_dependency_store.DependencyStore
+
+
+class TestDependencyStore(unittest.TestCase):
+    """Test cases for the versioned dependency store"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_path = Path(tempfile.mkdtemp())
+        self.store = DependencyStore(self.test_path / "store")
+        self.install_dir = self.test_path / "tools" / "BatchExport"
+        self.logger_patcher = patch.object(src_dependency_store, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        shutil.rmtree(self.test_path, ignore_errors=True)
+
+    def _add_version(self, version, content, name="Surxe/CUE4P-BatchExport"):
+        """Stage a version with a version.txt and a file of content, and add it to the store."""
+        staging_path = self.store.create_staging_dir()
+        (staging_path / "version.txt").write_text(version)
+        (staging_path / "BatchExport.exe").write_text(content)
+        return self.store.add(name, version, staging_path, src_dependency_store.get_content_key({"BatchExport.zip": content}))
+
+    def test_activate_switches_install_link(self):
+        """Test that the install directory links to the activated version and can be switched back to the previous one."""
+        first = self._add_version("v1", "one")
+        second = self._add_version("v2", "two")
+
+        self.store.activate(first, self.install_dir)
+        self.store.activate(second, self.install_dir)
+
+        self.assertTrue(src_dependency_store.is_link(self.install_dir))
+        self.assertEqual((self.install_dir / "version.txt").read_text(), "v2")
+        self.assertEqual(self.store.get_installed(self.install_dir), second)
+        self.assertEqual(self.store.get_previous(self.install_dir), first)
+
+        self.store.activate(self.store.get_previous(self.install_dir), self.install_dir)
+
+        self.assertEqual((self.install_dir / "BatchExport.exe").read_text(), "one")
+        self.assertEqual(self.store.get_previous(self.install_dir), second)
+        self.assertEqual(sorted(path.name for path in self.install_dir.parent.iterdir()), ["BatchExport"])
+
+    def test_add_same_content_stored_once(self):
+        """Test that a version re-tagged without changes is stored once, under both tags."""
+        first = self._add_version("v1", "same")
+        second = self._add_version("v1-rerelease", "same")
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.store.find("Surxe/CUE4P-BatchExport", "v1-rerelease"), first)
+        self.assertEqual([entry["tags"] for entry in self.store.list_versions("Surxe/CUE4P-BatchExport")], [["v1", "v1-rerelease"]])
+        self.assertEqual(list(self.store.staging_dir.iterdir()), [])
+
+    def test_find_version_of_other_dependency(self):
+        """Test that a version is only found for the dependency it was stored for."""
+        self._add_version("v1", "one", name="SteamRE/DepotDownloader")
+
+        self.assertIsNone(self.store.find("Surxe/CUE4P-BatchExport", "v1"))
+        self.assertIsNone(self.store.find("SteamRE/DepotDownloader", "v2"))
+
+    def test_activate_replaces_directory_installed_before(self):
+        """Test that an install directory from before the store is replaced by a link."""
+        self.install_dir.mkdir(parents=True)
+        (self.install_dir / "old.dll").write_text("old")
+        key = self._add_version("v1", "one")
+
+        self.store.activate(key, self.install_dir)
+
+        self.assertTrue(src_dependency_store.is_link(self.install_dir))
+        self.assertFalse((self.install_dir / "old.dll").exists())
+
+    def test_activate_missing_version(self):
+        """Test that activating a version that isn't stored fails and leaves the install alone."""
+        key = self._add_version("v1", "one")
+        self.store.activate(key, self.install_dir)
+
+        with self.assertRaises(ValueError):
+            self.store.activate("0" * 64, self.install_dir)
+
+        self.assertEqual(self.store.get_installed(self.install_dir), key)
+
+    def test_evict_removes_least_recently_installed(self):
+        """Test that over the size cap the least recently installed versions go first and the installed one stays."""
+        keys = [self._add_version(f"v{index}", str(index) * 1000) for index in range(4)]
+        for key in [keys[2], keys[0], keys[1], keys[3]]:
+            self.store.activate(key, self.install_dir)
+            time.sleep(0.01)
+        self.store.max_size = 2500
+
+        removed = self.store.evict()
+
+        self.assertEqual(removed, [keys[2], keys[0]])
+        self.assertFalse((self.store.root / keys[2]).exists())
+        self.assertEqual([entry["key"] for entry in self.store.list_versions("Surxe/CUE4P-BatchExport")], [keys[3], keys[1]])
+        self.assertEqual(self.store.get_previous(self.install_dir), keys[1])
+
+    def test_evict_keeps_installed_over_cap(self):
+        """Test that an installed version is kept even if it alone is over the size cap."""
+        self.store.max_size = 0
+        key = self._add_version("v1", "one")
+
+        self.store.activate(key, self.install_dir)
+
+        self.assertEqual((self.install_dir / "version.txt").read_text(), "v1")
+
+    def test_store_removes_interrupted_staging(self):
+        """Test that staging directories left by an interrupted install are removed by the next store."""
+        staging_path = self.store.create_staging_dir()
+        (staging_path / "partial.dll").write_text("partial")
+
+        DependencyStore(self.store.root)
+
+        self.assertFalse(staging_path.exists())
+
+    def test_get_content_key_order_independent(self):
+        """Test that the content address doesn't depend on the order the files were downloaded in."""
+        self.assertEqual(
+            src_dependency_store.get_content_key({"a.zip": "1" * 64, "README.md": "2" * 64}),
+            src_dependency_store.get_content_key({"README.md": "2" * 64, "a.zip": "1" * 64}),
+        )
+        self.assertNotEqual(
+            src_dependency_store.get_content_key({"a.zip": "1" * 64}),
+            src_dependency_store.get_content_key({"a.zip": "3" * 64}),
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import governor
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.governor module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_governor", os.path.join(src_path, "governor.py"))
+src_governor = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_governor)
+
+Governor = src_governor.Governor
+VolumeSlots = src_governor.VolumeSlots
+MB = 1024 ** 2
+
+
+class TestGovernor(unittest.TestCase):
+    """Test cases for the CPU and I/O slot governor"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.logger_patcher = patch.object(src_governor, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _acquire_in_thread(self, governor, paths):
+        """Start acquiring slots on another thread, returning the event set once they are held."""
+        acquired = threading.Event()
+        leases = []
+
+        def acquire():
+            leases.append(governor.acquire("waiting", paths))
+            acquired.set()
+        threading.Thread(target=acquire, daemon=True).start()
+        return acquired, leases
+
+    def test_slot_pool_serves_higher_priority_first(self):
+        """Test that a freed slot goes to the highest priority waiter, then to the earliest."""
+        pool = src_governor.SlotPool("CPU", 1)
+        pool.acquire()
+        order = []
+
+        def acquire(name, priority):
+            pool.acquire(priority)
+            order.append(name)
+            pool.release()
+        threads = []
+        for name, priority in [("low", 0), ("high", 5), ("low second", 0)]:
+            threads.append(threading.Thread(target=acquire, args=(name, priority), daemon=True))
+            threads[-1].start()
+            time.sleep(0.1)  # Arrive in this order
+        pool.release()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(order, ["high", "low", "low second"])
+
+    def test_acquire_waits_for_volume_slot(self):
+        """Test that a second process on a full volume waits until the first releases its slot."""
+        governor = Governor(cpu_slots=4, io_slots=1)
+        lease = governor.acquire("first", [self.test_path / "a"])
+
+        acquired, leases = self._acquire_in_thread(governor, [self.test_path / "b"])
+        self.assertFalse(acquired.wait(0.2))
+
+        lease.release()
+        self.assertTrue(acquired.wait(2))
+        leases[0].release()
+
+    def test_acquire_waits_for_cpu_slot(self):
+        """Test that processes without I/O paths are still limited by the CPU slots."""
+        governor = Governor(cpu_slots=1, io_slots=1)
+        lease = governor.acquire("first")
+
+        acquired, leases = self._acquire_in_thread(governor, None)
+        self.assertFalse(acquired.wait(0.2))
+
+        lease.release()
+        self.assertTrue(acquired.wait(2))
+        leases[0].release()
+
+    def test_release_twice_frees_slots_once(self):
+        """Test that releasing a lease again does not free slots held by others."""
+        governor = Governor(cpu_slots=2, io_slots=2)
+        lease = governor.acquire("first", [self.test_path])
+        governor.acquire("second", [self.test_path])
+
+        lease.release()
+        lease.release()
+
+        self.assertEqual(governor.volume(self.test_path).in_use, 1)
+        self.assertEqual(governor.cpu.in_use, 1)
+
+    def test_shutdown_fails_waiting_acquire(self):
+        """Test that shutting down stops stages waiting for a slot from starting processes."""
+        governor = Governor(cpu_slots=1, io_slots=1)
+        governor.acquire("first")
+        errors = []
+
+        def acquire():
+            try:
+                governor.acquire("waiting")
+            except RuntimeError as e:
+                errors.append(e)
+        thread = threading.Thread(target=acquire, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        governor.shutdown()
+        thread.join(2)
+
+        self.assertEqual(len(errors), 1)
+
+    def test_record_opens_slot_while_throughput_grows(self):
+        """Test that an adaptive volume allows another process once it has enough samples at its limit."""
+        volume = VolumeSlots("disk", 1, adaptive=True)
+        for _ in range(src_governor.MIN_SAMPLES):
+            volume.record(1, 100 * MB)
+        self.assertEqual(volume.limit, 2)
+
+        for _ in range(src_governor.MIN_SAMPLES):
+            volume.record(2, 190 * MB)
+        self.assertEqual(volume.limit, 3)
+
+    def test_record_lowers_limit_when_saturated(self):
+        """Test that a volume whose throughput does not grow with another process goes back to the previous limit."""
+        volume = VolumeSlots("disk", 1, adaptive=True)
+        for _ in range(src_governor.MIN_SAMPLES):
+            volume.record(1, 100 * MB)
+        for _ in range(src_governor.MIN_SAMPLES):
+            volume.record(2, 105 * MB)
+
+        self.assertEqual(volume.limit, 1)
+        self.assertEqual(volume.max_limit, 1)
+
+        for _ in range(src_governor.MIN_SAMPLES):
+            volume.record(1, 100 * MB)
+        self.assertEqual(volume.limit, 1)
+
+    def test_reset_limits_probes_saturated_volume_again(self):
+        """Test that a saturation found in one run no longer caps the volume once the limits are reset for the next run."""
+        governor = src_governor.Governor()
+        volume = governor.volume(self.test_dir)
+        for _ in range(src_governor.MIN_SAMPLES):
+            volume.record(1, 100 * MB)
+        for _ in range(src_governor.MIN_SAMPLES):
+            volume.record(2, 105 * MB)
+        self.assertEqual(volume.max_limit, 1)
+
+        governor.reset_limits()
+
+        self.assertEqual((volume.limit, volume.max_limit, volume.samples), (1, src_governor.MAX_AUTO_IO_SLOTS, {}))
+        for _ in range(src_governor.MIN_SAMPLES):
+            volume.record(1, 100 * MB)
+        self.assertEqual(volume.limit, 2)
+
+    def test_record_ignored_for_fixed_limit(self):
+        """Test that a configured limit is never changed by samples."""
+        volume = VolumeSlots("disk", 2, adaptive=False)
+        for _ in range(src_governor.MIN_SAMPLES * 2):
+            volume.record(2, 500 * MB)
+
+        self.assertEqual(volume.limit, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
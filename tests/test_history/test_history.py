@@ -0,0 +1,173 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import history
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.history module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_history", os.path.join(src_path, "history.py"))
+src_history = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_history)
+
+RunHistory = src_history.RunHistory
+
+VERSIONS = {"BatchExport": "v1.0", "UE4SS": "v3.0"}
+
+
+def make_report(stages):
+    """Build a minimal telemetry report from stage name to (wall seconds, input size)."""
+    return {
+        "started_at": 0,
+        "stages": {
+            name: {"status": "success", "wall_seconds": wall_seconds, "input_size": input_size}
+            for name, (wall_seconds, input_size) in stages.items()
+        },
+    }
+
+
+class TestRunHistory(unittest.TestCase):
+    """Test cases for the run history and regression detection"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.logger_patcher = patch.object(src_history, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+        self.history = RunHistory(self.test_path / "state" / "history.sqlite3")
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.history.close()
+        self.logger_patcher.stop()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _record(self, stages, versions=VERSIONS, success=True):
+        return self.history.record_run(make_report(stages), success, versions)
+
+    def test_find_regressions_flags_slow_stage(self):
+        """Test that a stage much slower than its median is reported."""
+        for seconds in (100, 110, 90):
+            self._record({"get_mapper": (seconds, None)})
+        run_id = self._record({"get_mapper": (250, None)})
+
+        regressions = self.history.find_regressions(run_id, threshold=1.5)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0]["stage"], "get_mapper")
+        self.assertEqual(regressions[0]["expected_seconds"], 100)
+        self.assertEqual(regressions[0]["ratio"], 2.5)
+        self.assertFalse(regressions[0]["normalized_by_input_size"])
+
+    def test_find_regressions_within_threshold(self):
+        """Test that normal variation is not reported."""
+        for seconds in (100, 110, 90):
+            self._record({"get_mapper": (seconds, None)})
+        run_id = self._record({"get_mapper": (140, None)})
+
+        self.assertEqual(self.history.find_regressions(run_id, threshold=1.5), [])
+
+    def test_find_regressions_normalizes_by_input_size(self):
+        """Test that a stage with twice the input may take twice as long."""
+        for _ in range(3):
+            self._record({"repack": (100, 1000)})
+
+        bigger_update = self._record({"repack": (200, 2000)})
+        self.assertEqual(self.history.find_regressions(bigger_update, threshold=1.5), [])
+
+        slower = self._record({"repack": (200, 1000)})
+        self.assertEqual([r["stage"] for r in self.history.find_regressions(slower, threshold=1.5)], ["repack"])
+
+    def test_find_regressions_needs_enough_history(self):
+        """Test that stages with too few previous runs are not judged."""
+        self._record({"batch_export": (100, 50)})
+        run_id = self._record({"batch_export": (1000, 50)})
+
+        self.assertEqual(self.history.find_regressions(run_id, threshold=1.5), [])
+
+    def test_find_regressions_ignores_up_to_date_runs(self):
+        """Test that runs skipped because their inputs were unchanged do not drag the baseline down."""
+        for _ in range(3):
+            self._record({"get_mapper": (100, None)})
+        for _ in range(5):
+            report = make_report({"get_mapper": (0.1, None)})
+            report["stages"]["get_mapper"]["up_to_date"] = True
+            self.history.record_run(report, True, VERSIONS)
+        run_id = self._record({"get_mapper": (110, None)})
+
+        self.assertEqual(self.history.find_regressions(run_id, threshold=1.5), [])
+
+    def test_find_regressions_reports_changed_dependencies(self):
+        """Test that a regression names the dependency versions that changed since the previous run."""
+        for _ in range(3):
+            self._record({"batch_export": (100, 50)})
+        run_id = self._record({"batch_export": (200, 50)}, versions={"BatchExport": "v1.1", "UE4SS": "v3.0"})
+
+        regressions = self.history.find_regressions(run_id, threshold=1.5)
+
+        self.assertEqual(regressions[0]["changed_dependencies"], {"BatchExport": {"from": "v1.0", "to": "v1.1"}})
+
+    def test_find_regressions_only_requested_stages(self):
+        """Test that stages outside the requested list are not checked."""
+        for _ in range(3):
+            self._record({"steam_download": (10, None)})
+        run_id = self._record({"steam_download": (1000, None)})
+
+        self.assertEqual(self.history.find_regressions(run_id, threshold=1.5, stages=["repack"]), [])
+
+    def test_baseline_medians_per_input(self):
+        """Test that the baseline has the median rates of the recent runs and the latest input size."""
+        for seconds, input_size, extracted in ((100, 10, 30), (300, 20, 80), (60, 6, 12)):
+            report = make_report({"repack": (seconds, input_size)})
+            report["stages"]["repack"].update(extracted_bytes=extracted, output_bytes=input_size)
+            self.history.record_run(report, True, VERSIONS)
+
+        baseline = self.history.baseline("repack")
+
+        self.assertEqual(baseline["runs"], 3)
+        self.assertEqual(baseline["input_size"], 6)
+        self.assertAlmostEqual(baseline["seconds_per_input"], 10)
+        self.assertAlmostEqual(baseline["extracted_per_input"], 3)
+        self.assertAlmostEqual(baseline["output_per_input"], 1)
+
+    def test_baseline_without_runs(self):
+        """Test that a stage that never did work has no baseline."""
+        self.assertIsNone(self.history.baseline("repack"))
+
+    def test_open_adds_missing_columns(self):
+        """Test that a database from before the disk columns were added is upgraded."""
+        import sqlite3
+        old_file = self.test_path / "old.sqlite3"
+        connection = sqlite3.connect(old_file)
+        connection.executescript(src_history.SCHEMA.replace("    input_size REAL,\n    extracted_bytes INTEGER,\n    output_bytes INTEGER\n", "    input_size REAL\n"))
+        connection.close()
+
+        history = RunHistory(old_file)
+        try:
+            history.record_run(make_report({"repack": (10, 5)}), True, VERSIONS)
+            self.assertEqual(history.baseline("repack")["runs"], 1)
+        finally:
+            history.close()
+
+    def test_history_persists_between_instances(self):
+        """Test that runs recorded by one process are the baseline for the next."""
+        for _ in range(3):
+            self._record({"get_mapper": (100, None)})
+        self.history.close()
+
+        self.history = RunHistory(self.test_path / "state" / "history.sqlite3")
+        run_id = self._record({"get_mapper": (300, None)})
+
+        self.assertEqual(len(self.history.find_regressions(run_id, threshold=1.5)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,360 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import re
+import hashlib
+import shutil
+import time
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import http_client
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.http_client module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_http_client", os.path.join(src_path, "http_client.py"))
+src_http_client = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_http_client)
+
+HttpClient = src_http_client.HttpClient
+
+RELEASE = {"tag_name": "v1.2.3", "assets": [{"name": "tool.zip", "browser_download_url": "/download/tool.zip"}]}
+ETAG = '"release-etag"'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Stand-in for the GitHub API and release downloads, recording the requests it gets."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers), self.client_address))
+        if self.path == "/repos/owner/tool/releases/latest":
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.end_headers()
+                return
+            self.send_body(json.dumps(RELEASE).encode(), {"ETag": ETAG})
+        elif self.path == "/files/asset.zip":
+            self.send_file()
+        elif self.path == "/drop":
+            # Answers without announcing it, then closes the connection like a server dropping an idle one
+            self.send_body(b"{}")
+            self.close_connection = True
+        elif self.path == "/download/tool.zip":
+            self.send_response(302)
+            self.send_header("Location", "/objects/tool.zip?signature=abc")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/objects/tool.zip?signature=abc":
+            self.send_body(b"z" * 100000)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def send_file(self):
+        """Serve server.content with Range and If-Range support, dropping the connection after server.drop_after bytes once."""
+        content, start = self.server.content, 0
+        end = len(content) - 1
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if self.server.ranges and match and (if_range is None or if_range == self.server.etag):
+            start, end = int(match.group(1)), int(match.group(2) or end)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+        else:
+            self.send_response(200)
+        if self.server.ranges:
+            self.send_header("ETag", self.server.etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        body = content[start:end + 1]
+        if self.server.drop_after is not None and len(body) > self.server.drop_after:
+            self.wfile.write(body[:self.server.drop_after])
+            self.server.drop_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def send_body(self, body, headers=None):
+        self.send_response(200)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+    """Test cases for the pooled HTTP client and its metadata cache"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the stand-in server shared by the tests."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        cls.server.requests = []
+        cls.server.content = b""
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the stand-in server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache_file = self.temp_dir / "http_cache.json"
+        self.server.requests.clear()
+        self.server.content = os.urandom(1024 * 1024)
+        self.server.etag = '"asset-v1"'
+        self.server.ranges = True
+        self.server.drop_after = None
+        self.logger_patcher = patch.object(src_http_client, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_get_json_caches_with_etag(self):
+        """Test that metadata is stored with its ETag and asked for again conditionally."""
+        url = f"{self.base_url}/repos/owner/tool/releases/latest"
+        client = HttpClient(self.cache_file)
+
+        self.assertEqual(client.get_json(url), RELEASE)
+        self.assertEqual(json.loads(self.cache_file.read_text())[url]["etag"], ETAG)
+
+        # A new client, like the next run, reads the cache from disk
+        second_client = HttpClient(self.cache_file)
+        self.assertEqual(second_client.get_json(url), RELEASE)
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn("If-None-Match", self.server.requests[0][1])
+        self.assertEqual(self.server.requests[1][1]["If-None-Match"], ETAG)
+        self.mock_logger.debug.assert_called_with(f"{url} not modified since it was cached")
+
+    def test_get_json_within_ttl_skips_request(self):
+        """Test that metadata younger than the TTL is used without a request."""
+        url = f"{self.base_url}/repos/owner/tool/releases/latest"
+        client = HttpClient(self.cache_file, metadata_ttl=600)
+
+        client.get_json(url)
+        client.get_json(url)
+
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_get_reuses_connection_and_follows_redirect(self):
+        """Test that requests to a host share one kept-alive connection, redirects included."""
+        client = HttpClient(self.cache_file)
+
+        client.get_json(f"{self.base_url}/repos/owner/tool/releases/latest")
+        with client.get(f"{self.base_url}/download/tool.zip") as response:
+            body = response.read()
+
+        self.assertEqual(body, b"z" * 100000)
+        self.assertEqual([request[0] for request in self.server.requests], ["/repos/owner/tool/releases/latest", "/download/tool.zip", "/objects/tool.zip?signature=abc"])
+        self.assertEqual(len({request[2] for request in self.server.requests}), 1)  # One client port
+        self.assertEqual(client.connections_opened, 1)
+        self.assertEqual(self.server.requests[0][1]["User-Agent"], "DarkAndDarker-Exporter")
+
+    def test_get_reconnects_when_server_closed_connection(self):
+        """Test that a kept-alive connection the server closed is replaced transparently."""
+        client = HttpClient(self.cache_file)
+        client.get_json(f"{self.base_url}/drop")
+        time.sleep(0.1)  # Lets the server close it
+
+        self.assertEqual(client.get_json(f"{self.base_url}/repos/owner/tool/releases/latest"), RELEASE)
+        self.assertEqual(client.connections_opened, 2)
+
+    def test_get_error_status(self):
+        """Test that an error status raises HttpError with the status."""
+        client = HttpClient(self.cache_file)
+
+        with self.assertRaises(src_http_client.HttpError) as cm:
+            client.get(f"{self.base_url}/missing")
+
+        self.assertEqual(cm.exception.status, 404)
+        self.assertIn("HTTP Error 404", str(cm.exception))
+
+    def get_ranges(self):
+        """Range headers of the requests for the asset."""
+        return [request[1].get("Range") for request in self.server.requests if request[0] == "/files/asset.zip"]
+
+    def test_download_resumes_after_disconnect(self):
+        """Test that a dropped download is resumed with a range request from where it stopped."""
+        self.server.drop_after = 300000
+        path = self.temp_dir / "asset.zip"
+
+        with patch.object(src_http_client, 'RETRY_DELAY', 0):
+            size, _ = HttpClient(self.cache_file).download(f"{self.base_url}/files/asset.zip", path)
+
+        self.assertEqual(size, len(self.server.content))
+        self.assertEqual(path.read_bytes(), self.server.content)
+        self.assertEqual(self.get_ranges()[0], "bytes=0-")
+        self.assertTrue(self.get_ranges()[1].startswith("bytes=300000-"))
+        self.assertEqual(self.server.requests[-1][1]["If-Range"], '"asset-v1"')
+        self.assertFalse(path.with_name("asset.zip.part").exists())
+        self.assertFalse(path.with_name("asset.zip.part.json").exists())
+
+    def test_download_resumes_from_earlier_run(self):
+        """Test that a download given up on keeps its .part file, and the next attempt continues it."""
+        self.server.drop_after = 500000
+        path = self.temp_dir / "asset.zip"
+        url = f"{self.base_url}/files/asset.zip"
+
+        with patch.object(src_http_client, 'PART_SAVE_INTERVAL', 65536):
+            with self.assertRaises(http.client.HTTPException):
+                HttpClient(self.cache_file).download(url, path, retries=0)
+            self.assertTrue(path.with_name("asset.zip.part").exists())
+
+            HttpClient(self.cache_file).download(url, path)
+
+        self.assertEqual(path.read_bytes(), self.server.content)
+        self.assertEqual(self.get_ranges()[-1], f"bytes=500000-{len(self.server.content) - 1}")
+
+    def test_download_restarts_when_file_changed(self):
+        """Test that a partial download of a file that changed on the server since is started over."""
+        self.server.drop_after = 500000
+        path = self.temp_dir / "asset.zip"
+        url = f"{self.base_url}/files/asset.zip"
+        with self.assertRaises(http.client.HTTPException):
+            HttpClient(self.cache_file).download(url, path, retries=0)
+        self.server.content = os.urandom(800000)
+        self.server.etag = '"asset-v2"'
+
+        with patch.object(src_http_client, 'RETRY_DELAY', 0):
+            HttpClient(self.cache_file).download(url, path)
+
+        self.assertEqual(path.read_bytes(), self.server.content)
+        self.assertEqual(self.get_ranges()[-1], "bytes=0-")
+
+    def test_download_in_segments(self):
+        """Test that a large file is downloaded as several byte ranges into one file."""
+        path = self.temp_dir / "asset.zip"
+        client = HttpClient(self.cache_file)
+
+        with patch.object(src_http_client, 'MIN_SEGMENT_SIZE', 200000):
+            client.download(f"{self.base_url}/files/asset.zip", path, segments=4)
+
+        self.assertEqual(path.read_bytes(), self.server.content)
+        size = len(self.server.content)
+        self.assertEqual(sorted(self.get_ranges()), sorted(["bytes=0-", f"bytes={size // 4}-{size // 2 - 1}", f"bytes={size // 2}-{size * 3 // 4 - 1}", f"bytes={size * 3 // 4}-{size - 1}"]))
+
+    def test_download_without_range_support(self):
+        """Test that a server without ranges is downloaded in one stream, and started over when dropped."""
+        self.server.ranges = False
+        self.server.drop_after = 300000
+        path = self.temp_dir / "asset.zip"
+
+        with patch.object(src_http_client, 'RETRY_DELAY', 0), patch.object(src_http_client, 'MIN_SEGMENT_SIZE', 200000):
+            HttpClient(self.cache_file).download(f"{self.base_url}/files/asset.zip", path, segments=4)
+
+        self.assertEqual(path.read_bytes(), self.server.content)
+        self.assertEqual(self.get_ranges(), ["bytes=0-", "bytes=300000-1048575", "bytes=0-"])
+
+    def test_download_hashes_while_writing(self):
+        """Test that a download in one stream is hashed without reading the file back."""
+        path = self.temp_dir / "asset.zip"
+        sha256 = hashlib.sha256(self.server.content).hexdigest()
+
+        with patch.object(src_http_client.Download, '_finish_hash', autospec=True, side_effect=src_http_client.Download._finish_hash) as mock_finish:
+            size, digest = HttpClient(self.cache_file).download(f"{self.base_url}/files/asset.zip", path, sha256=sha256.upper())
+
+        self.assertEqual(digest, sha256)
+        download = mock_finish.call_args[0][0]
+        self.assertEqual(download._hashed, size)
+        self.mock_logger.debug.assert_not_called()  # Nothing was read back
+
+    def test_download_hashes_resumed_and_segmented(self):
+        """Test that the digest covers ranges written out of order and bytes from an earlier attempt."""
+        self.server.drop_after = 100000
+        path = self.temp_dir / "asset.zip"
+        url = f"{self.base_url}/files/asset.zip"
+        sha256 = hashlib.sha256(self.server.content).hexdigest()
+
+        with patch.object(src_http_client, 'MIN_SEGMENT_SIZE', 200000), patch.object(src_http_client, 'PART_SAVE_INTERVAL', 65536):
+            with self.assertRaises(http.client.HTTPException):
+                HttpClient(self.cache_file).download(url, path, segments=4, retries=0)
+            _, digest = HttpClient(self.cache_file).download(url, path, segments=4, sha256=sha256)
+
+        self.assertEqual(digest, sha256)
+        self.assertEqual(path.read_bytes(), self.server.content)
+
+    def test_download_reuses_buffer(self):
+        """Test that a download reads into one buffer of the chunk size instead of allocating a chunk per read."""
+        path = self.temp_dir / "asset.zip"
+        sha256 = hashlib.sha256(self.server.content).hexdigest()
+        buffers = set()
+        readinto = src_http_client.HttpResponse.readinto
+
+        def record_readinto(response, buffer):
+            buffers.add((id(buffer.obj), buffer.obj.__len__()))
+            return readinto(response, buffer)
+
+        with patch.object(src_http_client.HttpResponse, 'readinto', autospec=True, side_effect=record_readinto) as mock_readinto, \
+             patch.object(src_http_client.HttpResponse, 'read', autospec=True) as mock_read:
+            size, digest = HttpClient(self.cache_file).download(f"{self.base_url}/files/asset.zip", path, sha256=sha256, chunk_size=4096)
+
+        self.assertEqual((size, digest), (len(self.server.content), sha256))
+        self.assertGreaterEqual(mock_readinto.call_count, len(self.server.content) // 4096)
+        self.assertEqual(len(buffers), 1)
+        self.assertEqual(next(iter(buffers))[1], 4096)
+        mock_read.assert_not_called()
+
+    def test_download_logs_progress_by_time(self):
+        """Test that progress is logged once the interval has passed, however few bytes arrived since."""
+        path = self.temp_dir / "asset.zip"
+
+        with patch.object(src_http_client, 'PROGRESS_LOG_INTERVAL', 0):
+            HttpClient(self.cache_file).download(f"{self.base_url}/files/asset.zip", path, chunk_size=256 * 1024)
+
+        progress = [call_args[0][0] for call_args in self.mock_logger.info.call_args_list if call_args[0][0].startswith("Downloading asset.zip")]
+        self.assertEqual(len(progress), 4)
+        self.assertIn("100.0% (1.0/1.0 MB", progress[-1])
+
+    def test_download_rejects_digest_mismatch(self):
+        """Test that a download without the expected digest raises and leaves nothing behind."""
+        path = self.temp_dir / "asset.zip"
+
+        with self.assertRaises(src_http_client.DigestMismatchError) as cm:
+            HttpClient(self.cache_file).download(f"{self.base_url}/files/asset.zip", path, sha256="0" * 64)
+
+        self.assertIn("asset.zip is corrupt", str(cm.exception))
+        self.assertEqual(list(self.temp_dir.iterdir()), [])
+
+    def test_parse_sha256(self):
+        """Test that GitHub's published digests and bare hashes are parsed, and other algorithms ignored."""
+        sha256 = "AB" * 32
+        self.assertEqual(src_http_client.parse_sha256(f"sha256:{sha256}"), sha256.lower())
+        self.assertEqual(src_http_client.parse_sha256(sha256), sha256.lower())
+        self.assertIsNone(src_http_client.parse_sha256("sha512:abc"))
+        self.assertIsNone(src_http_client.parse_sha256(None))
+
+    def test_get_proxy_bypasses_localhost(self):
+        """Test that proxies from the environment are used, except for local hosts."""
+        with patch.object(src_http_client, 'getproxies', return_value={"https": "http://proxy.local:3128"}), \
+             patch.object(src_http_client, 'proxy_bypass', return_value=False):
+            self.assertEqual(src_http_client.get_proxy("https", "api.github.com"), ("proxy.local", 3128))
+            self.assertIsNone(src_http_client.get_proxy("https", "127.0.0.1"))
+            self.assertIsNone(src_http_client.get_proxy("http", "api.github.com"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the Python path to import import_profile
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.import_profile module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_import_profile", os.path.join(src_path, "import_profile.py"))
+src_import_profile = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_import_profile)
+
+ImportProfiler = src_import_profile.ImportProfiler
+
+
+class TestImportProfile(unittest.TestCase):
+    """Test cases for the startup import profiler"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        (self.test_path / "profiled_outer.py").write_text("import time\nimport profiled_inner\ntime.sleep(0.02)\n")
+        (self.test_path / "profiled_inner.py").write_text("import time\ntime.sleep(0.05)\n")
+        sys.path.insert(0, self.test_dir)
+        self.profiler = ImportProfiler()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.profiler.uninstall()
+        sys.path.remove(self.test_dir)
+        for name in ("profiled_outer", "profiled_inner"):
+            sys.modules.pop(name, None)
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def test_import_profiler_times_nested_imports(self):
+        """Test that nested import time counts towards the total but not the self time of the importer."""
+        self.profiler.install()
+        import profiled_outer  # noqa: F401
+
+        outer_total, outer_self = self.profiler.timings["profiled_outer"]
+        inner_total, inner_self = self.profiler.timings["profiled_inner"]
+        self.assertGreaterEqual(inner_total, 0.05)
+        self.assertGreaterEqual(outer_total, inner_total + 0.02)
+        self.assertLess(outer_self, outer_total - 0.04)
+
+    def test_import_profiler_uninstall_stops_timing(self):
+        """Test that imports after uninstalling are not timed."""
+        self.profiler.install()
+        self.profiler.uninstall()
+        import profiled_inner  # noqa: F401
+
+        self.assertNotIn("profiled_inner", self.profiler.timings)
+        self.assertNotIn(self.profiler, sys.meta_path)
+
+    def test_import_profiler_leaves_builtin_loader_unchanged(self):
+        """Test that timing a built-in module doesn't patch BuiltinImporter, which is shared by every built-in module."""
+        from importlib.machinery import BuiltinImporter
+        unused = [name for name in sys.builtin_module_names if name not in sys.modules and name != "__main__"]
+        if not unused:
+            self.skipTest("Every built-in module is already imported")
+        exec_module = BuiltinImporter.__dict__["exec_module"]
+
+        self.profiler.install()
+        module = importlib.import_module(unused[0])
+        self.profiler.uninstall()
+
+        self.assertIn(unused[0], self.profiler.timings)
+        self.assertIs(BuiltinImporter.__dict__["exec_module"], exec_module)
+        self.assertIn(unused[0], sys.modules)
+        self.assertIs(module, sys.modules[unused[0]])
+
+    def test_report_lists_slowest_first(self):
+        """Test that the report lists the slowest imports first, up to the limit."""
+        self.profiler.install()
+        import profiled_outer  # noqa: F401
+
+        lines = self.profiler.report(limit=1).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("profiled_outer", lines[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import journal
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.journal module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_journal", os.path.join(src_path, "journal.py"))
+src_journal = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_journal)
+
+Journal = src_journal.Journal
+
+
+class TestJournal(unittest.TestCase):
+    """Test cases for the checkpoint Journal"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.journal_file = self.test_path / "journal.jsonl"
+        self.fingerprint = {"manifest_id": "1"}
+        self.logger_patcher = patch.object(src_journal, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _interrupted_run(self, units):
+        """Simulate a run that completed some units and then died without closing the journal."""
+        scope = Journal(self.journal_file).scope("repack", "out.pak", self.fingerprint)
+        for unit in units:
+            scope.mark_done(unit)
+
+    def test_resume_skips_completed_units(self):
+        """Test that a resumed run sees the units completed by the interrupted run."""
+        self._interrupted_run(["extract:a.pak", "extract:b.pak"])
+
+        scope = Journal(self.journal_file, resume=True).scope("repack", "out.pak", self.fingerprint)
+
+        self.assertTrue(scope.has_progress())
+        self.assertTrue(scope.is_done("extract:a.pak"))
+        self.assertTrue(scope.is_done("extract:b.pak"))
+        self.assertFalse(scope.is_done("extract:c.pak"))
+
+    def test_without_resume_starts_over(self):
+        """Test that a run without resume discards previous units, also for later runs."""
+        self._interrupted_run(["extract:a.pak"])
+
+        scope = Journal(self.journal_file).scope("repack", "out.pak", self.fingerprint)
+        self.assertFalse(scope.is_done("extract:a.pak"))
+
+        resumed = Journal(self.journal_file, resume=True).scope("repack", "out.pak", self.fingerprint)
+        self.assertFalse(resumed.has_progress())
+
+    def test_resume_with_changed_inputs_starts_over(self):
+        """Test that units are not reused when the stage inputs changed."""
+        self._interrupted_run(["extract:a.pak"])
+
+        scope = Journal(self.journal_file, resume=True).scope("repack", "out.pak", {"manifest_id": "2"})
+
+        self.assertFalse(scope.is_done("extract:a.pak"))
+
+    def test_clear_forgets_units_after_success(self):
+        """Test that a finished stage leaves nothing to resume."""
+        journal = Journal(self.journal_file)
+        scope = journal.scope("repack", "out.pak", self.fingerprint)
+        scope.mark_done("extract:a.pak")
+        scope.clear()
+        journal.close()
+
+        resumed = Journal(self.journal_file, resume=True).scope("repack", "out.pak", self.fingerprint)
+        self.assertFalse(resumed.has_progress())
+
+    def test_scopes_are_separate_per_target(self):
+        """Test that units of one target do not count for another."""
+        self._interrupted_run(["extract:a.pak"])
+
+        scope = Journal(self.journal_file, resume=True).scope("repack", "other.pak", self.fingerprint)
+
+        self.assertFalse(scope.is_done("extract:a.pak"))
+
+    def test_load_ignores_partial_last_line(self):
+        """Test that a line cut off by a crash mid-write is ignored."""
+        self._interrupted_run(["extract:a.pak"])
+        with open(self.journal_file, "a") as f:
+            f.write('{"event": "done", "stage": "rep')
+
+        scope = Journal(self.journal_file, resume=True).scope("repack", "out.pak", self.fingerprint)
+
+        self.assertTrue(scope.is_done("extract:a.pak"))
+
+    def test_load_compacts_file(self):
+        """Test that loading rewrites the journal without superseded entries."""
+        for _ in range(5):
+            self._interrupted_run(["extract:a.pak"])
+
+        Journal(self.journal_file)
+
+        lines = self.journal_file.read_text().splitlines()
+        self.assertEqual(len(lines), 2)  # One reset and one done entry
+
+    def test_has_progress(self):
+        """Test that the journal reports whether anything could be resumed."""
+        journal = Journal(self.journal_file)
+        self.assertFalse(journal.has_progress())
+
+        journal.scope("repack", "out.pak", self.fingerprint).mark_done("extract:a.pak")
+        self.assertTrue(journal.has_progress())
+        journal.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
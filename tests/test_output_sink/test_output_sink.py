@@ -0,0 +1,163 @@
+import unittest
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch, call
+
+# Add the src directory to the Python path to import output_sink
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.output_sink module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_output_sink", os.path.join(src_path, "output_sink.py"))
+src_output_sink = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_output_sink)
+
+OutputSink = src_output_sink.OutputSink
+
+
+class TestOutputSink(unittest.TestCase):
+    """Test cases for the process output sink"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.logger_patcher = patch.object(src_output_sink, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        src_output_sink.configure()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def test_write_logs_every_line_under_the_rate(self):
+        """Test that lines within the rate limit are all logged, whatever the chunk boundaries."""
+        sink = OutputSink("tool", lines_per_second=10)
+        sink.write(b'one\ntw')
+        sink.write(b'o\r\nthree')
+        sink.close()
+
+        self.assertEqual(self.mock_logger.debug.call_args_list, [
+            call('[process: tool] one'),
+            call('[process: tool] two'),
+            call('[process: tool] three'),
+        ])
+        self.assertEqual(sink.line_count, 3)
+
+    def test_write_samples_lines_over_the_rate(self):
+        """Test that a burst over the rate limit is sampled across the chunk and the rest counted."""
+        sink = OutputSink("tool", lines_per_second=10)
+        sink.write(b''.join(b'line %d\n' % index for index in range(1000)))
+        sink.close()
+
+        logged = [args[0] for args, _ in self.mock_logger.debug.call_args_list]
+        self.assertEqual(len(logged), 11)  # 10 sampled lines and the notice of the skipped ones
+        self.assertEqual(logged[0], '[process: tool] line 0')
+        self.assertEqual(logged[1], '[process: tool] line 100')
+        self.assertEqual(logged[-1], '[process: tool] (990 lines not logged)')
+
+    def test_write_refills_rate_over_time(self):
+        """Test that lines are logged again once the rate limit refilled."""
+        with patch.object(src_output_sink.time, 'monotonic', side_effect=[0.0, 0.0, 0.0, 5.0, 5.0]):
+            sink = OutputSink("tool", lines_per_second=2)
+            sink.write(b'a\nb\nc\n')  # 2 of 3 logged
+            sink.write(b'd\n')  # Refilled after 5 seconds
+
+        logged = [args[0] for args, _ in self.mock_logger.debug.call_args_list]
+        self.assertEqual(logged, ['[process: tool] a', '[process: tool] b', '[process: tool] d'])
+        self.assertEqual(sink.skipped, 1)
+
+    def test_write_zero_rate_logs_every_line(self):
+        """Test that a rate of 0 turns the limit off."""
+        sink = OutputSink("tool", lines_per_second=0)
+        sink.write(b''.join(b'line %d\n' % index for index in range(500)))
+        sink.close()
+
+        self.assertEqual(self.mock_logger.debug.call_count, 500)
+
+    def test_write_logs_error_lines_as_warnings(self):
+        """Test that error-like lines bypass the rate limit up to MAX_ERROR_LINES."""
+        sink = OutputSink("tool", lines_per_second=1)
+        chunk = b'ok\n' * 100 + b'LogPakFile: Error: corrupt\n' + b'ok\n' * 100 + b'Unhandled Exception: boom\n'
+        with patch.object(src_output_sink, 'MAX_ERROR_LINES', 2):
+            sink.write(chunk)
+            sink.write(b'Fatal error again\n')
+        sink.close()
+
+        self.assertEqual(self.mock_logger.warning.call_args_list, [
+            call('[process: tool] LogPakFile: Error: corrupt'),
+            call('[process: tool] Unhandled Exception: boom'),
+        ])
+
+    def test_write_spools_full_output(self):
+        """Test that the raw output, including unlogged lines and a missing final newline, is spooled."""
+        spool_file = self.test_path / "spool" / "tool-1.log.gz"
+        data = b''.join(b'line %d\n' % index for index in range(5000)) + b'end'
+        sink = OutputSink("tool", spool_file, lines_per_second=5)
+        for start in range(0, len(data), 777):
+            sink.write(data[start:start + 777])
+        sink.close()
+
+        with gzip.open(spool_file, 'rb') as file:
+            self.assertEqual(file.read(), data)
+        self.assertEqual(sink.byte_count, len(data))
+        self.assertIn(f"full output in {spool_file}", self.mock_logger.debug.call_args[0][0])
+
+    def test_log_tail_logs_last_lines(self):
+        """Test that the last lines are kept and logged on request."""
+        sink = OutputSink("tool", lines_per_second=1, tail_lines=3)
+        sink.write(b''.join(b'line %d\n' % index for index in range(100)))
+        sink.write(b'partial')
+        sink.close()
+        sink.log_tail()
+
+        self.mock_logger.error.assert_called_once_with("Last 3 lines of tool output:\nline 98\nline 99\npartial")
+
+    def test_log_tail_without_output(self):
+        """Test that nothing is logged for a process without output."""
+        sink = OutputSink("tool")
+        sink.close()
+        sink.log_tail()
+
+        self.mock_logger.error.assert_not_called()
+
+    def test_write_feeds_progress_with_every_line(self):
+        """Test that the progress tracker sees every line, including the ones not logged."""
+        parser = src_output_sink.get_parser("UnrealPak Extract")
+        progress = src_output_sink.ProgressTracker("UnrealPak Extract", parser)
+        sink = OutputSink("UnrealPak Extract", lines_per_second=1, progress=progress)
+        sink.write(b'Extracted "a" to "b"\n' * 1000)
+        sink.write(b'Extracted "a" to "b"')
+        sink.close()
+
+        self.assertEqual(progress.event.done, 1001)
+
+    def test_create_sink_attaches_progress_by_name(self):
+        """Test that sinks of tools with a parser get a progress tracker with the expected total."""
+        sink = src_output_sink.create_sink("BatchExport", 1, expected_total=500)
+
+        self.assertEqual(sink.progress.total, 500)
+        self.assertIsNone(src_output_sink.create_sink("get-latest-manifest-id", 2).progress)
+
+    def test_create_sink_uses_configuration(self):
+        """Test that sinks spool to a file named after the process once a spool directory is configured."""
+        self.assertIsNone(src_output_sink.create_sink("UnrealPak Extract", 42).spool_file)
+
+        src_output_sink.configure(spool_dir=self.test_path, lines_per_second=7)
+        sink = src_output_sink.create_sink("UnrealPak Extract", 42)
+        sink.close()
+
+        self.assertEqual(sink.spool_file, self.test_path / "UnrealPak_Extract-42.log.gz")
+        self.assertEqual(sink.lines_per_second, 7)
+        self.assertTrue(sink.spool_file.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import pipeline
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.pipeline module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_pipeline", os.path.join(src_path, "pipeline.py"))
+src_pipeline = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_pipeline)
+
+Pipeline = src_pipeline.Pipeline
+Stage = src_pipeline.Stage
+
+
+class TestPipeline(unittest.TestCase):
+    """Test cases for the Pipeline stage graph executor"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.logger_patcher = patch.object(src_pipeline, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+        self.calls = []
+        self.calls_lock = threading.Lock()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+
+    def _record(self, name, result=True):
+        """Build a stage function that records its call and returns result."""
+        def func():
+            with self.calls_lock:
+                self.calls.append(name)
+            return result
+        return func
+
+    def test_run_respects_dependencies(self):
+        """Test that stages run after the stages producing their inputs."""
+        stages = [
+            Stage("export", self._record("export"), inputs=["pak", "usmap"]),
+            Stage("repack", self._record("repack"), inputs=["game"], outputs=["pak"]),
+            Stage("mapper", self._record("mapper"), inputs=["game"], outputs=["usmap"]),
+            Stage("download", self._record("download"), outputs=["game"]),
+        ]
+        self.assertTrue(Pipeline(stages).run())
+
+        self.assertEqual(self.calls[0], "download")
+        self.assertEqual(self.calls[-1], "export")
+        self.assertCountEqual(self.calls, ["download", "repack", "mapper", "export"])
+
+    def test_run_independent_stages_concurrently(self):
+        """Test that independent stages overlap instead of running one after another."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait_for_sibling():
+            barrier.wait()  # Raises BrokenBarrierError if the sibling never starts
+            return True
+
+        stages = [
+            Stage("repack", wait_for_sibling, outputs=["pak"]),
+            Stage("mapper", wait_for_sibling, outputs=["usmap"]),
+        ]
+        pipeline = Pipeline(stages)
+
+        self.assertTrue(pipeline.run())
+        self.assertEqual(pipeline.results, {"repack": "success", "mapper": "success"})
+
+    def test_run_failure_skips_only_downstream(self):
+        """Test that a failed stage skips its consumers but not unrelated stages."""
+        stages = [
+            Stage("download", self._record("download"), outputs=["game"]),
+            Stage("repack", self._record("repack", result=False), inputs=["game"], outputs=["pak"]),
+            Stage("mapper", self._record("mapper"), inputs=["game"], outputs=["usmap"]),
+            Stage("export", self._record("export"), inputs=["pak", "usmap"], outputs=["data"]),
+            Stage("publish", self._record("publish"), inputs=["data"]),
+        ]
+        pipeline = Pipeline(stages)
+
+        self.assertFalse(pipeline.run())
+        self.assertEqual(pipeline.results, {
+            "download": "success",
+            "repack": "failed",
+            "mapper": "success",
+            "export": "skipped",
+            "publish": "skipped",
+        })
+        self.assertNotIn("export", self.calls)
+        self.assertNotIn("publish", self.calls)
+
+    def test_run_exception_marks_stage_failed(self):
+        """Test that an exception in a stage is treated as a failure."""
+        def explode():
+            raise RuntimeError("boom")
+
+        pipeline = Pipeline([Stage("download", explode, outputs=["game"]), Stage("repack", self._record("repack"), inputs=["game"])])
+
+        self.assertFalse(pipeline.run())
+        self.assertEqual(pipeline.results["download"], "failed")
+        self.assertEqual(pipeline.results["repack"], "skipped")
+
+    def test_run_failed_stage_cancels_its_process_group(self):
+        """Test that each stage runs in its own process group, cancelled only if the stage fails."""
+        from supervisor import Supervisor
+        stage_supervisor = Supervisor()
+        groups = {}
+
+        def stage_func(name, result):
+            def func():
+                groups[name] = stage_supervisor.current_group()
+                return result
+            return func
+        pipeline = Pipeline([
+            Stage("ok", stage_func("ok", True)),
+            Stage("broken", stage_func("broken", False)),
+        ])
+        with patch.object(src_pipeline, 'get_supervisor', return_value=stage_supervisor):
+            pipeline.run()
+
+        self.assertEqual((groups["ok"].name, groups["broken"].name), ("ok", "broken"))
+        self.assertFalse(groups["ok"].cancelled)
+        self.assertTrue(groups["broken"].cancelled)
+
+    def test_run_disabled_stage_does_not_block_consumers(self):
+        """Test that inputs of a disabled stage are assumed to already exist."""
+        stages = [
+            Stage("mapper", self._record("mapper"), outputs=["usmap"], enabled=False),
+            Stage("export", self._record("export"), inputs=["usmap"]),
+        ]
+        pipeline = Pipeline(stages)
+
+        self.assertTrue(pipeline.run())
+        self.assertEqual(self.calls, ["export"])
+        self.assertEqual(pipeline.results["mapper"], "disabled")
+
+    def test_run_interrupt_skips_pending_stages(self):
+        """Test that an interrupt stops new stages from starting and is re-raised."""
+        stages = [
+            Stage("download", self._record("download"), outputs=["game"]),
+            Stage("repack", self._record("repack"), inputs=["game"]),
+        ]
+        pipeline = Pipeline(stages)
+
+        with patch.object(src_pipeline, 'wait', side_effect=KeyboardInterrupt()):
+            with self.assertRaises(KeyboardInterrupt):
+                pipeline.run()
+
+        self.assertEqual(pipeline.results["repack"], "skipped")
+        self.assertNotIn("repack", self.calls)
+
+    def test_run_waits_for_stages_in_slices(self):
+        """Test that a long stage is waited for in short slices, so Ctrl+C can interrupt the wait on Windows."""
+        timeouts = []
+        real_wait = src_pipeline.wait
+
+        def record_wait(futures, timeout=None, return_when=None):
+            timeouts.append(timeout)
+            return real_wait(futures, timeout=timeout, return_when=return_when)
+
+        def slow():
+            time.sleep(0.1)
+            return True
+
+        with patch.object(src_pipeline, 'WAIT_SLICE', 0.01), patch.object(src_pipeline, 'wait', side_effect=record_wait):
+            self.assertTrue(Pipeline([Stage("download", slow)]).run())
+
+        self.assertGreater(len(timeouts), 1)
+        self.assertEqual(set(timeouts), {0.01})
+
+    def test_run_records_stage_telemetry(self):
+        """Test that each stage that ran is timed when telemetry is given."""
+        telemetry = src_pipeline.Telemetry()
+        stages = [
+            Stage("download", self._record("download"), outputs=["game"]),
+            Stage("repack", self._record("repack"), inputs=["game"]),
+            Stage("mapper", self._record("mapper"), enabled=False),
+        ]
+
+        self.assertTrue(Pipeline(stages, telemetry=telemetry).run())
+        self.assertCountEqual(telemetry.stages, ["download", "repack"])
+
+    def test_run_lane_runs_one_stage_at_a_time(self):
+        """Test that stages sharing a lane never overlap, in stage order."""
+        active = []
+        overlaps = []
+
+        def exclusive(name):
+            def func():
+                with self.calls_lock:
+                    if active:
+                        overlaps.append(name)
+                    active.append(name)
+                    self.calls.append(name)
+                time.sleep(0.05)
+                with self.calls_lock:
+                    active.remove(name)
+                return True
+            return func
+
+        stages = [Stage(f"repack[{i}]", exclusive(f"repack[{i}]"), lane="repack") for i in range(3)]
+
+        self.assertTrue(Pipeline(stages).run())
+        self.assertEqual(overlaps, [])
+        self.assertEqual(self.calls, ["repack[0]", "repack[1]", "repack[2]"])
+
+    def test_run_lane_limit(self):
+        """Test that a lane can allow more than one stage at a time."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait_for_sibling():
+            barrier.wait()
+            return True
+
+        stages = [Stage("a", wait_for_sibling, lane="download"), Stage("b", wait_for_sibling, lane="download")]
+
+        self.assertTrue(Pipeline(stages, lane_limits={"download": 2}).run())
+
+    def test_run_admit_waits_for_running_stage(self):
+        """Test that a stage that is not admitted waits until other stages finish and then starts."""
+        stages = [
+            Stage("download[1]", self._record("download[1]")),
+            Stage("download[2]", self._record("download[2]"), admit=lambda results: results["download[1]"] == "success"),
+        ]
+
+        self.assertTrue(Pipeline(stages).run())
+        self.assertEqual(self.calls, ["download[1]", "download[2]"])
+
+    def test_run_admit_never_passes(self):
+        """Test that a stage that can never be admitted fails instead of hanging, skipping its consumers."""
+        stages = [
+            Stage("download", self._record("download"), outputs=["game"], admit=lambda results: False),
+            Stage("repack", self._record("repack"), inputs=["game"]),
+        ]
+        pipeline = Pipeline(stages)
+
+        self.assertFalse(pipeline.run())
+        self.assertEqual(pipeline.results, {"download": "failed", "repack": "skipped"})
+        self.assertEqual(self.calls, [])
+
+    def test_init_duplicate_producer_raises(self):
+        """Test that two stages producing the same artifact are rejected."""
+        with self.assertRaises(ValueError):
+            Pipeline([Stage("a", self._record("a"), outputs=["x"]), Stage("b", self._record("b"), outputs=["x"])])
+
+    def test_init_cycle_raises(self):
+        """Test that cyclic stage graphs are rejected."""
+        with self.assertRaises(ValueError):
+            Pipeline([Stage("a", self._record("a"), inputs=["y"], outputs=["x"]), Stage("b", self._record("b"), inputs=["x"], outputs=["y"])])
+
+
+if __name__ == '__main__':
+    unittest.main()
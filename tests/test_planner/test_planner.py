@@ -0,0 +1,165 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import planner
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.planner module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_planner", os.path.join(src_path, "planner.py"))
+src_planner = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_planner)
+
+from history import RunHistory
+from run_state import RunState
+
+StagePlan = src_planner.StagePlan
+GB = src_planner.GB
+
+
+class TestPlanner(unittest.TestCase):
+    """Test cases for the run planner and disk checks"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.logger_patcher = patch.object(src_planner, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+        self.history = RunHistory(self.test_path / "state" / "history.sqlite3")
+        self.run_state = RunState(self.test_path / "state" / "run_state.json")
+
+        paks_dir = self.test_path / "game" / "DungeonCrawler" / "Content" / "Paks"
+        paks_dir.mkdir(parents=True)
+        (paks_dir / "pakchunk0-Windows.pak").write_bytes(b"p" * 1000)
+        self.options = SimpleNamespace(
+            should_download_dependencies=False,
+            force_download_dependencies=False,
+            dependencies_from_lock=False,
+            should_download_steam_game=False,
+            force_steam_download=False,
+            manifest_id="",
+            steam_game_download_dir=self.test_path / "game",
+            should_repack=True,
+            force_repack=False,
+            repack_output_file=self.test_path / "output" / "repacked.pak",
+            should_get_mapper=False,
+            force_get_mapper=False,
+            output_mapper_file=self.test_path / "output" / "mappings.usmap",
+            should_batch_export=False,
+            force_export=False,
+            output_data_dir=self.test_path / "output" / "data",
+        )
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.history.close()
+        self.logger_patcher.stop()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _record_repack(self, wall_seconds, input_size, extracted_bytes, output_bytes):
+        report = {"started_at": 0, "stages": {"repack": {
+            "status": "success", "wall_seconds": wall_seconds, "input_size": input_size,
+            "extracted_bytes": extracted_bytes, "output_bytes": output_bytes,
+        }}}
+        self.history.record_run(report, True, {})
+
+    def test_check_disk_enough_space(self):
+        """Test that a plan that fits reports no problems."""
+        plan = StagePlan("repack", True, "", disk_bytes={self.test_path: GB}, scratch_bytes={self.test_path: GB})
+        with patch.object(src_planner, 'get_free_space', return_value=3 * GB):
+            self.assertEqual(src_planner.check_disk([plan]), [])
+
+    def test_check_disk_too_full(self):
+        """Test that a volume without room for the plan is reported."""
+        plan = StagePlan("repack", True, "", scratch_bytes={self.test_path / "not" / "yet": 2 * GB})
+        with patch.object(src_planner, 'get_free_space', return_value=GB):
+            problems = src_planner.check_disk([plan])
+
+        self.assertEqual(len(problems), 1)
+        self.assertIn("1.0 GB free", problems[0])
+
+    def test_check_disk_scratch_is_not_summed(self):
+        """Test that scratch space of separate stages is reused while lasting output adds up."""
+        plans = [
+            StagePlan("repack", True, "", disk_bytes={self.test_path: GB}, scratch_bytes={self.test_path: 2 * GB}),
+            StagePlan("batch_export", True, "", disk_bytes={self.test_path: GB}, scratch_bytes={self.test_path: 2 * GB}),
+            StagePlan("get_mapper", False, "", disk_bytes={self.test_path: 100 * GB}),
+        ]
+        with patch.object(src_planner, 'get_free_space', return_value=int(4.5 * GB)):
+            self.assertEqual(src_planner.check_disk(plans), [])
+        with patch.object(src_planner, 'get_free_space', return_value=4 * GB):
+            self.assertEqual(len(src_planner.check_disk(plans)), 1)
+
+    def test_estimate_repack_disk_uses_history_ratios(self):
+        """Test that the extraction and output estimates scale the recorded ratios to the input."""
+        self._record_repack(100, 1000, 4000, 500)
+
+        extracted, output = src_planner.estimate_repack_disk(self.options, 2000, self.history.baseline("repack"))
+
+        self.assertEqual(extracted, 8000)
+        self.assertEqual(output, 1000)
+
+    def test_estimate_repack_disk_subtracts_replaced_output(self):
+        """Test that the repacked pak being replaced counts towards the new one."""
+        self.options.repack_output_file.parent.mkdir(parents=True)
+        self.options.repack_output_file.write_bytes(b"o" * 800)
+
+        extracted, output = src_planner.estimate_repack_disk(self.options, 1000, None)
+
+        self.assertEqual(extracted, 1000 * src_planner.DEFAULT_EXPANSION_RATIO)
+        self.assertEqual(output, 200)
+
+    def test_get_timeout_scales_history_to_input(self):
+        """Test that the timeout is a multiple of the expected duration for the input size."""
+        self._record_repack(1000, 1000, 3000, 1000)
+        baseline = self.history.baseline("repack")
+
+        self.assertEqual(src_planner.get_timeout(baseline), 1000 * src_planner.TIMEOUT_FACTOR)
+        self.assertEqual(src_planner.get_timeout(baseline, input_size=2000), 2000 * src_planner.TIMEOUT_FACTOR)
+        self.assertEqual(src_planner.get_timeout(baseline, input_size=10), src_planner.MIN_TIMEOUT)
+
+    def test_get_timeout_without_history(self):
+        """Test that a stage without history gets the default timeout."""
+        self.assertEqual(src_planner.get_timeout(None), src_planner.NO_HISTORY_TIMEOUT)
+        self.assertEqual(src_planner.get_timeout(None, default=120, minimum=120), 120)
+
+    def test_choose_extract_dir_none_fits(self):
+        """Test that no extraction directory is picked when no volume has room."""
+        with patch.object(src_planner, 'get_free_space', return_value=0):
+            self.assertIsNone(src_planner.choose_extract_dir(self.options, [self.test_path / "a", self.test_path / "b"], 10, 10))
+
+    def test_build_plan_repack_runs_with_estimates(self):
+        """Test that a repack without a previous run is planned with time and disk estimates from history."""
+        self._record_repack(100, 1000, 3000, 1000)
+
+        plans = src_planner.build_plan(self.options, self.run_state, self.history)
+
+        self.assertEqual([plan.name for plan in plans], ["repack"])
+        self.assertTrue(plans[0].runs)
+        self.assertIn("no previous successful run", plans[0].reason)
+        self.assertAlmostEqual(plans[0].wall_seconds, 100)
+        self.assertEqual(list(plans[0].scratch_bytes.values()), [3000])
+        self.assertEqual(plans[0].disk_bytes, {self.options.repack_output_file: 1000})
+
+    def test_build_plan_steam_download_undecided(self):
+        """Test that the download is undecided without a fixed manifest and later stages note it."""
+        self.options.should_download_steam_game = True
+
+        plans = src_planner.build_plan(self.options, self.run_state, self.history)
+
+        self.assertIsNone(plans[0].runs)
+        self.assertIn("decided again after the download", plans[1].reason)
+        self.assertIn("may run", src_planner.format_plan(plans, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
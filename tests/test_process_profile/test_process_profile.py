@@ -0,0 +1,130 @@
+import unittest
+import os
+import sys
+import subprocess
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import process_profile
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.process_profile module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_process_profile", os.path.join(src_path, "process_profile.py"))
+src_process_profile = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_process_profile)
+
+ProcessProfile = src_process_profile.ProcessProfile
+parse_profile = src_process_profile.parse_profile
+
+
+class TestProcessProfile(unittest.TestCase):
+    """Test cases for the process profiles"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.logger_patcher = patch.object(src_process_profile, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+        src_process_profile._warned.clear()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        src_process_profile.configure()
+
+    def test_parse_profile_all_settings(self):
+        """Test that every setting of a profile is parsed."""
+        profile = parse_profile("priority=below_normal io=idle cpus=0-3,6 memory=8G")
+
+        self.assertEqual(profile, ProcessProfile("below_normal", "idle", [0, 1, 2, 3, 6], 8 * 1024 ** 3))
+
+    def test_parse_profile_blank(self):
+        """Test that a blank profile sets nothing."""
+        self.assertFalse(parse_profile(""))
+        self.assertFalse(parse_profile(None))
+
+    def test_parse_profile_invalid(self):
+        """Test that unknown settings and invalid values are rejected."""
+        for text in ("priority=realtime", "io=high", "cpus=3-1", "cpus=a", "memory=lots", "nice=5", "priority"):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    parse_profile(text)
+
+    def test_parse_memory_units(self):
+        """Test that memory sizes default to MB and accept unit suffixes."""
+        self.assertEqual(src_process_profile.parse_memory("4096"), 4096 * 1024 ** 2)
+        self.assertEqual(src_process_profile.parse_memory("512M"), 512 * 1024 ** 2)
+        self.assertEqual(src_process_profile.parse_memory("1.5gb"), int(1.5 * 1024 ** 3))
+
+    def test_configure_merges_stage_over_default(self):
+        """Test that a stage profile only overrides the settings it sets."""
+        src_process_profile.configure("priority=below_normal io=idle", {"batch_export": "memory=16G", "repack": "priority=idle"})
+
+        self.assertEqual(src_process_profile.get_profile("batch_export"), ProcessProfile("below_normal", "idle", None, 16 * 1024 ** 3))
+        self.assertEqual(src_process_profile.get_profile("repack"), ProcessProfile("idle", "idle"))
+        self.assertEqual(src_process_profile.get_profile("get_mapper"), ProcessProfile("below_normal", "idle"))
+        self.assertEqual(src_process_profile.get_profile(None), ProcessProfile("below_normal", "idle"))
+
+    def test_configure_invalid_stage_profile(self):
+        """Test that an invalid stage profile names the stage and leaves the configuration as it was."""
+        src_process_profile.configure("priority=idle")
+
+        with self.assertRaises(ValueError) as cm:
+            src_process_profile.configure("", {"repack": "cpus=x"})
+
+        self.assertIn("repack", str(cm.exception))
+        self.assertEqual(src_process_profile.get_profile("repack"), ProcessProfile("idle"))
+
+    def test_get_profile_backfill_stage(self):
+        """Test that backfill stages use the profile of their stage."""
+        src_process_profile.configure("", {"repack": "priority=idle"})
+
+        self.assertEqual(src_process_profile.get_profile("repack[1234567890]"), ProcessProfile("idle"))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "nice and CPU affinity are checked through /proc")
+    def test_apply_profile_to_process(self):
+        """Test that priority and CPU affinity are applied to a running process and its children."""
+        import psutil
+        code = "import subprocess, sys, time\nsubprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\nprint('ready', flush=True)\ntime.sleep(30)"
+        process = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE)
+        try:
+            process.stdout.readline()
+            src_process_profile.apply_profile(process.pid, ProcessProfile("below_normal", cpu_affinity=[0]), "tool")
+
+            root = psutil.Process(process.pid)
+            for proc in [root] + root.children(recursive=True):
+                self.assertEqual(proc.nice(), 10)
+                self.assertEqual(proc.cpu_affinity(), [0])
+            self.assertEqual(len(root.children()), 1)
+        finally:
+            for child in psutil.Process(process.pid).children(recursive=True):
+                child.kill()
+            process.kill()
+            process.wait()
+            process.stdout.close()
+
+    def test_apply_profile_warns_once_when_denied(self):
+        """Test that a setting the exporter may not apply is skipped with a single warning."""
+        import psutil
+        process = subprocess.Popen([sys.executable, '-c', "import time; time.sleep(30)"])
+        try:
+            with patch.object(psutil.Process, 'nice', side_effect=psutil.AccessDenied(process.pid)):
+                src_process_profile.apply_profile(process.pid, ProcessProfile("above_normal"), "tool")
+                src_process_profile.apply_profile(process.pid, ProcessProfile("above_normal"), "tool")
+        finally:
+            process.kill()
+            process.wait()
+
+        self.mock_logger.warning.assert_called_once()
+        self.assertIn("Could not apply the process profile", self.mock_logger.warning.call_args[0][0])
+
+    def test_apply_profile_empty_does_nothing(self):
+        """Test that a profile without scheduling settings doesn't touch the process."""
+        with patch.dict(sys.modules, {'psutil': None}):
+            src_process_profile.apply_profile(1, ProcessProfile(memory_limit=1024), "tool")
+
+        self.mock_logger.debug.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+import unittest
+import os
+import sys
+import asyncio
+import shlex
+import time
+from unittest.mock import patch, call
+
+# Add the src directory to the Python path to import process_runner
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# The runner logs through output_sink, imported by name like run_process does
+import output_sink
+
+# Import directly from the src.process_runner module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_process_runner", os.path.join(src_path, "process_runner.py"))
+src_process_runner = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_process_runner)
+
+ProcessRunner = src_process_runner.ProcessRunner
+get_command = src_process_runner.get_command
+
+
+class TestProcessRunner(unittest.TestCase):
+    """Test cases for the asyncio process runner"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start one runner shared by the tests, like run_process does."""
+        cls.runner = ProcessRunner()
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.logger_patcher = patch.object(output_sink, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+
+    @patch('os.name', 'nt')
+    @patch.object(src_process_runner, 'split_windows_command_line', side_effect=shlex.split)
+    def test_get_command_shell_script_on_windows(self, mock_split):
+        """Test that shell scripts are run through bash on Windows."""
+        self.assertEqual(get_command("script.sh"), ['bash', 'script.sh'])
+        self.assertEqual(get_command("script.sh --arg"), ['bash', 'script.sh', '--arg'])
+        self.assertEqual(get_command(["script.sh", "--arg"]), ['bash', 'script.sh', '--arg'])
+        self.assertEqual(get_command(["myscript.sh", "--arg1", "value"]), ['bash', 'myscript.sh', '--arg1', 'value'])
+        self.assertEqual(get_command(["tool.exe", "script.sh"]), ['tool.exe', 'script.sh'])
+        self.assertEqual(get_command([]), [])
+
+    @patch('os.name', 'nt')
+    @patch.object(src_process_runner, 'split_windows_command_line', side_effect=shlex.split)
+    def test_get_command_string_on_windows(self, mock_split):
+        """Test that a command line string is split the way Windows parses it, and other programs are not changed."""
+        self.assertEqual(get_command("python script.py"), ['python', 'script.py'])
+        mock_split.assert_called_once_with("python script.py")
+
+    @patch('os.name', 'posix')
+    def test_get_command_shell_script_on_unix(self):
+        """Test that shell scripts are run directly on Unix."""
+        self.assertEqual(get_command("script.sh"), ['script.sh'])
+        self.assertEqual(get_command(["ls", "-la"]), ['ls', '-la'])
+
+    @patch('os.name', 'posix')
+    def test_get_command_string_with_arguments_on_unix(self):
+        """Test that a command line string is split into the program and its arguments, quotes included."""
+        self.assertEqual(get_command("echo hello"), ['echo', 'hello'])
+        self.assertEqual(get_command("tool --name 'two words'"), ['tool', '--name', 'two words'])
+
+    @unittest.skipUnless(os.name == 'nt', "CommandLineToArgvW is only available on Windows")
+    def test_split_windows_command_line(self):
+        """Test that a Windows command line is split like Windows does, and joined back to the same command line."""
+        command_line = 'C:\\Tools\\UnrealPak.exe "C:\\Program Files\\Game\\a.pak" -Extract'
+        arguments = src_process_runner.split_windows_command_line(command_line)
+
+        self.assertEqual(arguments, ['C:\\Tools\\UnrealPak.exe', 'C:\\Program Files\\Game\\a.pak', '-Extract'])
+        self.assertEqual(src_process_runner.subprocess.list2cmdline(arguments), command_line)
+        self.assertEqual(src_process_runner.split_windows_command_line(""), [])
+
+    def test_start_string_command_with_arguments(self):
+        """Test that a command line string with arguments runs the program with them."""
+        arguments = [sys.executable, '-c', 'import sys; sys.exit(len(sys.argv))', 'a b', 'c']
+        command_line = src_process_runner.subprocess.list2cmdline(arguments) if os.name == 'nt' else shlex.join(arguments)
+
+        self.assertEqual(self.runner.start(command_line, "argv").wait(10), 3)
+
+    def test_start_supervises_many_processes_on_one_loop(self):
+        """Test that many processes started from one thread run at once."""
+        start_time = time.monotonic()
+        handles = [self.runner.start([sys.executable, '-c', f"import time; time.sleep(1); print({index})"], f"p{index}") for index in range(8)]
+        exit_codes = [handle.wait() for handle in handles]
+
+        self.assertEqual(exit_codes, [0] * 8)
+        self.assertLess(time.monotonic() - start_time, 5)
+        for index in range(8):
+            self.mock_logger.debug.assert_any_call(f'[process: p{index}] {index}')
+
+    def test_start_timeout_stops_process(self):
+        """Test that a process running past its timeout is terminated and the wait raises."""
+        handle = self.runner.start([sys.executable, '-c', "import time; time.sleep(30)"], "slow", timeout=0.5)
+
+        with self.assertRaises(TimeoutError) as cm:
+            handle.wait()
+
+        self.assertIn("Process slow timed out after 0.5 seconds", str(cm.exception))
+        self.assertIsNotNone(handle.poll())
+
+    def test_start_kills_process_ignoring_terminate(self):
+        """Test that a process ignoring terminate is killed after the grace period."""
+        code = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(30)"
+        with patch.object(src_process_runner, 'TERMINATE_GRACE', 0.5):
+            handle = self.runner.start([sys.executable, '-c', code], "stubborn", timeout=1)
+            with self.assertRaises(TimeoutError):
+                handle.wait()
+
+        self.assertIsNotNone(handle.poll())
+
+    def test_start_idle_watchdog_stops_stalled_process(self):
+        """Test that a process without output or activity is stopped at its idle timeout, not its timeout."""
+        start_time = time.monotonic()
+        handle = self.runner.start([sys.executable, '-c', "import time; print('started', flush=True); time.sleep(30)"], "hung", timeout=20, idle_timeout=1)
+
+        with self.assertRaises(src_process_runner.ProcessStalledError) as cm:
+            handle.wait()
+
+        self.assertIn("Process hung stalled: no output and no CPU or disk activity for 1 seconds", str(cm.exception))
+        self.assertLess(time.monotonic() - start_time, 10)
+        self.assertIsNotNone(handle.poll())
+
+    def test_start_idle_watchdog_keeps_busy_process(self):
+        """Test that a silent process using the CPU is left running."""
+        code = "import time\nend = time.monotonic() + 2.5\nwhile time.monotonic() < end: pass"
+        handle = self.runner.start([sys.executable, '-c', code], "busy", idle_timeout=1)
+
+        self.assertEqual(handle.wait(), 0)
+
+    def test_start_idle_watchdog_needs_progress_from_parsed_tools(self):
+        """Test that output without progress doesn't keep a tool with a progress parser alive."""
+        code = "import time\nfor _ in range(100):\n    print('Loading mappings', flush=True)\n    time.sleep(0.1)"
+        handle = self.runner.start([sys.executable, '-c', code], "BatchExport", idle_timeout=1)
+
+        with self.assertRaises(src_process_runner.ProcessStalledError) as cm:
+            handle.wait()
+
+        self.assertIn("no progress", str(cm.exception))
+
+    def test_start_idle_watchdog_off(self):
+        """Test that an idle timeout of 0 turns the watchdog off."""
+        handle = self.runner.start([sys.executable, '-c', "import time; time.sleep(1.5)"], "quiet", idle_timeout=0)
+
+        self.assertEqual(handle.wait(), 0)
+
+    def test_start_memory_limit_stops_process(self):
+        """Test that a process using more memory than its limit is stopped."""
+        code = "import time\ndata = bytearray(200 * 1024 * 1024)\nprint('allocated', flush=True)\ntime.sleep(30)"
+        handle = self.runner.start([sys.executable, '-c', code], "hungry", timeout=20, memory_limit=100 * 1024 * 1024)
+
+        with self.assertRaises(src_process_runner.ProcessMemoryError) as cm:
+            handle.wait()
+
+        self.assertIn("Process hungry used", str(cm.exception))
+        self.assertIn("over its memory limit of 100 MB", str(cm.exception))
+        self.assertIsNotNone(handle.poll())
+
+    def test_start_memory_limit_keeps_process_under_it(self):
+        """Test that a process staying under its memory limit runs to the end."""
+        handle = self.runner.start([sys.executable, '-c', "import time; time.sleep(1.5)"], "small", memory_limit=1024 ** 3)
+
+        self.assertEqual(handle.wait(), 0)
+
+    def test_read_output_splits_lines_across_chunks(self):
+        """Test that lines split over several reads are joined before logging."""
+        class FakeStream:
+            def __init__(self, chunks):
+                self.chunks = list(chunks)
+
+            async def read(self, size):
+                return self.chunks.pop(0) if self.chunks else b''
+
+        class FakeProcess:
+            def __init__(self, chunks):
+                self.stdout = FakeStream(chunks)
+                self.returncode = 0
+
+            async def wait(self):
+                return 0
+
+        process = FakeProcess([b'hel', b'lo\nwor', b'ld\n\nsecond', b' half', b''])
+        asyncio.run(src_process_runner.read_output(process, output_sink.OutputSink("chunks")))
+
+        self.assertEqual(self.mock_logger.debug.call_args_list, [
+            call('[process: chunks] hello'),
+            call('[process: chunks] world'),
+            call('[process: chunks] second half'),
+        ])
+
+    def test_read_output_replaces_invalid_utf8(self):
+        """Test that output that isn't valid UTF-8 is still logged."""
+        handle = self.runner.start([sys.executable, '-c', "import sys; sys.stdout.buffer.write(b'odd \\xff byte\\n')"], "bytes")
+        handle.wait()
+
+        self.mock_logger.debug.assert_called_with('[process: bytes] odd � byte')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import progress
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.progress module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_progress", os.path.join(src_path, "progress.py"))
+src_progress = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_progress)
+
+ProgressTracker = src_progress.ProgressTracker
+
+
+class TestProgressParsers(unittest.TestCase):
+    """Test cases for the per-tool progress parsers"""
+
+    def test_get_parser_by_name_prefix(self):
+        """Test that parsers are picked by the run_process name."""
+        self.assertIsInstance(src_progress.get_parser("download-game-files"), src_progress.DepotDownloaderParser)
+        self.assertIsInstance(src_progress.get_parser("UnrealPak Extract"), src_progress.UnrealPakParser)
+        self.assertIsInstance(src_progress.get_parser("UnrealPak Repack"), src_progress.UnrealPakParser)
+        self.assertIsInstance(src_progress.get_parser("BatchExport"), src_progress.BatchExportParser)
+        self.assertIsNone(src_progress.get_parser("get-latest-manifest-id"))
+        self.assertIsNot(src_progress.get_parser("BatchExport"), src_progress.get_parser("BatchExport"))
+
+    def test_parser_without_parse_fails_when_created(self):
+        """Test that a parser that doesn't implement parse can't be created."""
+        class IncompleteParser(src_progress.ProgressParser):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteParser()
+
+    def test_depot_downloader_parser_percent_and_bytes(self):
+        """Test that DepotDownloader's percent lines and byte totals are parsed."""
+        parser = src_progress.DepotDownloaderParser()
+
+        self.assertIsNone(parser.parse(b'Connecting to Steam3... Done!\nGot depot key for 2016591'))
+        event = parser.parse(b' 10.50% game/a.pak\n 25.00% game/b.pak')
+        self.assertEqual((event.done, event.fraction), (2, 0.25))
+
+        event = parser.parse(b'100.00% game/c.pak\nDepot 2016591 - Downloaded 1048576 bytes (2097152 bytes uncompressed)\nTotal downloaded: 1048576 bytes (2097152 bytes uncompressed) from 1 depots')
+        self.assertEqual((event.done, event.fraction, event.bytes_done), (3, 1.0, 1048576))
+
+    def test_depot_downloader_parser_ignores_other_percent_signs(self):
+        """Test that a % in a line that isn't a file line doesn't break parsing."""
+        parser = src_progress.DepotDownloaderParser()
+
+        self.assertIsNone(parser.parse(b'Pre-allocating 100% of files'))
+
+    def test_unrealpak_parser_extract(self):
+        """Test that extracted files, failures, and the summary line are parsed."""
+        parser = src_progress.UnrealPakParser()
+
+        event = parser.parse(b'LogPakFile: Display: Extracted "A/a.uasset" to "out/A/a.uasset".\nLogPakFile: Display: Extracted "A/b.uasset" to "out/A/b.uasset".')
+        self.assertEqual((event.done, event.failed), (2, 0))
+        event = parser.parse(b'LogPakFile: Error: Unable to extract "A/c.uasset"')
+        self.assertEqual((event.done, event.failed), (2, 1))
+
+        # The summary line is authoritative
+        event = parser.parse(b'LogPakFile: Display: Finished extracting 5 files (including 1 errors).')
+        self.assertEqual((event.done, event.failed), (5, 1))
+
+    def test_unrealpak_parser_create(self):
+        """Test that the summary of a pak creation is parsed into files and bytes."""
+        parser = src_progress.UnrealPakParser()
+
+        event = parser.parse(b'LogPakFile: Display: Added 1234 files, 567890 bytes total, time 12.34s.')
+
+        self.assertEqual((event.done, event.bytes_done), (1234, 567890))
+
+    def test_batch_export_parser(self):
+        """Test that exported and failed assets and an announced total are parsed."""
+        parser = src_progress.BatchExportParser()
+
+        event = parser.parse(b'Found 300 packages to export\nExported DungeonCrawler/Item/A\nExported DungeonCrawler/Item/B\nFailed to export DungeonCrawler/Item/C')
+
+        self.assertEqual((event.done, event.failed, event.total), (2, 1, 300))
+        self.assertEqual(src_progress.BatchExportParser.unit, "assets")
+
+
+class TestProgressTracker(unittest.TestCase):
+    """Test cases for the progress tracker"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.logger_patcher = patch.object(src_progress, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+
+    def test_feed_logs_throughput_and_eta_from_expected_total(self):
+        """Test that progress is logged once per interval with throughput and an ETA."""
+        with patch.object(src_progress.time, 'monotonic', return_value=0.0):
+            tracker = ProgressTracker("BatchExport", src_progress.BatchExportParser(), expected_total=1000, log_interval=30)
+        with patch.object(src_progress.time, 'monotonic', return_value=10.0):
+            tracker.feed(b'Exported a\n' * 100)
+        self.mock_logger.info.assert_not_called()  # Before the first interval
+
+        with patch.object(src_progress.time, 'monotonic', return_value=40.0):
+            tracker.feed(b'Exported a\n' * 100)
+
+        self.mock_logger.info.assert_called_once_with("[progress: BatchExport] 200 / ~1,000 assets, 5.0 assets/s, ETA 2.7 min")
+        self.assertEqual(tracker.last_progress_at, 40.0)
+
+    def test_eta_from_fraction(self):
+        """Test that the ETA follows the reported fraction when there is one."""
+        with patch.object(src_progress.time, 'monotonic', return_value=0.0):
+            tracker = ProgressTracker("download-game-files", src_progress.DepotDownloaderParser())
+        with patch.object(src_progress.time, 'monotonic', return_value=60.0):
+            tracker.feed(b' 25.00% game/a.pak')
+
+        self.assertAlmostEqual(tracker.eta(60.0), 180.0)
+        self.assertIn("25.0%", tracker.describe(60.0))
+        self.assertIn("ETA 3.0 min", tracker.describe(60.0))
+
+    def test_eta_unknown_without_total(self):
+        """Test that there is no ETA without a total or fraction."""
+        tracker = ProgressTracker("UnrealPak Extract", src_progress.UnrealPakParser())
+        tracker.feed(b'Extracted "a" to "b"')
+
+        self.assertIsNone(tracker.eta())
+        self.assertNotIn("ETA", tracker.describe())
+
+    def test_output_without_progress_keeps_last_progress_time(self):
+        """Test that output that isn't progress doesn't count as progress."""
+        with patch.object(src_progress.time, 'monotonic', return_value=0.0):
+            tracker = ProgressTracker("BatchExport", src_progress.BatchExportParser())
+        with patch.object(src_progress.time, 'monotonic', return_value=50.0):
+            tracker.feed(b'Loading mappings...')
+
+        self.assertEqual(tracker.last_progress_at, 0.0)
+
+    def test_finish_logs_summary(self):
+        """Test that the summary has the totals and average rates."""
+        with patch.object(src_progress.time, 'monotonic', return_value=0.0):
+            tracker = ProgressTracker("UnrealPak Repack", src_progress.UnrealPakParser())
+            tracker.feed(b'Added 600 files, 125829120 bytes total, time 60s.')
+        with patch.object(src_progress.time, 'monotonic', return_value=60.0):
+            tracker.finish()
+
+        self.mock_logger.info.assert_called_once_with("[progress: UnrealPak Repack] Finished 600 files in 60s (10.0 files/s), 120 MB (2.0 MB/s)")
+
+    def test_finish_without_progress_logs_nothing(self):
+        """Test that a process that reported no progress gets no summary."""
+        tracker = ProgressTracker("BatchExport", src_progress.BatchExportParser())
+        tracker.finish()
+
+        self.mock_logger.info.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
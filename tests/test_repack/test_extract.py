@@ -0,0 +1,132 @@
+import unittest
+import os
+import sys
+import random
+import tempfile
+import shutil
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import repack
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.repack.repack module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_repack", os.path.join(src_path, "repack", "repack.py"))
+src_repack = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_repack)
+
+import trash
+
+Repacker = src_repack.Repacker
+
+
+class TestExtractPaks(unittest.TestCase):
+    """Test cases for the parallel, mount ordered pak extraction"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.logger_patcher = patch.object(src_repack, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+        self.trash = trash.Trash(self.test_path / "state" / "trash.json")
+        self.trash_patcher = patch.object(src_repack, 'get_trash', return_value=self.trash)
+        self.trash_patcher.start()
+        self.paks_dir = self.test_path / "Paks"
+        self.paks_dir.mkdir()
+        # Every pak contains shared.txt, so the pak extracted last decides its content
+        for name in ("pakchunk0-Windows.pak", "pakchunk1-Windows.pak", "pakchunk0-Windows_0_P.pak"):
+            (self.paks_dir / name).write_text(name)
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.trash.wait(10)
+        self.trash_patcher.stop()
+        self.logger_patcher.stop()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _repacker(self):
+        repacker = Repacker.__new__(Repacker)
+        repacker.journal_scope = None
+        repacker.baseline = None
+        repacker.unrealpak_exe = "UnrealPak.exe"
+        repacker.crypto_json = "Crypto.json"
+        repacker.paks_dir = self.paks_dir
+        repacker.pak_extract_dir = self.test_path / "PakExtract"
+        return repacker
+
+    def _fake_unrealpak(self, options, name, timeout, io_paths):
+        """Extract a pak like UnrealPak would, finishing in random order."""
+        pak_file, part_dir = Path(options[2]), Path(options[4])
+        time.sleep(random.uniform(0, 0.05))
+        (part_dir / "Game").mkdir(parents=True, exist_ok=True)
+        (part_dir / "Game" / "shared.txt").write_text(pak_file.name)
+        (part_dir / "Game" / f"{pak_file.stem}.txt").write_text(pak_file.name)
+
+    def test_get_pak_order_patch_paks_last(self):
+        """Test that patch paks are mounted after the base paks."""
+        order = [pak_file.name for pak_file in src_repack.get_pak_order(self.paks_dir)]
+
+        self.assertEqual(order, ["pakchunk0-Windows.pak", "pakchunk1-Windows.pak", "pakchunk0-Windows_0_P.pak"])
+
+    def test_merge_tree_replaces_files(self):
+        """Test that merging moves files over existing ones and removes the source."""
+        source = self.test_path / "source"
+        target = self.test_path / "target"
+        (source / "a").mkdir(parents=True)
+        (target / "a").mkdir(parents=True)
+        (source / "a" / "file.txt").write_text("new")
+        (target / "a" / "file.txt").write_text("old")
+
+        src_repack.merge_tree(source, target)
+
+        self.assertEqual((target / "a" / "file.txt").read_text(), "new")
+        self.assertFalse(source.exists())
+
+    def test_extract_paks_result_is_deterministic(self):
+        """Test that the extraction matches extracting in mount order, whichever pak finishes first."""
+        with patch.object(src_repack, 'run_process', side_effect=self._fake_unrealpak):
+            for _ in range(3):
+                repacker = self._repacker()
+                repacker.cleanup()
+                repacker.extract_paks()
+
+                extract_dir = self.test_path / "PakExtract" / "Game"
+                self.assertEqual((extract_dir / "shared.txt").read_text(), "pakchunk0-Windows_0_P.pak")
+                self.assertEqual(len(list(extract_dir.iterdir())), 4)
+                self.assertFalse(src_repack.get_parts_dir(repacker.pak_extract_dir).exists())
+
+    def test_extract_paks_uses_stage_timeout(self):
+        """Test that every pak gets the timeout of the whole stage, not its share of the stage's time per byte."""
+        timeouts = []
+
+        def record_timeout(options, name, timeout, io_paths):
+            timeouts.append(timeout)
+            self._fake_unrealpak(options, name, timeout, io_paths)
+
+        repacker = self._repacker()
+        repacker.baseline = {"seconds_per_input": 100.0, "input_size": 1, "wall_seconds": 100.0}
+        total_size = sum(pak_file.stat().st_size for pak_file in self.paks_dir.iterdir())
+        with patch.object(src_repack, 'run_process', side_effect=record_timeout):
+            repacker.extract_paks()
+
+        self.assertEqual(timeouts, [src_repack.get_timeout(repacker.baseline, input_size=total_size)] * 3)
+
+    def test_extract_paks_raises_first_error(self):
+        """Test that a failing extraction fails the whole extraction."""
+        def fail_one(options, name, timeout, io_paths):
+            if "pakchunk1" in options[2]:
+                raise Exception("Process UnrealPak Extract exited with code 1")
+            self._fake_unrealpak(options, name, timeout, io_paths)
+
+        with patch.object(src_repack, 'run_process', side_effect=fail_one):
+            with self.assertRaises(Exception):
+                self._repacker().extract_paks()
+
+
+if __name__ == '__main__':
+    unittest.main()
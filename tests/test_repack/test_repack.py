@@ -1,5 +1,7 @@
 import unittest
+from unittest.mock import patch
 from src.repack.repack import Repacker
+from trash import Trash
 from pathlib import Path
 
 class DummyOptions:
@@ -36,8 +38,11 @@ class TestRepacker(unittest.TestCase):
             repacker = Repacker.__new__(Repacker)
             repacker.options = opts
             repacker.pak_extract_dir = pak_extract_dir
-            # Run cleanup
-            repacker.cleanup()
+            # Run cleanup, into a trash recorded in the temp dir
+            trash = Trash(Path(temp_dir) / "state" / "trash.json")
+            with patch('src.repack.repack.get_trash', return_value=trash):
+                repacker.cleanup()
+            trash.wait(10)
             # PakExtract dir should be removed
             self.assertFalse(pak_extract_dir.exists())
     def setUp(self):
@@ -0,0 +1,160 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import run_state
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.run_state module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_run_state", os.path.join(src_path, "run_state.py"))
+src_run_state = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_run_state)
+
+RunState = src_run_state.RunState
+
+
+class TestRunState(unittest.TestCase):
+    """Test cases for RunState fingerprint tracking"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.state_file = self.test_path / "state" / "run_state.json"
+        self.output_file = self.test_path / "output.pak"
+        self.output_file.write_bytes(b"pak" * 100)
+        self.logger_patcher = patch.object(src_run_state, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _logged_info(self):
+        return " ".join(str(c.args[0]) for c in self.mock_logger.info.call_args_list)
+
+    def test_should_run_without_record(self):
+        """Test that a stage runs when nothing has been recorded for it."""
+        run_state = RunState(self.state_file)
+
+        self.assertTrue(run_state.should_run("repack", self.output_file, {"manifest_id": "1"}, outputs=[self.output_file]))
+        self.assertIn("no previous successful run", self._logged_info())
+
+    def test_should_run_skips_unchanged_fingerprint(self):
+        """Test that a recorded stage with the same fingerprint and existing outputs is skipped."""
+        run_state = RunState(self.state_file)
+        run_state.record("repack", self.output_file, {"manifest_id": "1"})
+
+        self.assertFalse(run_state.should_run("repack", self.output_file, {"manifest_id": "1"}, outputs=[self.output_file]))
+        self.assertIn("Skipping repack", self._logged_info())
+
+    def test_should_run_reports_changed_keys(self):
+        """Test that a changed fingerprint reruns the stage and names what changed."""
+        run_state = RunState(self.state_file)
+        run_state.record("repack", self.output_file, {"manifest_id": "1", "crypto_json": "abc"})
+
+        self.assertTrue(run_state.should_run("repack", self.output_file, {"manifest_id": "2", "crypto_json": "abc"}, outputs=[self.output_file]))
+        self.assertIn("inputs changed since last run (manifest_id)", self._logged_info())
+
+    def test_should_run_missing_output(self):
+        """Test that a missing output reruns the stage even with an unchanged fingerprint."""
+        run_state = RunState(self.state_file)
+        run_state.record("repack", self.output_file, {"manifest_id": "1"})
+        self.output_file.unlink()
+
+        self.assertTrue(run_state.should_run("repack", self.output_file, {"manifest_id": "1"}, outputs=[self.output_file]))
+
+    def test_should_run_empty_output_dir(self):
+        """Test that an empty output directory reruns the stage."""
+        output_dir = self.test_path / "data"
+        output_dir.mkdir()
+        run_state = RunState(self.state_file)
+        run_state.record("batch_export", output_dir, {"mapping_file": "abc"})
+
+        self.assertTrue(run_state.should_run("batch_export", output_dir, {"mapping_file": "abc"}, outputs=[output_dir]))
+
+    def test_should_run_force(self):
+        """Test that force always reruns the stage."""
+        run_state = RunState(self.state_file)
+        run_state.record("repack", self.output_file, {"manifest_id": "1"})
+
+        self.assertTrue(run_state.should_run("repack", self.output_file, {"manifest_id": "1"}, outputs=[self.output_file], force=True))
+
+    def test_explain_does_not_log(self):
+        """Test that explain returns the decision and reason without logging it."""
+        run_state = RunState(self.state_file)
+        run_state.record("repack", self.output_file, {"manifest_id": "1"})
+
+        runs, reason = run_state.explain("repack", self.output_file, {"manifest_id": "2"}, outputs=[self.output_file])
+
+        self.assertTrue(runs)
+        self.assertIn("manifest_id", reason)
+        self.mock_logger.info.assert_not_called()
+
+    def test_begin_forgets_record(self):
+        """Test that starting a stage removes its record so an interrupted run is not skipped next time."""
+        run_state = RunState(self.state_file)
+        run_state.record("repack", self.output_file, {"manifest_id": "1"})
+        run_state.begin("repack", self.output_file)
+
+        self.assertTrue(RunState(self.state_file).should_run("repack", self.output_file, {"manifest_id": "1"}, outputs=[self.output_file]))
+
+    def test_record_persists_between_instances(self):
+        """Test that recorded fingerprints are written to the state file."""
+        RunState(self.state_file).record("repack", self.output_file, {"manifest_id": "1"})
+
+        data = json.loads(self.state_file.read_text())
+        self.assertEqual(len(data["stages"]), 1)
+        self.assertFalse(RunState(self.state_file).should_run("repack", self.output_file, {"manifest_id": "1"}))
+
+    def test_records_are_separate_per_target(self):
+        """Test that the same stage writing to different outputs keeps separate records."""
+        run_state = RunState(self.state_file)
+        run_state.record("repack", self.test_path / "a.pak", {"manifest_id": "1"})
+
+        self.assertTrue(run_state.should_run("repack", self.test_path / "b.pak", {"manifest_id": "1"}))
+
+    def test_hash_file_uses_cache_until_file_changes(self):
+        """Test that file hashes are cached by size and mtime."""
+        run_state = RunState(self.state_file)
+        first = run_state.hash_file(self.output_file)
+
+        with patch("builtins.open", side_effect=AssertionError("file should not be reread")):
+            self.assertEqual(run_state.hash_file(self.output_file), first)
+
+        self.output_file.write_bytes(b"changed contents")
+        self.assertNotEqual(run_state.hash_file(self.output_file), first)
+
+    def test_pak_signature_changes_with_footer(self):
+        """Test that the pak signature reflects the size and the end of the file."""
+        before = RunState.pak_signature(self.output_file)
+        with open(self.output_file, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"X")
+
+        after = RunState.pak_signature(self.output_file)
+        self.assertEqual(before["size"], after["size"])
+        self.assertNotEqual(before["footer_sha256"], after["footer_sha256"])
+
+    def test_load_corrupt_state_file(self):
+        """Test that a corrupt state file is ignored with a warning."""
+        self.state_file.parent.mkdir(parents=True)
+        self.state_file.write_text("{not json")
+
+        run_state = RunState(self.state_file)
+
+        self.assertEqual(run_state.stages, {})
+        self.mock_logger.warning.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import os
+import sys
+import subprocess
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import stage_registry
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.stage_registry module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_stage_registry", os.path.join(src_path, "stage_registry.py"))
+src_stage_registry = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_stage_registry)
+
+load_stage = src_stage_registry.load_stage
+
+project_root = os.path.abspath(os.path.join(src_path, '..'))
+
+
+class TestStageRegistry(unittest.TestCase):
+    """Test cases for lazily loading stage entry points"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.logger_patcher = patch.object(src_stage_registry, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+
+    def test_load_stage_returns_entry_point(self):
+        """Test that a registered stage loads its entry point."""
+        entry_point = load_stage("get_mapper")
+
+        self.assertTrue(callable(entry_point))
+        self.assertEqual(entry_point.__name__, "main")
+        self.assertIn("mapper.get_mapper", sys.modules)
+
+    def test_load_stage_unknown_raises(self):
+        """Test that an unregistered stage raises ValueError."""
+        with self.assertRaises(ValueError):
+            load_stage("not_a_stage")
+
+    def test_load_stage_not_imported_at_startup(self):
+        """Test that --help does not import stage code or the libraries only runs need."""
+        script = (
+            "import sys, runpy\n"
+            "sys.path.insert(0, 'src')\n"
+            "sys.argv = ['run.py', '--help']\n"
+            "try:\n"
+            "    runpy.run_path('src/run.py', run_name='__main__')\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print('Loaded:', *[m for m in ('dependency_manager', 'pipeline', 'psutil', 'sqlite3', 'urllib.request', 'repack.repack') if m in sys.modules])\n"
+        )
+        result = subprocess.run([sys.executable, "-c", script], cwd=project_root, capture_output=True, text=True)
+
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "Loaded:", result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
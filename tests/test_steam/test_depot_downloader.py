@@ -230,7 +230,8 @@ class TestDepotDownloader(unittest.TestCase):
             with patch.object(depot, '_download') as mock_download:
                 with patch.object(depot, '_write_downloaded_manifest_id') as mock_write:
                     with patch.object(src_run_depot_downloader, 'logger') as mock_logger:
-                        depot.run(manifest_id)
+                        with patch.object(src_run_depot_downloader, 'annotate') as mock_annotate:
+                            depot.run(manifest_id)
                         
                         # Verify download and write were not called
                         mock_download.assert_not_called()
@@ -239,6 +240,9 @@ class TestDepotDownloader(unittest.TestCase):
                         # Verify logging
                         mock_logger.info.assert_called_once_with(f'Already downloaded manifest {manifest_id}')
 
+                        # Verify the run is kept out of the stage's timing history
+                        mock_annotate.assert_called_once_with(up_to_date=True)
+
     @patch('os.path.exists')
     def test_run_with_manifest_id_already_downloaded_with_force(self, mock_exists):
         """Test run method when manifest is already downloaded but force is True."""
@@ -81,6 +81,7 @@ class TestDepotDownloaderProcesses(unittest.TestCase):
             # Verify the name option was passed
             call_kwargs = mock_run_process.call_args[1]
             self.assertEqual(call_kwargs['name'], 'download-game-files')
+            self.assertEqual(call_kwargs['timeout'], src_run_depot_downloader.NO_HISTORY_TIMEOUT)
 
     @patch('os.path.exists')
     @patch.object(src_run_depot_downloader, 'run_process')
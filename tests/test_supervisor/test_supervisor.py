@@ -0,0 +1,217 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest.mock import patch, MagicMock
+
+# Add the src directory to the Python path to import supervisor
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.supervisor module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_supervisor", os.path.join(src_path, "supervisor.py"))
+src_supervisor = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_supervisor)
+
+# run_process imports the supervisor and the output sink by name, so those are the ones patched for it
+import supervisor
+import output_sink
+import process_profile
+import governor
+from utils import run_process
+
+Supervisor = src_supervisor.Supervisor
+TaskGroup = src_supervisor.TaskGroup
+
+
+def python_cmd(code):
+    """Command running a snippet of Python in a child process."""
+    return [sys.executable, '-c', code]
+
+
+class TestSupervisor(unittest.TestCase):
+    """Test cases for the process supervisor and task groups"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.supervisor = supervisor.Supervisor()
+        self.patchers = [
+            patch.object(supervisor, '_supervisor', self.supervisor),
+            patch.object(supervisor, 'logger'),
+            patch.object(src_supervisor, 'logger'),
+            patch.object(output_sink, 'logger'),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        for patcher in reversed(self.patchers):
+            patcher.stop()
+
+    def test_task_group_runs_highest_priority_first(self):
+        """Test that queued tasks start by priority, then in order of submission."""
+        started = []
+        tasks = TaskGroup("tasks", max_workers=1, supervisor=self.supervisor)
+        for name, priority in [("low", 0), ("high", 10), ("mid", 5), ("mid second", 5)]:
+            tasks.submit(started.append, name, priority=priority)
+        tasks.run()
+
+        self.assertEqual(started, ["high", "mid", "mid second", "low"])
+
+    def test_task_group_limits_workers(self):
+        """Test that no more than max_workers tasks run at once."""
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def task():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+        tasks = TaskGroup("tasks", max_workers=2, supervisor=self.supervisor)
+        for _ in range(6):
+            tasks.submit(task)
+        tasks.run()
+
+        self.assertEqual(max(peak), 2)
+
+    def test_task_group_failure_cancels_siblings(self):
+        """Test that a failing task kills the process trees of the running tasks and drops the queued ones."""
+        started = []
+
+        def sleeper(name):
+            started.append(name)
+            run_process(python_cmd("import time; time.sleep(30)"), name=name)
+
+        def failing():
+            time.sleep(0.5)  # Until the sleepers run
+            raise RuntimeError("broken pak")
+        tasks = TaskGroup("extract", max_workers=3, supervisor=self.supervisor)
+        tasks.submit(failing, priority=2)
+        tasks.submit(sleeper, "sibling 1", priority=1)
+        tasks.submit(sleeper, "sibling 2", priority=1)
+        tasks.submit(sleeper, "queued", priority=0)
+
+        start_time = time.monotonic()
+        with self.assertRaises(RuntimeError):
+            tasks.run()
+
+        self.assertLess(time.monotonic() - start_time, 15)
+        self.assertNotIn("queued", started)
+        self.assertEqual(self.supervisor.outcomes(), {src_supervisor.OUTCOME_CANCELLED: 2})
+        self.assertTrue(all(child.handle.poll() is not None for child in self.supervisor.children))
+
+    def test_run_process_records_outcomes(self):
+        """Test that how each process ended is recorded, with its group."""
+        with self.supervisor.group("stage"):
+            run_process(python_cmd("pass"), name="ok")
+            with self.assertRaises(Exception):
+                run_process(python_cmd("import sys; sys.exit(3)"), name="broken")
+            with self.assertRaises(Exception):
+                run_process(python_cmd("import time; time.sleep(30)"), name="slow", timeout=0.5)
+
+        outcomes = {child.name: (child.outcome, child.exit_code) for child in self.supervisor.children}
+        self.assertEqual(outcomes["ok"], (src_supervisor.OUTCOME_SUCCEEDED, 0))
+        self.assertEqual(outcomes["broken"], (src_supervisor.OUTCOME_FAILED, 3))
+        self.assertEqual(outcomes["slow"][0], src_supervisor.OUTCOME_TIMED_OUT)
+        self.assertIn("broken (PID", self.supervisor.children[1].describe())
+        self.assertIn("in stage: failed", self.supervisor.children[1].describe())
+
+    def test_run_process_uses_profile_of_stage(self):
+        """Test that a process gets the profile of the stage its group is nested in."""
+        process_profile.configure("", {"batch_export": "memory=100M"})
+        try:
+            with self.supervisor.group("batch_export"):
+                with self.supervisor.group("export"):
+                    with self.assertRaises(Exception) as cm:
+                        run_process(python_cmd("import time\ndata = bytearray(200 * 1024 * 1024)\ntime.sleep(30)"), name="BatchExport", timeout=20)
+            run_process(python_cmd("data = bytearray(200 * 1024 * 1024)"), name="other")
+        finally:
+            process_profile.configure()
+
+        self.assertIn("over its memory limit of 100 MB", str(cm.exception))
+        outcomes = {child.name: child.outcome for child in self.supervisor.children}
+        self.assertEqual(outcomes, {"BatchExport": src_supervisor.OUTCOME_OVER_MEMORY, "other": src_supervisor.OUTCOME_SUCCEEDED})
+
+    def test_run_process_invalid_profile_fails_cleanly(self):
+        """Test that a process whose profile can't be applied is stopped, recorded as failed and gives its slots back."""
+        import psutil
+        if not hasattr(psutil.Process, 'cpu_affinity'):
+            self.skipTest("CPU affinity is not supported on this platform")
+        process_profile.configure("", {"repack": "cpus=9999"})
+        mock_governor = MagicMock()
+        try:
+            with patch.object(governor, 'get_governor', return_value=mock_governor):
+                with self.supervisor.group("repack"):
+                    with self.assertRaises(Exception) as cm:
+                        run_process(python_cmd("import time; time.sleep(30)"), name="UnrealPak", timeout=20)
+        finally:
+            process_profile.configure()
+
+        self.assertIn("Could not apply the process profile", str(cm.exception.args[1]))
+        child = self.supervisor.children[0]
+        self.assertEqual(child.outcome, src_supervisor.OUTCOME_FAILED)
+        self.assertIsNotNone(child.handle.poll())
+        mock_governor.acquire.return_value.release.assert_called_once()
+
+    def test_group_cancels_background_processes_on_error(self):
+        """Test that a group left with an error cancels the processes still running in it, nested groups included."""
+        with self.assertRaises(ValueError):
+            with self.supervisor.group("get_mapper"):
+                with self.supervisor.group("game"):
+                    run_process(python_cmd("import time; time.sleep(30)"), name="DarkAndDarker", background=True)
+                raise ValueError("mappings never showed up")
+
+        child = self.supervisor.children[0]
+        self.assertEqual(child.outcome, src_supervisor.OUTCOME_CANCELLED)
+        self.assertEqual(child.group.path, "get_mapper/game")
+
+    def test_cancel_all_cancels_later_processes(self):
+        """Test that processes started after cancel_all are cancelled right away."""
+        self.supervisor.cancel_all("interrupted")
+
+        with self.assertRaises(Exception) as cm:
+            run_process(python_cmd("import time; time.sleep(30)"), name="late", timeout=20)
+
+        self.assertIn("late was cancelled", str(cm.exception))
+        self.assertEqual(self.supervisor.children[0].outcome, src_supervisor.OUTCOME_CANCELLED)
+
+    def test_cancelled_process_outcome_before_exit(self):
+        """Test that a cancelled process counts as cancelled even before its exit was reaped."""
+        child = self.supervisor.register(MagicMock(pid=1, poll=MagicMock(return_value=None)), "game", background=True)
+        child.cancelled = True
+
+        self.assertEqual(child.outcome, src_supervisor.OUTCOME_CANCELLED)
+        self.assertEqual(self.supervisor.running(), [])
+
+    def test_prune_forgets_ended_processes(self):
+        """Test that pruning keeps only the running processes, so later reports don't repeat earlier runs."""
+        running = self.supervisor.register(MagicMock(pid=1, poll=MagicMock(return_value=None)), "game", background=True)
+        ended = self.supervisor.register(MagicMock(pid=2, poll=MagicMock(return_value=0)), "UnrealPak")
+        ended.end(src_supervisor.OUTCOME_SUCCEEDED, 0)
+
+        self.assertEqual(self.supervisor.prune(), [ended])
+        self.assertEqual(self.supervisor.children, [running])
+        self.assertEqual(self.supervisor.outcomes(), {src_supervisor.OUTCOME_RUNNING: 1})
+
+    def test_log_report_counts_outcomes(self):
+        """Test that the report counts every outcome and lists the processes that didn't succeed."""
+        report_supervisor = Supervisor()
+        for name, exit_code in [("a", 0), ("b", 0), ("c", 1)]:
+            child = report_supervisor.register(MagicMock(pid=1, poll=MagicMock(return_value=exit_code)), name)
+            child.end(src_supervisor.OUTCOME_SUCCEEDED if exit_code == 0 else src_supervisor.OUTCOME_FAILED, exit_code)
+        report_supervisor.log_report()
+
+        src_supervisor.logger.info.assert_called_once_with("Processes: 1 failed, 2 succeeded")
+        src_supervisor.logger.warning.assert_called_once()
+        self.assertIn("c (PID 1): failed", src_supervisor.logger.warning.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import os
+import sys
+import json
+import tempfile
+import shutil
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import telemetry
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.telemetry module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_telemetry", os.path.join(src_path, "telemetry.py"))
+src_telemetry = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_telemetry)
+
+Telemetry = src_telemetry.Telemetry
+
+# Busy-loops for a moment and writes a file, so CPU and write counters move
+BUSY_SCRIPT = (
+    "import sys, time\n"
+    "end = time.time() + 0.5\n"
+    "while time.time() < end: pass\n"
+    "open(sys.argv[1], 'wb').write(b'x' * 1024 * 1024)\n"
+)
+
+
+class TestTelemetry(unittest.TestCase):
+    """Test cases for stage and process telemetry"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.logger_patcher = patch.object(src_telemetry, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+        src_telemetry.activate(None)
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _run_busy_process(self, telemetry):
+        process = subprocess.Popen([sys.executable, "-c", BUSY_SCRIPT, str(self.test_path / "out.bin")])
+        sampler = telemetry.track_process(process, "busy")
+        process.wait()
+        sampler.stop()
+        return sampler
+
+    def test_track_process_without_active_telemetry(self):
+        """Test that process tracking is a no-op unless telemetry is activated."""
+        self.assertIsNone(src_telemetry.track_process(subprocess.Popen([sys.executable, "-c", "pass"]), "noop"))
+
+    def test_sampler_records_process_resources(self):
+        """Test that a sampled process reports CPU time and memory."""
+        telemetry = Telemetry(sample_interval=0.05)
+
+        entry = self._run_busy_process(telemetry).to_dict()
+
+        self.assertEqual(entry["name"], "busy")
+        self.assertEqual(entry["exit_code"], 0)
+        self.assertGreater(entry["cpu_seconds"], 0)
+        self.assertGreater(entry["peak_rss_bytes"], 0)
+        self.assertGreaterEqual(entry["peak_processes"], 1)
+
+    def test_processes_are_attributed_to_the_running_stage(self):
+        """Test that processes started inside a stage are summed into that stage."""
+        telemetry = Telemetry(sample_interval=0.05)
+
+        with telemetry.stage("repack"):
+            self._run_busy_process(telemetry)
+        self._run_busy_process(telemetry)
+
+        report = telemetry.report({"repack": "success"})
+        self.assertEqual(report["stages"]["repack"]["status"], "success")
+        self.assertEqual(report["stages"]["repack"]["processes"], ["busy"])
+        self.assertGreater(report["stages"]["repack"]["process_cpu_seconds"], 0)
+        self.assertEqual([p["stage"] for p in report["processes"]], ["repack", None])
+
+    def test_stage_records_time_on_failure(self):
+        """Test that a stage raising an exception is still recorded."""
+        telemetry = Telemetry()
+
+        with self.assertRaises(RuntimeError):
+            with telemetry.stage("get_mapper"):
+                raise RuntimeError("boom")
+
+        self.assertIn("wall_seconds", telemetry.stages["get_mapper"])
+
+    def test_annotate_adds_fields_to_current_stage(self):
+        """Test that stages can attach fields such as their input size to their entry."""
+        telemetry = Telemetry()
+        src_telemetry.activate(telemetry)
+
+        with telemetry.stage("repack"):
+            src_telemetry.annotate(input_size=1024)
+        src_telemetry.annotate(input_size=1)  # Outside any stage, ignored
+
+        self.assertEqual(telemetry.stages["repack"]["input_size"], 1024)
+
+    def test_in_current_stage_attributes_other_threads(self):
+        """Test that work handed to another thread is attributed to the stage that started it."""
+        from concurrent.futures import ThreadPoolExecutor
+        telemetry = Telemetry()
+        src_telemetry.activate(telemetry)
+
+        with telemetry.stage("repack"):
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                executor.submit(src_telemetry.in_current_stage(lambda: src_telemetry.annotate(extracted_bytes=2048))).result()
+
+        self.assertEqual(telemetry.stages["repack"]["extracted_bytes"], 2048)
+
+    def test_write_report(self):
+        """Test that the report is written as JSON."""
+        telemetry = Telemetry(sample_interval=0.05)
+        with telemetry.stage("batch_export"):
+            self._run_busy_process(telemetry)
+
+        report_file = self.test_path / "logs" / "2025-01-01.report.json"
+        telemetry.write_report(report_file)
+
+        report = json.loads(report_file.read_text())
+        self.assertIn("batch_export", report["stages"])
+        self.assertEqual(len(report["processes"]), 1)
+        self.assertIn(report["processes"][0]["likely_bound_by"], ("cpu", "memory", "disk", "waiting"))
+
+    def test_classify(self):
+        """Test the bottleneck guess for a process tree."""
+        self.assertEqual(src_telemetry._classify(cpu_seconds=10, wall_seconds=10, peak_rss=1, io_bytes=0), "cpu")
+        self.assertEqual(src_telemetry._classify(cpu_seconds=1, wall_seconds=10, peak_rss=1, io_bytes=10), "disk")
+        self.assertEqual(src_telemetry._classify(cpu_seconds=1, wall_seconds=10, peak_rss=1, io_bytes=0), "waiting")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import os
+import sys
+import json
+import stat
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the Python path to import trash
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.trash module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_trash", os.path.join(src_path, "trash.py"))
+src_trash = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_trash)
+
+Trash = src_trash.Trash
+
+
+class TestTrash(unittest.TestCase):
+    """Test cases for the background deletion trash"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_path = Path(self.test_dir)
+        self.logger_patcher = patch.object(src_trash, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+        self.registry_file = self.test_path / "state" / "trash.json"
+        self.trash = Trash(self.registry_file, workers=4)
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.trash.wait(10)
+        self.logger_patcher.stop()
+        if self.test_path.exists():
+            shutil.rmtree(self.test_path)
+
+    def _make_tree(self, root, dirs=5, files=20):
+        """Create a small nested tree, with a read-only file like UnrealPak sometimes leaves."""
+        for index in range(dirs):
+            nested = root / f"dir{index}" / "nested"
+            nested.mkdir(parents=True)
+            for file_index in range(files):
+                (nested / f"file{file_index}.uasset").write_bytes(b"x" * 10)
+            (root / f"dir{index}" / "top.txt").write_text("top")
+        read_only = root / "read_only.txt"
+        read_only.write_text("locked")
+        os.chmod(read_only, stat.S_IREAD)
+        return root
+
+    def test_delete_tree_removes_everything(self):
+        """Test that the parallel walker deletes a nested tree, read-only files included."""
+        root = self._make_tree(self.test_path / "PakExtract")
+
+        directories = src_trash.delete_tree(root, workers=4)
+
+        self.assertFalse(root.exists())
+        self.assertEqual(directories, 11)  # The root, 5 directories and 5 nested ones
+
+    def test_move_returns_at_once_and_deletes_in_background(self):
+        """Test that a moved directory is gone from its place at once and from the trash once done."""
+        root = self._make_tree(self.test_path / "PakExtract")
+
+        trashed = self.trash.move(root)
+
+        self.assertFalse(root.exists())
+        self.assertEqual(trashed.parent, (self.test_path / src_trash.TRASH_DIR_NAME).absolute())
+        self.assertTrue(self.trash.wait(10))
+        self.assertFalse(trashed.exists())
+        self.assertFalse((self.test_path / src_trash.TRASH_DIR_NAME).exists())  # Emptied trash directories are removed
+        self.assertEqual(json.loads(self.registry_file.read_text()), [])
+
+    def test_move_missing_path(self):
+        """Test that moving a path that doesn't exist does nothing."""
+        self.assertIsNone(self.trash.move(self.test_path / "missing"))
+        self.assertFalse(self.registry_file.exists())
+
+    def test_move_deletes_now_if_rename_fails(self):
+        """Test that a path that can't be renamed into the trash is deleted right away."""
+        root = self._make_tree(self.test_path / "PakExtract")
+
+        with patch.object(src_trash.os, 'replace', side_effect=OSError("in use")):
+            self.assertIsNone(self.trash.move(root))
+
+        self.assertFalse(root.exists())
+        self.mock_logger.warning.assert_called_once()
+
+    def test_recover_deletes_leftovers_of_earlier_run(self):
+        """Test that the paths an earlier run moved to the trash and didn't delete are deleted on the next start."""
+        trash_dir = self.test_path / src_trash.TRASH_DIR_NAME
+        self._make_tree(trash_dir / "PakExtract-1")
+        (trash_dir / "old.pak-2").write_bytes(b"p")
+        unplugged = self.test_path / "unplugged" / src_trash.TRASH_DIR_NAME / "PakExtract-3"
+        self.registry_file.parent.mkdir(parents=True)
+        self.registry_file.write_text(json.dumps([str(trash_dir / "PakExtract-1"), str(trash_dir / "old.pak-2"), str(unplugged)]))
+
+        self.assertEqual(self.trash.recover(), 2)
+
+        self.assertTrue(self.trash.wait(10))
+        self.assertFalse(trash_dir.exists())
+        self.assertEqual(json.loads(self.registry_file.read_text()), [str(unplugged)])
+
+    def test_recover_deletes_only_recorded_paths(self):
+        """Test that recovering deletes neither unrecorded files in the trash directory nor recorded paths outside one."""
+        trash_dir = self.test_path / src_trash.TRASH_DIR_NAME
+        (trash_dir / "PakExtract-1").mkdir(parents=True)
+        (trash_dir / "not-ours.txt").write_text("keep")
+        user_trash = self.test_path / ".trash"
+        (user_trash / "photo.jpg").mkdir(parents=True)
+        self.registry_file.parent.mkdir(parents=True)
+        self.registry_file.write_text(json.dumps([str(trash_dir / "PakExtract-1"), str(user_trash)]))
+
+        self.assertEqual(self.trash.recover(), 1)
+
+        self.assertTrue(self.trash.wait(10))
+        self.assertEqual(os.listdir(trash_dir), ["not-ours.txt"])
+        self.assertTrue((user_trash / "photo.jpg").exists())
+        self.assertEqual(json.loads(self.registry_file.read_text()), [])
+
+    def test_move_after_background_deletion_finished(self):
+        """Test that the deletion thread is started again for a later move."""
+        for name in ("first", "second"):
+            root = self._make_tree(self.test_path / name, dirs=1, files=1)
+            self.trash.move(root)
+            self.assertTrue(self.trash.wait(10))
+
+        self.assertEqual(self.trash.pending, 0)
+        self.assertFalse((self.test_path / src_trash.TRASH_DIR_NAME).exists())
+
+    def test_lower_io_priority_does_not_raise(self):
+        """Test that lowering the I/O priority works or reports that it isn't supported."""
+        self.assertIsInstance(src_trash.lower_io_priority(), bool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,8 @@ import sys
 import os
 import tempfile
 import shutil
-from unittest.mock import patch, Mock
+from pathlib import Path
+from unittest.mock import patch, Mock, call
 
 # Add the src directory to the Python path to import utils
 src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
@@ -15,6 +16,8 @@ spec = importlib.util.spec_from_file_location("src_utils", os.path.join(src_path
 src_utils = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(src_utils)
 
+import trash
+
 clear_dir = src_utils.clear_dir
 
 
@@ -22,28 +25,35 @@ class TestClearDir(unittest.TestCase):
     """Test cases for the clear_dir function.
     
     The clear_dir function should clear directory contents but keep the directory itself.
-    Tests use temporary directories to avoid affecting the actual file system.
+    Tests use temporary directories and a trash with a temporary registry to avoid affecting the actual file system.
     """
 
     def setUp(self):
         """Set up temporary directory for each test."""
-        self.test_dir = tempfile.mkdtemp()
+        self.root_dir = tempfile.mkdtemp()
+        self.test_dir = os.path.join(self.root_dir, "cleared")
+        os.makedirs(self.test_dir)
+        self.logger_patcher = patch.object(trash, 'logger')
+        self.logger_patcher.start()
+        self.trash = trash.Trash(Path(self.root_dir) / "state" / "trash.json")
 
     def tearDown(self):
         """Clean up temporary directory after each test."""
-        if os.path.exists(self.test_dir):
+        self.trash.wait(10)
+        self.logger_patcher.stop()
+        if os.path.exists(self.root_dir):
             # Handle read-only files on Windows
             def handle_remove_readonly(func, path, exc):
                 if os.path.exists(path):
                     os.chmod(path, 0o777)
                     func(path)
             
-            shutil.rmtree(self.test_dir, onerror=handle_remove_readonly)
+            shutil.rmtree(self.root_dir, onerror=handle_remove_readonly)
 
     def test_clear_empty_directory(self):
         """Test clear_dir on an empty directory."""
         # Directory should remain empty and exist
-        clear_dir(self.test_dir)
+        clear_dir(self.test_dir, self.trash)
         self.assertTrue(os.path.exists(self.test_dir))
         self.assertTrue(os.path.isdir(self.test_dir))
         self.assertEqual(len(os.listdir(self.test_dir)), 0)
@@ -64,7 +74,7 @@ class TestClearDir(unittest.TestCase):
         self.assertTrue(os.path.exists(file2))
         
         # Clear directory
-        clear_dir(self.test_dir)
+        clear_dir(self.test_dir, self.trash)
         
         # Directory should exist but be empty
         self.assertTrue(os.path.exists(self.test_dir))
@@ -92,7 +102,7 @@ class TestClearDir(unittest.TestCase):
         self.assertTrue(os.path.exists(file_in_subdir))
         
         # Clear directory
-        clear_dir(self.test_dir)
+        clear_dir(self.test_dir, self.trash)
         
         # Directory should exist but be empty
         self.assertTrue(os.path.exists(self.test_dir))
@@ -119,7 +129,7 @@ class TestClearDir(unittest.TestCase):
         self.assertEqual(len(os.listdir(self.test_dir)), 2)
         
         # Clear directory
-        clear_dir(self.test_dir)
+        clear_dir(self.test_dir, self.trash)
         
         # Directory should be empty
         self.assertTrue(os.path.exists(self.test_dir))
@@ -137,7 +147,7 @@ class TestClearDir(unittest.TestCase):
         
         try:
             # Clear directory (may need to handle permission errors)
-            clear_dir(self.test_dir)
+            clear_dir(self.test_dir, self.trash)
             
             # Directory should be empty
             self.assertTrue(os.path.exists(self.test_dir))
@@ -152,7 +162,7 @@ class TestClearDir(unittest.TestCase):
         
         # Should raise an appropriate exception
         with self.assertRaises((FileNotFoundError, OSError)):
-            clear_dir(non_existent)
+            clear_dir(non_existent, self.trash)
 
     def test_clear_directory_with_hidden_files(self):
         """Test clear_dir removes hidden files (files starting with dot)."""
@@ -170,33 +180,44 @@ class TestClearDir(unittest.TestCase):
         self.assertTrue(os.path.exists(regular_file))
         
         # Clear directory
-        clear_dir(self.test_dir)
+        clear_dir(self.test_dir, self.trash)
         
         # Directory should be empty
         self.assertTrue(os.path.exists(self.test_dir))
         self.assertEqual(len(os.listdir(self.test_dir)), 0)
 
+    def test_clear_dir_leaves_other_trash_alone(self):
+        """Test that clear_dir doesn't use or empty a .trash directory that isn't the tool's own."""
+        user_trash = os.path.join(self.root_dir, ".trash")
+        os.makedirs(user_trash)
+        with open(os.path.join(user_trash, "keep.txt"), 'w') as f:
+            f.write("user content")
+        with open(os.path.join(self.test_dir, "file.txt"), 'w') as f:
+            f.write("test content")
+
+        clear_dir(self.test_dir, self.trash)
+        self.assertTrue(self.trash.wait(10))
+        self.trash.recover()
+
+        self.assertEqual(os.listdir(user_trash), ["keep.txt"])
+        self.assertFalse(os.path.exists(os.path.join(self.root_dir, trash.TRASH_DIR_NAME)))
+
     @patch('os.listdir')
-    @patch('os.path.isdir')
-    @patch('shutil.rmtree')
-    @patch('os.remove')
-    def test_clear_dir_mocked_operations(self, mock_remove, mock_rmtree, mock_isdir, mock_listdir):
+    @patch('trash.get_trash')
+    def test_clear_dir_mocked_operations(self, mock_get_trash, mock_listdir):
         """Test clear_dir with mocked file system operations."""
         # Mock directory contents
         mock_listdir.return_value = ['file.txt', 'subdir', '.hidden']
         
-        # Mock isdir checks
-        def mock_isdir_func(path):
-            return path.endswith('subdir')
-        mock_isdir.side_effect = mock_isdir_func
-        
         # Call clear_dir
         clear_dir('/test/path')
         
-        # Verify calls
+        # Verify every item is moved to the trash next to the directory
         mock_listdir.assert_called_once_with('/test/path')
-        mock_rmtree.assert_called_once()  # For subdir
-        self.assertEqual(mock_remove.call_count, 2)  # For file.txt and .hidden
+        trash_dir = Path('/test/path').absolute().parent / trash.TRASH_DIR_NAME
+        self.assertEqual(mock_get_trash.return_value.move.call_args_list, [
+            call(os.path.join('/test/path', name), trash_dir) for name in ['file.txt', 'subdir', '.hidden']
+        ])
 
     def test_clear_directory_with_special_characters(self):
         """Test clear_dir handles files with special characters."""
@@ -210,7 +231,7 @@ class TestClearDir(unittest.TestCase):
             f.write("content2")
         
         # Clear directory
-        clear_dir(self.test_dir)
+        clear_dir(self.test_dir, self.trash)
         
         # Directory should be empty
         self.assertTrue(os.path.exists(self.test_dir))
@@ -1,8 +1,20 @@
 import unittest
+import os
+import sys
+import subprocess
+
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+
 
 class TestUtils(unittest.TestCase):
     """Base test class for any future general utility tests."""
-    pass
+
+    def test_import_utils_without_psutil(self):
+        """Test that importing utils doesn't load psutil, which only process handling needs."""
+        code = f"import sys; sys.path.insert(0, {os.path.abspath(src_path)!r}); import utils; print('psutil' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+        self.assertEqual(output.strip(), "False")
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
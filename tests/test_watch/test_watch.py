@@ -0,0 +1,103 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+# Add the src directory to the Python path to import watch
+src_path = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+sys.path.insert(0, src_path)
+
+# Import directly from the src.watch module to avoid conflicts
+import importlib.util
+spec = importlib.util.spec_from_file_location("src_watch", os.path.join(src_path, "watch.py"))
+src_watch = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(src_watch)
+
+Watcher = src_watch.Watcher
+
+
+class TestWatcher(unittest.TestCase):
+    """Test cases for watch mode manifest polling"""
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.logger_patcher = patch.object(src_watch, 'logger')
+        self.mock_logger = self.logger_patcher.start()
+        self.run_pipeline = MagicMock(return_value=True)
+        self.watcher = Watcher(MagicMock(), self.run_pipeline, interval=600, jitter=60)
+        self.downloader = MagicMock()
+        self.watcher._downloader = self.downloader
+
+    def tearDown(self):
+        """Clean up after each test method."""
+        self.logger_patcher.stop()
+
+    def _set_manifests(self, latest, downloaded):
+        self.downloader._get_latest_manifest_id.return_value = latest
+        self.downloader._read_downloaded_manifest_id.return_value = downloaded
+
+    def test_check_runs_pipeline_for_new_manifest(self):
+        """Test that a manifest different from manifest.txt runs the pipeline with that manifest."""
+        self._set_manifests("222", "111")
+
+        self.assertTrue(self.watcher.check())
+        self.run_pipeline.assert_called_once_with("222")
+
+    def test_check_skips_downloaded_manifest(self):
+        """Test that nothing runs while the latest manifest is already downloaded."""
+        self._set_manifests("111", "111")
+
+        self.assertFalse(self.watcher.check())
+        self.run_pipeline.assert_not_called()
+
+    def test_check_retries_failed_manifest(self):
+        """Test that a manifest whose run failed is retried even though it is downloaded."""
+        self._set_manifests("222", "111")
+        self.run_pipeline.return_value = False
+        self.watcher.check()
+
+        self._set_manifests("222", "222")
+        self.run_pipeline.return_value = True
+        self.assertTrue(self.watcher.check())
+        self.assertIsNone(self.watcher.failed_manifest_id)
+
+        self.assertFalse(self.watcher.check())
+        self.assertEqual(self.run_pipeline.call_count, 2)
+
+    def test_check_survives_poll_errors(self):
+        """Test that a failed poll is logged instead of stopping the watcher."""
+        self.downloader._get_latest_manifest_id.side_effect = RuntimeError("steam is down")
+
+        self.assertFalse(self.watcher.check())
+        self.mock_logger.error.assert_called_once()
+        self.run_pipeline.assert_not_called()
+
+    def test_check_unknown_latest_manifest(self):
+        """Test that an undetermined latest manifest does not run the pipeline."""
+        self._set_manifests(None, "111")
+
+        self.assertFalse(self.watcher.check())
+        self.run_pipeline.assert_not_called()
+
+    def test_next_delay_stays_within_jitter(self):
+        """Test that the delay between checks is the interval plus or minus the jitter."""
+        for _ in range(100):
+            self.assertTrue(540 <= self.watcher.next_delay() <= 660)
+
+    def test_run_waits_between_checks(self):
+        """Test that run checks, waits, and stops after the requested number of checks."""
+        self._set_manifests("111", "111")
+        with patch.object(self.watcher._stop, 'wait') as mock_wait:
+            self.watcher.run(max_checks=3)
+
+        self.assertEqual(self.downloader._get_latest_manifest_id.call_count, 3)
+        self.assertEqual(mock_wait.call_count, 2)
+
+    def test_init_rejects_non_positive_interval(self):
+        """Test that a zero interval is rejected instead of polling in a busy loop."""
+        with self.assertRaises(ValueError):
+            Watcher(MagicMock(), self.run_pipeline, interval=0)
+
+
+if __name__ == '__main__':
+    unittest.main()